@@ -0,0 +1,102 @@
+"""
+Benchmark: backfill reanudable con checkpoint y presupuesto de tiempo.
+
+Simula un backfill largo con un FakeClock (las latencias de BigQuery avanzan
+el reloj en lugar de dormir) y un bucket en memoria. Encadena invocaciones
+resume hasta completar el job y comprueba que:
+- ninguna invocación supera su presupuesto de tiempo
+- cada partición se escribe exactamente una vez
+- las fechas con error se reintentan en la siguiente invocación
+- las invocaciones resume no listan el bucket
+
+Uso:
+    uv run python benchmarks/bench_backfill_resume.py --days 120 --budget 300
+"""
+
+import argparse
+import json
+import logging
+import re
+import sys
+from datetime import date, timedelta
+
+from fakes import FakeBigQueryClient, FakeClock, FakeStorageClient, load_function
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=120)
+    parser.add_argument("--rows", type=int, default=200)
+    parser.add_argument("--budget", type=float, default=300, help="Segundos simulados por invocación")
+    parser.add_argument("--query-latency", type=float, default=6.0, help="Segundos simulados por query")
+    parser.add_argument("--download-latency", type=float, default=2.0, help="Segundos simulados por día")
+    parser.add_argument("--max-invocations", type=int, default=50)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    module = load_function("ingest_taxis")
+
+    start = date(2023, 6, 1)
+    end = start + timedelta(days=args.days - 1)
+    failing = {(start + timedelta(days=args.days // 2)).isoformat()}
+
+    clock = FakeClock()
+    bq = FakeBigQueryClient(
+        rows_per_day=args.rows,
+        query_latency=args.query_latency,
+        download_latency=args.download_latency,
+        sleep=clock.sleep,
+        fail_once=failing,
+    )
+    gcs = FakeStorageClient()
+    module.set_client("bigquery", bq)
+    module.set_client("storage", gcs)
+    bucket = gcs.bucket(module.GCS_BUCKET)
+
+    # Una partición previa: la primera invocación debe saltarla
+    bucket.blob(module.partition_blob_path(start.isoformat())).upload_from_string(b"existing")
+
+    result = module.start_backfill(
+        start.isoformat(), end.isoformat(), job_id="bench", time_budget=args.budget, clock=clock
+    )
+    listings_after_start = len(bucket.list_prefixes)
+    invocations = [result]
+    while result["job_status"] != "completed" and len(invocations) < args.max_invocations:
+        result = module.resume_backfill("bench", time_budget=args.budget, clock=clock)
+        invocations.append(result)
+
+    for i, r in enumerate(invocations, 1):
+        print(
+            f"invocation {i:>2}: processed={r['processed_this_invocation']:>3}  "
+            f"completed={r['completed_dates']:>3}  remaining={r['remaining_dates']:>3}  "
+            f"elapsed={r['elapsed_seconds']:6.1f}s / {r['time_budget_seconds']:.0f}s  "
+            f"job_status={r['job_status']}  errors={len(r.get('errors', []))}"
+        )
+
+    checkpoint = json.loads(bucket.objects[module.backfill_checkpoint_path("bench")])
+    data_generations = [
+        gen for name, gen in bucket.generations.items() if name.startswith(f"{module.PARQUET_BASE_PATH}/")
+    ]
+    sample = checkpoint["completed"][(start + timedelta(days=1)).isoformat()]
+
+    checks = {
+        "job completed": result["job_status"] == "completed",
+        "within budget": all(r["elapsed_seconds"] <= r["time_budget_seconds"] for r in invocations),
+        "each partition written once": data_generations.count(1) == args.days,
+        "failed date retried": all(d in checkpoint["completed"] for d in failing) and not checkpoint["errors"],
+        "existing date skipped": checkpoint["skipped"] == [start.isoformat()],
+        # Solo los listados de una fecha al escribirla (_remove_stale_parts), ninguno por mes
+        "resume without listing": all(
+            re.search(r"/date=\d{4}-\d{2}-\d{2}/$", prefix)
+            for prefix in bucket.list_prefixes[listings_after_start:]
+        ),
+        "per-date metrics": sample["rows"] == args.rows and sample["bytes"] > 0 and sample["duration_seconds"] > 0,
+    }
+    print(f"sample checkpoint entry: {sample}")
+    for name, ok in checks.items():
+        print(f"{name:>28}: {'OK' if ok else 'FAIL'}")
+    sys.exit(0 if all(checks.values()) else 1)
+
+
+if __name__ == "__main__":
+    main()
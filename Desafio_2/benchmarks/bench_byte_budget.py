@@ -0,0 +1,189 @@
+"""
+Benchmark: ingesta de taxis contra una cuota diaria de bytes de BigQuery
+(scripts/set_bigquery_quotas.sh) sin presupuesto vs con dry run y
+presupuesto por invocación / día de cuota (QUERY_BYTE_BUDGET_GB,
+QUERY_DAILY_BYTE_BUDGET_GB).
+
+El cliente BigQuery falso rechaza las queries que superarían la cuota, como
+BigQuery con la cuota por usuario, y sus dry runs devuelven los bytes
+sintéticos de cada query (bytes_per_scan: la tabla pública no está
+particionada, así que un día y un tramo escanean lo mismo).
+
+1. Sin presupuesto: la ingesta lanza queries a ciegas y falla a mitad
+2. Con presupuesto diario igual a la cuota: admite lo que cabe y aplaza el resto
+   sin errores; una segunda invocación el mismo día no lanza ninguna query y
+   al día de cuota siguiente continúa donde se quedó
+3. EXTRACT_MODE=range: una query por tramo, el mismo rango cabe en el presupuesto
+4. Presupuesto por invocación con bytes reales por debajo de la estimación:
+   el contador diario se corrige con los bytes reales
+5. Backfill: para en estado running al agotar el presupuesto y se reanuda
+6. Una fecha cuya query no cabe ni con el presupuesto entero se marca exceeds_budget
+
+La cuota por defecto es un tercio de lo que escanea el rango (--days x
+--scan-gb), para que ningún escenario quepa entero en un solo día de cuota.
+
+Uso:
+    uv run python benchmarks/bench_byte_budget.py --days 30 --quota-gb 20
+"""
+
+import argparse
+import logging
+from datetime import date, timedelta
+
+from google.api_core import exceptions as gcs_exceptions
+
+from fakes import FakeBigQueryClient, FakeStorageClient, load_function
+
+GIB = 1024**3
+
+
+class QuotaClient(FakeBigQueryClient):
+    """Rechaza las queries (no los dry runs) que superarían la cuota diaria."""
+
+    def __init__(self, quota_bytes: int, **kwargs):
+        super().__init__(**kwargs)
+        self.quota_bytes = quota_bytes
+        self.used_bytes = 0
+
+    def reset_quota(self) -> None:
+        self.used_bytes = 0
+
+    def query(self, sql, *args, job_config=None, **kwargs):
+        job = super().query(sql, *args, job_config=job_config, **kwargs)
+        if getattr(job_config, "dry_run", False):
+            return job
+        with self._lock:
+            if self.used_bytes + job.total_bytes_processed > self.quota_bytes:
+                raise gcs_exceptions.Forbidden("Quota exceeded: Your usage exceeded quota for QueryUsagePerUserPerDay")
+            self.used_bytes += job.total_bytes_processed
+        return job
+
+
+def report(label: str, result: dict, bq: QuotaClient, jobs_before: int) -> None:
+    budget = result.get("byte_budget") or {}
+    print(
+        f"{label:>26}: written={len(result['dates_written']):>3}  errors={len(result.get('errors', [])):>3}  "
+        f"deferred={len(budget.get('deferred_dates', [])):>3}  jobs={len(bq.queries) - jobs_before:>3}  "
+        f"estimated={budget.get('estimated_bytes', 0) / GIB:6.1f} GiB  "
+        f"actual={budget.get('actual_bytes', result.get('bytes_processed', 0)) / GIB:6.1f} GiB"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--rows", type=int, default=1000, help="Viajes por día")
+    parser.add_argument("--quota-gb", type=float, help="Cuota diaria de bytes procesados (GiB; default: un tercio del rango)")
+    parser.add_argument("--scan-gb", type=float, default=2, help="Bytes procesados por query (GiB)")
+    args = parser.parse_args()
+    if args.quota_gb is None:
+        args.quota_gb = args.days * args.scan_gb / 3
+    fits = int(args.quota_gb // args.scan_gb)
+    if fits < 2 or 2 * fits >= args.days:
+        parser.error("--quota-gb must fit at least 2 queries and less than half of --days")
+
+    logging.disable(logging.WARNING)
+    module = load_function("ingest_taxis")
+    dates = [(date(2023, 1, 1) + timedelta(days=i)).isoformat() for i in range(args.days)]
+    start, end = dates[0], dates[-1]
+    checks = {}
+
+    def setup(**kwargs) -> QuotaClient:
+        gcs = FakeStorageClient()
+        bq = QuotaClient(int(args.quota_gb * GIB), rows_per_day=args.rows, query_latency=0, download_latency=0,
+                         bytes_per_scan=int(args.scan_gb * GIB), **kwargs)
+        module.set_client("storage", gcs)
+        module.set_client("bigquery", bq)
+        module.taxis_partitions.partition_index._cache.clear()
+        module.taxis_budget.QUERY_BYTE_BUDGET_GB = module.taxis_budget.QUERY_DAILY_BYTE_BUDGET_GB = 0
+        module.taxis_budget.quota_day = lambda: "2025-01-01"
+        return bq
+
+    # 1. Sin presupuesto: queries a ciegas hasta chocar con la cuota
+    bq = setup()
+    blind = module.process_taxi_ingestion(start, end)
+    report("no budget", blind, bq, 0)
+    checks["without a budget the run fails partway on the quota"] = (
+        blind["status"] == "partial_success" and "Quota exceeded" in blind["errors"][0]["error"]
+    )
+
+    # 2. Presupuesto diario igual a la cuota, repartido entre invocaciones
+    bq = setup()
+    module.taxis_budget.QUERY_DAILY_BYTE_BUDGET_GB = args.quota_gb
+    first = module.process_taxi_ingestion(start, end)
+    report("daily budget, run 1", first, bq, 0)
+    checks["one dry run per date, dry runs are not jobs"] = (
+        len(bq.dry_runs) == args.days and len(bq.queries) == first["bigquery_jobs"]
+    )
+    jobs = len(bq.queries)
+    second = module.process_taxi_ingestion(start, end)
+    report("same quota day, run 2", second, bq, jobs)
+    module.taxis_budget.quota_day = lambda: "2025-01-02"
+    bq.reset_quota()
+    jobs = len(bq.queries)
+    third = module.process_taxi_ingestion(start, end)
+    report("next quota day, run 3", third, bq, jobs)
+    checks["budget admits what fits and defers the rest without errors"] = (
+        first["status"] == "success" and len(first["dates_written"]) == fits
+        and first["byte_budget"]["deferred_dates"] == dates[fits:]
+    )
+    checks["second run on the same quota day runs no query"] = (
+        second["new_dates_processed"] == 0 and second["bigquery_jobs"] == 0 and "errors" not in second
+    )
+    checks["next quota day resumes with the deferred dates"] = third["dates_written"] == dates[fits:2 * fits]
+    used, _ = module.taxis_budget.read_budget_ledger(module.GCS_BUCKET, "2025-01-01")
+    checks["ledger matches the bytes actually processed"] = used == first["bytes_processed"]
+
+    # 3. EXTRACT_MODE=range: una query por tramo en lugar de una por día
+    bq = setup()
+    module.taxis_budget.QUERY_DAILY_BYTE_BUDGET_GB = args.quota_gb
+    ranged = module.process_taxi_ingestion(start, end, extract_mode="range")
+    report("daily budget, range mode", ranged, bq, 0)
+    checks["range mode fits the whole range in the same budget"] = (
+        ranged["dates_written"] == dates and not ranged["byte_budget"]["deferred_dates"]
+    )
+
+    # 4. Presupuesto por invocación; los bytes reales quedan por debajo de la estimación
+    bq = setup(actual_bytes_ratio=0.8)
+    module.taxis_budget.QUERY_BYTE_BUDGET_GB = module.taxis_budget.QUERY_DAILY_BYTE_BUDGET_GB = args.quota_gb / 2
+    partial = module.process_taxi_ingestion(start, end)
+    report("invocation budget, 80%", partial, bq, 0)
+    budget = partial["byte_budget"]
+    used, _ = module.taxis_budget.read_budget_ledger(module.GCS_BUCKET, "2025-01-01")
+    checks["report shows estimated vs actual bytes"] = (
+        budget["actual_bytes"] == partial["bytes_processed"] < budget["estimated_bytes"]
+        <= budget["invocation_budget_bytes"]
+    )
+    checks["ledger is settled with the actual bytes"] = used == budget["actual_bytes"]
+
+    # 5. Backfill: el presupuesto de bytes para el job como el de tiempo
+    bq = setup()
+    module.taxis_budget.QUERY_DAILY_BYTE_BUDGET_GB = args.quota_gb
+    started = module.start_backfill(start, end)
+    report("backfill, invocation 1", started, bq, 0)
+    module.taxis_budget.quota_day = lambda: "2025-01-02"
+    bq.reset_quota()
+    jobs = len(bq.queries)
+    resumed = module.resume_backfill(started["job_id"])
+    report("backfill, invocation 2", resumed, bq, jobs)
+    checks["backfill stops as running and resumes on the next quota day"] = (
+        started["job_status"] == "running" and started["processed_this_invocation"] == fits
+        and resumed["processed_this_invocation"] == fits and "errors" not in resumed
+    )
+
+    # 6. Una query que no cabe ni con el presupuesto entero
+    bq = setup()
+    module.taxis_budget.QUERY_BYTE_BUDGET_GB = args.scan_gb / 2
+    oversized = module.process_single_date(start)
+    unit = oversized["byte_budget"]["units"][0]
+    print(f"{'oversized date':>26}: deferred={oversized['deferred']}  exceeds_budget={unit.get('exceeds_budget')}")
+    checks["oversized query is deferred and flagged"] = (
+        oversized["deferred"] and unit.get("exceeds_budget") and not bq.queries
+    )
+
+    for name, ok in checks.items():
+        print(f"{'OK' if ok else 'FAIL':>4}  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Benchmark: un cliente nuevo por llamada vs el registro de clientes del proceso.
+
+Los constructores storage.Client / bigquery.Client se sustituyen por fakes
+cuyo __init__ duerme --construct-cost segundos (descubrimiento de credenciales
+y transporte HTTP). "per call" desactiva la caché del registro para reproducir
+el comportamiento anterior; "registry" es el comportamiento actual.
+
+Uso:
+    uv run python benchmarks/bench_client_reuse.py --days 30 --construct-cost 0.05
+"""
+
+import argparse
+import time
+from datetime import date, timedelta
+
+from google.cloud import bigquery, storage
+
+from fakes import FakeBigQueryClient, FakeStorageClient, load_function
+
+
+class _ForgetfulDict(dict):
+    """dict que no guarda nada: cada _get_client vuelve a llamar a la factory."""
+
+    def __setitem__(self, key, value):
+        pass
+
+
+def run(module, label: str, args) -> None:
+    constructed = {"storage": 0, "bigquery": 0}
+    gcs = FakeStorageClient()
+    bq = FakeBigQueryClient(rows_per_day=args.rows)
+
+    def storage_client(*a, **kw):
+        constructed["storage"] += 1
+        time.sleep(args.construct_cost)
+        return gcs
+
+    def bigquery_client(*a, **kw):
+        constructed["bigquery"] += 1
+        time.sleep(args.construct_cost)
+        return bq
+
+    # Los clientes se importan dentro de get_*_client: se parchea el constructor real
+    storage.Client = storage_client
+    bigquery.Client = bigquery_client
+    module.clients._clients = _ForgetfulDict() if label == "per call" else {}
+    module.taxis_partitions.partition_index._cache.clear()
+
+    start = time.perf_counter()
+    module.process_single_date("2024-01-01", force=True)
+    cold = time.perf_counter() - start
+
+    end_date = (date(2024, 1, 2) + timedelta(days=args.days - 1)).isoformat()
+    start = time.perf_counter()
+    module.process_taxi_ingestion("2024-01-02", end_date, force=True, max_workers=1)
+    per_date = (time.perf_counter() - start) / args.days
+
+    print(
+        f"{label:>9}: first call={cold * 1000:7.1f} ms  per date={per_date * 1000:7.1f} ms  "
+        f"clients built: storage={constructed['storage']} bigquery={constructed['bigquery']}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--rows", type=int, default=200)
+    parser.add_argument("--construct-cost", type=float, default=0.05)
+    args = parser.parse_args()
+
+    module = load_function("ingest_taxis")
+    for label in ("per call", "registry"):
+        run(module, label, args)
+
+
+if __name__ == "__main__":
+    main()
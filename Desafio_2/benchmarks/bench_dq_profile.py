@@ -0,0 +1,221 @@
+"""
+Benchmark: perfil de calidad por partición en la ingesta (DQ_PROFILE /
+DQ_THRESHOLDS) frente a los tests de dbt sobre tablas completas.
+
+1. Exactitud: el perfil de un día sintético con problemas inyectados (tarifas
+   negativas, NULLs, coordenadas fuera de Chicago, unique_key duplicados)
+   coincide con las mismas métricas calculadas en SQL por DuckDB, y el perfil
+   combinado por record batches (ruta streaming) es idéntico al de la tabla
+2. Coste: ms de profile_taxi_table por millón de filas y sobrecoste sobre
+   write_daily_table, y tamaño del perfil frente a la partición
+3. Umbrales: un día rechazado no se escribe (todas las rutas, también la
+   streaming, conservan la partición anterior) y queda su perfil con
+   rejected; en weather, los días con precipitación negativa del stub de
+   Open-Meteo acaban en errors de process_weather_ingestion
+
+Uso:
+    uv run python benchmarks/bench_dq_profile.py --rows 1000000
+"""
+
+import argparse
+import io
+import json
+import logging
+import time
+from datetime import datetime
+
+import duckdb
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from fakes import FakeStorageClient, OpenMeteoStub, load_function, synthetic_taxi_day, synthetic_weather_value
+
+DAY = "2024-03-04"
+
+
+class TableRows:
+    """RowIterator mínimo sobre una tabla Arrow para write_daily_parquet_stream."""
+
+    def __init__(self, table: pa.Table, batch_rows: int):
+        self._table = table
+        self._batch_rows = batch_rows
+        self.total_rows = table.num_rows
+
+    def to_arrow(self, *args, **kwargs) -> pa.Table:
+        return self._table
+
+    def to_arrow_iterable(self, *args, **kwargs):
+        return iter(self._table.to_batches(max_chunksize=self._batch_rows))
+
+
+def dirty_day(rows: int) -> pa.Table:
+    """Día sintético (como sale de BigQuery) con problemas de calidad inyectados."""
+    df = synthetic_taxi_day(DAY, rows, seed=7)
+    rng = np.random.default_rng(7)
+    pick = lambda fraction: rng.random(rows) < fraction  # noqa: E731
+    df.loc[pick(0.001), "fare"] = -5.0
+    df.loc[pick(0.01), "pickup_latitude"] = np.nan
+    df.loc[pick(0.002), "dropoff_longitude"] = -90.0
+    df.loc[pick(0.02), "tips"] = np.nan
+    duplicated = rng.choice(rows, 50, replace=False)
+    df.loc[duplicated, "unique_key"] = df.loc[duplicated[0], "unique_key"]
+    df.loc[rng.choice(rows, 10, replace=False), "unique_key"] = None
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def reference_profile(table: pa.Table, bounds: dict) -> dict:
+    """Las mismas métricas del perfil calculadas en SQL con DuckDB."""
+    con = duckdb.connect()
+    con.register("t", table)
+    numeric = [f.name for f in table.schema if pa.types.is_integer(f.type) or pa.types.is_floating(f.type)]
+    (lat_low, lat_high), (lon_low, lon_high) = bounds["latitude"], bounds["longitude"]
+    outside = " or ".join(
+        f"{p}_latitude < {lat_low} or {p}_latitude > {lat_high} or {p}_longitude < {lon_low} or {p}_longitude > {lon_high}"
+        for p in ("pickup", "dropoff")
+    )
+    columns = [f"count(*) - count({name})" for name in table.column_names]
+    columns += [f"min({name})::double" for name in numeric] + [f"max({name})::double" for name in numeric]
+    columns += [
+        "count(*) filter (where fare < 0)",
+        "count(*) filter (where trip_seconds = 0)",
+        f"count(*) filter (where {outside})",
+        "count(unique_key) - count(distinct unique_key)",
+    ]
+    values = list(con.execute(f"select {', '.join(columns)} from t").fetchone())
+    n = len(table.column_names)
+    nulls, rest = dict(zip(table.column_names, values[:n])), values[n:]
+    return {
+        "nulls": nulls,
+        "min": dict(zip(numeric, rest[:len(numeric)])),
+        "max": dict(zip(numeric, rest[len(numeric):2 * len(numeric)])),
+        "checks": dict(zip(["negative_fare", "zero_second_trips", "out_of_chicago", "duplicate_unique_keys"],
+                           rest[2 * len(numeric):])),
+    }
+
+
+def best_of(fn, repeat: int = 3) -> float:
+    times = []
+    for _ in range(repeat):
+        begin = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - begin)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Viajes del día perfilado")
+    parser.add_argument("--batch-rows", type=int, default=100_000, help="Filas por record batch (ruta streaming)")
+    args = parser.parse_args()
+
+    logging.disable(logging.ERROR)  # los días rechazados se registran como error
+    module = load_function("ingest_taxis")
+    weather = load_function("ingest_weather")
+    quality = module.taxis_quality
+    module.instrumentation.STAGE_LOGS = weather.instrumentation.STAGE_LOGS = False
+    checks = {}
+
+    raw = dirty_day(args.rows)
+    loaded = raw.append_column("loaded_at", pa.repeat(pa.scalar(datetime(2025, 1, 1), type=pa.timestamp("us")),
+                                                      raw.num_rows))
+    table = module.conform_taxi_table(loaded)
+
+    # 1. Exactitud frente a SQL y combinación por record batches
+    profile = module.profile_taxi_table(table, DAY)
+    reference = reference_profile(table, quality.CHICAGO_BOUNDS)
+    print(f"checks: {profile['checks']}")
+    checks["null counts match DuckDB"] = profile["nulls"] == reference["nulls"]
+    checks["numeric min/max match DuckDB"] = all(
+        np.isclose(profile[side][name], reference[side][name])
+        for side in ("min", "max") for name in reference[side]
+    )
+    checks["checks match DuckDB"] = profile["checks"] == reference["checks"]
+    partials = [quality._partial_taxi_profile(pa.Table.from_batches([batch]))
+                for batch in table.to_batches(max_chunksize=args.batch_rows)]
+    checks["per-batch profile equals whole-table profile"] = quality.combine_taxi_profile(partials, DAY) == profile
+
+    # 2. Coste por millón de filas y sobrecoste sobre la escritura
+    module.set_client("storage", FakeStorageClient())
+    seconds = best_of(lambda: module.profile_taxi_table(table, DAY))
+    write_off = best_of(lambda: module.write_daily_table(loaded, module.GCS_BUCKET, DAY))
+    quality.DQ_PROFILE = True
+    gcs = FakeStorageClient()
+    module.set_client("storage", gcs)
+    write_on = best_of(lambda: module.write_daily_table(loaded, module.GCS_BUCKET, DAY))
+    objects = gcs.bucket(module.GCS_BUCKET).objects
+    sidecar = objects[quality.profile_blob_path(DAY)]
+    print(f"profile_taxi_table: {seconds * 1000:.0f} ms for {table.num_rows:,} rows "
+          f"({seconds * 1000 / table.num_rows * 1e6:.0f} ms per million rows)")
+    print(f"write_daily_table: {write_off * 1000:.0f} ms without profile, {write_on * 1000:.0f} ms with DQ_PROFILE "
+          f"(+{(write_on - write_off) / write_off:.1%})")
+    print(f"profile sidecar: {len(sidecar):,} bytes vs {len(objects[module.partition_blob_path(DAY)]) / 1024**2:.1f} MiB "
+          f"partition")
+    checks["sidecar is one JSON line without the Hive key"] = (
+        sidecar.count(b"\n") == 1 and "date" not in json.loads(sidecar)
+    )
+
+    # 3. Umbrales: todas las rutas conservan la partición anterior
+
+    def previous_partition_kept() -> bool:
+        names = [name for name in objects if f"date={DAY}" in name and not name.startswith(quality.PROFILE_PREFIX)]
+        return names == [module.partition_blob_path(DAY)] and objects[names[0]] == before
+
+    quality.DQ_THRESHOLDS = "negative_fare=0.0005,duplicate_unique_keys=0"
+    before = objects[module.partition_blob_path(DAY)]
+    try:
+        module.write_daily_table(loaded, module.GCS_BUCKET, DAY)
+        rejected = False
+    except ValueError as e:
+        rejected = True
+        print(f"table path: {e}")
+    stored = json.loads(objects[quality.profile_blob_path(DAY)])
+    checks["table path rejects the day and keeps the previous partition"] = (
+        rejected and stored["rejected"] and objects[module.partition_blob_path(DAY)] == before
+    )
+    try:
+        module.write_daily_parquet_stream(TableRows(raw, args.batch_rows), module.GCS_BUCKET, DAY)
+        rejected = False
+    except ValueError:
+        rejected = True
+    checks["stream path rejects the day and keeps the previous partition"] = rejected and previous_partition_kept()
+    module.taxis_partitions.PARTITION_TARGET_ROWS = args.rows // 4
+    try:
+        module.write_daily_parquet_stream(TableRows(raw, args.batch_rows), module.GCS_BUCKET, DAY)
+        rejected = False
+    except ValueError:
+        rejected = True
+    checks["multi-file stream path removes only its unpublished parts"] = rejected and previous_partition_kept()
+    module.taxis_partitions.PARTITION_TARGET_ROWS = 0
+    quality.DQ_THRESHOLDS = "out_of_chicago=0.5,nulls.pickup_latitude=0.05"
+    checks["day under its thresholds is written"] = module.write_daily_table(loaded, module.GCS_BUCKET, DAY).endswith(
+        "data.parquet"
+    ) and pq.read_table(io.BytesIO(objects[module.partition_blob_path(DAY)])).num_rows == args.rows
+
+    # Weather: el stub genera precipitaciones negativas en algunos días
+    weather.DQ_PROFILE, weather.DQ_THRESHOLDS = True, "negative_precipitation=0"
+    weather._rate_limiter = weather.TokenBucket(rate=1e9, capacity=10**9)
+    weather.WEATHER_CACHE_MEMORY_ENTRIES, weather.WEATHER_CACHE_URI = 0, ""
+    gcs = FakeStorageClient()
+    weather.set_client("storage", gcs)
+    with OpenMeteoStub(latency=0) as stub:
+        weather.OPEN_METEO_URL = stub.url
+        result = weather.process_weather_ingestion("2023-01-01", "2023-03-31")
+    dates = weather.get_date_range("2023-01-01", "2023-03-31")
+    expected = {
+        d for d in dates
+        if any(synthetic_weather_value(v, d) < 0 for v in ("precipitation_sum", "rain_sum", "snowfall_sum"))
+    }
+    failed = {e["date"] for e in result.get("errors", [])}
+    profiles = [n for n in gcs.bucket(weather.GCS_BUCKET).objects if n.startswith(weather.PROFILE_PREFIX)]
+    print(f"weather: written={len(result['dates_written'])}  rejected={len(failed)}  profiles={len(profiles)}")
+    checks["weather rejects exactly the days with negative precipitation"] = (
+        failed == expected and set(result["dates_written"]) == set(dates) - expected and len(profiles) == len(dates)
+    )
+
+    for name, ok in checks.items():
+        print(f"{'OK' if ok else 'FAIL':>4}  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Benchmark: re-encoding del landing con force=true vs mode=rewrite desde la
+caché de extracts (EXTRACT_CACHE_DIR, un Arrow IPC por día).
+
+1. Ingesta inicial con EXTRACT_CACHE_DIR: puebla la caché
+2. Cambio de formato (--profile): force=true vuelve a lanzar una query por día
+3. El mismo cambio con rewrite_from_cache: sin queries, leyendo la caché con
+   memory mapping y escribiendo con REWRITE_MAX_WORKERS threads por etapa
+
+Comprueba que rewrite produce las mismas particiones que force=true (con
+loaded_at congelado), que las rutas pandas, Arrow y EXTRACT_MODE=range guardan
+el mismo extract, que la lectura es zero-copy y que la poda por tamaño borra
+primero los días usados hace más tiempo.
+
+Uso:
+    uv run python benchmarks/bench_extract_cache.py --days 30 --rows 20000
+    uv run python benchmarks/bench_extract_cache.py --days 365 --query-latency 5
+"""
+
+import argparse
+import io
+import logging
+import os
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from fakes import FakeBigQueryClient, FakeStorageClient, load_function
+
+
+class FrozenDatetime(datetime):
+    @classmethod
+    def utcnow(cls):
+        return datetime(2025, 1, 1, 3, 0, 0)
+
+
+def partitions(module, gcs) -> dict:
+    bucket = gcs.bucket(module.GCS_BUCKET)
+    return {
+        name: pq.read_table(io.BytesIO(data))
+        for name, data in bucket.objects.items()
+        if name.startswith(f"{module.PARQUET_BASE_PATH}/")
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--rows", type=int, default=20000, help="Viajes por día")
+    parser.add_argument("--query-latency", type=float, default=0.5, help="Segundos por job de BigQuery")
+    parser.add_argument("--download-latency", type=float, default=0.05)
+    parser.add_argument("--profile", default="compact", help="PARQUET_PROFILE del re-encoding")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    module = load_function("ingest_taxis")
+    module.datetime = FrozenDatetime
+    dates = [(date(2023, 1, 1) + timedelta(days=i)).isoformat() for i in range(args.days)]
+    start, end = dates[0], dates[-1]
+    checks = {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        module.EXTRACT_CACHE_DIR = tmp
+        gcs = FakeStorageClient()
+        bq = FakeBigQueryClient(
+            rows_per_day=args.rows, query_latency=args.query_latency, download_latency=args.download_latency
+        )
+        module.set_client("storage", gcs)
+        module.set_client("bigquery", bq)
+
+        begin = time.perf_counter()
+        module.process_taxi_ingestion(start, end)
+        initial = time.perf_counter() - begin
+        cache_mb = sum(os.path.getsize(module.extract_cache_path(d)) for d in dates) / 1024**2
+        print(f"{'initial ingest':>16}: {initial:7.2f}s  cached_days={len(module.cached_extract_dates(start, end))}  "
+              f"cache={cache_mb:.1f} MB")
+
+        # Cambio de formato del landing
+        module.taxis_parquet.PARQUET_PROFILE = args.profile
+        runs = {}
+        for label, fn in (
+            ("force=true", lambda: module.process_taxi_ingestion(start, end, force=True)),
+            ("rewrite", lambda: module.rewrite_from_cache(start, end)),
+        ):
+            module.taxis_partitions.partition_index._cache.clear()
+            jobs = len(bq.queries)
+            begin = time.perf_counter()
+            result = fn()
+            seconds = time.perf_counter() - begin
+            runs[label] = partitions(module, gcs)
+            print(
+                f"{label:>16}: {seconds:7.2f}s  dates={result['new_dates_processed']}  "
+                f"bigquery_jobs={len(bq.queries) - jobs}  "
+                f"projected year={seconds / args.days * 365 / 60:6.1f} min"
+            )
+            if label == "rewrite":
+                checks["rewrite runs no BigQuery job"] = len(bq.queries) == jobs
+                checks["rewrite writes every date"] = result["dates_written"] == dates
+        checks["rewrite output equals force=true output"] = runs["force=true"].keys() == runs["rewrite"].keys() and all(
+            runs["force=true"][name].equals(runs["rewrite"][name]) for name in runs["force=true"]
+        )
+
+        # Mismo extract por las rutas pandas, Arrow y EXTRACT_MODE=range
+        day = dates[len(dates) // 2]
+        reference = module.read_extract_cache(day)
+        same = True
+        for kwargs in ({"write_path": "arrow"}, {"extract_mode": "range"}):
+            os.remove(module.extract_cache_path(day))
+            module.process_taxi_ingestion(day, day, force=True, **kwargs)
+            same = same and module.read_extract_cache(day).equals(reference)
+        checks["pandas, arrow and range paths cache the same extract"] = same
+
+        # Zero-copy: abrir un día no reserva memoria de Arrow
+        allocated = pa.total_allocated_bytes()
+        table = module.read_extract_cache(day)
+        checks["cache read is zero-copy (memory mapped)"] = (
+            pa.total_allocated_bytes() - allocated < table.nbytes // 100
+        )
+        del table
+
+        # LRU: con presupuesto justo para la mitad de los días, se conservan
+        # los leídos después que el resto
+        recent = dates[:max(1, len(dates) // 2)]
+        for d in recent:
+            module.read_extract_cache(d)
+        module.EXTRACT_CACHE_MAX_MB = sum(os.path.getsize(module.extract_cache_path(d)) for d in recent) / 1024**2
+        evicted = module.prune_extract_cache()
+        kept = module.cached_extract_dates(start, end)
+        print(f"{'LRU prune':>16}: budget={module.EXTRACT_CACHE_MAX_MB:.1f} MB  evicted={evicted}  kept={len(kept)}")
+        checks["LRU eviction keeps recently used days"] = set(recent) <= kept and evicted > 0
+
+    for name, ok in checks.items():
+        print(f"{'OK' if ok else 'FAIL':>4}  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Benchmark: tiempo de import (cold start) de los entry points de las funciones.
+
+Ejecuta `python -X importtime -c "import main"` en el directorio de cada
+función (con src/ en PYTHONPATH, como ingest_shared/ en el zip desplegado), reporta el tiempo acumulado de `main` (mediana de --runs) y los
+módulos pesados cargados, y sale con código 1 si se supera --max-ms.
+
+Uso:
+    uv run python benchmarks/bench_import_time.py --max-ms 300
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+from fakes import SRC_DIR
+
+FUNCTIONS = ["ingest_taxis", "ingest_weather"]
+HEAVY_MODULES = ["pandas", "pyarrow", "google.cloud.bigquery", "google.cloud.storage", "requests"]
+
+
+def run_in(function_name: str, *args: str) -> subprocess.CompletedProcess:
+    """Ejecuta python en el directorio de la función con el paquete ingest_shared importable."""
+    return subprocess.run(
+        [sys.executable, *args], cwd=SRC_DIR / function_name, capture_output=True, text=True, check=True,
+        env={**os.environ, "PYTHONPATH": str(SRC_DIR)},
+    )
+
+
+def import_time_ms(function_name: str) -> float:
+    """Tiempo acumulado (ms) del import de main según -X importtime."""
+    proc = run_in(function_name, "-X", "importtime", "-c", "import main")
+    for line in proc.stderr.splitlines():
+        parts = [p.strip() for p in line.split("|")]
+        if len(parts) == 3 and parts[2] == "main":
+            return int(parts[1]) / 1000
+    raise RuntimeError(f"main not found in importtime output for {function_name}")
+
+
+def heavy_modules_loaded(function_name: str) -> list[str]:
+    code = f"import sys, main; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    proc = run_in(function_name, "-c", code)
+    return [m for m in proc.stdout.strip().split(",") if m]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-ms", type=float, default=300, help="Umbral de regresión por entry point")
+    args = parser.parse_args()
+
+    failed = False
+    for function_name in FUNCTIONS:
+        ms = statistics.median(import_time_ms(function_name) for _ in range(args.runs))
+        heavy = heavy_modules_loaded(function_name)
+        status = "OK" if ms <= args.max_ms else "REGRESSION"
+        failed |= ms > args.max_ms
+        print(f"{function_name:>15}: import={ms:7.1f} ms  heavy modules at import: {heavy or 'none'}  [{status}]")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Benchmark: throughput del motor local DuckDB (src/local_engine).
+
+Genera un landing sintético con los writers reales de las funciones de ingesta
+(taxis/date=*/data.parquet y weather/date=*/data.parquet) y ejecuta
+run_local_pipeline con distintos números de workers, reportando filas/segundo.
+Comprueba que silver_taxis y taxis_weather_enriched tienen tantas filas como
+el landing y que todos los viajes quedan enriquecidos con weather.
+
+Uso:
+    uv run python benchmarks/bench_local_engine.py --days 30 --rows 50000 --workers 1 2 4
+"""
+
+import argparse
+import logging
+import tempfile
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import duckdb
+import pandas as pd
+
+from fakes import FakeStorageClient, load_function, synthetic_taxi_day, synthetic_weather_value
+
+WEATHER_COLUMNS = {
+    "temperature_max": "temperature_2m_max",
+    "temperature_min": "temperature_2m_min",
+    "temperature_mean": "temperature_2m_mean",
+    "precipitation_sum": "precipitation_sum",
+    "rain_sum": "rain_sum",
+    "snowfall_sum": "snowfall_sum",
+    "wind_speed_max": "wind_speed_10m_max",
+    "wind_gusts_max": "wind_gusts_10m_max",
+    "weather_code": "weather_code",
+}
+
+
+def build_landing(root: Path, dates: list[str], rows: int) -> int:
+    """Escribe el landing sintético con los writers de las funciones y lo vuelca a disco."""
+    taxis = load_function("ingest_taxis")
+    weather = load_function("ingest_weather")
+    gcs = FakeStorageClient()
+    taxis.set_client("storage", gcs)
+    weather.set_client("storage", gcs)
+
+    for d in dates:
+        df = synthetic_taxi_day(d, rows, seed=int(d.replace("-", "")))
+        df["loaded_at"] = datetime.utcnow()
+        taxis.write_daily_parquet(df, taxis.GCS_BUCKET, d)
+
+        day = {"date": [date.fromisoformat(d)]}
+        day.update({col: [abs(synthetic_weather_value(var, d))] for col, var in WEATHER_COLUMNS.items()})
+        day_df = pd.DataFrame(day)
+        day_df["loaded_at"] = datetime.utcnow()
+        weather.write_daily_parquet(day_df, weather.GCS_BUCKET, d)
+
+    total = 0
+    for name, data in gcs.bucket(taxis.GCS_BUCKET).objects.items():
+        if name.endswith(".parquet"):
+            (root / name).parent.mkdir(parents=True, exist_ok=True)
+            (root / name).write_bytes(data)
+            total += len(data)
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--rows", type=int, default=50000, help="Filas por día")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    engine = load_function("local_engine")
+    dates = [(date(2023, 6, 1) + timedelta(days=i)).isoformat() for i in range(args.days)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        landing = Path(tmp) / "landing"
+        size = build_landing(landing, dates, args.rows)
+        print(f"landing: {args.days} days x {args.rows} rows ({size / 1024**2:.1f} MB)")
+
+        for workers in args.workers:
+            output = Path(tmp) / f"out_{workers}"
+            result = engine.run_local_pipeline(str(landing), str(output), max_workers=workers)
+            print(
+                f"workers={workers:>2}  partitions={result['partitions_processed']:>3}  "
+                f"errors={len(result.get('errors', []))}  time={result['elapsed_seconds']:.2f}s  "
+                f"throughput={result['rows_per_second']:>10,} rows/s"
+            )
+
+        con = duckdb.connect()
+        silver, enriched, missing_weather = con.execute(f"""
+            select
+                (select count(*) from read_parquet('{output}/silver_taxis/*/*.parquet', hive_partitioning = false)),
+                count(*),
+                count(*) filter (where temperature_category is null)
+            from read_parquet('{output}/taxis_weather_enriched/*/*.parquet', hive_partitioning = false)
+        """).fetchone()
+        expected = args.days * args.rows
+        print(f"silver rows = landing rows: {silver == expected}")
+        print(f"enriched rows = landing rows: {enriched == expected}")
+        print(f"all trips joined to weather: {missing_weather == 0}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Benchmark: perfiles de escritura Parquet de write_daily_parquet.
+
+Escribe varios días sintéticos de taxis con cada perfil de PARQUET_PROFILES
+sobre un bucket en memoria y compara tamaño total, tiempo de escritura y
+tiempo de scan con DuckDB sobre el layout Hive resultante:
+- full: agregado por company sobre todas las filas
+- selective: una hora de trip_start_timestamp (se beneficia de min/max por row group)
+
+Comprueba además que todos los perfiles devuelven los mismos resultados.
+
+Uso:
+    uv run python benchmarks/bench_parquet_profiles.py --days 7 --rows 30000
+"""
+
+import argparse
+import logging
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+import duckdb
+
+from fakes import FakeStorageClient, load_function, synthetic_taxi_day
+
+QUERIES = {
+    "full": """
+        SELECT company, count(*) AS trips, round(sum(trip_total), 2) AS total
+        FROM read_parquet('{path}/taxis/*/*.parquet', hive_partitioning = true)
+        GROUP BY company ORDER BY company
+    """,
+    "selective": """
+        SELECT count(*) AS trips, round(sum(fare), 2) AS fare
+        FROM read_parquet('{path}/taxis/*/*.parquet', hive_partitioning = true)
+        WHERE trip_start_timestamp >= TIMESTAMPTZ '{day} 08:00:00+00'
+          AND trip_start_timestamp <  TIMESTAMPTZ '{day} 09:00:00+00'
+    """,
+}
+
+
+def scan_seconds(con, sql: str, runs: int) -> tuple[float, list]:
+    timings, result = [], None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = con.execute(sql).fetchall()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--rows", type=int, default=30000, help="Filas por día")
+    parser.add_argument("--runs", type=int, default=5, help="Repeticiones de cada query DuckDB")
+    parser.add_argument("--profiles", nargs="+", default=None, help="Perfiles a comparar (default: todos)")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    module = load_function("ingest_taxis")
+    profiles = args.profiles or list(module.taxis_parquet.PARQUET_PROFILES)
+
+    dates = [(date(2024, 1, 1) + timedelta(days=i)).isoformat() for i in range(args.days)]
+    frames = {d: synthetic_taxi_day(d, args.rows, seed=int(d.replace("-", ""))) for d in dates}
+
+    con = duckdb.connect()
+    baseline = None
+    results = {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for profile in profiles:
+            module.taxis_parquet.PARQUET_PROFILE = profile
+            gcs = FakeStorageClient()
+            module.set_client("storage", gcs)
+
+            write_seconds = 0.0
+            for d in dates:
+                df = frames[d].copy()
+                start = time.perf_counter()
+                module.write_daily_parquet(df, module.GCS_BUCKET, d)
+                write_seconds += time.perf_counter() - start
+
+            root = Path(tmp) / profile
+            size = 0
+            for name, data in gcs.bucket(module.GCS_BUCKET).objects.items():
+                if name.startswith(f"{module.PARQUET_BASE_PATH}/"):
+                    (root / name).parent.mkdir(parents=True, exist_ok=True)
+                    (root / name).write_bytes(data)
+                    size += len(data)
+
+            scans = {
+                name: scan_seconds(con, sql.format(path=root, day=dates[len(dates) // 2]), args.runs)
+                for name, sql in QUERIES.items()
+            }
+            results[profile] = {name: rows for name, (_, rows) in scans.items()}
+
+            baseline = baseline or size
+            print(
+                f"{profile:>8}: size={size / 1024**2:7.2f} MB ({size / baseline:5.2f}x)  "
+                f"write={write_seconds * 1000:7.1f} ms  "
+                + "  ".join(f"{name}={seconds * 1000:6.1f} ms" for name, (seconds, _) in scans.items())
+            )
+
+    reference = results[profiles[0]]
+    same = all(r == reference for r in results.values())
+    print(f"Same query results across profiles: {same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark: índice de particiones sobre un bucket falso con muchas particiones.
+
+Compara el listado completo original con las sondas blob.exists(), el listado
+acotado por mes, el manifest y la caché en proceso, para la comprobación de
+una fecha (daily_offset) y de un rango de un mes.
+
+Uso:
+    uv run python benchmarks/bench_partition_index.py --partitions 10000 --latency 0.05
+"""
+
+import argparse
+import time
+from datetime import date, timedelta
+
+from fakes import FakeStorageClient, load_function
+
+
+def timed(fn, repeat: int = 3) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--partitions", type=int, default=10_000)
+    parser.add_argument("--latency", type=float, default=0.05, help="Latencia por request/página de GCS (s)")
+    args = parser.parse_args()
+
+    module = load_function("ingest_taxis")
+    gcs = FakeStorageClient(latency=0.0)
+    module.set_client("storage", gcs)
+    bucket = gcs.bucket(module.GCS_BUCKET)
+
+    first = date(2000, 1, 1)
+    dates = [(first + timedelta(days=i)).isoformat() for i in range(args.partitions)]
+    for d in dates:
+        bucket.blob(module.partition_blob_path(d)).upload_from_string(b"")
+    bucket.latency = args.latency
+    target = dates[len(dates) // 2]
+    month_start, month_end = target[:8] + "01", target[:8] + "28"
+
+    def full_listing():
+        module.get_existing_dates(module.GCS_BUCKET)
+
+    def probe():
+        module.taxis_partitions.partition_index._cache.clear()
+        module.partition_exists(module.GCS_BUCKET, target)
+
+    def month_listing():
+        module.taxis_partitions.partition_index._cache.clear()
+        module.get_existing_dates(module.GCS_BUCKET, month_start, month_end)
+
+    def cached():
+        module.get_existing_dates(module.GCS_BUCKET, month_start, month_end)
+        module.partition_exists(module.GCS_BUCKET, target)
+
+    def manifest():
+        module.get_existing_dates(module.GCS_BUCKET, month_start, month_end)
+
+    results = [
+        ("full listing (baseline)", timed(full_listing)),
+        ("single date exists() probe", timed(probe)),
+        ("month prefix listing", timed(month_listing)),
+        ("warm cache (range + probe)", timed(cached)),
+    ]
+    module.partitions.PARTITION_MANIFEST = True
+    module.taxis_partitions.partition_index._write_manifest(module.GCS_BUCKET, set(dates))
+    results.append(("manifest read (range)", timed(manifest)))
+
+    print(f"{args.partitions} partitions, {args.latency * 1000:.0f} ms per GCS request/page")
+    for name, seconds in results:
+        print(f"  {name:<28} {seconds * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Benchmark: particiones de un fichero vs multi-fichero (PARTITION_TARGET_ROWS / _MB).
+
+Escribe varios días sintéticos pesados con write_daily_parquet sobre un bucket
+en memoria (con latencia por request) para cada objetivo de tamaño y compara:
+- ficheros por partición y tiempo de escritura + subida
+- tiempo de scan con DuckDB sobre el layout Hive resultante (full y selective)
+
+Comprueba además que todos los objetivos devuelven los mismos resultados y
+que get_existing_dates no cuenta una partición multi-fichero sin marcador.
+
+Uso:
+    uv run python benchmarks/bench_partition_parts.py --days 3 --rows 200000
+    uv run python benchmarks/bench_partition_parts.py --targets single rows=50000 mb=4
+"""
+
+import argparse
+import logging
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+import duckdb
+
+from fakes import FakeStorageClient, load_function, synthetic_taxi_day
+
+QUERIES = {
+    "full": """
+        SELECT company, count(*) AS trips, round(sum(trip_total), 2) AS total
+        FROM read_parquet('{path}/taxis/*/*.parquet', hive_partitioning = true)
+        GROUP BY company ORDER BY company
+    """,
+    "selective": """
+        SELECT count(*) AS trips, round(sum(fare), 2) AS fare
+        FROM read_parquet('{path}/taxis/*/*.parquet', hive_partitioning = true)
+        WHERE trip_start_timestamp >= TIMESTAMPTZ '{day} 08:00:00+00'
+          AND trip_start_timestamp <  TIMESTAMPTZ '{day} 09:00:00+00'
+    """,
+}
+
+
+def apply_target(module, target: str) -> None:
+    """single | rows=N | mb=N"""
+    module.taxis_partitions.PARTITION_TARGET_ROWS = 0
+    module.taxis_partitions.PARTITION_TARGET_MB = 0
+    if target.startswith("rows="):
+        module.taxis_partitions.PARTITION_TARGET_ROWS = int(target.split("=", 1)[1])
+    elif target.startswith("mb="):
+        module.taxis_partitions.PARTITION_TARGET_MB = int(target.split("=", 1)[1])
+    elif target != "single":
+        raise ValueError(f"Invalid target: {target}")
+
+
+def scan_seconds(con, sql: str, runs: int) -> tuple[float, list]:
+    timings, result = [], None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = con.execute(sql).fetchall()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=3)
+    parser.add_argument("--rows", type=int, default=200000, help="Filas por día")
+    parser.add_argument("--targets", nargs="+", default=["single", "rows=100000", "rows=50000", "mb=4", "mb=2"])
+    parser.add_argument("--row-group-rows", type=int, default=25000)
+    parser.add_argument("--latency", type=float, default=0.02, help="Latencia por request GCS (s)")
+    parser.add_argument("--runs", type=int, default=5, help="Repeticiones de cada query DuckDB")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    module = load_function("ingest_taxis")
+    module.ARROW_ROW_GROUP_ROWS = args.row_group_rows
+
+    dates = [(date(2024, 1, 1) + timedelta(days=i)).isoformat() for i in range(args.days)]
+    frames = {d: synthetic_taxi_day(d, args.rows, seed=int(d.replace("-", ""))) for d in dates}
+
+    con = duckdb.connect()
+    results = {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for target in args.targets:
+            apply_target(module, target)
+            module.taxis_partitions.partition_index._cache.clear()
+            gcs = FakeStorageClient(latency=args.latency)
+            module.set_client("storage", gcs)
+            bucket = gcs.bucket(module.GCS_BUCKET)
+
+            write_seconds = 0.0
+            for d in dates:
+                start = time.perf_counter()
+                module.write_daily_parquet(frames[d].copy(), module.GCS_BUCKET, d)
+                write_seconds += time.perf_counter() - start
+
+            root = Path(tmp) / target.replace("=", "_")
+            files = 0
+            for name, data in bucket.objects.items():
+                if name.startswith(f"{module.PARQUET_BASE_PATH}/"):
+                    (root / name).parent.mkdir(parents=True, exist_ok=True)
+                    (root / name).write_bytes(data)
+                    files += 1
+
+            scans = {
+                name: scan_seconds(con, sql.format(path=root, day=dates[len(dates) // 2]), args.runs)
+                for name, sql in QUERIES.items()
+            }
+            results[target] = {name: rows for name, (_, rows) in scans.items()}
+
+            print(
+                f"{target:>12}: files/day={files / len(dates):5.1f}  write+upload={write_seconds * 1000:7.1f} ms  "
+                + "  ".join(f"{name}={seconds * 1000:6.1f} ms" for name, (seconds, _) in scans.items())
+            )
+
+            if module._multipart_enabled():
+                module.taxis_partitions.partition_index._cache.clear()
+                bucket.blob(module.taxis_partitions.partition_marker_path(dates[0])).delete()
+                complete = module.get_existing_dates(module.GCS_BUCKET, dates[0], dates[-1])
+                if dates[0] in complete or len(complete) != len(dates) - 1:
+                    print(f"{'':>14}FAIL: partition without marker counted as existing")
+
+    reference = results[args.targets[0]]
+    same = all(r == reference for r in results.values())
+    print(f"Same query results across targets: {same}")
+
+
+if __name__ == "__main__":
+    main()
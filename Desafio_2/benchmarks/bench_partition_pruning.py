@@ -0,0 +1,131 @@
+"""
+Benchmark: bytes leídos del landing en una ejecución diaria de silver_taxis,
+filtrando por la expresión sobre trip_start_timestamp (antes) vs por la clave
+Hive date de la external table (después).
+
+Escribe --days días sintéticos con write_daily_parquet sobre el bucket en
+memoria, los vuelca a disco con el layout taxis/date=YYYY-MM-DD/ y para el
+último día (la ejecución diaria típica) calcula:
+- ficheros leídos según EXPLAIN ANALYZE de DuckDB sobre el layout Hive
+- bytes estimados: tamaño en el Parquet de las columnas que lee stg_taxis en
+  los ficheros que hay que abrir. Sin filtro sobre la clave Hive, BigQuery lee
+  esas columnas de todos los ficheros de la external table; con él, solo las
+  de las particiones filtradas.
+
+Comprueba que ambos filtros devuelven exactamente las mismas filas.
+
+Uso:
+    uv run python benchmarks/bench_partition_pruning.py --days 90 --rows 20000
+"""
+
+import argparse
+import logging
+import re
+import tempfile
+from datetime import date, timedelta
+from pathlib import Path
+
+import duckdb
+import pyarrow.parquet as pq
+
+from fakes import FakeStorageClient, load_function, synthetic_taxi_day
+
+# Columnas de la external table que proyecta stg_taxis
+STG_COLUMNS = [
+    "unique_key", "taxi_id", "trip_start_timestamp", "trip_end_timestamp",
+    "trip_seconds", "trip_miles", "fare", "tips", "tolls", "extras", "trip_total",
+    "payment_type", "company", "pickup_community_area", "dropoff_community_area",
+    "pickup_latitude", "pickup_longitude", "dropoff_latitude", "dropoff_longitude",
+]
+
+FILTERS = {
+    "before": "cast(trip_start_timestamp as date) = date '{day}'",
+    "after": "date = date '{day}'",
+}
+
+QUERY = """
+    select {columns}
+    from read_parquet('{path}/taxis/*/*.parquet', hive_partitioning = true,
+                      hive_types = {{'date': date}})
+    where trip_start_timestamp is not null and {where}
+"""
+
+
+def column_bytes(path: Path) -> int:
+    """Bytes comprimidos de las columnas de STG_COLUMNS en un Parquet."""
+    metadata = pq.ParquetFile(path).metadata
+    total = 0
+    for rg in range(metadata.num_row_groups):
+        row_group = metadata.row_group(rg)
+        for i in range(row_group.num_columns):
+            chunk = row_group.column(i)
+            if chunk.path_in_schema in STG_COLUMNS:
+                total += chunk.total_compressed_size
+    return total
+
+
+def files_read(con, sql: str) -> int:
+    plan = "\n".join(row[1] for row in con.execute(f"explain analyze {sql}").fetchall())
+    match = re.search(r"Total Files Read:\s*(\d+)", plan)
+    return int(match.group(1)) if match else -1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=90, help="Particiones en el landing")
+    parser.add_argument("--rows", type=int, default=20000, help="Viajes por día")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    module = load_function("ingest_taxis")
+    gcs = FakeStorageClient()
+    module.set_client("storage", gcs)
+    bucket = gcs.bucket(module.GCS_BUCKET)
+
+    dates = [(date(2024, 1, 1) + timedelta(days=i)).isoformat() for i in range(args.days)]
+    for d in dates:
+        module.write_daily_parquet(synthetic_taxi_day(d, args.rows, seed=int(d.replace("-", ""))),
+                                   module.GCS_BUCKET, d)
+    day = dates[-1]
+
+    con = duckdb.connect()
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        partitions = {}
+        for name, data in bucket.objects.items():
+            if name.startswith(f"{module.PARQUET_BASE_PATH}/") and name.endswith(".parquet"):
+                (root / name).parent.mkdir(parents=True, exist_ok=True)
+                (root / name).write_bytes(data)
+                partition = name.split("/")[1].removeprefix("date=")
+                partitions.setdefault(partition, []).append(root / name)
+
+        # Sin filtro sobre la clave Hive se leen todos los ficheros; con él, los del día
+        scanned = {
+            "before": [p for paths in partitions.values() for p in paths],
+            "after": partitions[day],
+        }
+        results, scanned_bytes = {}, {}
+        for label, where in FILTERS.items():
+            sql = QUERY.format(columns=", ".join(STG_COLUMNS), path=root, where=where.format(day=day))
+            result = con.execute(f"{sql} order by unique_key").arrow()
+            results[label] = result.read_all() if hasattr(result, "read_all") else result
+            scanned_bytes[label] = nbytes = sum(column_bytes(p) for p in scanned[label])
+            print(
+                f"{label:>7}: where {where.format(day=day):<48} files_read={files_read(con, sql):>4}  "
+                f"bytes_scanned={nbytes / 1024**2:8.2f} MiB  rows={results[label].num_rows}"
+            )
+
+    before, after = scanned_bytes["before"], scanned_bytes["after"]
+    print(f"Daily run over {args.days} partitions reads {after / before:.1%} of the bytes ({before / after:.0f}x less)")
+
+    checks = {
+        "both filters return the same rows": (
+            results["before"].equals(results["after"]) and results["after"].num_rows > 0
+        ),
+    }
+    for name, ok in checks.items():
+        print(f"{'OK' if ok else 'FAIL':>4}  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Benchmark: mode=refresh (huellas por día) vs force=true para recoger cambios del origen.
+
+Ingesta un rango con process_taxi_ingestion contra los fakes, simula filas
+tardías en --changed días del origen (FakeBigQueryClient.revisions) y
+compara dos formas de recogerlas:
+1. process_taxi_ingestion con force=True: re-descarga todo el rango
+2. detect_source_changes: una query agregada de huellas y re-ingesta solo
+   de los días cuya huella difiere de la guardada en su partición
+
+Comprueba que refresh detecta exactamente los días cambiados, que las
+particiones reescritas tienen las filas nuevas y que una segunda pasada ya
+no encuentra cambios.
+
+Uso:
+    uv run python benchmarks/bench_source_refresh.py --start 2023-01-01 --end 2023-12-31 --changed 5
+"""
+
+import argparse
+import io
+import logging
+import random
+import time
+
+import pyarrow.parquet as pq
+
+from fakes import FakeBigQueryClient, FakeStorageClient, load_function
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--start", default="2023-01-01")
+    parser.add_argument("--end", default="2023-12-31")
+    parser.add_argument("--changed", type=int, default=5, help="Días con filas tardías en el origen")
+    parser.add_argument("--rows", type=int, default=500, help="Viajes por día")
+    parser.add_argument("--query-latency", type=float, default=0.05)
+    parser.add_argument("--download-latency", type=float, default=0.02)
+    parser.add_argument("--write-path", choices=["pandas", "arrow"], default="pandas")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    module = load_function("ingest_taxis")
+    module.WRITE_PATH = args.write_path
+    module.SOURCE_FINGERPRINT = True
+
+    gcs = FakeStorageClient()
+    bq = FakeBigQueryClient(rows_per_day=args.rows)
+    module.set_client("storage", gcs)
+    module.set_client("bigquery", bq)
+    bucket = gcs.bucket(module.GCS_BUCKET)
+
+    landed = module.process_taxi_ingestion(args.start, args.end)
+    dates = module.get_date_range(args.start, args.end)
+    print(f"Landed {landed['new_dates_processed']} dates")
+
+    # Filas tardías en el origen y latencias reales a partir de aquí
+    changed = sorted(random.Random(0).sample(dates, args.changed))
+    bq.revisions = {d: 7 for d in changed}
+    bq.query_latency, bq.download_latency = args.query_latency, args.download_latency
+
+    dry = module.detect_source_changes(args.start, args.end, dry_run=True)
+
+    runs = {}
+    for label, fn in (
+        ("force=true", lambda: module.process_taxi_ingestion(args.start, args.end, force=True)),
+        ("refresh", lambda: module.detect_source_changes(args.start, args.end)),
+    ):
+        module.taxis_partitions.partition_index._cache.clear()
+        before = len(bq.queries)
+        start = time.perf_counter()
+        result = fn()
+        runs[label] = result
+        print(
+            f"{label:>12}: dates re-ingested={result['new_dates_processed']:>4}  "
+            f"time={time.perf_counter() - start:6.2f}s  bigquery_jobs={len(bq.queries) - before:>4}  "
+            f"bytes_processed={result['bytes_processed'] / 1024**3:8.1f} GB"
+        )
+        if label == "force=true":
+            # Volver al estado previo al cambio para que refresh tenga trabajo
+            bq.revisions = {}
+            module.process_taxi_ingestion(args.start, args.end, force=True)
+            bq.revisions = {d: 7 for d in changed}
+
+    second = module.detect_source_changes(args.start, args.end, dry_run=True)
+
+    def partition_rows(date):
+        name = module.partition_blob_path(date)
+        return pq.ParquetFile(io.BytesIO(bucket.objects[name])).metadata.num_rows
+
+    checks = {
+        "dry run finds exactly the changed days": dry["changed"] == changed and not dry["missing"],
+        "refresh re-ingests only the changed days": runs["refresh"]["changed"] == changed
+        and runs["refresh"]["new_dates_processed"] == len(changed),
+        "refreshed partitions contain the late rows": all(partition_rows(d) == args.rows + 7 for d in changed),
+        "second pass finds no changes": not second["changed"] and not second["missing"]
+        and not second["unfingerprinted"],
+    }
+    for name, ok in checks.items():
+        print(f"{'OK' if ok else 'FAIL':>4}  {name}")
+
+
+if __name__ == "__main__":
+    main()
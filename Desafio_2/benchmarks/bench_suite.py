@@ -0,0 +1,261 @@
+"""
+Suite end-to-end de benchmarks de ingesta con fakes en proceso.
+
+Ejecuta process_taxi_ingestion, process_weather_ingestion y las variantes
+process_single_date contra FakeBigQueryClient, FakeStorageClient y
+OpenMeteoStub (ver fakes.py). Cada escenario corre en un subproceso propio
+para medir su RSS pico y reporta:
+- dates/s y rows/s de extremo a extremo
+- RSS pico por encima del RSS tras cargar la función
+- p50/p95 de latencia por etapa (existing_dates, fetch, write)
+
+Los resultados se comparan con baselines.json: un escenario falla si sus
+dates/s caen o su RSS pico sube más de --tolerance respecto al baseline
+guardado con la misma configuración (días, filas, latencias).
+Los baselines dependen de la máquina: regenerarlos con --update-baselines
+al cambiar de entorno o tras una mejora intencionada.
+
+Uso:
+    uv run python benchmarks/bench_suite.py
+    uv run python benchmarks/bench_suite.py --days 365 --scenarios taxis_range_pandas
+    uv run python benchmarks/bench_suite.py --update-baselines
+"""
+
+import argparse
+import json
+import logging
+import resource
+import subprocess
+import sys
+import threading
+import time
+from datetime import date, datetime, timedelta
+from functools import wraps
+from pathlib import Path
+
+from fakes import FakeBigQueryClient, FakeStorageClient, OpenMeteoStub, load_function
+
+BASELINES_PATH = Path(__file__).resolve().parent / "baselines.json"
+
+# Parámetros que tienen que coincidir para comparar con un baseline
+CONFIG_KEYS = ("days", "single_dates", "rows", "query_latency", "download_latency", "upload_latency", "weather_latency")
+
+# Escenario → función. Las etapas se miden envolviendo las funciones del módulo.
+SCENARIOS = {
+    "taxis_range_pandas": "ingest_taxis",
+    "taxis_range_arrow": "ingest_taxis",
+    "taxis_range_extract": "ingest_taxis",
+    "taxis_single_date": "ingest_taxis",
+    "weather_range": "ingest_weather",
+    "weather_single_date": "ingest_weather",
+}
+
+STAGES = {
+    "ingest_taxis": {
+        "existing_dates": ["get_existing_dates", "partition_exists"],
+        "fetch": ["fetch_taxi_data_for_date", "start_taxi_query_for_date", "fetch_range_day"],
+        "write": ["write_daily_parquet", "write_daily_parquet_stream"],
+    },
+    "ingest_weather": {
+        "existing_dates": ["get_existing_dates", "partition_exists"],
+        "fetch": ["fetch_weather_for_range"],
+        "write": ["write_daily_parquet"],
+    },
+}
+
+
+class FrozenDatetime(datetime):
+    """Fecha fija para que los rangos de weather no caigan en el futuro."""
+
+    @classmethod
+    def now(cls, tz=None):
+        return datetime(2025, 1, 1, 3, 0, 0)
+
+    @classmethod
+    def utcnow(cls):
+        return datetime(2025, 1, 1, 3, 0, 0)
+
+
+def instrument(module, stages: dict) -> dict:
+    """Envuelve las funciones de cada etapa para registrar su latencia (segundos)."""
+    latencies = {stage: [] for stage in stages}
+    lock = threading.Lock()
+
+    def timed(stage, fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with lock:
+                    latencies[stage].append(time.perf_counter() - start)
+        return wrapper
+
+    for stage, names in stages.items():
+        for name in names:
+            if hasattr(module, name):
+                setattr(module, name, timed(stage, getattr(module, name)))
+    return latencies
+
+
+def percentile(values: list, q: float) -> float:
+    """Percentil por rango más cercano (0 si no hay valores)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(q * len(ordered)) - 1))]
+
+
+def run_scenario(name: str, args) -> dict:
+    function_name = SCENARIOS[name]
+    module = load_function(function_name)
+    gcs = FakeStorageClient(latency=args.upload_latency, keep_data=False)
+    module.set_client("storage", gcs)
+
+    dates = [(date(2023, 1, 1) + timedelta(days=i)).isoformat() for i in range(args.days)]
+    single_dates = dates[:args.single_dates]
+
+    if function_name == "ingest_taxis":
+        module.set_client("bigquery", FakeBigQueryClient(
+            rows_per_day=args.rows,
+            query_latency=args.query_latency,
+            download_latency=args.download_latency,
+        ))
+    else:
+        module.datetime = FrozenDatetime
+        # El rate limit real dominaría la medida; se aísla el coste del pipeline
+        module._rate_limiter = module.TokenBucket(rate=1e9, capacity=10**9)
+        # Sin caché de Open-Meteo: las repeticiones deben medir la request real
+        module.WEATHER_CACHE_MEMORY_ENTRIES, module.WEATHER_CACHE_URI = 0, ""
+
+    latencies = instrument(module, STAGES[function_name])
+    base_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    stub = OpenMeteoStub(latency=args.weather_latency) if function_name == "ingest_weather" else None
+    if stub:
+        stub.__enter__()
+        module.OPEN_METEO_URL = stub.url
+
+    try:
+        start = time.perf_counter()
+        if name == "taxis_single_date":
+            results = [module.process_single_date(d, force=False) for d in single_dates]
+            processed, rows = len(results), sum(r["trips_count"] for r in results)
+        elif name == "weather_single_date":
+            results = [module.process_single_date(d, force=False) for d in single_dates]
+            processed, rows = len(results), len(results)
+        elif function_name == "ingest_taxis":
+            kwargs = {
+                "taxis_range_pandas": {"extract_mode": "per_date", "write_path": "pandas"},
+                "taxis_range_arrow": {"extract_mode": "per_date", "write_path": "arrow"},
+                "taxis_range_extract": {"extract_mode": "range", "write_path": "pandas"},
+            }[name]
+            result = module.process_taxi_ingestion(dates[0], dates[-1], force=False, **kwargs)
+            processed, rows = result["new_dates_processed"], result["total_trips"]
+        else:
+            result = module.process_weather_ingestion(dates[0], dates[-1], force=False)
+            processed, rows = result["new_dates_processed"], result["new_dates_processed"]
+        seconds = time.perf_counter() - start
+    finally:
+        if stub:
+            stub.__exit__(None, None, None)
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        "scenario": name,
+        "dates": processed,
+        "rows": rows,
+        "seconds": round(seconds, 3),
+        "dates_per_sec": round(processed / seconds, 2),
+        "rows_per_sec": round(rows / seconds),
+        "peak_rss_mb": round((peak_rss - base_rss) / 1024, 1),
+        "stages": {
+            stage: {
+                "calls": len(values),
+                "p50_ms": round(percentile(values, 0.50) * 1000, 2),
+                "p95_ms": round(percentile(values, 0.95) * 1000, 2),
+            }
+            for stage, values in latencies.items()
+        },
+    }
+
+
+def compare(result: dict, baseline: dict | None, config: dict, tolerance: float) -> list[str]:
+    """Devuelve las regresiones de un escenario frente a su baseline (si es de la misma config)."""
+    if not baseline or baseline.get("config") != config:
+        return []
+    regressions = []
+    if result["dates_per_sec"] < baseline["dates_per_sec"] * (1 - tolerance):
+        regressions.append(f"dates/s {result['dates_per_sec']} < baseline {baseline['dates_per_sec']}")
+    # Holgura absoluta de 16 MB: el RSS de escenarios pequeños es ruidoso
+    if result["peak_rss_mb"] > baseline["peak_rss_mb"] * (1 + tolerance) + 16:
+        regressions.append(f"peak RSS {result['peak_rss_mb']} MB > baseline {baseline['peak_rss_mb']} MB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--days", type=int, default=90, help="Fechas por escenario de rango")
+    parser.add_argument("--single-dates", type=int, default=10, help="Llamadas en los escenarios single_date")
+    parser.add_argument("--rows", type=int, default=2000, help="Viajes por día")
+    parser.add_argument("--query-latency", type=float, default=0.02)
+    parser.add_argument("--download-latency", type=float, default=0.01)
+    parser.add_argument("--upload-latency", type=float, default=0.005)
+    parser.add_argument("--weather-latency", type=float, default=0.02)
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Degradación admitida frente al baseline")
+    parser.add_argument("--update-baselines", action="store_true")
+    parser.add_argument("--child", choices=list(SCENARIOS), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        logging.disable(logging.WARNING)
+        print(json.dumps(run_scenario(args.child, args)))
+        return
+
+    forwarded = [a for a in sys.argv[1:] if a != "--update-baselines"]
+    config = {key: getattr(args, key) for key in CONFIG_KEYS}
+    baselines = json.loads(BASELINES_PATH.read_text()) if BASELINES_PATH.exists() else {}
+    failed = False
+
+    for name in args.scenarios:
+        out = subprocess.run(
+            [sys.executable, __file__, *forwarded, "--child", name],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip().splitlines()[-1]
+        result = json.loads(out)
+
+        stages = "  ".join(
+            f"{stage}=p50 {s['p50_ms']:.1f}/p95 {s['p95_ms']:.1f} ms"
+            for stage, s in result["stages"].items() if s["calls"]
+        )
+        baseline = baselines.get(name)
+        regressions = compare(result, baseline, config, args.tolerance)
+        failed |= bool(regressions)
+        if regressions:
+            status = "REGRESSION: " + "; ".join(regressions)
+        elif baseline and baseline.get("config") == config:
+            status = "OK"
+        else:
+            status = "no baseline for this config"
+        print(
+            f"{name:>20}: dates={result['dates']:>4}  {result['dates_per_sec']:8.1f} dates/s  "
+            f"{result['rows_per_sec']:>9,} rows/s  peak_rss=+{result['peak_rss_mb']:.0f} MB  [{status}]"
+        )
+        print(f"{'':>22}{stages}")
+
+        if args.update_baselines:
+            baselines[name] = {k: result[k] for k in ("dates_per_sec", "rows_per_sec", "peak_rss_mb", "stages")}
+            baselines[name]["config"] = config
+
+    if args.update_baselines:
+        BASELINES_PATH.write_text(json.dumps(baselines, indent=2, sort_keys=True) + "\n")
+        print(f"Baselines written to {BASELINES_PATH}")
+        return
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
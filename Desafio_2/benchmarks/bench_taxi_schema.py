@@ -0,0 +1,134 @@
+"""
+Benchmark: dtypes inferidos por día vs schema fijo del landing (taxi_arrow_schema).
+
+Para un día sintético servido por el cliente BigQuery falso compara la
+memoria por fila del DataFrame (memory_usage deep) y de la tabla Arrow que
+se escribe, y el tamaño del Parquet resultante:
+- inferred: lo que se hacía antes, rows.to_dataframe() + pa.Table.from_pandas(df)
+- pinned (TAXI_MONEY_TYPE=float64 | float32 | decimal): fetch_taxi_data_for_date,
+  que descarga en Arrow y convierte al schema fijo antes de pasar a pandas
+
+Comprueba además que con el schema fijo los Parquet de un día normal, un día
+vacío y un día con columnas enteras a NULL, por la ruta pandas y la Arrow,
+tienen exactamente el mismo schema (y cuántos schemas distintos salen sin él).
+
+Uso:
+    uv run python benchmarks/bench_taxi_schema.py --rows 200000
+"""
+
+import argparse
+import io
+import logging
+from datetime import datetime
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from fakes import FakeBigQueryClient, FakeStorageClient, load_function
+
+NULL_DAY = "2024-01-02"
+EMPTY_DAY = "2024-01-03"
+
+
+class EdgeDaysClient(FakeBigQueryClient):
+    """Días sintéticos con un día sin viajes y otro con columnas enteras a NULL."""
+
+    def day_rows(self, date: str) -> int:
+        return 0 if date == EMPTY_DAY else super().day_rows(date)
+
+    def day_pages(self, date: str):
+        if date == EMPTY_DAY:
+            return
+        for page in super().day_pages(date):
+            if date == NULL_DAY:
+                for column in ("pickup_community_area", "dropoff_community_area", "company", "tolls"):
+                    page[column] = None
+            yield page
+
+
+def per_row(nbytes: int, rows: int) -> float:
+    return nbytes / max(rows, 1)
+
+
+def parquet_bytes(module, gcs, date: str) -> bytes:
+    return gcs.bucket(module.GCS_BUCKET).objects[module.partition_blob_path(date)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000, help="Viajes del día medido")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    module = load_function("ingest_taxis")
+    day = "2024-01-01"
+
+    gcs = FakeStorageClient()
+    module.set_client("storage", gcs)
+    module.set_client("bigquery", FakeBigQueryClient(rows_per_day=args.rows))
+
+    # Antes: dtypes inferidos por to_dataframe y schema inferido por from_pandas
+    df = module.start_taxi_query_for_date(day).to_dataframe()
+    df["loaded_at"] = datetime.utcnow()
+    table = pa.Table.from_pandas(df)
+    buffer = io.BytesIO()
+    pq.write_table(table, buffer)
+    print(
+        f"{'inferred':>16}: pandas={per_row(df.memory_usage(deep=True).sum(), len(df)):6.1f} B/row  "
+        f"arrow={per_row(table.nbytes, table.num_rows):6.1f} B/row  "
+        f"parquet={per_row(buffer.tell(), table.num_rows):6.2f} B/row"
+    )
+    del df, table
+
+    for money_type in ("float64", "float32", "decimal"):
+        module.taxis_schema.TAXI_MONEY_TYPE = money_type
+        df = module.fetch_taxi_data_for_date(day)
+        table = module.conform_taxi_table(pa.Table.from_pandas(df, preserve_index=False))
+        module.write_daily_parquet(df, module.GCS_BUCKET, day)
+        print(
+            f"{f'pinned {money_type}':>16}: pandas={per_row(df.memory_usage(deep=True).sum(), len(df)):6.1f} B/row  "
+            f"arrow={per_row(table.nbytes, table.num_rows):6.1f} B/row  "
+            f"parquet={per_row(len(parquet_bytes(module, gcs, day)), table.num_rows):6.2f} B/row"
+        )
+        del df, table
+    module.taxis_schema.TAXI_MONEY_TYPE = "float64"
+
+    # Estabilidad del schema entre días y rutas de escritura
+    dates = [day, NULL_DAY, EMPTY_DAY]
+    module.set_client("bigquery", EdgeDaysClient(rows_per_day=1000))
+    inferred, pinned = set(), set()
+    for date in dates:
+        df = module.start_taxi_query_for_date(date).to_dataframe()
+        df["loaded_at"] = datetime.utcnow()
+        inferred.add(pa.Table.from_pandas(df).schema.remove_metadata())
+    for write_path in ("pandas", "arrow"):
+        module.taxis_partitions.partition_index._cache.clear()
+        module.process_taxi_ingestion(dates[0], dates[-1], force=True, write_path=write_path)
+        for date in dates:
+            schema = pq.read_schema(io.BytesIO(parquet_bytes(module, gcs, date)))
+            pinned.add(schema)
+    print(f"Distinct schemas across {len(dates)} edge days: inferred={len(inferred)}  "
+          f"pinned (pandas + arrow paths)={len(pinned)}")
+
+    written = next(iter(pinned))
+    checks = {
+        "pinned schema identical across days and write paths": len(pinned) == 1,
+        "written schema is taxi_arrow_schema without pandas metadata": (
+            written.remove_metadata().equals(module.taxi_arrow_schema())
+            and b"pandas" not in (written.metadata or {})
+        ),
+        "all-NULL community areas stay int16": pq.read_table(
+            io.BytesIO(parquet_bytes(module, gcs, NULL_DAY)), columns=["pickup_community_area"]
+        ).schema.field(0).type == pa.int16(),
+        "values survive the round trip": np.isclose(
+            pq.read_table(io.BytesIO(parquet_bytes(module, gcs, day)), columns=["fare"]).column(0).to_numpy(),
+            module.start_taxi_query_for_date(day).to_dataframe()["fare"].to_numpy(),
+        ).all(),
+    }
+    for name, ok in checks.items():
+        print(f"{'OK' if ok else 'FAIL':>4}  {name}")
+
+
+if __name__ == "__main__":
+    main()
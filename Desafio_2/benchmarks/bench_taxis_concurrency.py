@@ -0,0 +1,59 @@
+"""
+Benchmark: process_taxi_ingestion secuencial vs concurrente.
+
+Usa clientes BigQuery/GCS falsos con latencia inyectada para medir el speedup
+de run_date_pipeline frente a procesar las fechas una a una.
+
+Uso:
+    uv run python benchmarks/bench_taxis_concurrency.py --days 30 --workers 1 4 8
+"""
+
+import argparse
+import time
+from datetime import date, timedelta
+
+from fakes import FakeBigQueryClient, FakeStorageClient, load_function
+
+
+def run(module, days: int, workers: int, args) -> dict:
+    bq = FakeBigQueryClient(rows_per_day=args.rows, query_latency=args.query_latency, download_latency=args.download_latency)
+    gcs = FakeStorageClient(latency=args.upload_latency)
+    module.set_client("bigquery", bq)
+    module.set_client("storage", gcs)
+
+    end_date = (date(2024, 1, 1) + timedelta(days=days - 1)).isoformat()
+
+    start = time.perf_counter()
+    result = module.process_taxi_ingestion("2024-01-01", end_date, force=True, max_workers=workers)
+    elapsed = time.perf_counter() - start
+    return {
+        "workers": workers,
+        "dates": result["new_dates_processed"],
+        "errors": len(result.get("errors", [])),
+        "seconds": elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--query-latency", type=float, default=0.2)
+    parser.add_argument("--download-latency", type=float, default=0.1)
+    parser.add_argument("--upload-latency", type=float, default=0.1)
+    args = parser.parse_args()
+
+    module = load_function("ingest_taxis")
+    baseline = None
+    for workers in args.workers:
+        r = run(module, args.days, workers, args)
+        baseline = baseline or r["seconds"]
+        print(
+            f"workers={r['workers']:>2}  dates={r['dates']:>4}  errors={r['errors']}  "
+            f"time={r['seconds']:.2f}s  speedup={baseline / r['seconds']:.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
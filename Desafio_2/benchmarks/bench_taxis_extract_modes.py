@@ -0,0 +1,66 @@
+"""
+Benchmark: extracción per_date (una query por día) vs range (una query por tramo).
+
+Compara número de jobs de BigQuery, bytes escaneados y tiempo total, y verifica
+que los Parquet diarios de ambos modos tengan el mismo schema y filas.
+
+Uso:
+    uv run python benchmarks/bench_taxis_extract_modes.py --days 30
+"""
+
+import argparse
+import io
+import time
+from datetime import date, timedelta
+
+import pyarrow.parquet as pq
+
+from fakes import FakeBigQueryClient, FakeStorageClient, load_function
+
+
+def run(module, mode: str, args) -> tuple[dict, dict]:
+    bq = FakeBigQueryClient(
+        rows_per_day=args.rows, query_latency=args.query_latency, download_latency=args.download_latency
+    )
+    gcs = FakeStorageClient()
+    module.set_client("bigquery", bq)
+    module.set_client("storage", gcs)
+
+    end_date = (date(2024, 1, 1) + timedelta(days=args.days - 1)).isoformat()
+    start = time.perf_counter()
+    result = module.process_taxi_ingestion("2024-01-01", end_date, force=True, extract_mode=mode)
+    result["seconds"] = time.perf_counter() - start
+    return result, gcs.bucket(module.GCS_BUCKET).objects
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--query-latency", type=float, default=1.0)
+    parser.add_argument("--download-latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    module = load_function("ingest_taxis")
+    outputs = {}
+    for mode in ("per_date", "range"):
+        result, objects = run(module, mode, args)
+        outputs[mode] = objects
+        print(
+            f"{mode:>8}: jobs={result['bigquery_jobs']:>4}  "
+            f"scanned={result['bytes_processed'] / 1024**3:8.1f} GiB  "
+            f"dates={result['new_dates_processed']}  time={result['seconds']:.2f}s"
+        )
+
+    mismatches = 0
+    for name, data in outputs["per_date"].items():
+        a = pq.read_table(io.BytesIO(data))
+        b = pq.read_table(io.BytesIO(outputs["range"][name]))
+        if not a.schema.equals(b.schema, check_metadata=True) or a.num_rows != b.num_rows or not a.drop(["loaded_at"]).equals(b.drop(["loaded_at"])):
+            mismatches += 1
+            print(f"MISMATCH: {name}")
+    print(f"Parquet parity: {len(outputs['per_date']) - mismatches}/{len(outputs['per_date'])} files identical")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Benchmark: rango de taxis en una instancia vs repartido con mode=fanout.
+
+Procesa el mismo rango de dos formas contra los fakes de BigQuery y GCS:
+1. process_taxi_ingestion en una sola invocación (lo que hace hoy mode=range)
+2. start_fanout publicando chunks en InMemoryPubSub, que los entrega a
+   --instances threads que hacen de instancias de ingest_taxis_pubsub;
+   después fanout_status agrega los resultados
+
+Con --fail-dates, la primera query que toca esas fechas falla: el chunk
+queda en partial_success/error y fanout_status lo republica hasta
+completarlo (o agotar FANOUT_MAX_ATTEMPTS).
+
+Las latencias se pagan en tiempo real y todas las "instancias" comparten el
+proceso (y la CPU de la máquina), así que el speedup solo es representativo
+cuando la latencia de BigQuery domina sobre el encoding.
+
+Uso:
+    uv run python benchmarks/bench_taxis_fanout.py --start 2023-01-01 --end 2023-06-30 --instances 8
+"""
+
+import argparse
+import logging
+import time
+
+from fakes import FakeBigQueryClient, FakeStorageClient, InMemoryPubSub, load_function
+
+
+def setup(module, args, fail_dates=()):
+    module.taxis_partitions.partition_index._cache.clear()
+    gcs = FakeStorageClient()
+    module.set_client("storage", gcs)
+    module.set_client("bigquery", FakeBigQueryClient(
+        rows_per_day=args.rows,
+        query_latency=args.query_latency,
+        download_latency=args.download_latency,
+        fail_once=set(fail_dates),
+    ))
+    return gcs.bucket(module.GCS_BUCKET)
+
+
+def data_partitions(bucket) -> int:
+    return sum(name.startswith("taxis/date=") for name in bucket.objects)
+
+
+def run_single(module, args) -> dict:
+    bucket = setup(module, args)
+    start = time.perf_counter()
+    result = module.process_taxi_ingestion(args.start, args.end, max_workers=args.max_workers)
+    seconds = time.perf_counter() - start
+    return {"seconds": seconds, "dates": result["new_dates_processed"], "partitions": data_partitions(bucket)}
+
+
+def run_fanout(module, args, fail_dates=()) -> dict:
+    bucket = setup(module, args, fail_dates)
+    with InMemoryPubSub(module.ingest_taxis_pubsub, instances=args.instances) as pubsub:
+        module.set_client("publisher", pubsub)
+        start = time.perf_counter()
+        job = module.start_fanout(args.start, args.end, chunk_days=args.chunk_days, max_workers=args.max_workers)
+        pubsub.drain()
+        status = module.fanout_status(job["job_id"])
+        polls = 1
+        while status["job_status"] == "running":
+            pubsub.drain()
+            status = module.fanout_status(job["job_id"])
+            polls += 1
+        seconds = time.perf_counter() - start
+    return {
+        "seconds": seconds,
+        "dates": status["new_dates_processed"],
+        "partitions": data_partitions(bucket),
+        "chunks": status["chunks"]["total"],
+        "messages": len(pubsub.published),
+        "polls": polls,
+        "job_status": status["job_status"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--start", default="2023-01-01")
+    parser.add_argument("--end", default="2023-06-30")
+    parser.add_argument("--instances", type=int, default=8)
+    parser.add_argument("--chunk-days", type=int, default=14)
+    parser.add_argument("--max-workers", type=int, default=4, help="Threads por etapa en cada instancia")
+    parser.add_argument("--rows", type=int, default=200, help="Viajes por día")
+    parser.add_argument("--query-latency", type=float, default=0.2)
+    parser.add_argument("--download-latency", type=float, default=0.05)
+    parser.add_argument("--fail-dates", nargs="*", default=["2023-02-14", "2023-05-01"])
+    args = parser.parse_args()
+
+    # Los fallos simulados de --fail-dates se loguean como ERROR
+    logging.disable(logging.CRITICAL)
+    module = load_function("ingest_taxis")
+
+    single = run_single(module, args)
+    print(f"{'single instance':>22}: dates={single['dates']:>4}  time={single['seconds']:6.2f}s")
+
+    fanout = run_fanout(module, args)
+    print(
+        f"{f'fanout x{args.instances}':>22}: dates={fanout['dates']:>4}  time={fanout['seconds']:6.2f}s  "
+        f"chunks={fanout['chunks']}  speedup={single['seconds'] / fanout['seconds']:.1f}x"
+    )
+
+    retried = run_fanout(module, args, args.fail_dates)
+    print(
+        f"{'fanout + failures':>22}: dates={retried['dates']:>4}  time={retried['seconds']:6.2f}s  "
+        f"messages={retried['messages']} for {retried['chunks']} chunks  polls={retried['polls']}  "
+        f"job_status={retried['job_status']}"
+    )
+
+    expected = single["partitions"]
+    checks = {
+        "fanout writes every date": fanout["partitions"] == expected and fanout["job_status"] == "completed",
+        "failed chunks are retried to completion": (
+            retried["partitions"] == expected
+            and retried["job_status"] == "completed"
+            and retried["messages"] > retried["chunks"]
+        ),
+    }
+    for name, ok in checks.items():
+        print(f"{'OK' if ok else 'FAIL':>4}  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Benchmark: memoria pico de la ruta pandas vs la ruta Arrow en streaming.
+
+Cada ruta se ejecuta en un subproceso propio (ru_maxrss es monótono) sobre un
+día sintético servido por el cliente BigQuery falso, y se reporta el RSS pico
+por encima del RSS tras cargar la función, más el pico del pool de Arrow.
+
+Uso:
+    uv run python benchmarks/bench_taxis_memory.py --rows 1000000
+"""
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+
+import pyarrow as pa
+
+from fakes import FakeBigQueryClient, FakeStorageClient, load_function
+
+
+def child(write_path: str, rows: int) -> None:
+    module = load_function("ingest_taxis")
+    module.set_client("bigquery", FakeBigQueryClient(rows_per_day=rows))
+    gcs = FakeStorageClient(keep_data=False)
+    module.set_client("storage", gcs)
+
+    base_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    result = module.process_single_date("2024-01-01", force=True, write_path=write_path)
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({
+        "write_path": write_path,
+        "rows": result["trips_count"],
+        "peak_rss_mb": (peak_rss - base_rss) / 1024,
+        "arrow_pool_peak_mb": pa.default_memory_pool().max_memory() / 1024**2,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--child", choices=["pandas", "arrow"])
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.rows)
+        return
+
+    for write_path in ("pandas", "arrow"):
+        out = subprocess.run(
+            [sys.executable, __file__, "--child", write_path, "--rows", str(args.rows)],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip().splitlines()[-1]
+        r = json.loads(out)
+        print(
+            f"{r['write_path']:>6}: rows={r['rows']}  peak_rss=+{r['peak_rss_mb']:.0f} MB  "
+            f"arrow_pool_peak={r['arrow_pool_peak_mb']:.0f} MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Benchmark: requests a Open-Meteo por día vs por tramo en process_weather_ingestion.
+
+Ejecuta la ingesta contra un stub HTTP local, una vez pidiendo un día por
+request (WEATHER_MAX_SPAN_DAYS=1, el comportamiento anterior) y otra con
+tramos, y comprueba que los Parquet diarios sean idénticos byte a byte
+(con loaded_at congelado).
+
+Uso:
+    uv run python benchmarks/bench_weather_batching.py --start 2023-06-01 --end 2023-12-31
+"""
+
+import argparse
+import time
+from datetime import datetime
+
+from fakes import FakeStorageClient, OpenMeteoStub, load_function
+
+
+class FrozenDatetime(datetime):
+    @classmethod
+    def utcnow(cls):
+        return datetime(2025, 1, 1, 3, 0, 0)
+
+
+def run(module, stub: OpenMeteoStub, span: int, args) -> tuple[dict, dict]:
+    gcs = FakeStorageClient()
+    module.set_client("storage", gcs)
+    module.WEATHER_MAX_SPAN_DAYS = span
+    module.partition_index._cache.clear()
+
+    before = stub.requests
+    start = time.perf_counter()
+    result = module.process_weather_ingestion(args.start, args.end, force=True)
+    result["seconds"] = time.perf_counter() - start
+    result["stub_requests"] = stub.requests - before
+    return result, gcs.bucket(module.GCS_BUCKET).objects
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--start", default="2023-06-01")
+    parser.add_argument("--end", default="2023-12-31")
+    parser.add_argument("--span", type=int, default=92)
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    module = load_function("ingest_weather")
+    module.datetime = FrozenDatetime
+    # Sin rate limit para aislar el efecto del número de requests
+    module._rate_limiter = module.TokenBucket(rate=1e9, capacity=10**9)
+    # Sin caché de Open-Meteo: la segunda pasada serviría todo desde la LRU
+    module.WEATHER_CACHE_MEMORY_ENTRIES, module.WEATHER_CACHE_URI = 0, ""
+
+    with OpenMeteoStub(latency=args.latency) as stub:
+        module.OPEN_METEO_URL = stub.url
+        outputs = {}
+        for label, span in (("per day", 1), (f"span={args.span}", args.span)):
+            result, objects = run(module, stub, span, args)
+            outputs[label] = objects
+            print(
+                f"{label:>10}: requests={result['stub_requests']:>4}  "
+                f"dates={result['new_dates_processed']}  time={result['seconds']:.2f}s"
+            )
+
+    per_day, batched = outputs.values()
+    identical = sum(per_day[name] == batched.get(name) for name in per_day)
+    print(f"Byte-identical Parquet files: {identical}/{len(per_day)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Benchmark: caché de respuestas de Open-Meteo (LRU en proceso + tier persistente).
+
+Reprocesa un año con force=true contra el stub HTTP local en cuatro pasadas:
+1. sin caché (WEATHER_CACHE_MEMORY_ENTRIES=0, sin WEATHER_CACHE_URI)
+2. cold: caché vacía, puebla ambos tiers
+3. warm: misma instancia, todo sale de la LRU
+4. redeploy: LRU vacía, todo sale del tier persistente
+
+para un tier persistente en disco (directorio temporal) y en GCS (bucket
+falso), y comprueba que los Parquet son idénticos byte a byte a los de la
+pasada sin caché (loaded_at congelado). Comprueba además que los días dentro
+de la ventana de frescura se piden siempre a la API y que la poda por tamaño
+deja el tier por debajo de WEATHER_CACHE_MAX_MB.
+
+Uso:
+    uv run python benchmarks/bench_weather_cache.py --start 2023-01-01 --end 2023-12-31
+"""
+
+import argparse
+import logging
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from fakes import FakeStorageClient, OpenMeteoStub, load_function
+
+
+class FrozenDatetime(datetime):
+    @classmethod
+    def utcnow(cls):
+        return datetime(2025, 1, 1, 3, 0, 0)
+
+
+def run(module, stub: OpenMeteoStub, start: str, end: str) -> tuple[dict, dict]:
+    """Ingesta con force=true sobre un bucket de landing limpio."""
+    gcs = module.get_storage_client()
+    gcs.buckets.pop(module.GCS_BUCKET, None)
+    module.partition_index._cache.clear()
+
+    before = stub.requests
+    begin = time.perf_counter()
+    result = module.process_weather_ingestion(start, end, force=True)
+    result["seconds"] = time.perf_counter() - begin
+    result["stub_requests"] = stub.requests - before
+    return result, dict(gcs.bucket(module.GCS_BUCKET).objects)
+
+
+def report(label: str, result: dict) -> None:
+    cache = result["weather_cache"]
+    print(
+        f"{label:>16}: http_requests={result['stub_requests']:>3}  time={result['seconds'] * 1000:7.1f} ms  "
+        f"memory_hits={cache['memory_hits']:>3}  persistent_hits={cache['persistent_hits']:>3}  "
+        f"misses={cache['misses']:>3}  writes={cache['writes']:>3}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--start", default="2023-01-01")
+    parser.add_argument("--end", default="2023-12-31")
+    parser.add_argument("--latency", type=float, default=0.05, help="Latencia por request del stub (s)")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    module = load_function("ingest_weather")
+    module.datetime = FrozenDatetime
+    module._rate_limiter = module.TokenBucket(rate=1e9, capacity=10**9)
+    module.set_client("storage", FakeStorageClient())
+    checks = {}
+
+    with OpenMeteoStub(latency=args.latency) as stub, tempfile.TemporaryDirectory() as tmp:
+        module.OPEN_METEO_URL = stub.url
+
+        module.WEATHER_CACHE_MEMORY_ENTRIES, module.WEATHER_CACHE_URI = 0, ""
+        baseline, expected = run(module, stub, args.start, args.end)
+        report("no cache", baseline)
+        module.WEATHER_CACHE_MEMORY_ENTRIES = 4096
+
+        for tier, uri in (("disk", f"{tmp}/open-meteo"), ("gcs", "gs://weather-cache/open-meteo")):
+            module.WEATHER_CACHE_URI = uri
+            module._weather_cache.clear()
+            outputs = {}
+            for label in ("cold", "warm", "redeploy"):
+                if label == "redeploy":
+                    module._weather_cache.clear()
+                result, outputs[label] = run(module, stub, args.start, args.end)
+                report(f"{tier} {label}", result)
+                if label != "cold":
+                    checks[f"{tier} {label}: zero HTTP calls"] = result["stub_requests"] == 0
+            checks[f"{tier}: Parquet byte-identical to no cache"] = all(o == expected for o in outputs.values())
+
+        # Ventana de frescura: los últimos días se piden siempre
+        module.WEATHER_CACHE_URI = f"{tmp}/fresh"
+        today = datetime.now().date()
+        start, end = (today - timedelta(days=120)).isoformat(), (today - timedelta(days=1)).isoformat()
+        run(module, stub, start, end)
+        fresh, _ = run(module, stub, start, end)
+        recent = len([d for d in module.get_date_range(start, end) if not module.is_cacheable_date(d)])
+        print(f"{'fresh window':>16}: http_requests={fresh['stub_requests']}  "
+              f"not_cacheable={fresh['weather_cache']['not_cacheable']} (expected {recent})")
+        checks["recent days always hit the API, older ones never"] = (
+            fresh["stub_requests"] > 0 and fresh["weather_cache"]["not_cacheable"] == recent
+            and fresh["weather_cache"]["misses"] == 0
+        )
+
+        # Poda por tamaño: con presupuesto para la mitad del tier (medido en
+        # la pasada de disco, sea cual sea el rango) se poda y no se supera
+        module.WEATHER_CACHE_URI = f"{tmp}/open-meteo"
+        full = module._persistent_entries()
+        module.WEATHER_CACHE_URI = f"{tmp}/small"
+        module.WEATHER_CACHE_MAX_MB = sum(entry[1] for entry in full) / 2 / 1024**2
+        module._weather_cache.clear()
+        pruned, _ = run(module, stub, args.start, args.end)
+        kept = module._persistent_entries()
+        size = sum(entry[1] for entry in kept)
+        print(f"{'half budget':>16}: max={module.WEATHER_CACHE_MAX_MB * 1024:.1f} KB  "
+              f"evictions={pruned['weather_cache']['evictions']}  entries={len(kept)}/{len(full)}  "
+              f"size={size / 1024:.1f} KB")
+        checks["size eviction keeps the tier under WEATHER_CACHE_MAX_MB"] = (
+            pruned["weather_cache"]["evictions"] > 0 and size <= module.WEATHER_CACHE_MAX_MB * 1024**2
+        )
+
+    for name, ok in checks.items():
+        print(f"{'OK' if ok else 'FAIL':>4}  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Benchmark: requests.get sin reintentos vs sesión con pool, retry y rate limit.
+
+Recorre un rango largo pidiendo un día por request contra un stub de
+Open-Meteo que añade latencia e inyecta respuestas 429 con Retry-After,
+y compara fechas fallidas, throughput y contadores HTTP.
+
+Uso:
+    uv run python benchmarks/bench_weather_resilience.py --throttle-rate 0.1
+"""
+
+import argparse
+import time
+
+import requests
+
+from fakes import FakeStorageClient, OpenMeteoStub, load_function
+
+
+def run(module, label: str, args) -> None:
+    gcs = FakeStorageClient()
+    module.set_client("storage", gcs)
+    module.partition_index._cache.clear()
+
+    with OpenMeteoStub(latency=args.latency, throttle_rate=args.throttle_rate, retry_after=args.retry_after) as stub:
+        module.OPEN_METEO_URL = stub.url
+        start = time.perf_counter()
+        result = module.process_weather_ingestion(args.start, args.end, force=True)
+        seconds = time.perf_counter() - start
+
+    http = result.get("http", {})
+    print(
+        f"{label:>9}: processed={result['new_dates_processed']:>4}  failed={len(result.get('errors', [])):>4}  "
+        f"time={seconds:6.2f}s  dates/s={result['new_dates_processed'] / seconds:6.1f}  "
+        f"stub_429s={stub.throttled}  retries={http.get('retries')}  throttled={http.get('throttled')}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--start", default="2023-06-01")
+    parser.add_argument("--end", default="2023-08-31")
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--throttle-rate", type=float, default=0.1)
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--rate-limit", type=float, default=50)
+    args = parser.parse_args()
+
+    module = load_function("ingest_weather")
+    # Un día por request para estresar el cliente HTTP
+    module.WEATHER_MAX_SPAN_DAYS = 1
+    # Sin caché de Open-Meteo: cada pasada debe llegar al stub
+    module.WEATHER_CACHE_MEMORY_ENTRIES, module.WEATHER_CACHE_URI = 0, ""
+
+    # Baseline: el módulo requests como "sesión" (requests.get sin pool ni reintentos)
+    module.set_client("http", requests)
+    module._rate_limiter = module.TokenBucket(rate=1e9, capacity=10**9)
+    run(module, "baseline", args)
+
+    module.set_client("http", None)
+    module._rate_limiter = module.TokenBucket(args.rate_limit, int(args.rate_limit))
+    run(module, "session", args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+"""
+Check de paridad: vw_trips_weather_summary (sobre taxis_weather_enriched) vs
+trips_weather_summary_agg (sobre el cubo diario taxis_agg/ de DAILY_AGG).
+
+Escribe un landing sintético con los writers reales (DAILY_AGG=true), con los
+casos frontera de check_silver_parity (NULLs, viajes no válidos, redondeos) y
+compañías / áreas / tipos de pago con frecuencias Zipf (--skew) como en el
+dataset real, y ejecuta el motor local. Compara los dos resúmenes en dialecto
+DuckDB (SUMMARY_SQL y CUBE_SUMMARY_SQL de src/local_engine) fila a fila: las
+mismas claves, conteos, mínimos y máximos exactos y medias, sumas y
+desviaciones típicas con tolerancia relativa --rtol. median_duration_min no
+está en la vista del cubo (no se recompone desde counts y sums).
+
+Además:
+- el cubo de un día es el mismo por las rutas pandas, Arrow, streaming por
+  record batches y multi-fichero (PARTITION_TARGET_ROWS)
+- bytes que lee un refresco del dashboard (la vista sobre taxis_weather_enriched
+  vs la tabla trips_weather_summary_agg) y una ejecución diaria de dbt sobre los
+  cubos, como tamaño lógico de las columnas referenciadas (lo que factura BigQuery)
+- throughput de aggregate_daily_cube
+
+Uso:
+    uv run python benchmarks/check_cube_parity.py
+    uv run python benchmarks/check_cube_parity.py --days 30 --day-rows 50000 --skew 0
+"""
+
+import argparse
+import io
+import logging
+import math
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from bench_local_engine import WEATHER_COLUMNS
+from check_silver_parity import landing_day
+from fakes import FakeStorageClient, load_function, synthetic_weather_value
+
+# Columnas de taxis_weather_enriched que lee vw_trips_weather_summary
+VIEW_COLUMNS = [
+    "is_valid_trip", "date", "day_of_week", "day_type", "time_of_day",
+    "temperature_category", "precipitation_category", "adverse_conditions",
+    "trip_minutes", "trip_miles", "avg_speed_mph", "trip_total", "tip_percentage",
+    "temperature_mean_c", "precipitation_mm", "wind_speed_max_kmh",
+]
+
+# Columnas del cubo que lee trips_weather_summary_agg (más date de la ruta Hive)
+CUBE_COLUMNS = [
+    "start_hour", "trips", "count_trip_minutes", "sum_trip_minutes", "sumsq_trip_minutes",
+    "min_trip_minutes", "max_trip_minutes", "count_trip_miles", "sum_trip_miles",
+    "count_avg_speed_mph", "sum_avg_speed_mph", "count_trip_total", "sum_trip_total",
+    "count_tip_percentage", "sum_tip_percentage",
+]
+
+EXACT = {"total_trips", "min_duration_min", "max_duration_min"}
+
+
+class TableRows:
+    """RowIterator mínimo sobre una tabla Arrow para write_daily_parquet_stream."""
+
+    def __init__(self, table: pa.Table, batch_rows: int):
+        self._table = table
+        self._batch_rows = batch_rows
+        self.total_rows = table.num_rows
+
+    def to_arrow(self, *args, **kwargs) -> pa.Table:
+        return self._table
+
+    def to_arrow_iterable(self, *args, **kwargs):
+        return iter(self._table.to_batches(max_chunksize=self._batch_rows))
+
+
+def skewed_day(day: str, rows: int, skew: float) -> pa.Table:
+    """landing_day con compañía, área de recogida y tipo de pago repartidos según Zipf."""
+    table = landing_day(day, rows)
+    # El landing guarda trip_seconds como entero: sin las fracciones de segundo frontera
+    seconds = table.schema.get_field_index("trip_seconds")
+    table = table.set_column(seconds, "trip_seconds", pc.round(table.column(seconds)))
+    if skew <= 0:
+        return table
+    rng = np.random.default_rng(int(day.replace("-", "")) + 1)
+
+    def zipf(values: list, n: int) -> np.ndarray:
+        weights = 1.0 / np.arange(1, len(values) + 1) ** skew
+        return rng.choice(np.array(values, dtype=object), n, p=weights / weights.sum())
+
+    n = table.num_rows
+    # Los casos frontera (al final) conservan sus NULLs
+    keep = pc.is_null(table.column("company")).to_numpy(zero_copy_only=False)
+    replacements = {
+        "company": zipf([f"Company {i}" for i in range(40)], n),
+        "payment_type": zipf(["Credit Card", "Cash", "Mobile", "Unknown"], n),
+        "pickup_community_area": zipf([8, 32, 28, 76, 33, 24, 6, 7, 56, 3] + list(range(9, 24)), n),
+    }
+    for name, values in replacements.items():
+        column = table.column(name)
+        values = pa.array(values, type=column.type) if name != "pickup_community_area" else pa.array(
+            values.astype("float64"), type=column.type
+        )
+        table = table.set_column(table.schema.get_field_index(name), name, pc.if_else(keep, column, values))
+    return table
+
+
+def build_landing(module, weather, root: Path, dates: list[str], rows: int, skew: float) -> dict:
+    """Escribe taxis (con DAILY_AGG) y weather con los writers y vuelca el bucket a disco."""
+    gcs = FakeStorageClient()
+    module.set_client("storage", gcs)
+    weather.set_client("storage", gcs)
+    loaded_at = pa.scalar(datetime(2025, 1, 1, 3, 0, 0), type=pa.timestamp("us"))
+
+    seconds = 0.0
+    for d in dates:
+        table = skewed_day(d, rows, skew)
+        table = table.append_column("loaded_at", pa.repeat(loaded_at, table.num_rows))
+        begin = time.perf_counter()
+        module.write_daily_table(table, module.GCS_BUCKET, d)
+        seconds += time.perf_counter() - begin
+
+        day = {"date": [date.fromisoformat(d)]}
+        day.update({col: [abs(synthetic_weather_value(var, d))] for col, var in WEATHER_COLUMNS.items()})
+        day_df = pd.DataFrame(day)
+        day_df["loaded_at"] = datetime.utcnow()
+        weather.write_daily_parquet(day_df, weather.GCS_BUCKET, d)
+
+    sizes = {module.PARQUET_BASE_PATH: 0, module.taxis_cube.AGG_BASE_PATH: 0}
+    for name, data in gcs.bucket(module.GCS_BUCKET).objects.items():
+        if name.endswith(".parquet"):
+            (root / name).parent.mkdir(parents=True, exist_ok=True)
+            (root / name).write_bytes(data)
+            prefix = name.split("/", 1)[0]
+            if prefix in sizes:
+                sizes[prefix] += len(data)
+    sizes["write_seconds"] = seconds
+    return sizes
+
+
+def compare(view: pa.Table, cube: pa.Table, keys: list[str], rtol: float) -> dict:
+    """Mismatches por columna entre las dos vistas (ya ordenadas por las claves)."""
+    mismatches = {"rows": int(view.num_rows != cube.num_rows)}
+    if mismatches["rows"]:
+        print(f"  rows: view={view.num_rows} cube={cube.num_rows}")
+        return mismatches
+    for name in keys + [c for c in cube.column_names if c not in keys]:
+        a, b = view.column(name).to_pylist(), cube.column(name).to_pylist()
+        if name in keys or name in EXACT:
+            bad = [(x, y) for x, y in zip(a, b) if x != y]
+        else:
+            bad = [
+                (x, y) for x, y in zip(a, b)
+                if (x is None) != (y is None) or (x is not None and not math.isclose(x, y, rel_tol=rtol, abs_tol=rtol))
+            ]
+        if bad:
+            print(f"  {name}: first mismatches {bad[:3]}")
+        mismatches[name] = len(bad)
+    return mismatches
+
+
+def logical_bytes(table: pa.Table, columns: list[str]) -> int:
+    """Tamaño lógico de las columnas (lo que factura BigQuery en una external table)."""
+    return sum(table.column(name).nbytes for name in columns)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=14)
+    parser.add_argument("--day-rows", type=int, default=20000, help="Viajes sintéticos por día")
+    parser.add_argument("--skew", type=float, default=1.2, help="Exponente Zipf de las dimensiones (0 = uniforme)")
+    parser.add_argument("--rtol", type=float, default=1e-9)
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Filas del test de throughput")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    module = load_function("ingest_taxis")
+    weather = load_function("ingest_weather")
+    engine = load_function("local_engine")
+    module.DAILY_AGG = True
+    keys = [name.strip() for name in engine.SUMMARY_GROUP_BY.split(",")]
+    dates = [(date(2024, 3, 4) + timedelta(days=i)).isoformat() for i in range(args.days)]
+    checks = {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        landing, output = Path(tmp) / "landing", Path(tmp) / "out"
+        sizes = build_landing(module, weather, landing, dates, args.day_rows, args.skew)
+        engine.run_local_pipeline(str(landing), str(output))
+
+        con = engine.connect()
+        timings, summaries = {}, {}
+        for label, root in (("view", None), ("cube", landing)):
+            begin = time.perf_counter()
+            summaries[label] = engine.trips_weather_summary(con, output, root)
+            timings[label] = time.perf_counter() - begin
+        view = summaries["view"].drop_columns(["median_duration_min"])
+        cube = summaries["cube"]
+        checks["same columns as the view (without median_duration_min)"] = view.column_names == cube.column_names
+        mismatches = compare(view, cube, keys, args.rtol)
+        for name, count in mismatches.items():
+            print(f"{'OK' if not count else 'FAIL':>4}  {name:<24} mismatches={count}")
+        checks["cube summary matches the view"] = not any(mismatches.values())
+        print(f"Compared {view.num_rows} summary rows ({sum(view.column('total_trips').to_pylist()):,} valid trips)")
+
+        columns = [c for c in VIEW_COLUMNS if c != "date"]
+        enriched = pq.read_table(output / engine.ENRICHED_PATH, columns=columns, partitioning=None)
+        cubes = pq.read_table(landing / module.taxis_cube.AGG_BASE_PATH, columns=CUBE_COLUMNS, partitioning=None)
+        # date (DATE, 8 bytes) sale de la ruta Hive en ambos casos
+        view_bytes = logical_bytes(enriched, columns) + enriched.num_rows * 8
+        cube_bytes = logical_bytes(cubes, CUBE_COLUMNS) + cubes.num_rows * 8
+        summary_bytes = cube.nbytes
+        print(
+            f"landing: taxis={sizes[module.PARQUET_BASE_PATH] / 1024**2:.2f} MiB  "
+            f"taxis_agg={sizes[module.taxis_cube.AGG_BASE_PATH] / 1024**2:.2f} MiB  "
+            f"({cubes.num_rows / args.days:,.0f} cells/day for {args.day_rows:,} trips/day, skew={args.skew})"
+        )
+        print(
+            f"dashboard refresh: view reads {view_bytes / 1024**2:.2f} MiB of taxis_weather_enriched "
+            f"({timings['view'] * 1000:.0f} ms); trips_weather_summary_agg is {summary_bytes / 1024:.1f} KiB "
+            f"({view_bytes / summary_bytes:,.0f}x less)"
+        )
+        print(
+            f"dbt build: one day of trips_weather_summary_agg reads {cube_bytes / args.days / 1024:.1f} KiB of cubes; "
+            f"full rebuild {cube_bytes / 1024**2:.2f} MiB ({timings['cube'] * 1000:.0f} ms)"
+        )
+
+    # Mismo cubo por todas las rutas de escritura
+    day = dates[0]
+    table = skewed_day(day, args.day_rows, args.skew)
+    loaded = table.append_column(
+        "loaded_at", pa.repeat(pa.scalar(datetime(2025, 1, 1), type=pa.timestamp("us")), table.num_rows)
+    )
+    writes = {
+        "pandas": lambda: module.write_daily_parquet(loaded.to_pandas(), module.GCS_BUCKET, day),
+        "arrow": lambda: module.write_daily_table(loaded, module.GCS_BUCKET, day),
+        "stream": lambda: module.write_daily_parquet_stream(TableRows(table, 3000), module.GCS_BUCKET, day),
+    }
+    cubes = {}
+    for multipart in (False, True):
+        module.taxis_partitions.PARTITION_TARGET_ROWS = 4000 if multipart else 0
+        for label, write in writes.items():
+            gcs = FakeStorageClient()
+            module.set_client("storage", gcs)
+            module.taxis_partitions.partition_index._cache.clear()
+            write()
+            data = gcs.bucket(module.GCS_BUCKET).objects[module.taxis_cube.agg_blob_path(day)]
+            cubes[f"{label}{' multipart' if multipart else ''}"] = pq.read_table(io.BytesIO(data))
+    module.taxis_partitions.PARTITION_TARGET_ROWS = 0
+    reference = cubes["arrow"]
+    same = True
+    for label, other in cubes.items():
+        ok = other.schema.equals(reference.schema) and all(
+            other.column(name).equals(reference.column(name))
+            if not pa.types.is_floating(reference.schema.field(name).type)
+            else np.allclose(other.column(name).to_numpy(), reference.column(name).to_numpy(), rtol=args.rtol, equal_nan=True)
+            for name in reference.column_names
+        )
+        same = same and ok
+        if not ok:
+            print(f"  {label}: cube differs from the arrow path")
+    checks["pandas, arrow, stream and multipart paths write the same cube"] = same
+
+    # Throughput: agregación en kernels de Arrow sobre la tabla ya convertida
+    big = module.conform_taxi_table(pa.concat_tables([loaded] * max(1, args.rows // loaded.num_rows)))
+    begin = time.perf_counter()
+    module.aggregate_daily_cube(big)
+    seconds = time.perf_counter() - begin
+    print(f"aggregate_daily_cube: {big.num_rows:,} rows in {seconds * 1000:.0f} ms "
+          f"({big.num_rows / seconds:,.0f} rows/s); landing writes took {sizes['write_seconds']:.2f}s for "
+          f"{args.days} days")
+
+    for name, ok in checks.items():
+        print(f"{'OK' if ok else 'FAIL':>4}  {name}")
+    sys.exit(0 if all(checks.values()) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Check de paridad: derive_silver_columns (ingesta) vs silver_taxis.sql.
+
+Construye días sintéticos con casos frontera (NULLs en cada operando, ceros,
+tarifas negativas, mitades exactas de redondeo, horas límite de time_of_day,
+sábados y domingos) y compara, fila a fila y columna a columna, las columnas
+de SILVER_DERIVED_COLUMNS calculadas con pyarrow.compute contra las que
+produce SILVER_TAXIS_SQL del motor local (silver_taxis.sql en dialecto
+DuckDB) sobre el mismo Parquet. La comparación es exacta, NULL incluido.
+
+Además mide el throughput de derive_silver_columns sobre --rows filas.
+
+Uso:
+    uv run python benchmarks/check_silver_parity.py
+    uv run python benchmarks/check_silver_parity.py --days 30 --rows 1000000
+"""
+
+import argparse
+import logging
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from fakes import load_function, synthetic_taxi_day
+
+
+def edge_cases(day: str) -> pa.Table:
+    """Filas frontera de un día: cada una ataca una rama del SQL."""
+    base = np.datetime64(f"{day}T00:00:00", "us")
+    hours = [0, 5, 6, 9, 10, 15, 16, 19, 20, 23, 23, 12, 12, 12, 12, 12, 12, 12, 12, 12]
+    n = len(hours)
+    start = [base + np.timedelta64(h * 3600 + 59 * 60 + 59, "s") for h in hours]
+    rows = {
+        "unique_key": [f"edge-{day}-{i:03d}" for i in range(n)],
+        "taxi_id": [None] * n,
+        "trip_start_timestamp": start,
+        "trip_end_timestamp": [s + np.timedelta64(600, "s") for s in start],
+        # NULL, 0, 1 s, mitad exacta de minuto (30 s → 0.5 min), 0.5 s (cast → 1)
+        "trip_seconds": [None, 0, 1, 30, 90, 45, 3600, 7, None, 0, 59, 61, 0.5, 0.4, 600, 600, 600, 600, 600, 600],
+        "trip_miles": [1.0, None, 0.0, 0.125, 2.005, 1.115, 10.0, -1.0, 0.0, 3.0,
+                       0.3, 0.7, 1.0, 1.0, 2.675, 1.005, 0.015, 5.0, 1.0, None],
+        "fare": [10.0, 10.0, None, 0.0, -2.5, 8.0, 40.0, 4.0, 5.0, 12.0,
+                 8.0, 3.0, 7.0, 7.0, 8.0, 200.0, 1.0, 3.0, None, 0.0],
+        "tips": [1.0, None, 2.0, 1.0, 0.0, 1.0, 0.125, 0.05, 1.25, None,
+                 2.0, 0.01, 1.0, 1.0, 1.0, 0.01, 0.00125, 0.005, 1.0, 1.0],
+        "trip_total": [11.0, 12.0, 3.0, 1.0, -2.5, 9.0, 40.125, 4.05, None, 12.0,
+                       10.0, 3.01, 8.0, 8.0, 9.0, 200.01, 1.00125, 3.005, 1.0, 1.0],
+    }
+    for column in ("tolls", "extras", "pickup_community_area", "dropoff_community_area",
+                   "pickup_latitude", "pickup_longitude", "dropoff_latitude", "dropoff_longitude"):
+        rows[column] = [None] * n
+    rows["payment_type"] = [None] * n
+    rows["company"] = [None] * n
+    return pa.table(rows).cast(pa.schema([
+        ("unique_key", pa.string()), ("taxi_id", pa.string()),
+        ("trip_start_timestamp", pa.timestamp("us", tz="UTC")), ("trip_end_timestamp", pa.timestamp("us", tz="UTC")),
+        ("trip_seconds", pa.float64()), ("trip_miles", pa.float64()),
+        ("fare", pa.float64()), ("tips", pa.float64()), ("trip_total", pa.float64()),
+        ("tolls", pa.float64()), ("extras", pa.float64()),
+        ("pickup_community_area", pa.float64()), ("dropoff_community_area", pa.float64()),
+        ("pickup_latitude", pa.float64()), ("pickup_longitude", pa.float64()),
+        ("dropoff_latitude", pa.float64()), ("dropoff_longitude", pa.float64()),
+        ("payment_type", pa.string()), ("company", pa.string()),
+    ]))
+
+
+def landing_day(day: str, rows: int) -> pa.Table:
+    """Día sintético + casos frontera con el mismo schema (como sale de BigQuery)."""
+    df = synthetic_taxi_day(day, rows, seed=int(day.replace("-", "")))
+    rng = np.random.default_rng(int(day.replace("-", "")))
+    # NULLs dispersos en los operandos y precios con mitades de céntimo
+    for column in ("trip_seconds", "trip_miles", "fare", "tips", "trip_total"):
+        df[column] = df[column].astype("float64").mask(rng.random(rows) < 0.03)
+    df["tips"] = df["tips"] + rng.choice([0.0, 0.005, 0.0125], rows)
+    edges = edge_cases(day)
+    synthetic = pa.Table.from_pandas(df, preserve_index=False).select(edges.column_names).cast(edges.schema)
+    return pa.concat_tables([synthetic, edges])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=14)
+    parser.add_argument("--day-rows", type=int, default=5000, help="Filas sintéticas por día")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Filas del test de throughput")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    module = load_function("ingest_taxis")
+    engine = load_function("local_engine")
+    columns = module.taxis_silver.SILVER_DERIVED_COLUMNS
+
+    con = engine.connect()
+    mismatches = {name: 0 for name in columns}
+    checked = 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(args.days):
+            day = (date(2024, 3, 4) + timedelta(days=i)).isoformat()
+            table = landing_day(day, args.day_rows)
+            path = Path(tmp) / f"{day}.parquet"
+            pq.write_table(table, path)
+
+            derived = module.derive_silver_columns(table).select(["unique_key", *columns])
+            expected = con.execute(
+                f"select unique_key, {', '.join(columns)} from ({engine.SILVER_TAXIS_SQL.format(source=[str(path)])})"
+            ).arrow()
+            if hasattr(expected, "read_all"):
+                expected = expected.read_all()
+
+            got = derived.sort_by("unique_key")
+            want = expected.sort_by("unique_key")
+            checked += got.num_rows
+            for name in columns:
+                a = got.column(name).to_pylist()
+                b = want.column(name).to_pylist()
+                bad = [(k, x, y) for k, x, y in zip(got.column("unique_key").to_pylist(), a, b) if x != y]
+                if bad and not mismatches[name]:
+                    print(f"  {name}: first mismatches {bad[:3]}")
+                mismatches[name] += len(bad)
+
+    for name in columns:
+        print(f"{'OK' if not mismatches[name] else 'FAIL':>4}  {name:<15} mismatches={mismatches[name]}")
+    print(f"Compared {checked} rows against SILVER_TAXIS_SQL")
+
+    # Throughput: todo el trabajo ocurre en kernels de Arrow
+    big = pa.concat_tables([landing_day("2024-03-04", args.day_rows)] * max(1, args.rows // args.day_rows))
+    start = time.perf_counter()
+    module.derive_silver_columns(big)
+    seconds = time.perf_counter() - start
+    print(f"derive_silver_columns: {big.num_rows:,} rows in {seconds * 1000:.0f} ms "
+          f"({big.num_rows / seconds:,.0f} rows/s)")
+
+    sys.exit(1 if any(mismatches.values()) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,598 @@
+"""
+Fakes en proceso para benchmarks de las Cloud Functions de ingesta.
+
+- load_function: carga src/<function>/main.py como módulo aislado
+- FakeBigQueryClient: devuelve días sintéticos de taxis con latencia inyectada
+- FakeStorageClient: bucket GCS en memoria con latencia inyectada
+- OpenMeteoStub: servidor HTTP local que imita la archive API de Open-Meteo
+- FakeClock: reloj simulado que avanza con las latencias de los fakes
+- InMemoryPubSub: publisher + subscriber en memoria que entrega a un handler CloudEvent
+"""
+
+import base64
+import hashlib
+import importlib.util
+import io
+import json
+import queue
+import re
+import sys
+import threading
+import time
+import zlib
+from concurrent.futures import Future
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from google.api_core import exceptions as gcs_exceptions
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+
+
+def load_function(function_name: str, stage_logs: bool = False):
+    """
+    Carga src/<function_name>/main.py con un nombre de módulo único.
+
+    Los módulos hermanos y el paquete ingest_shared (src/ingest_shared, que
+    Terraform empaqueta junto a cada main.py) se resuelven durante la carga y se
+    retiran de sys.modules al terminar, para que cada carga tenga su propio
+    estado y ingest_taxis e ingest_weather puedan cargarse en el mismo proceso.
+    Quedan accesibles como atributos del módulo devuelto (p.ej.
+    taxis.clients._clients): la configuración se cambia en el módulo que la lee.
+    Los logs JSON por etapa (STAGE_LOGS) se desactivan salvo que se pidan,
+    para no mezclarlos con la salida de los benchmarks.
+    """
+    function_dir = SRC_DIR / function_name
+    before = set(sys.modules)
+    loaded = {}
+    sys.path[:0] = [str(function_dir), str(SRC_DIR)]
+    try:
+        spec = importlib.util.spec_from_file_location(f"{function_name}_main", function_dir / "main.py")
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[spec.name] = module
+        spec.loader.exec_module(module)
+    finally:
+        for path in (str(function_dir), str(SRC_DIR)):
+            sys.path.remove(path)
+        for name in set(sys.modules) - before:
+            origin = getattr(sys.modules[name], "__file__", None) or ""
+            if name != spec.name and origin.startswith(str(SRC_DIR)):
+                loaded[name] = sys.modules.pop(name)
+    for name, shared in loaded.items():
+        setattr(module, name.rsplit(".", 1)[-1], shared)
+    for loaded_module in (module, *loaded.values()):
+        if hasattr(loaded_module, "STAGE_LOGS"):
+            loaded_module.STAGE_LOGS = stage_logs
+    return module
+
+
+def synthetic_taxi_day(date: str, rows: int, seed: int = 0, offset: int = 0) -> pd.DataFrame:
+    """Genera un día sintético con las columnas de TAXI_COLUMNS (unique_key desde offset)."""
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp(date, tz="UTC") + pd.to_timedelta(rng.integers(0, 86400, rows), unit="s")
+    seconds = rng.integers(0, 3600, rows)
+    fare = rng.gamma(2.0, 8.0, rows).round(2)
+    tips = (fare * rng.choice([0, 0.1, 0.15, 0.2], rows)).round(2)
+    return pd.DataFrame({
+        "unique_key": [f"{date}-{i:08d}" for i in range(offset, offset + rows)],
+        "taxi_id": rng.choice([f"taxi-{i:04d}" for i in range(2000)], rows),
+        "trip_start_timestamp": start,
+        "trip_end_timestamp": start + pd.to_timedelta(seconds, unit="s"),
+        "trip_seconds": seconds,
+        "trip_miles": rng.gamma(1.5, 2.0, rows).round(2),
+        "pickup_community_area": rng.integers(1, 78, rows).astype("float64"),
+        "dropoff_community_area": rng.integers(1, 78, rows).astype("float64"),
+        "fare": fare,
+        "tips": tips,
+        "tolls": np.zeros(rows),
+        "extras": rng.choice([0.0, 1.0, 4.0], rows),
+        "trip_total": (fare + tips).round(2),
+        "payment_type": rng.choice(["Cash", "Credit Card", "Mobile", "Unknown"], rows),
+        "company": rng.choice([f"Company {i}" for i in range(40)], rows),
+        "pickup_latitude": rng.normal(41.88, 0.05, rows),
+        "pickup_longitude": rng.normal(-87.63, 0.05, rows),
+        "dropoff_latitude": rng.normal(41.88, 0.05, rows),
+        "dropoff_longitude": rng.normal(-87.63, 0.05, rows),
+    })
+
+
+class FakeRowIterator:
+    """Resultado de query falso que genera las filas por páginas bajo demanda."""
+
+    def __init__(self, client: "FakeBigQueryClient", dates: list[str]):
+        self._client = client
+        self._dates = dates
+        self.total_rows = sum(client.day_rows(date) for date in dates)
+
+    def _pages(self):
+        client = self._client
+        for date in self._dates:
+            client.sleep(client.download_latency)
+            yield from client.day_pages(date)
+
+    def _frame(self) -> pd.DataFrame:
+        frames = list(self._pages())
+        if not frames:
+            return synthetic_taxi_day("1970-01-01", 0)
+        return pd.concat(frames, ignore_index=True)
+
+    def to_dataframe(self, *args, **kwargs) -> pd.DataFrame:
+        # Como el RowIterator real: descarga en Arrow y convierte a pandas
+        return self.to_arrow().to_pandas()
+
+    def to_arrow_iterable(self, *args, **kwargs):
+        for page in self._pages():
+            yield pa.RecordBatch.from_pandas(page, preserve_index=False)
+
+    def to_arrow(self, *args, **kwargs) -> pa.Table:
+        return pa.Table.from_pandas(self._frame(), preserve_index=False)
+
+
+class FakeFingerprintRows(list):
+    """Resultado de la query agregada de huellas: lista de dicts con total_rows."""
+
+    @property
+    def total_rows(self) -> int:
+        return len(self)
+
+
+class FakeFingerprintJob:
+    """Query de fetch_source_fingerprints: agrega los días sintéticos con la misma fórmula."""
+
+    def __init__(self, client: "FakeBigQueryClient", dates: list[str]):
+        self._client = client
+        self._dates = dates
+        # Solo lee 3 de las 19 columnas de TAXI_COLUMNS
+        self.total_bytes_processed = client.bytes_per_scan * 3 // 19
+
+    def result(self, *args, **kwargs) -> FakeFingerprintRows:
+        self._client.sleep(self._client.query_latency)
+        rows = FakeFingerprintRows()
+        for date in self._dates:
+            day = pd.concat(list(self._client.day_pages(date)), ignore_index=True)
+            if day.empty:
+                continue
+            key_hash = 0
+            for key in day["unique_key"]:
+                key_hash ^= int(hashlib.md5(key.encode("utf-8")).hexdigest()[:15], 16)
+            rows.append({
+                "date": date,
+                "row_count": len(day),
+                "max_trip_end_us": day["trip_end_timestamp"].max().value // 1000,
+                "key_hash": key_hash,
+            })
+        return rows
+
+
+class FakeDryRunJob:
+    """Dry run: solo la estimación de bytes, sin resultado (como el QueryJob real con dry_run)."""
+
+    def __init__(self, client: "FakeBigQueryClient"):
+        client.sleep(client.dry_run_latency)
+        self.total_bytes_processed = client.bytes_per_scan
+
+
+class FakeQueryJob:
+    def __init__(self, client: "FakeBigQueryClient", dates: list[str]):
+        self._client = client
+        self._dates = dates
+        self.total_bytes_processed = int(client.bytes_per_scan * client.actual_bytes_ratio)
+
+    def result(self, *args, **kwargs) -> FakeRowIterator:
+        self._client.sleep(self._client.query_latency)
+        return FakeRowIterator(self._client, self._dates)
+
+    def to_dataframe(self, *args, **kwargs) -> pd.DataFrame:
+        return self.result().to_dataframe()
+
+
+class FakeBigQueryClient:
+    """
+    Cliente BigQuery falso: cada query devuelve los días sintéticos de su WHERE.
+
+    query_latency se paga una vez por job; download_latency una vez por día devuelto.
+    Las filas se generan en páginas de page_size, como el paginado de la API.
+    sleep permite pagar las latencias en un FakeClock en lugar de en tiempo real.
+    La primera query que toca una fecha de fail_once falla.
+    Cada query procesa bytes_per_scan (la tabla pública no está particionada:
+    se escanean las columnas completas sea cual sea el rango); el dry run
+    (job_config.dry_run) devuelve esa estimación y la query real la multiplica
+    por actual_bytes_ratio.
+    revisions {fecha: filas extra} simula filas tardías en el origen: cambia
+    los datos y la huella de esos días (se puede modificar entre ingestas).
+    """
+
+    def __init__(
+        self,
+        rows_per_day: int = 1000,
+        query_latency: float = 0.0,
+        download_latency: float = 0.0,
+        bytes_per_scan: int = 2 * 1024**3,
+        page_size: int = 50_000,
+        sleep=time.sleep,
+        fail_once: set[str] | None = None,
+        actual_bytes_ratio: float = 1.0,
+        dry_run_latency: float = 0.0,
+        **_,
+    ):
+        self.rows_per_day = rows_per_day
+        self.query_latency = query_latency
+        self.download_latency = download_latency
+        self.bytes_per_scan = bytes_per_scan
+        self.page_size = page_size
+        self.sleep = sleep
+        self.fail_once = set(fail_once or ())
+        self.actual_bytes_ratio = actual_bytes_ratio
+        self.dry_run_latency = dry_run_latency
+        self.revisions: dict[str, int] = {}
+        self.queries = []
+        self.dry_runs = []
+        self._lock = threading.Lock()
+
+    def day_rows(self, date: str) -> int:
+        """Filas de un día sintético, incluidas las de revisions."""
+        return self.rows_per_day + self.revisions.get(date, 0)
+
+    def day_pages(self, date: str):
+        """Páginas de un día sintético (filas extra de revisions al final)."""
+        seed = int(date.replace("-", ""))
+        total = self.day_rows(date)
+        for offset in range(0, total, self.page_size):
+            rows = min(self.page_size, total - offset)
+            yield synthetic_taxi_day(date, rows, seed=seed + offset, offset=offset)
+
+    def query(self, sql: str, *args, job_config=None, **kwargs) -> FakeQueryJob:
+        found = re.findall(r"'(\d{4}-\d{2}-\d{2})'", sql)
+        start, end = found[0], found[-1]
+        dates = [d.strftime("%Y-%m-%d") for d in pd.date_range(start, end, freq="D")]
+        if getattr(job_config, "dry_run", False):
+            with self._lock:
+                self.dry_runs.append(sql)
+            return FakeDryRunJob(self)
+        with self._lock:
+            self.queries.append(sql)
+            failing = self.fail_once.intersection(dates)
+            self.fail_once -= failing
+        if failing:
+            raise gcs_exceptions.ServiceUnavailable(f"simulated failure for {sorted(failing)}")
+        if "BIT_XOR" in sql:
+            return FakeFingerprintJob(self, dates)
+        return FakeQueryJob(self, dates)
+
+
+class FakeBlob:
+    def __init__(self, bucket: "FakeBucket", name: str):
+        self.bucket = bucket
+        self.name = name
+        self.generation = None
+        self.metadata = bucket.metadata.get(name)
+
+    @property
+    def size(self) -> int | None:
+        data = self.bucket.objects.get(self.name)
+        return len(data) if data is not None else None
+
+    @property
+    def updated(self) -> datetime | None:
+        return self.bucket.updated.get(self.name)
+
+    def exists(self, *args, **kwargs) -> bool:
+        time.sleep(self.bucket.latency)
+        return self.name in self.bucket.objects
+
+    def upload_from_file(self, file_obj, *args, **kwargs) -> None:
+        self.upload_from_string(file_obj.read())
+
+    def upload_from_string(self, data, *args, if_generation_match=None, **kwargs) -> None:
+        time.sleep(self.bucket.latency)
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        if not self.bucket.keep_data:
+            data = b""
+        with self.bucket.lock:
+            current = self.bucket.generations.get(self.name, 0)
+            if if_generation_match is not None and if_generation_match != current:
+                raise gcs_exceptions.PreconditionFailed(f"generation mismatch for {self.name}")
+            self.bucket.objects[self.name] = bytes(data)
+            self.bucket.metadata[self.name] = dict(self.metadata) if self.metadata else None
+            self.bucket.generations[self.name] = current + 1
+            self.bucket.updated[self.name] = datetime.now(timezone.utc)
+            self.generation = current + 1
+            self.bucket.uploads += 1
+
+    def delete(self, *args, **kwargs) -> None:
+        time.sleep(self.bucket.latency)
+        with self.bucket.lock:
+            if self.name not in self.bucket.objects:
+                raise gcs_exceptions.NotFound(f"{self.name} not found")
+            del self.bucket.objects[self.name]
+            self.bucket.generations.pop(self.name, None)
+            self.bucket.metadata.pop(self.name, None)
+            self.bucket.updated.pop(self.name, None)
+
+    def patch(self, *args, **kwargs) -> None:
+        time.sleep(self.bucket.latency)
+        with self.bucket.lock:
+            if self.name not in self.bucket.objects:
+                raise gcs_exceptions.NotFound(f"{self.name} not found")
+            self.bucket.metadata[self.name] = dict(self.metadata) if self.metadata else None
+
+    def download_as_bytes(self, *args, **kwargs) -> bytes:
+        time.sleep(self.bucket.latency)
+        with self.bucket.lock:
+            if self.name not in self.bucket.objects:
+                raise gcs_exceptions.NotFound(f"{self.name} not found")
+            self.generation = self.bucket.generations[self.name]
+            return self.bucket.objects[self.name]
+
+    def open(self, mode: str = "rb", *args, **kwargs):
+        if "r" in mode:
+            return io.BytesIO(self.download_as_bytes())
+        return FakeBlobWriter(self)
+
+
+class FakeBlobWriter(io.RawIOBase):
+    """Escritura en streaming como BlobWriter: guarda los chunks solo si el bucket lo pide."""
+
+    def __init__(self, blob: FakeBlob):
+        self._blob = blob
+        self._chunks = []
+        self.bytes_written = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        if self._blob.bucket.keep_data:
+            self._chunks.append(bytes(data))
+        self.bytes_written += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.bytes_written
+
+    def close(self) -> None:
+        if not self.closed:
+            self._blob.upload_from_string(b"".join(self._chunks))
+        super().close()
+
+    def terminate(self) -> None:
+        """Cancela la subida sin crear el objeto."""
+        self._chunks = []
+        super().close()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        # Como BlobWriter: una excepción dentro del with cancela la subida
+        if exc_type is not None:
+            self.terminate()
+        else:
+            self.close()
+
+
+class FakeClock:
+    """Reloj monotónico simulado: solo avanza con advance() / sleep()."""
+
+    def __init__(self, start: float = 0.0):
+        self._now = start
+        self._lock = threading.Lock()
+
+    def __call__(self) -> float:
+        with self._lock:
+            return self._now
+
+    def advance(self, seconds: float) -> None:
+        with self._lock:
+            self._now += seconds
+
+    sleep = advance
+
+
+class InMemoryPubSub:
+    """
+    Stand-in de Pub/Sub: publish() encola el mensaje y `instances` threads
+    lo entregan a `handler` como un CloudEvent messagePublished, igual que el
+    trigger de Eventarc a instancias distintas de la función worker.
+
+    Los mensajes cuyo handler lanza excepción no se reentregan (retry_policy
+    DO_NOT_RETRY); se cuentan en `failed`.
+
+    Uso:
+        with InMemoryPubSub(module.ingest_taxis_pubsub, instances=8) as pubsub:
+            module.set_client("publisher", pubsub)
+            ...
+            pubsub.drain()
+    """
+
+    def __init__(self, handler=None, instances: int = 1, latency: float = 0.0):
+        self.handler = handler
+        self.instances = instances
+        self.latency = latency
+        self.published: list[dict] = []
+        self.delivered = 0
+        self.failed = 0
+        self._queue: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._threads: list[threading.Thread] = []
+
+    def publish(self, topic: str, data: bytes, **attributes) -> Future:
+        time.sleep(self.latency)
+        with self._lock:
+            message_id = str(len(self.published))
+            self.published.append({"topic": topic, "data": json.loads(data), "attributes": attributes})
+        self._queue.put(data)
+        future = Future()
+        future.set_result(message_id)
+        return future
+
+    def _deliver(self) -> None:
+        while True:
+            data = self._queue.get()
+            if data is None:
+                self._queue.task_done()
+                return
+            event = SimpleNamespace(data={"message": {"data": base64.b64encode(data).decode("ascii")}})
+            try:
+                self.handler(event)
+                with self._lock:
+                    self.delivered += 1
+            except Exception:
+                with self._lock:
+                    self.failed += 1
+            finally:
+                self._queue.task_done()
+
+    def drain(self) -> None:
+        """Bloquea hasta que todos los mensajes publicados se han entregado."""
+        self._queue.join()
+
+    def __enter__(self) -> "InMemoryPubSub":
+        for _ in range(self.instances):
+            thread = threading.Thread(target=self._deliver, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+
+
+class FakeBucket:
+    def __init__(self, name: str, latency: float = 0.0, keep_data: bool = True):
+        self.name = name
+        self.latency = latency
+        self.keep_data = keep_data
+        self.objects: dict[str, bytes] = {}
+        self.generations: dict[str, int] = {}
+        self.metadata: dict[str, dict | None] = {}
+        self.updated: dict[str, datetime] = {}
+        self.uploads = 0
+        self.list_calls = 0
+        self.list_prefixes: list[str] = []
+        self.lock = threading.Lock()
+
+    def blob(self, name: str) -> FakeBlob:
+        return FakeBlob(self, name)
+
+    def list_blobs(self, prefix: str = "", *args, **kwargs):
+        """Como la API, pagina de 1000 en 1000: la latencia se paga por página."""
+        with self.lock:
+            names = sorted(n for n in self.objects if n.startswith(prefix))
+        pages = max(1, -(-len(names) // 1000))
+        time.sleep(self.latency * pages)
+        self.list_calls += pages
+        self.list_prefixes.append(prefix)
+        return [FakeBlob(self, n) for n in names]
+
+
+class FakeStorageClient:
+    """
+    Cliente GCS falso con buckets en memoria.
+
+    Con keep_data=False los objetos se registran vacíos, para medir memoria
+    sin que el propio bucket retenga los ficheros subidos.
+    """
+
+    def __init__(self, latency: float = 0.0, keep_data: bool = True, **_):
+        self.latency = latency
+        self.keep_data = keep_data
+        self.buckets: dict[str, FakeBucket] = {}
+
+    def bucket(self, name: str) -> FakeBucket:
+        if name not in self.buckets:
+            self.buckets[name] = FakeBucket(name, self.latency, self.keep_data)
+        return self.buckets[name]
+
+
+def synthetic_weather_value(variable: str, date: str) -> float | int:
+    """
+    Valor determinista por (variable, fecha), igual pida el rango que se pida
+    y en cualquier proceso (hash() de str cambia con PYTHONHASHSEED).
+    """
+    rng = np.random.default_rng(zlib.crc32(f"{variable}|{date}".encode("utf-8")))
+    if variable == "weather_code":
+        return int(rng.choice([0, 1, 2, 3, 51, 61, 71, 95]))
+    return round(float(rng.normal(10, 8)), 1)
+
+
+class OpenMeteoStub:
+    """
+    Servidor HTTP local que imita /v1/archive de Open-Meteo.
+
+    Con throttle_rate > 0, esa fracción de requests responde 429 con el
+    header Retry-After (segundos enteros) indicado.
+
+    Uso:
+        with OpenMeteoStub(latency=0.05) as stub:
+            module.OPEN_METEO_URL = stub.url
+    """
+
+    def __init__(self, latency: float = 0.0, throttle_rate: float = 0.0, retry_after: int = 1):
+        self.latency = latency
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.requests = 0
+        self.throttled = 0
+        self._rng = np.random.default_rng(0)
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # HTTP/1.1 para que los clientes puedan reutilizar conexiones keep-alive
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                stub._handle(self)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}/v1/archive"
+
+    def _handle(self, handler: BaseHTTPRequestHandler) -> None:
+        with self._lock:
+            self.requests += 1
+            throttle = self._rng.random() < self.throttle_rate
+            self.throttled += throttle
+        time.sleep(self.latency)
+
+        if throttle:
+            self._respond(handler, 429, {"error": True, "reason": "Too many requests"},
+                          {"Retry-After": str(self.retry_after)})
+            return
+
+        query = parse_qs(urlparse(handler.path).query)
+        dates = [d.strftime("%Y-%m-%d") for d in pd.date_range(query["start_date"][0], query["end_date"][0])]
+        daily = {"time": dates}
+        for variable in query.get("daily", []):
+            daily[variable] = [synthetic_weather_value(variable, d) for d in dates]
+        self._respond(handler, 200, {"daily": daily})
+
+    @staticmethod
+    def _respond(handler: BaseHTTPRequestHandler, status: int, payload: dict, headers: dict | None = None) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            handler.send_header(key, value)
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def __enter__(self) -> "OpenMeteoStub":
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,64 @@
+{% macro partition_dates(var_names) -%}
+    {#
+        Fechas (YYYY-MM-DD) a reconstruir según las vars de dbt indicadas,
+        unidas y ordenadas. Cada var es una lista YAML o un string separado
+        por comas, tal como lo emite dates_written de los ingesters.
+        Devuelve none si ninguna var está definida (ejecución incremental por
+        max(date)) y [] si están definidas pero vacías (no hay nada que hacer).
+    #}
+    {%- set dates = [] -%}
+    {%- set found = [] -%}
+    {%- for var_name in var_names -%}
+        {%- set raw = var(var_name, none) -%}
+        {%- if raw is not none -%}
+            {%- do found.append(var_name) -%}
+            {%- set values = raw.split(',') if raw is string else raw -%}
+            {%- for value in values -%}
+                {%- set value = value | string | trim -%}
+                {%- if value and not modules.re.match('^\d{4}-\d{2}-\d{2}$', value) -%}
+                    {{ exceptions.raise_compiler_error("Invalid date '" ~ value ~ "' in var " ~ var_name) }}
+                {%- endif -%}
+                {%- if value and value not in dates -%}
+                    {%- do dates.append(value) -%}
+                {%- endif -%}
+            {%- endfor -%}
+        {%- endif -%}
+    {%- endfor -%}
+    {{ return((dates | sort) if found else none) }}
+{%- endmacro %}
+
+
+{% macro partition_literals(dates) -%}
+    {#
+        Lista para config(partitions=...): insert_overwrite con particiones
+        estáticas reemplaza exactamente esas sin consultar la tabla destino.
+    #}
+    {%- set literals = [] -%}
+    {%- for date in dates -%}
+        {%- do literals.append("date('" ~ date ~ "')") -%}
+    {%- endfor -%}
+    {{ return(literals) }}
+{%- endmacro %}
+
+
+{% macro max_partition_date() -%}
+    {#
+        max(date) de la tabla destino como literal, consultado antes de
+        compilar el modelo: a diferencia de una subquery, un literal permite
+        podar particiones (también las Hive de las external tables).
+    #}
+    {%- if execute -%}
+        {%- set result = run_query("select coalesce(max(date), date '1900-01-01') from " ~ this) -%}
+        {{ return("date '" ~ result.columns[0].values()[0] ~ "'") }}
+    {%- endif -%}
+    {{ return("date '1900-01-01'") }}
+{%- endmacro %}
+
+
+{% macro date_in(column, dates) -%}
+    {%- if dates -%}
+        {{ column }} in ({% for date in dates %}date '{{ date }}'{% if not loop.last %}, {% endif %}{% endfor %})
+    {%- else -%}
+        false
+    {%- endif -%}
+{%- endmacro %}
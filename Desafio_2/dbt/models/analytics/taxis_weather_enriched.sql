@@ -1,6 +1,10 @@
 -- Analytics layer: Taxi trips enriched with weather data
 -- Dataset: analytics
 -- Materialización: incremental (insert_overwrite por partición)
+-- Con vars taxis_dates / weather_dates (dates_written de los ingesters) solo se
+-- reconstruyen esas particiones; sin ellas, las fechas posteriores al max(date)
+
+{% set rebuild_dates = partition_dates(['taxis_dates', 'weather_dates']) %}
 
 {{
     config(
@@ -11,6 +15,7 @@
             "data_type": "date",
             "granularity": "day"
         },
+        partitions=partition_literals(rebuild_dates) if rebuild_dates else none,
         cluster_by=["pickup_community_area", "temperature_category"],
         on_schema_change='append_new_columns'
     )
@@ -18,8 +23,10 @@
 
 with silver_taxis as (
     select * from {{ ref('silver_taxis') }}
-    {% if is_incremental() %}
-    where date > (select coalesce(max(date), '1900-01-01') from {{ this }})
+    {% if is_incremental() and rebuild_dates is not none %}
+    where {{ date_in('date', rebuild_dates) }}
+    {% elif is_incremental() %}
+    where date > {{ max_partition_date() }}
     {% endif %}
 ),
 
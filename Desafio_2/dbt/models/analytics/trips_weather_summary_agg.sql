@@ -0,0 +1,105 @@
+-- Analytics layer: vw_trips_weather_summary desde el cubo diario de la ingesta
+-- Dataset: analytics
+-- Purpose: Mismas filas y métricas que vw_trips_weather_summary calculadas desde
+--          raw_data.taxi_daily_agg_ext (una fila por celda hora / área / pago /
+--          compañía y día) en lugar de taxis_weather_enriched (una por viaje)
+-- Materialización: incremental (insert_overwrite por partición), solo con var
+-- taxis_daily_agg. Looker Studio lee unas decenas de filas por día y cada
+-- ejecución de dbt solo lee los cubos de las fechas a reconstruir (vars
+-- taxis_dates / weather_dates o las posteriores al max(date))
+-- Sin median_duration_min: una mediana no se recompone desde counts y sums
+
+{% set rebuild_dates = partition_dates(['taxis_dates', 'weather_dates']) %}
+
+{{
+    config(
+        materialized='incremental',
+        incremental_strategy='insert_overwrite',
+        partition_by={
+            "field": "date",
+            "data_type": "date",
+            "granularity": "day"
+        },
+        partitions=partition_literals(rebuild_dates) if rebuild_dates else none,
+        enabled=var('taxis_daily_agg')
+    )
+}}
+
+with cube as (
+    select
+        date,
+        extract(dayofweek from date) as day_of_week,
+        case
+            when extract(dayofweek from date) in (1, 7) then 'weekend'
+            else 'weekday'
+        end as day_type,
+        case
+            when start_hour between 6 and 9 then 'morning_rush'
+            when start_hour between 10 and 15 then 'midday'
+            when start_hour between 16 and 19 then 'evening_rush'
+            when start_hour between 20 and 23 then 'night'
+            else 'late_night'
+        end as time_of_day,
+        * except (date)
+    from {{ source('raw_data', 'taxi_daily_agg_ext') }}
+    -- Filtro sobre la clave Hive date: solo se leen los cubos de esas fechas
+    {% if is_incremental() and rebuild_dates is not none %}
+    where {{ date_in('date', rebuild_dates) }}
+    {% elif is_incremental() %}
+    where date > {{ max_partition_date() }}
+    {% endif %}
+),
+
+silver_weather as (
+    select * from {{ ref('silver_weather') }}
+),
+
+-- Agregación principal por fecha y condiciones climáticas (mismo grano que la vista)
+daily_weather_summary as (
+    select
+        -- Dimensiones temporales
+        c.date,
+        c.day_of_week,
+        c.day_type,
+        c.time_of_day,
+
+        -- Dimensiones climáticas
+        w.temperature_category,
+        w.precipitation_category,
+        w.adverse_conditions,
+
+        -- Métricas de viajes
+        sum(c.trips) as total_trips,
+
+        -- Duración del viaje: media y desviación típica muestral desde count, sum y sumsq
+        sum(c.sum_trip_minutes) / nullif(sum(c.count_trip_minutes), 0) as avg_duration_min,
+        min(c.min_trip_minutes) as min_duration_min,
+        max(c.max_trip_minutes) as max_duration_min,
+        sqrt(greatest(
+            sum(c.sumsq_trip_minutes) - pow(sum(c.sum_trip_minutes), 2) / nullif(sum(c.count_trip_minutes), 0),
+            0
+        ) / nullif(sum(c.count_trip_minutes) - 1, 0)) as stddev_duration_min,
+
+        -- Distancia
+        sum(c.sum_trip_miles) / nullif(sum(c.count_trip_miles), 0) as avg_distance_miles,
+        sum(c.sum_trip_miles) as total_distance_miles,
+
+        -- Velocidad
+        sum(c.sum_avg_speed_mph) / nullif(sum(c.count_avg_speed_mph), 0) as avg_speed_mph,
+
+        -- Tarifas
+        sum(c.sum_trip_total) / nullif(sum(c.count_trip_total), 0) as avg_fare,
+        sum(c.sum_trip_total) as total_revenue,
+        sum(c.sum_tip_percentage) / nullif(sum(c.count_tip_percentage), 0) as avg_tip_pct,
+
+        -- Clima detallado (un valor por fecha)
+        any_value(w.temperature_mean_c) as avg_temperature_c,
+        any_value(w.precipitation_mm) as avg_precipitation_mm,
+        any_value(w.wind_speed_max_kmh) as avg_wind_speed_kmh
+
+    from cube c
+    left join silver_weather w on c.date = w.date
+    group by 1, 2, 3, 4, 5, 6, 7
+)
+
+select * from daily_weather_summary
@@ -1,6 +1,12 @@
 -- Silver layer: Curated taxi trips data
 -- Dataset: silver_data
 -- Materialización: incremental (insert_overwrite por partición)
+-- Con var taxis_silver_columns_at_ingest las columnas derivadas vienen
+-- calculadas desde la ingesta y aquí solo se proyectan
+-- Con var taxis_dates (dates_written de ingest_taxis) solo se reconstruyen
+-- esas particiones; sin ella, las fechas posteriores al max(date) actual
+
+{% set rebuild_dates = partition_dates(['taxis_dates']) %}
 
 {{
     config(
@@ -11,6 +17,7 @@
             "data_type": "date",
             "granularity": "day"
         },
+        partitions=partition_literals(rebuild_dates) if rebuild_dates else none,
         cluster_by=["pickup_community_area", "payment_type"],
         on_schema_change='append_new_columns'
     )
@@ -18,11 +25,16 @@
 
 with stg_taxis as (
     select * from {{ ref('stg_taxis') }}
-    {% if is_incremental() %}
+    -- Siempre se filtra por la clave Hive partition_date (= date(trip_start_timestamp))
+    {% if is_incremental() and rebuild_dates is not none %}
+    -- Solo las particiones que tocó la ingesta (incluidos backfills y re-ingestas)
+    where {{ date_in('partition_date', rebuild_dates) }}
+    {% elif is_incremental() %}
     -- En ejecuciones incrementales, solo procesar datos nuevos
-    where cast(trip_start_timestamp as date) > (
-        select coalesce(max(date), '1900-01-01') from {{ this }}
-    )
+    where partition_date > {{ max_partition_date() }}
+    {% else %}
+    -- Build completo: filtro explícito para require_partition_filter
+    where partition_date >= date '1900-01-01'
     {% endif %}
 ),
 
@@ -30,13 +42,19 @@ transformed as (
     select
         -- Primary key and partition
         unique_key,
-        cast(trip_start_timestamp as date) as date,
+        partition_date as date,
 
         -- Timestamps
         trip_start_timestamp as trip_start_ts,
         trip_end_timestamp as trip_end_ts,
 
         -- Time extractions
+        {%- if var('taxis_silver_columns_at_ingest') %}
+        start_hour,
+        day_of_week,
+        day_type,
+        time_of_day,
+        {%- else %}
         extract(hour from trip_start_timestamp) as start_hour,
         extract(dayofweek from trip_start_timestamp) as day_of_week,
         case
@@ -50,13 +68,22 @@ transformed as (
             when extract(hour from trip_start_timestamp) between 20 and 23 then 'night'
             else 'late_night'
         end as time_of_day,
+        {%- endif %}
 
         -- Trip duration
         cast(trip_seconds as int64) as trip_seconds,
+        {%- if var('taxis_silver_columns_at_ingest') %}
+        trip_minutes,
+        {%- else %}
         round(cast(trip_seconds as float64) / 60, 2) as trip_minutes,
+        {%- endif %}
 
         -- Distance
         round(cast(trip_miles as float64), 2) as trip_miles,
+        {%- if var('taxis_silver_columns_at_ingest') %}
+        trip_km,
+        avg_speed_mph,
+        {%- else %}
         round(cast(trip_miles as float64) * 1.60934, 2) as trip_km,
 
         -- Average speed (only if trip_seconds > 0)
@@ -65,6 +92,7 @@ transformed as (
             then round((cast(trip_miles as float64) / (cast(trip_seconds as float64) / 3600)), 2)
             else null
         end as avg_speed_mph,
+        {%- endif %}
 
         -- Financial metrics
         round(cast(fare as float64), 2) as fare,
@@ -73,6 +101,10 @@ transformed as (
         round(cast(extras as float64), 2) as extras,
         round(cast(trip_total as float64), 2) as trip_total,
 
+        {%- if var('taxis_silver_columns_at_ingest') %}
+        tip_percentage,
+        cost_per_mile,
+        {%- else %}
         -- Tip percentage
         case
             when cast(fare as float64) > 0
@@ -86,6 +118,7 @@ transformed as (
             then round(cast(trip_total as float64) / cast(trip_miles as float64), 2)
             else null
         end as cost_per_mile,
+        {%- endif %}
 
         -- Categories
         coalesce(cast(payment_type as string), 'Unknown') as payment_type,
@@ -101,6 +134,9 @@ transformed as (
         cast(dropoff_longitude as float64) as dropoff_lon,
 
         -- Valid trip flag
+        {%- if var('taxis_silver_columns_at_ingest') %}
+        is_valid_trip,
+        {%- else %}
         case
             when cast(trip_seconds as int64) > 0
                  and cast(trip_miles as float64) > 0
@@ -108,6 +144,7 @@ transformed as (
             then true
             else false
         end as is_valid_trip,
+        {%- endif %}
 
         -- Metadata
         current_timestamp() as processed_at
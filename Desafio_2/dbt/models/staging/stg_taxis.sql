@@ -1,12 +1,32 @@
 -- Staging model for taxi trips data
 -- Materialización: ephemeral (CTE, no genera tabla)
+-- partition_date es la clave Hive de la external table: los modelos que
+-- filtran sobre ella solo leen los ficheros de esas particiones
 
 with source as (
+    {%- if var('taxis_partition_markers') %}
+    -- Particiones multi-fichero (PARTITION_TARGET_ROWS): si la fecha tiene
+    -- marcador solo cuentan las partes que lista; si no, su data.parquet. Los
+    -- ficheros de una escritura a medias o ya reemplazada no se leen nunca
+    select ext.* except (file_name)
+    from (
+        select *, _FILE_NAME as file_name from {{ source('raw_data', 'taxi_trips_ext') }}
+    ) as ext
+    left join {{ source('raw_data', 'taxi_partition_markers_ext') }} as markers
+        using (date)
+    where if(
+        markers.date is null,
+        ends_with(ext.file_name, '/data.parquet'),
+        exists (select 1 from unnest(markers.parts) as part where ends_with(ext.file_name, concat('/', part)))
+    )
+    {%- else %}
     select * from {{ source('raw_data', 'taxi_trips_ext') }}
+    {%- endif %}
 ),
 
 renamed as (
     select
+        date as partition_date,
         unique_key,
         taxi_id,
         trip_start_timestamp,
@@ -26,6 +46,19 @@ renamed as (
         pickup_longitude,
         dropoff_latitude,
         dropoff_longitude
+        {%- if var('taxis_silver_columns_at_ingest') %},
+        -- Columnas derivadas en la ingesta (DERIVE_SILVER_COLUMNS)
+        trip_minutes,
+        trip_km,
+        avg_speed_mph,
+        tip_percentage,
+        cost_per_mile,
+        start_hour,
+        day_of_week,
+        day_type,
+        time_of_day,
+        is_valid_trip
+        {%- endif %}
     from source
     where trip_start_timestamp is not null
 )
@@ -0,0 +1,46 @@
+-- Checks de calidad del landing sobre los perfiles que escriben ingest_taxis e
+-- ingest_weather (DQ_PROFILE), unos cientos de bytes por partición, en lugar
+-- de escanear silver_taxis y silver_weather enteras. Equivalen a los tests
+-- unique / not_null de unique_key y date: un viaje solo está en la partición
+-- de su fecha, así que sin duplicados por día no los hay en toda la tabla.
+-- Devuelve una fila por partición y check que falla (rows y nulls son palabras
+-- reservadas en BigQuery: van entre backticks). Las particiones escritas
+-- antes de activar DQ_PROFILE no tienen perfil y no se comprueban.
+
+{{
+    config(
+        enabled=var('dq_profiles'),
+        tags=['dq_profiles']
+    )
+}}
+
+with taxis as (
+    select * from {{ source('raw_data', 'taxi_dq_profiles_ext') }}
+),
+
+weather as (
+    select * from {{ source('raw_data', 'weather_dq_profiles_ext') }}
+),
+
+failures as (
+    select 'taxis' as dataset, date, 'rejected' as check_name, `rows` as failing_rows
+    from taxis where rejected
+    union all
+    select 'taxis', date, 'duplicate_unique_keys', checks.duplicate_unique_keys
+    from taxis where checks.duplicate_unique_keys > 0
+    union all
+    select 'taxis', date, 'nulls.unique_key', `nulls`.unique_key
+    from taxis where `nulls`.unique_key > 0
+    union all
+    select 'weather', date, 'rejected', `rows`
+    from weather where rejected
+    -- Un día de clima es exactamente una fila con fecha
+    union all
+    select 'weather', date, 'rows', `rows`
+    from weather where `rows` != 1
+    union all
+    select 'weather', date, 'nulls.date', `nulls`.date
+    from weather where `nulls`.date > 0
+)
+
+select * from failures
@@ -1,53 +1,67 @@
 #!/bin/bash
 # ==============================================================================
-# Script para cargar datos históricos de taxis en lotes
+# Script para cargar datos históricos de taxis con un job de backfill reanudable
 # ==============================================================================
-# Uso: ./backfill_taxis.sh
+# Uso: ./backfill_taxis.sh [START_DATE] [END_DATE] [JOB_ID]
 # 
-# Procesa datos de taxis desde 2023-06-01 hasta 2023-12-31 en lotes mensuales
-# para evitar timeouts de Cloud Functions (máx 540s)
+# Crea un job de backfill (mode=backfill) y lo reanuda (mode=resume) hasta que
+# termina. Cada invocación trabaja dentro de su presupuesto de tiempo y guarda
+# el progreso en gs://<bucket>/_backfills/taxis/<job_id>.json, así que si el
+# script se corta basta con relanzarlo con el mismo JOB_ID.
 # ==============================================================================
 
 FUNCTION_URL="https://ingest-taxis-eviwr2rngq-ew.a.run.app"
 
-# Definir rangos mensuales
-declare -a RANGES=(
-    "2023-06-01,2023-06-30"
-    "2023-07-01,2023-07-31"
-    "2023-08-01,2023-08-31"
-    "2023-09-01,2023-09-30"
-    "2023-10-01,2023-10-31"
-    "2023-11-01,2023-11-30"
-    "2023-12-01,2023-12-31"
-)
+START="${1:-2023-06-01}"
+END="${2:-2023-12-31}"
+JOB_ID="${3:-backfill_${START}_${END}}"
+MAX_INVOCATIONS=50
+
+field() {
+    echo "$1" | python3 -c "import sys, json; print(json.load(sys.stdin).get('$2', ''))" 2>/dev/null
+}
 
 echo "🚕 Iniciando backfill de datos de taxis..."
-echo "📅 Rango total: 2023-06-01 a 2023-12-31"
+echo "📅 Rango total: $START a $END (job: $JOB_ID)"
 echo "================================================"
 
-for range in "${RANGES[@]}"; do
-    IFS=',' read -r START END <<< "$range"
-    
+MODE_QUERY="mode=backfill&start_date=${START}&end_date=${END}&job_id=${JOB_ID}"
+# Fechas escritas por todas las invocaciones, para reconstruir solo esas en dbt
+DATES_WRITTEN=""
+
+for ((i = 1; i <= MAX_INVOCATIONS; i++)); do
     echo ""
-    echo "📆 Procesando: $START a $END"
+    echo "📆 Invocación $i"
     echo "⏳ Esto puede tomar varios minutos..."
-    
-    RESPONSE=$(curl -s "${FUNCTION_URL}?mode=range&start_date=${START}&end_date=${END}")
-    
+
+    RESPONSE=$(curl -s "${FUNCTION_URL}?${MODE_QUERY}")
+
     # Extraer información del response
-    STATUS=$(echo $RESPONSE | python3 -c "import sys, json; print(json.load(sys.stdin).get('status', 'unknown'))" 2>/dev/null)
-    MESSAGE=$(echo $RESPONSE | python3 -c "import sys, json; print(json.load(sys.stdin).get('message', 'No message'))" 2>/dev/null)
-    NEW_DATES=$(echo $RESPONSE | python3 -c "import sys, json; print(json.load(sys.stdin).get('new_dates_processed', 0))" 2>/dev/null)
-    
+    STATUS=$(field "$RESPONSE" status)
+    JOB_STATUS=$(field "$RESPONSE" job_status)
+
     if [ "$STATUS" == "success" ] || [ "$STATUS" == "partial_success" ]; then
-        echo "✅ $STATUS: $MESSAGE"
-        echo "   Días procesados: $NEW_DATES"
+        echo "✅ $STATUS ($JOB_STATUS)"
+        echo "   Días en esta invocación: $(field "$RESPONSE" processed_this_invocation)"
+        echo "   Días completados: $(field "$RESPONSE" completed_dates) / $(field "$RESPONSE" total_dates_in_range)"
+        echo "   Días pendientes: $(field "$RESPONSE" remaining_dates)"
+        WRITTEN=$(echo "$RESPONSE" | python3 -c "import sys, json; print(','.join(json.load(sys.stdin).get('dates_written', [])))" 2>/dev/null)
+        if [ -n "$WRITTEN" ]; then
+            DATES_WRITTEN="${DATES_WRITTEN:+${DATES_WRITTEN},}${WRITTEN}"
+        fi
     else
-        echo "❌ Error: $MESSAGE"
+        echo "❌ Error: $(field "$RESPONSE" message)"
         echo "   Response completo: $RESPONSE"
     fi
-    
-    # Pequeña pausa entre lotes
+
+    if [ "$JOB_STATUS" == "completed" ]; then
+        break
+    fi
+
+    # Las siguientes invocaciones continúan desde el checkpoint
+    MODE_QUERY="mode=resume&job_id=${JOB_ID}"
+
+    # Pequeña pausa entre invocaciones
     sleep 2
 done
 
@@ -55,5 +69,10 @@ echo ""
 echo "================================================"
 echo "🎉 Backfill completado!"
 echo ""
+if [ -n "$DATES_WRITTEN" ]; then
+    echo "Para reconstruir solo las particiones escritas:"
+    echo "  ./run_dbt_pipeline.sh --taxis-dates ${DATES_WRITTEN}"
+    echo ""
+fi
 echo "Para verificar los datos:"
 echo "  gsutil ls gs://orbidi-challenge-data-landing/taxis/ | wc -l"
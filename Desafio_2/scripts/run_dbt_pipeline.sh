@@ -3,6 +3,20 @@
 # Script: run_dbt_pipeline.sh
 # Ejecuta el pipeline completo de dbt + aplica policy tags
 # ==============================================================================
+# Uso: ./run_dbt_pipeline.sh [--taxis-dates D1,D2 | --taxis-result FILE]
+#                            [--weather-dates D1,D2 | --weather-result FILE]
+#                            [--profile-checks]
+#
+# Con las fechas que tocó la ingesta (dates_written del response JSON de
+# ingest_taxis / ingest_weather), silver_taxis y taxis_weather_enriched solo
+# reconstruyen esas particiones (vars taxis_dates / weather_dates). Sin
+# argumentos, los modelos incrementales procesan las fechas posteriores a su
+# max(date). También se leen de DBT_TAXIS_DATES / DBT_WEATHER_DATES.
+#
+# Con --profile-checks (requiere DQ_PROFILE en la ingesta y la var dbt
+# dq_profiles) el paso de tests solo ejecuta landing_profiles, que lee los
+# perfiles de calidad por partición en lugar de escanear las tablas completas.
+# ==============================================================================
 
 set -e
 
@@ -10,6 +24,41 @@ SCRIPT_DIR="$(cd "$(dirname "$0")" && pwd)"
 PROJECT_ROOT="$(dirname "$SCRIPT_DIR")"
 DBT_DIR="${PROJECT_ROOT}/dbt"
 
+TAXIS_DATES="${DBT_TAXIS_DATES-}"
+WEATHER_DATES="${DBT_WEATHER_DATES-}"
+TAXIS_SET="${DBT_TAXIS_DATES+1}"
+WEATHER_SET="${DBT_WEATHER_DATES+1}"
+PROFILE_CHECKS=""
+
+# dates_written de un response JSON de la ingesta, separado por comas
+dates_written() {
+    python3 -c "import sys, json; print(','.join(json.load(open(sys.argv[1])).get('dates_written', [])))" "$1"
+}
+
+while [ $# -gt 0 ]; do
+    case "$1" in
+        --taxis-dates) TAXIS_DATES="$2"; TAXIS_SET=1; shift 2 ;;
+        --weather-dates) WEATHER_DATES="$2"; WEATHER_SET=1; shift 2 ;;
+        --taxis-result) TAXIS_DATES="$(dates_written "$2")"; TAXIS_SET=1; shift 2 ;;
+        --weather-result) WEATHER_DATES="$(dates_written "$2")"; WEATHER_SET=1; shift 2 ;;
+        --profile-checks) PROFILE_CHECKS=1; shift ;;
+        *) echo "Argumento desconocido: $1" >&2; exit 1 ;;
+    esac
+done
+
+# Solo se pasan las vars indicadas: una var vacía significa "ninguna partición"
+DBT_VARS=""
+if [ -n "$TAXIS_SET" ]; then
+    DBT_VARS="taxis_dates: '${TAXIS_DATES}'"
+fi
+if [ -n "$WEATHER_SET" ]; then
+    DBT_VARS="${DBT_VARS:+${DBT_VARS}, }weather_dates: '${WEATHER_DATES}'"
+fi
+RUN_ARGS=()
+if [ -n "$DBT_VARS" ]; then
+    RUN_ARGS=(--vars "{${DBT_VARS}}")
+fi
+
 echo "=============================================="
 echo "dbt Pipeline - $(date)"
 echo "=============================================="
@@ -23,13 +72,22 @@ uv run dbt debug --profiles-dir . --quiet
 
 # Step 2: Ejecutar modelos (incremental)
 echo ""
-echo "[2/4] Ejecutando modelos dbt (incremental)..."
-uv run dbt run --profiles-dir .
+if [ -n "$DBT_VARS" ]; then
+    echo "[2/4] Ejecutando modelos dbt (particiones: {${DBT_VARS}})..."
+else
+    echo "[2/4] Ejecutando modelos dbt (incremental)..."
+fi
+uv run dbt run --profiles-dir . "${RUN_ARGS[@]}"
 
 # Step 3: Ejecutar tests
 echo ""
-echo "[3/4] Ejecutando tests..."
-uv run dbt test --profiles-dir .
+if [ -n "$PROFILE_CHECKS" ]; then
+    echo "[3/4] Ejecutando checks sobre los perfiles de calidad..."
+    uv run dbt test --profiles-dir . --select tag:dq_profiles
+else
+    echo "[3/4] Ejecutando tests..."
+    uv run dbt test --profiles-dir .
+fi
 
 # Step 4: Aplicar policy tags
 echo ""
@@ -0,0 +1,13 @@
+"""
+Código común de las Cloud Functions de ingesta (ingest_taxis, ingest_weather).
+
+Terraform lo empaqueta como ingest_shared/ junto al main.py de cada función, así
+que una corrección llega a las dos. Como en los main.py, las dependencias
+pesadas se importan dentro de las funciones que las usan.
+
+Módulos:
+- clients.py: registro de clientes de GCP (y HTTP) compartidos por el proceso
+- dates.py: rangos de fechas y tramos consecutivos (group_contiguous_dates)
+- instrumentation.py: métricas y logs JSON por etapa (stage_span / instrumented)
+- partitions.py: índice de particiones diarias (caché en proceso y manifest, PartitionIndex)
+"""
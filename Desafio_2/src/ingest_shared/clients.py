@@ -0,0 +1,76 @@
+"""
+Registro de clientes compartidos por el proceso.
+
+Los clientes viven a nivel de proceso, así que las instancias warm los
+reutilizan entre invocaciones y los workers concurrentes los comparten. Los
+benchmarks y tests registran fakes con set_client.
+
+Variables de entorno:
+- GCP_PROJECT: Project ID de GCP (default: orbidi-challenge)
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from typing import TYPE_CHECKING, Any, Callable
+
+if TYPE_CHECKING:
+    from google.cloud import bigquery, storage
+
+PROJECT_ID = os.environ.get("GCP_PROJECT", "orbidi-challenge")
+
+# Registro {nombre: cliente} del proceso (ver _get_client)
+_clients: dict = {}
+_clients_lock = threading.Lock()
+
+
+def _get_client(name: str, factory: Callable[[], Any]) -> Any:
+    """
+    Devuelve el cliente registrado con `name`, creándolo con `factory` la
+    primera vez. Los clientes viven a nivel de proceso, así que las instancias
+    warm los reutilizan entre invocaciones y los workers concurrentes los comparten.
+    """
+    client = _clients.get(name)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(name)
+            if client is None:
+                client = factory()
+                _clients[name] = client
+    return client
+
+
+def set_client(name: str, client: Any) -> None:
+    """
+    Registra un cliente ya construido (p.ej. un fake en benchmarks o tests).
+
+    Args:
+        name: "storage", "bigquery", "publisher" o "http"
+        client: Instancia a usar; None elimina el registro y fuerza recrearlo
+    """
+    with _clients_lock:
+        if client is None:
+            _clients.pop(name, None)
+        else:
+            _clients[name] = client
+
+
+def reset_clients() -> None:
+    """Elimina todos los clientes registrados (se recrean en el siguiente uso)."""
+    with _clients_lock:
+        _clients.clear()
+
+
+def get_storage_client() -> storage.Client:
+    """Cliente de Cloud Storage compartido del proceso."""
+    from google.cloud import storage
+
+    return _get_client("storage", lambda: storage.Client(project=PROJECT_ID))
+
+
+def get_bigquery_client() -> bigquery.Client:
+    """Cliente de BigQuery compartido del proceso (lee de US, dataset público)."""
+    from google.cloud import bigquery
+
+    return _get_client("bigquery", lambda: bigquery.Client(project=PROJECT_ID))
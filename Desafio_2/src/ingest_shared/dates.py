@@ -0,0 +1,66 @@
+"""
+Utilidades de rangos de fechas (YYYY-MM-DD) de las funciones de ingesta.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import List
+
+
+def get_date_range(start_date: str, end_date: str) -> List[str]:
+    """
+    Genera lista de fechas entre start y end.
+
+    Args:
+        start_date: Fecha inicio (YYYY-MM-DD)
+        end_date: Fecha fin (YYYY-MM-DD)
+
+    Returns:
+        Lista de fechas en formato YYYY-MM-DD
+    """
+    start = datetime.strptime(start_date, "%Y-%m-%d")
+    end = datetime.strptime(end_date, "%Y-%m-%d")
+
+    dates = []
+    current = start
+    while current <= end:
+        dates.append(current.strftime("%Y-%m-%d"))
+        current += timedelta(days=1)
+
+    return dates
+
+
+def _months_in_range(start_date: str, end_date: str) -> List[str]:
+    """Meses (YYYY-MM) que cubre un rango de fechas."""
+    months = []
+    for date in get_date_range(start_date, end_date):
+        if not months or months[-1] != date[:7]:
+            months.append(date[:7])
+    return months
+
+
+def group_contiguous_dates(dates: List[str], max_days: int) -> List[List[str]]:
+    """
+    Agrupa fechas en tramos consecutivos de como mucho max_days días.
+
+    Args:
+        dates: Fechas ordenadas (YYYY-MM-DD)
+        max_days: Máximo de días por tramo
+
+    Returns:
+        Lista de tramos, cada uno una lista de fechas consecutivas
+
+    Ejemplo:
+        ["2024-01-01", "2024-01-02", "2024-01-05"] -> [["2024-01-01", "2024-01-02"], ["2024-01-05"]]
+    """
+    runs: List[List[str]] = []
+    previous = None
+    for date in dates:
+        current = datetime.strptime(date, "%Y-%m-%d")
+        if runs and previous + timedelta(days=1) == current and len(runs[-1]) < max_days:
+            runs[-1].append(date)
+        else:
+            runs.append([date])
+        previous = current
+    return runs
@@ -0,0 +1,231 @@
+"""
+Instrumentación por etapa de las funciones de ingesta.
+
+Cada process_* decorado con instrumented(FUNCTION_NAME) abre una colección de
+métricas para la invocación; stage_span mide una etapa dentro de ella y, si
+STAGE_LOGS, la emite como log JSON en el logger "{función}.stages".
+
+Variables de entorno:
+- STAGE_LOGS: Si es "true", emite un log JSON por etapa y fecha (default: true)
+- INGEST_DEBUG_PROFILE: Si es "true", añade top-N de cProfile y tracemalloc al resultado (default: false)
+- DEBUG_PROFILE_TOP_N: Entradas del top-N de INGEST_DEBUG_PROFILE (default: 20)
+"""
+
+from __future__ import annotations
+
+import contextvars
+import functools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, List
+
+STAGE_LOGS = os.environ.get("STAGE_LOGS", "true").lower() == "true"
+INGEST_DEBUG_PROFILE = os.environ.get("INGEST_DEBUG_PROFILE", "false").lower() == "true"
+DEBUG_PROFILE_TOP_N = int(os.environ.get("DEBUG_PROFILE_TOP_N", "20"))
+
+# Métricas de la invocación en curso; los pools de threads copian el contexto
+_current_timings: contextvars.ContextVar = contextvars.ContextVar("current_timings", default=None)
+
+
+class JsonLogFormatter(logging.Formatter):
+    """Una línea JSON por registro: Cloud Logging la ingiere como jsonPayload."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        return json.dumps({
+            "severity": record.levelname,
+            "message": record.getMessage(),
+            **getattr(record, "json_fields", {}),
+        }, default=str)
+
+
+def get_stage_logger(function: str) -> logging.Logger:
+    """
+    Logger de los spans de una función: JSON a stdout, sin el prefijo del
+    handler raíz. El handler se añade una sola vez aunque el módulo se recargue.
+    """
+    stage_logger = logging.getLogger(f"{function}.stages")
+    if not any(handler.get_name() == "stage_json" for handler in stage_logger.handlers):
+        stage_logger.setLevel(logging.INFO)
+        stage_logger.propagate = False
+        handler = logging.StreamHandler(sys.stdout)
+        handler.set_name("stage_json")
+        handler.setFormatter(JsonLogFormatter())
+        stage_logger.addHandler(handler)
+    return stage_logger
+
+
+class StageTimings:
+    """
+    Métricas por etapa de una invocación: una entrada por span con wall time,
+    filas, bytes de entrada/salida y RSS pico del proceso al cerrar el span.
+    """
+
+    def __init__(self, function: str):
+        self.function = function
+        self._spans: dict = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, span: dict) -> None:
+        with self._lock:
+            self._spans.setdefault(stage, []).append(span)
+
+    def summary(self) -> dict:
+        """
+        Agrega los spans por etapa.
+
+        Returns:
+            Dict {etapa: {count, p50_ms, p95_ms, max_ms, total_ms, rows, bytes_in,
+            bytes_out, peak_rss_mb}}
+        """
+        with self._lock:
+            spans = {stage: list(items) for stage, items in self._spans.items()}
+
+        summary = {}
+        for stage, items in spans.items():
+            durations = sorted(s["seconds"] for s in items)
+            summary[stage] = {
+                "count": len(items),
+                "p50_ms": round(_percentile(durations, 0.50) * 1000, 2),
+                "p95_ms": round(_percentile(durations, 0.95) * 1000, 2),
+                "max_ms": round(durations[-1] * 1000, 2),
+                "total_ms": round(sum(durations) * 1000, 2),
+                "rows": sum(s.get("rows") or 0 for s in items),
+                "bytes_in": sum(s.get("bytes_in") or 0 for s in items),
+                "bytes_out": sum(s.get("bytes_out") or 0 for s in items),
+                "peak_rss_mb": max(s["peak_rss_mb"] for s in items),
+            }
+        return summary
+
+
+def _percentile(ordered: List[float], q: float) -> float:
+    """Percentil por rango más cercano sobre una lista ya ordenada."""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, round(q * len(ordered)) - 1))]
+
+
+def _peak_rss_mb() -> float:
+    import resource
+
+    # ru_maxrss está en KB en Linux (runtime de Cloud Functions)
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+@contextmanager
+def stage_span(stage: str, date: str | None = None, **fields):
+    """
+    Mide una etapa de la ingesta. Fuera de una invocación instrumentada no hace nada.
+
+    El bloque puede completar el span (rows, bytes_in, bytes_out) sobre el dict
+    que devuelve el context manager. Al cerrarse se registra en la invocación
+    actual y, si STAGE_LOGS, se emite como log JSON estructurado.
+
+    Args:
+        stage: Nombre de la etapa (p.ej. bigquery_query, parquet_encode, upload)
+        date: Fecha o rango al que pertenece el span
+        **fields: Campos iniciales del span (rows, bytes_in, bytes_out)
+    """
+    timings = _current_timings.get()
+    span = dict(fields)
+    if timings is None:
+        yield span
+        return
+
+    start = time.perf_counter()
+    try:
+        yield span
+    finally:
+        span["seconds"] = time.perf_counter() - start
+        span["peak_rss_mb"] = _peak_rss_mb()
+        timings.record(stage, span)
+        if STAGE_LOGS:
+            get_stage_logger(timings.function).info(f"stage {stage} {date or ''}".strip(), extra={"json_fields": {
+                "event": "stage",
+                "function": timings.function,
+                "stage": stage,
+                "date": date,
+                **{k: round(v, 4) if isinstance(v, float) else v for k, v in span.items()},
+            }})
+
+
+def _start_debug_profile() -> Any:
+    import cProfile
+    import tracemalloc
+
+    tracemalloc.start()
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+
+def _stop_debug_profile(profiler: Any, function: str) -> dict:
+    """
+    Para cProfile y tracemalloc y devuelve su top-N.
+
+    cProfile solo ve el thread que atiende la invocación (no los pools de
+    fetch/write); tracemalloc sí cubre las reservas de todos los threads.
+    """
+    import io as _io
+    import pstats
+    import tracemalloc
+
+    profiler.disable()
+    stream = _io.StringIO()
+    pstats.Stats(profiler, stream=stream).sort_stats("cumulative").print_stats(DEBUG_PROFILE_TOP_N)
+
+    snapshot = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    report = {
+        "cprofile_top": [line for line in stream.getvalue().splitlines() if line.strip()],
+        "tracemalloc_peak_mb": round(peak / 1024**2, 1),
+        "tracemalloc_top": [
+            {"location": str(stat.traceback), "size_kb": round(stat.size / 1024, 1), "count": stat.count}
+            for stat in snapshot.statistics("lineno")[:DEBUG_PROFILE_TOP_N]
+        ],
+    }
+    logging.getLogger(function).info(f"Debug profile: {json.dumps(report)}")
+    return report
+
+
+def instrumented(function: str) -> Callable[[Callable[..., dict]], Callable[..., dict]]:
+    """
+    Decorador de los process_* de una función: abre una colección de métricas
+    para la invocación y añade result["timings"] con el resumen por etapa.
+
+    Acepta el kwarg debug_profile (o INGEST_DEBUG_PROFILE) para añadir además
+    result["debug_profile"] con el top-N de cProfile y tracemalloc. Las llamadas
+    anidadas se contabilizan en la invocación exterior.
+
+    Args:
+        function: Nombre de la función en los logs de etapa (FUNCTION_NAME)
+    """
+    def decorator(fn: Callable[..., dict]) -> Callable[..., dict]:
+        @functools.wraps(fn)
+        def wrapper(*args, debug_profile: bool = False, **kwargs):
+            if _current_timings.get() is not None:
+                return fn(*args, **kwargs)
+
+            timings = StageTimings(function)
+            token = _current_timings.set(timings)
+            profiler = _start_debug_profile() if debug_profile or INGEST_DEBUG_PROFILE else None
+            try:
+                result = fn(*args, **kwargs)
+            finally:
+                _current_timings.reset(token)
+                report = _stop_debug_profile(profiler, function) if profiler else None
+
+            result["timings"] = timings.summary()
+            if report:
+                result["debug_profile"] = report
+            return result
+
+        return wrapper
+
+    return decorator
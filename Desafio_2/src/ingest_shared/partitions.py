@@ -0,0 +1,236 @@
+"""
+Índice de particiones diarias {base}/date=YYYY-MM-DD en GCS.
+
+Evita listar el bucket entero en cada invocación: caché en proceso por mes con
+TTL (compartida entre invocaciones de una instancia warm), blob.exists() para
+una sola fecha y, opcionalmente, un manifest con todas las fechas escritas.
+
+Variables de entorno:
+- PARTITION_CACHE_TTL: Segundos de vida de la caché de particiones en instancias warm (default: 300)
+- PARTITION_MANIFEST: Si es "true", mantiene _manifests/{base}.json con las fechas escritas (default: false)
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, List, Set
+
+from ingest_shared.clients import get_storage_client
+from ingest_shared.dates import _months_in_range
+
+logger = logging.getLogger(__name__)
+
+PARTITION_CACHE_TTL = int(os.environ.get("PARTITION_CACHE_TTL", "300"))
+PARTITION_MANIFEST = os.environ.get("PARTITION_MANIFEST", "false").lower() == "true"
+# Reintentos de las escrituras condicionales a la generación (manifest, contador de bytes)
+MANIFEST_MAX_RETRIES = 5
+
+
+def _dates_from_blobs(blobs) -> Set[str]:
+    """Extrae las fechas de los paths Hive de una lista de blobs."""
+    dates = set()
+    for blob in blobs:
+        # Extraer fecha del path: {base}/date=2024-01-01/data.parquet
+        for part in blob.name.split("/"):
+            if part.startswith("date="):
+                dates.add(part.replace("date=", ""))
+                break
+    return dates
+
+
+class PartitionIndex:
+    """
+    Índice de las particiones diarias de un dataset del landing.
+
+    Por defecto una partición es {base}/date=YYYY-MM-DD/data.parquet; una
+    función con otro layout pasa cómo listar sus fechas completas (list_dates)
+    y qué blobs comprobar para una fecha (exists_paths).
+    """
+
+    def __init__(
+        self,
+        base_path: str,
+        list_dates: Callable[[Any, str], Set[str]] | None = None,
+        exists_paths: Callable[[str], List[str]] | None = None,
+        label: str = "",
+    ):
+        """
+        Args:
+            base_path: Prefijo de los datos en el bucket (p.ej. "taxis")
+            list_dates: (bucket, sufijo) -> fechas completas bajo {base}/date={sufijo}
+            exists_paths: fecha -> blobs cuya existencia marca la partición
+            label: Nombre del dataset en los logs ("taxi" -> "existing taxi dates")
+        """
+        self.base_path = base_path
+        # Fuera del prefijo de datos para que las external tables no lo lean como Parquet
+        self.manifest_path = f"_manifests/{base_path}.json"
+        self.label = label
+        self._list_dates = list_dates or self._list_data_files
+        self._exists_paths = exists_paths or (lambda date: [f"{base_path}/date={date}/data.parquet"])
+        # Caché {(bucket, YYYY-MM): (expira, fechas)} compartida entre invocaciones de una instancia
+        self._cache: dict = {}
+        self._cache_lock = threading.Lock()
+        self._manifest_lock = threading.Lock()
+
+    def _list_data_files(self, bucket, suffix: str) -> Set[str]:
+        return _dates_from_blobs(bucket.list_blobs(prefix=f"{self.base_path}/date={suffix}"))
+
+    def _cache_get(self, bucket_name: str, month: str) -> Set[str] | None:
+        """Devuelve las fechas cacheadas de un mes si la entrada no ha expirado."""
+        with self._cache_lock:
+            entry = self._cache.get((bucket_name, month))
+            if entry and entry[0] > time.monotonic():
+                return set(entry[1])
+        return None
+
+    def _cache_put(self, bucket_name: str, month: str, dates: Set[str]) -> None:
+        with self._cache_lock:
+            self._cache[(bucket_name, month)] = (time.monotonic() + PARTITION_CACHE_TTL, set(dates))
+
+    def read_manifest(self, bucket_name: str) -> Set[str] | None:
+        """
+        Lee el manifest de particiones del bucket.
+
+        Returns:
+            Set de fechas, o None si el manifest no existe
+        """
+        from google.api_core import exceptions as gcs_exceptions
+
+        client = get_storage_client()
+        blob = client.bucket(bucket_name).blob(self.manifest_path)
+        try:
+            return set(json.loads(blob.download_as_bytes())["dates"])
+        except gcs_exceptions.NotFound:
+            return None
+
+    def _write_manifest(self, bucket_name: str, add: Set[str], seed: Set[str] | None = None) -> None:
+        """
+        Añade fechas al manifest con un read-modify-write condicionado a la
+        generación leída (if_generation_match), reintentando si otra instancia
+        lo modificó entre medias.
+
+        Si el manifest no existe se siembra con el listado completo del bucket
+        (o con `seed` si el llamante ya lo tiene), así que activar
+        PARTITION_MANIFEST sobre un bucket con particiones no las pierde.
+        """
+        from google.api_core import exceptions as gcs_exceptions
+
+        client = get_storage_client()
+        bucket = client.bucket(bucket_name)
+
+        with self._manifest_lock:
+            for _ in range(MANIFEST_MAX_RETRIES):
+                blob = bucket.blob(self.manifest_path)
+                try:
+                    dates = set(json.loads(blob.download_as_bytes())["dates"])
+                    generation = blob.generation
+                except gcs_exceptions.NotFound:
+                    dates = set(seed) if seed is not None else self._list_dates(bucket, "")
+                    generation = 0
+
+                if add <= dates and generation:
+                    return
+
+                payload = {
+                    "dates": sorted(dates | add),
+                    "updated_at": datetime.utcnow().isoformat(),
+                }
+                try:
+                    blob.upload_from_string(
+                        json.dumps(payload),
+                        content_type="application/json",
+                        if_generation_match=generation,
+                    )
+                    return
+                except gcs_exceptions.PreconditionFailed:
+                    continue
+
+        logger.warning(f"Could not update partition manifest after {MANIFEST_MAX_RETRIES} attempts")
+
+    def partition_exists(self, bucket_name: str, date: str) -> bool:
+        """
+        Comprueba si existe la partición de una fecha con blob.exists() sobre
+        sus exists_paths (en orden), sin listar el bucket. Usa la caché en
+        proceso si el mes está cacheado.
+
+        Args:
+            bucket_name: Nombre del bucket GCS
+            date: Fecha (YYYY-MM-DD)
+
+        Returns:
+            True si la partición existe
+        """
+        cached = self._cache_get(bucket_name, date[:7])
+        if cached is not None:
+            return date in cached
+
+        client = get_storage_client()
+        bucket = client.bucket(bucket_name)
+        return any(bucket.blob(path).exists() for path in self._exists_paths(date))
+
+    def register_partition(self, bucket_name: str, date: str) -> None:
+        """
+        Registra una partición recién escrita en la caché y, si está activo, en el manifest.
+
+        Args:
+            bucket_name: Nombre del bucket GCS
+            date: Fecha de la partición (YYYY-MM-DD)
+        """
+        with self._cache_lock:
+            entry = self._cache.get((bucket_name, date[:7]))
+            if entry:
+                entry[1].add(date)
+
+        if PARTITION_MANIFEST:
+            self._write_manifest(bucket_name, {date})
+
+    def get_existing_dates(
+        self, bucket_name: str, start_date: str | None = None, end_date: str | None = None
+    ) -> Set[str]:
+        """
+        Obtiene las fechas que ya existen en GCS (particiones existentes).
+
+        Con rango, solo lista los prefijos de los meses afectados ({base}/date=YYYY-MM)
+        y devuelve las fechas dentro del rango. Orden de resolución: manifest (si
+        PARTITION_MANIFEST), caché en proceso por mes, listado acotado por prefijo.
+
+        Args:
+            bucket_name: Nombre del bucket GCS
+            start_date: Fecha inicio opcional (YYYY-MM-DD)
+            end_date: Fecha fin opcional (YYYY-MM-DD)
+
+        Returns:
+            Set de fechas en formato YYYY-MM-DD
+        """
+        client = get_storage_client()
+        bucket = client.bucket(bucket_name)
+        bounded = start_date is not None and end_date is not None
+
+        existing_dates = self.read_manifest(bucket_name) if PARTITION_MANIFEST else None
+        if existing_dates is None and PARTITION_MANIFEST:
+            # Primera ejecución con manifest: sembrarlo con el listado completo (también con rango)
+            existing_dates = self._list_dates(bucket, "")
+            self._write_manifest(bucket_name, set(), seed=existing_dates)
+
+        if existing_dates is not None:
+            if bounded:
+                existing_dates = {d for d in existing_dates if start_date <= d <= end_date}
+        elif not bounded:
+            existing_dates = self._list_dates(bucket, "")
+        else:
+            existing_dates = set()
+            for month in _months_in_range(start_date, end_date):
+                month_dates = self._cache_get(bucket_name, month)
+                if month_dates is None:
+                    month_dates = self._list_dates(bucket, month)
+                    self._cache_put(bucket_name, month, month_dates)
+                existing_dates |= {d for d in month_dates if start_date <= d <= end_date}
+
+        label = f"{self.label} " if self.label else ""
+        logger.info(f"Found {len(existing_dates)} existing {label}dates in GCS")
+        return existing_dates
@@ -11,70 +11,188 @@ Variables de entorno:
 - GCP_PROJECT: Project ID de GCP (default: orbidi-challenge)
 - GCS_BUCKET: Bucket de GCS para datos landing (default: orbidi-challenge-data-landing)
 - OFFSET_DAYS: Días de offset para modo daily_offset (default: 364)
+- INGEST_MAX_WORKERS: Workers concurrentes por etapa en modo range (default: 4)
+- INGEST_MAX_IN_FLIGHT: Máximo de DataFrames en memoria a la vez en modo range (default: 8)
+- EXTRACT_MODE: "per_date" (una query por día) o "range" (una query por tramo) (default: per_date)
+- EXTRACT_MAX_DAYS: Máximo de días por query en EXTRACT_MODE=range (default: 31)
+- WRITE_PATH: "pandas" o "arrow" (streaming sin DataFrame, solo per_date) (default: pandas)
+- ARROW_ROW_GROUP_ROWS: Filas por row group en WRITE_PATH=arrow (default: 100000)
+- PARQUET_PROFILE: Perfil de escritura Parquet: default, zstd o compact (default: default)
+- PARQUET_COMPRESSION, PARQUET_COMPRESSION_LEVEL, PARQUET_ROW_GROUP_ROWS,
+  PARQUET_DICTIONARY_COLUMNS, PARQUET_SORT_BY: Sobrescriben campos del perfil
+- TAXI_MONEY_TYPE: Tipo de fare, tips, tolls, extras y trip_total en el landing:
+  float64, float32 o decimal (decimal(12, 2), NUMERIC en BigQuery) (default: float64)
+- DERIVE_SILVER_COLUMNS: Si es "true", añade al landing las columnas derivadas de
+  silver_taxis (SILVER_DERIVED_COLUMNS) calculadas con pyarrow.compute (default: false)
+- DAILY_AGG: Si es "true", escribe junto a cada partición el cubo diario pre-agregado
+  taxis_agg/date=YYYY-MM-DD/data.parquet que lee trips_weather_summary_agg (default: false)
+- DQ_PROFILE: Si es "true", escribe el perfil de calidad de cada día (nulos, min/max y
+  checks) en _profiles/taxis/date=YYYY-MM-DD/profile.json (default: false)
+- DQ_THRESHOLDS: Fracción máxima de filas por check que admite un día, p. ej.
+  "duplicate_unique_keys=0,negative_fare=0.01,nulls.unique_key=0"; un día que la
+  supera no se escribe y queda en errors (default: vacío, no rechaza ninguno)
+- SOURCE_FINGERPRINT: Si es "true", guarda con cada partición la huella de origen del día
+  que compara mode=refresh; sin ella refresh reporta la partición como unfingerprinted.
+  Las re-ingestas de mode=refresh la guardan siempre (default: false)
+- PARTITION_TARGET_ROWS: Filas máximas por fichero; si es > 0 la partición se escribe
+  como part-<escritura>-00000.parquet, part-<escritura>-00001.parquet... y su marcador
+  _complete/taxis/date=YYYY-MM-DD/parts.json lista los ficheros vigentes
+  (default: 0, un único data.parquet)
+- PARTITION_TARGET_MB: Tamaño objetivo por fichero en MB, con la misma rotación (default: 0)
+- PARTITION_CACHE_TTL: Segundos de vida de la caché de particiones en instancias warm (default: 300)
+- PARTITION_MANIFEST: Si es "true", mantiene _manifests/taxis.json con las fechas escritas (default: false)
+- STAGE_LOGS: Si es "true", emite un log JSON por etapa y fecha (default: true)
+- INGEST_DEBUG_PROFILE: Si es "true", añade top-N de cProfile y tracemalloc al resultado (default: false)
+- DEBUG_PROFILE_TOP_N: Entradas del top-N de INGEST_DEBUG_PROFILE (default: 20)
+- FUNCTION_TIMEOUT_SECONDS: timeout_seconds de la función desplegada (default: 540)
+- BACKFILL_TIME_BUDGET: Segundos de trabajo por invocación en modo backfill (default: 480)
+- BACKFILL_SAFETY_MARGIN: Segundos reservados antes del timeout en modo backfill (default: 60)
+- BACKFILL_BATCH_DAYS: Fechas por lote entre checkpoints en modo backfill (default: 8)
+- TAXIS_WORK_TOPIC: Topic de Pub/Sub donde el modo fanout publica los chunks (default: ingest-taxis-work)
+- FANOUT_CHUNK_DAYS: Máximo de fechas consecutivas por chunk en modo fanout (default: 14)
+- FANOUT_MAX_ATTEMPTS: Intentos por chunk antes de darlo por fallido en modo fanout (default: 3)
+- EXTRACT_CACHE_DIR: Directorio local donde guardar el extract crudo de cada día como Arrow IPC
+  para mode=rewrite (default: vacío, sin caché). Pensado para ejecuciones locales: en Cloud
+  Functions /tmp ocupa memoria de la instancia y no sobrevive a ella
+- EXTRACT_CACHE_MAX_MB: Presupuesto de disco de la caché de extracts; se borran primero los días
+  usados hace más tiempo según el índice taxis/_access.json de la caché (default: 10240)
+- REWRITE_MAX_WORKERS: Threads por etapa en mode=rewrite (default: núcleos de la máquina)
+- QUERY_BYTE_BUDGET_GB: Bytes procesados máximos por las queries de extracción de una invocación,
+  en GB de 1024^3 como set_bigquery_quotas.sh (default: 0, sin límite)
+- QUERY_DAILY_BYTE_BUDGET_GB: Bytes procesados máximos por día de cuota (medianoche del Pacífico,
+  como la cuota de BigQuery), acumulados entre invocaciones en _budgets/taxis/{día}.json
+  (default: 0, sin límite)
+- EXTRACT_DRY_RUN: Si es "true", estima con dry run los bytes de cada query aunque no haya
+  presupuesto (default: false; con presupuesto siempre se estiman)
 
 Modos de operación:
 - daily_offset: Calcula la fecha a procesar basándose en la fecha actual menos OFFSET_DAYS
   Ejemplo: Si hoy es 2025-12-30 y OFFSET_DAYS=364, procesa 2024-01-01
 - range: Procesa un rango de fechas
+- backfill: Crea (o reanuda) un job de backfill con checkpoint en GCS y trabaja
+  hasta agotar su presupuesto de tiempo
+- resume: Reanuda un job de backfill existente a partir de su job_id
+- fanout: Reparte las fechas pendientes en chunks y publica un mensaje mode=range
+  por chunk en TAXIS_WORK_TOPIC; cada chunk lo procesa una instancia del worker
+  (ingest_taxis_pubsub), que guarda su resultado en _fanout/taxis/{job_id}/chunks/
+- fanout_status: Agrega los resultados de un job de fan-out y reintenta los chunks fallidos
+- refresh: Compara la huella de cada día en el origen (una query agregada) con la
+  guardada en la metadata de su partición (SOURCE_FINGERPRINT) y re-ingesta solo los
+  días que cambiaron
+- rewrite: Reescribe las particiones del rango desde la caché de extracts (EXTRACT_CACHE_DIR)
+  sin lanzar queries, p. ej. tras cambiar el perfil Parquet, TAXI_MONEY_TYPE o
+  DERIVE_SILVER_COLUMNS. Ejemplo local:
+  EXTRACT_CACHE_DIR=.extract_cache uv run functions-framework --target ingest_taxis
 
 Lógica incremental:
 - Verifica si la partición ya existe en GCS antes de procesar
 - Si existe, omite el procesamiento (idempotente)
 - Opción force=true para reprocesar
+- mode=refresh para recoger filas tardías o corregidas sin reprocesar todo el rango
+- Con presupuesto de bytes, las fechas que no caben se aplazan (deferred_dates en
+  byte_budget) y siguen pendientes para la siguiente ejecución
+- Los modos que escriben (y fanout_status) devuelven dates_written, las fechas escritas:
+  run_dbt_pipeline.sh --taxis-result las pasa a dbt (var taxis_dates) para
+  reconstruir solo esas particiones de silver_taxis y taxis_weather_enriched
 """
 
+from __future__ import annotations
+
+import contextvars
+import functools
 import os
 import json
 import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import List, Set
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator, List, Set, Tuple
 
 import functions_framework
-from google.cloud import storage, bigquery
-import pandas as pd
-import pyarrow as pa
-import pyarrow.parquet as pq
 import io
 
+from ingest_shared.clients import get_bigquery_client, get_storage_client
+# Los tests y benchmarks registran fakes con set_client sobre el módulo de la función
+from ingest_shared.clients import reset_clients, set_client  # noqa: F401
+from ingest_shared.dates import _months_in_range, get_date_range, group_contiguous_dates
+from ingest_shared.instrumentation import instrumented, stage_span
+from ingest_shared.partitions import _dates_from_blobs
+from taxis_budget import merge_budget_reports, plan_extract_budget, settle_extract_budget
+from taxis_common import FUNCTION_NAME, GCS_BUCKET, INGEST_MAX_WORKERS, _add_bytes_written, _stats_lock
+from taxis_cube import aggregate_daily_cube, combine_daily_cube, daily_cube_tables, write_daily_cube
+from taxis_fanout import fanout_status, record_fanout_chunk, start_fanout
+from taxis_parquet import _parquet_writer_options, _sort_for_profile, get_parquet_profile
+from taxis_partitions import (
+    COMPLETE_PREFIX, PARQUET_BASE_PATH, _commit_partition_parts, _finish_multipart_write, _multipart_enabled,
+    _remove_stale_parts, _write_partition_parts, get_existing_dates, partition_blob_path, partition_exists,
+    register_partition,
+)
+from taxis_quality import _check_streamed_profile, check_profile, dq_enabled, dq_profile_tables, profile_taxi_table
+from taxis_schema import (
+    PUBLIC_TAXI_TABLE, TAXI_COLUMNS, _extract_query_sql, _taxi_pandas_type, conform_taxi_table, extract_where_clause,
+    taxi_arrow_schema,
+)
+from taxis_silver import derive_silver_columns
+
+# Dependencias pesadas (pandas, pyarrow, google-cloud-*) se importan dentro de
+# las funciones que las usan: una invocación que solo comprueba que la fecha ya
+# existe no paga su coste de import en el cold start.
+if TYPE_CHECKING:
+    import pandas as pd
+    import pyarrow as pa
+    from google.cloud import bigquery
+
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Configuracion desde variables de entorno
-PROJECT_ID = os.environ.get("GCP_PROJECT", "orbidi-challenge")
-GCS_BUCKET = os.environ.get("GCS_BUCKET", "orbidi-challenge-data-landing")
+
+# Configuracion desde variables de entorno (GCP_PROJECT la lee ingest_shared.clients;
+# GCS_BUCKET e INGEST_MAX_WORKERS, taxis_common)
 
 # Offset para modo daily_offset (2025-12-29 - 730 = 2023-12-29)
 OFFSET_DAYS = int(os.environ.get("OFFSET_DAYS", "730"))
 
-# Dataset público de taxis de Chicago
-PUBLIC_TAXI_TABLE = "bigquery-public-data.chicago_taxi_trips.taxi_trips"
-
-# Ruta base para Parquet en GCS (Hive-style partitioning)
-PARQUET_BASE_PATH = "taxis"
-
-# Columnas a extraer del dataset público
-TAXI_COLUMNS = [
-    "unique_key",
-    "taxi_id", 
-    "trip_start_timestamp",
-    "trip_end_timestamp",
-    "trip_seconds",
-    "trip_miles",
-    "pickup_community_area",
-    "dropoff_community_area",
-    "fare",
-    "tips",
-    "tolls",
-    "extras",
-    "trip_total",
-    "payment_type",
-    "company",
-    "pickup_latitude",
-    "pickup_longitude",
-    "dropoff_latitude",
-    "dropoff_longitude"
-]
+# Concurrencia para modo range: DataFrames en vuelo
+INGEST_MAX_IN_FLIGHT = int(os.environ.get("INGEST_MAX_IN_FLIGHT", "8"))
+
+# Modo de extracción para range: "per_date" (una query por día) o "range" (una query por tramo)
+EXTRACT_MODE = os.environ.get("EXTRACT_MODE", "per_date")
+EXTRACT_MAX_DAYS = int(os.environ.get("EXTRACT_MAX_DAYS", "31"))
+
+# Ruta de escritura: "pandas" (to_dataframe + write_table) o "arrow" (record batches en streaming)
+WRITE_PATH = os.environ.get("WRITE_PATH", "pandas")
+ARROW_ROW_GROUP_ROWS = int(os.environ.get("ARROW_ROW_GROUP_ROWS", "100000"))
+
+# Columnas derivadas de silver_taxis calculadas en la ingesta (ver derive_silver_columns)
+DERIVE_SILVER_COLUMNS = os.environ.get("DERIVE_SILVER_COLUMNS", "false").lower() == "true"
+
+# Cubo diario pre-agregado junto a cada partición (ver aggregate_daily_cube)
+DAILY_AGG = os.environ.get("DAILY_AGG", "false").lower() == "true"
+
+# Huella de origen como metadata de cada partición escrita (ver table_fingerprint)
+SOURCE_FINGERPRINT = os.environ.get("SOURCE_FINGERPRINT", "false").lower() == "true"
+
+# Caché local de extractos crudos (Arrow IPC por día) para mode=rewrite
+EXTRACT_CACHE_DIR = os.environ.get("EXTRACT_CACHE_DIR", "")
+EXTRACT_CACHE_MAX_MB = float(os.environ.get("EXTRACT_CACHE_MAX_MB", "10240"))
+REWRITE_MAX_WORKERS = int(os.environ.get("REWRITE_MAX_WORKERS", "0")) or os.cpu_count() or 1
+_extract_cache_lock = threading.Lock()
+
+# Backfill reanudable: presupuesto por invocación por debajo del timeout de la función
+FUNCTION_TIMEOUT_SECONDS = int(os.environ.get("FUNCTION_TIMEOUT_SECONDS", "540"))
+BACKFILL_TIME_BUDGET = int(os.environ.get("BACKFILL_TIME_BUDGET", "480"))
+BACKFILL_SAFETY_MARGIN = int(os.environ.get("BACKFILL_SAFETY_MARGIN", "60"))
+BACKFILL_BATCH_DAYS = int(os.environ.get("BACKFILL_BATCH_DAYS", "8"))
+
+# True mientras mode=refresh re-ingesta: sus escrituras guardan siempre la huella
+_refresh_writes: contextvars.ContextVar = contextvars.ContextVar("refresh_writes", default=False)
+
+# Prefijos en GCS junto a las particiones de PARQUET_BASE_PATH (ver taxis_partitions).
+# Checkpoints de backfill: _backfills/taxis/{job_id}.json
+BACKFILL_PREFIX = f"_backfills/{PARQUET_BASE_PATH}"
 
 
 def calculate_offset_date(offset_days: int | None = None) -> str:
@@ -96,142 +214,980 @@ def calculate_offset_date(offset_days: int | None = None) -> str:
     return target_date.strftime("%Y-%m-%d")
 
 
-def get_existing_dates(bucket_name: str) -> Set[str]:
+def parse_max_workers(value: Any) -> int | None:
     """
-    Obtiene las fechas que ya existen en GCS (particiones existentes).
+    Parámetro max_workers de un request HTTP o de un mensaje de Pub/Sub, que
+    puede llegar como número o como string JSON ("8").
 
     Args:
-        bucket_name: Nombre del bucket GCS
+        value: Valor recibido (None o "" si no se indicó)
 
     Returns:
-        Set de fechas en formato YYYY-MM-DD
+        Threads por etapa, o None para usar el default
+
+    Raises:
+        ValueError: Si no es un entero positivo
     """
-    client = storage.Client(project=PROJECT_ID)
-    bucket = client.bucket(bucket_name)
+    if value is None or value == "":
+        return None
+    try:
+        workers = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"max_workers must be a positive integer, got {value!r}") from None
+    if workers < 1 or (isinstance(value, float) and value != workers):
+        raise ValueError(f"max_workers must be a positive integer, got {value!r}")
+    return workers
 
-    existing_dates = set()
-    prefix = f"{PARQUET_BASE_PATH}/date="
 
-    blobs = bucket.list_blobs(prefix=prefix)
-    for blob in blobs:
-        # Extraer fecha del path: taxis/date=2024-01-01/data.parquet
-        try:
-            parts = blob.name.split("/")
-            for part in parts:
-                if part.startswith("date="):
-                    date_str = part.replace("date=", "")
-                    existing_dates.add(date_str)
-                    break
-        except Exception:
-            continue
+# Índice de particiones (PARTITION_CACHE_TTL y PARTITION_MANIFEST los lee ingest_shared.partitions).
+# Las particiones multi-fichero solo cuentan si tienen marcador (ver _complete_dates)
 
-    logger.info(f"Found {len(existing_dates)} existing taxi dates in GCS")
-    return existing_dates
+
+def extract_cache_path(date: str) -> str:
+    """Path del extract crudo de un día: {EXTRACT_CACHE_DIR}/taxis/date=YYYY-MM-DD.arrow"""
+    return os.path.join(EXTRACT_CACHE_DIR, PARQUET_BASE_PATH, f"date={date}.arrow")
+
+
+def _extract_access_path() -> str:
+    """Índice de último uso de la caché de extracts: {EXTRACT_CACHE_DIR}/taxis/_access.json"""
+    return os.path.join(EXTRACT_CACHE_DIR, PARQUET_BASE_PATH, "_access.json")
+
+
+def _read_extract_access() -> dict:
+    """Índice {"clock": último valor, "used": {fichero: valor de su último uso}}."""
+    try:
+        with open(_extract_access_path(), "rb") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {"clock": 0, "used": {}}
 
 
-def get_date_range(start_date: str, end_date: str) -> List[str]:
+def _write_extract_access(index: dict) -> None:
+    path = _extract_access_path()
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(index, f)
+    os.replace(tmp_path, path)
+
+
+def _touch_extract_cache(date: str) -> None:
+    """
+    Marca el uso del extract de un día con el siguiente valor de un contador
+    monótono. El mtime no sirve para el LRU: su resolución depende del sistema
+    de ficheros y dos usos seguidos pueden empatar o quedar en otro orden.
+    """
+    try:
+        with _extract_cache_lock:
+            index = _read_extract_access()
+            index["clock"] += 1
+            index["used"][os.path.basename(extract_cache_path(date))] = index["clock"]
+            _write_extract_access(index)
+    except OSError as e:
+        logger.warning(f"Extract cache access index update failed for {date}: {str(e)}")
+
+
+def cache_extract_tables(tables: Iterable[pa.Table], date: str) -> Iterable[pa.Table]:
     """
-    Genera lista de fechas entre start y end.
+    Devuelve las mismas tablas y, según se consumen, las guarda en el Arrow IPC
+    del día (sin compresión, para poder reabrirlo con memory mapping).
+
+    El fichero se escribe aparte y solo se mueve a su sitio al consumir la
+    última tabla: un extract a medias nunca queda en la caché. Un fallo al
+    escribir la caché se registra y no interrumpe la ingesta.
 
     Args:
-        start_date: Fecha inicio (YYYY-MM-DD)
-        end_date: Fecha fin (YYYY-MM-DD)
+        tables: Tablas crudas del extract (TAXI_COLUMNS con los tipos de BigQuery)
+        date: Fecha del extract (YYYY-MM-DD)
 
-    Returns:
-        Lista de fechas en formato YYYY-MM-DD
+    Yields:
+        Las tablas de entrada, sin modificar
     """
-    start = datetime.strptime(start_date, "%Y-%m-%d")
-    end = datetime.strptime(end_date, "%Y-%m-%d")
+    import pyarrow as pa
+
+    if not EXTRACT_CACHE_DIR:
+        yield from tables
+        return
 
-    dates = []
-    current = start
-    while current <= end:
-        dates.append(current.strftime("%Y-%m-%d"))
-        current += timedelta(days=1)
+    path = extract_cache_path(date)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    writer = None
+    failed = False
+    try:
+        for table in tables:
+            if not failed:
+                try:
+                    if writer is None:
+                        os.makedirs(os.path.dirname(path), exist_ok=True)
+                        writer = pa.ipc.new_file(tmp_path, table.schema)
+                    writer.write_table(table)
+                except Exception as e:
+                    logger.warning(f"Extract cache write failed for {date}: {str(e)}")
+                    failed = True
+            yield table
+
+        if writer is not None and not failed:
+            writer.close()
+            writer = None
+            os.replace(tmp_path, path)
+            _touch_extract_cache(date)
+            prune_extract_cache()
+    finally:
+        if writer is not None:
+            writer.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def cache_extract_day(table: pa.Table, date: str) -> None:
+    """
+    Guarda en la caché el extract completo de una fecha.
+
+    Args:
+        table: Resultado crudo de la query del día
+        date: Fecha del extract (YYYY-MM-DD)
+    """
+    with stage_span("extract_cache", date, rows=table.num_rows, bytes_in=table.nbytes):
+        for _ in cache_extract_tables([table], date):
+            pass
+
+
+def read_extract_cache(date: str) -> pa.Table | None:
+    """
+    Abre el extract cacheado de un día con memory mapping: las columnas
+    apuntan al fichero mapeado, sin copiarlo a memoria.
+
+    Args:
+        date: Fecha (YYYY-MM-DD)
 
+    Returns:
+        Tabla cruda del día, o None si no está en la caché o le faltan columnas
+    """
+    import pyarrow as pa
+
+    path = extract_cache_path(date)
+    try:
+        table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+    except FileNotFoundError:
+        return None
+
+    # La poda borra antes los días usados hace más tiempo
+    _touch_extract_cache(date)
+    if set(TAXI_COLUMNS) - set(table.column_names):
+        logger.warning(f"Cached extract for {date} lacks columns - ignoring it")
+        return None
+    return table
+
+
+def cached_extract_dates(start_date: str, end_date: str) -> Set[str]:
+    """Fechas del rango con extract en la caché."""
+    directory = os.path.join(EXTRACT_CACHE_DIR, PARQUET_BASE_PATH)
+    if not EXTRACT_CACHE_DIR or not os.path.isdir(directory):
+        return set()
+
+    dates = set()
+    for name in os.listdir(directory):
+        if name.startswith("date=") and name.endswith(".arrow"):
+            date = name[len("date="):-len(".arrow")]
+            if start_date <= date <= end_date:
+                dates.add(date)
     return dates
 
 
-def fetch_taxi_data_for_date(date: str) -> pd.DataFrame:
+def prune_extract_cache() -> int:
+    """
+    Borra los extracts usados hace más tiempo hasta que la caché ocupe como
+    mucho EXTRACT_CACHE_MAX_MB. El orden de uso es el del índice de accesos
+    (ver _touch_extract_cache); los días que no aparecen en él (cacheados por
+    otra versión o con el índice perdido) se borran primero, por fecha.
+
+    Returns:
+        Número de días borrados
+    """
+    directory = os.path.join(EXTRACT_CACHE_DIR, PARQUET_BASE_PATH)
+    if not EXTRACT_CACHE_DIR or not os.path.isdir(directory):
+        return 0
+
+    with _extract_cache_lock:
+        index = _read_extract_access()
+        entries = []
+        for entry in os.scandir(directory):
+            if entry.name.endswith(".arrow"):
+                entries.append((entry.path, entry.stat().st_size, index["used"].get(entry.name, 0)))
+        entries.sort(key=lambda entry: (entry[2], entry[0]))
+
+        total = sum(size for _, size, _ in entries)
+        limit = EXTRACT_CACHE_MAX_MB * 1024**2
+        evicted = 0
+        for path, size, _ in entries:
+            if total <= limit:
+                break
+            os.remove(path)
+            index["used"].pop(os.path.basename(path), None)
+            total -= size
+            evicted += 1
+        if evicted:
+            _write_extract_access(index)
+
+    if evicted:
+        logger.info(f"Evicted {evicted} cached extracts ({total / 1024**2:.1f} MB left)")
+    return evicted
+
+
+def start_extract_query(
+    where_clause: str, stats: dict | None = None, label: str | None = None, order_by: str | None = None
+) -> bigquery.table.RowIterator:
+    """
+    Lanza un SELECT de TAXI_COLUMNS sobre el dataset público y espera a que termine,
+    sin descargar todavía las filas.
+
+    Args:
+        where_clause: Condición WHERE (sin la palabra clave)
+        stats: Dict opcional donde acumular bigquery_jobs y bytes_processed
+        label: Fecha o rango de la query para las métricas por etapa
+        order_by: Expresión ORDER BY opcional (sin la palabra clave)
+
+    Returns:
+        RowIterator con el resultado de la query
+    """
+    # Cliente BigQuery - lee de US (dataset público)
+    client = get_bigquery_client()
+
+    query = _extract_query_sql(where_clause, order_by)
+
+    # Ejecutar query
+    with stage_span("bigquery_query", label) as span:
+        job = client.query(query)
+        rows = job.result()
+        span["rows"] = rows.total_rows
+        span["bytes_in"] = job.total_bytes_processed or 0
+
+    if stats is not None:
+        with _stats_lock:
+            stats["bigquery_jobs"] = stats.get("bigquery_jobs", 0) + 1
+            stats["bytes_processed"] = stats.get("bytes_processed", 0) + (job.total_bytes_processed or 0)
+
+    return rows
+
+
+def run_extract_query(
+    where_clause: str,
+    stats: dict | None = None,
+    label: str | None = None,
+    cache_date: str | None = None,
+) -> pd.DataFrame:
+    """
+    Ejecuta un SELECT de TAXI_COLUMNS sobre el dataset público y lo descarga entero.
+
+    Args:
+        where_clause: Condición WHERE (sin la palabra clave)
+        stats: Dict opcional donde acumular bigquery_jobs y bytes_processed
+        label: Fecha o rango de la query para las métricas por etapa
+        cache_date: Fecha que cubre la query; con EXTRACT_CACHE_DIR el
+            resultado crudo se guarda en la caché de extracts
+
+    Returns:
+        DataFrame con el resultado de la query, con los tipos de taxi_arrow_schema
+        (diccionarios como category)
+    """
+    rows = start_extract_query(where_clause, stats, label)
+    with stage_span("to_dataframe", label) as span:
+        table = rows.to_arrow()
+        # Tipos fijados al descargar: to_dataframe() infiere object/float64/ns por día
+        df = conform_taxi_table(table).to_pandas(types_mapper=_taxi_pandas_type)
+        span["rows"] = len(df)
+        span["bytes_out"] = int(df.memory_usage().sum())
+
+    if cache_date and EXTRACT_CACHE_DIR:
+        cache_extract_day(table, cache_date)
+    return df
+
+
+def fetch_taxi_data_for_date(date: str, stats: dict | None = None) -> pd.DataFrame:
     """
     Obtiene datos de taxis del dataset público de BigQuery para una fecha específica.
 
     Args:
         date: Fecha (YYYY-MM-DD)
+        stats: Dict opcional donde acumular métricas de BigQuery
 
     Returns:
         DataFrame con datos de taxis de ese día
     """
-    # Cliente BigQuery - lee de US (dataset público) 
-    client = bigquery.Client(project=PROJECT_ID)
-    
-    columns_str = ", ".join(TAXI_COLUMNS)
-    
-    query = f"""
-        SELECT {columns_str}
-        FROM `{PUBLIC_TAXI_TABLE}`
-        WHERE DATE(trip_start_timestamp) = '{date}'
-    """
-    
     logger.info(f"Querying taxi data for date: {date}")
-    
-    # Ejecutar query
-    df = client.query(query).to_dataframe()
-    
+
+    df = run_extract_query(extract_where_clause(date, date), stats, date, cache_date=date)
+
     logger.info(f"Retrieved {len(df)} taxi trips for {date}")
-    
+
     # Añadir columna de auditoría
     df['loaded_at'] = datetime.utcnow()
-    
+
     return df
 
 
-def write_daily_parquet(df: pd.DataFrame, bucket_name: str, date: str) -> str:
+def start_taxi_query_for_date(date: str, stats: dict | None = None) -> bigquery.table.RowIterator:
+    """
+    Lanza la query de taxis de una fecha sin descargar las filas (ruta Arrow).
+
+    Args:
+        date: Fecha (YYYY-MM-DD)
+        stats: Dict opcional donde acumular métricas de BigQuery
+
+    Returns:
+        RowIterator listo para leerse en record batches
+    """
+    logger.info(f"Querying taxi data for date: {date}")
+
+    rows = start_extract_query(extract_where_clause(date, date), stats, date)
+
+    logger.info(f"Query for {date} finished with {rows.total_rows} taxi trips")
+    return rows
+
+
+def iter_taxi_data_for_range(
+    start_date: str, end_date: str, stats: dict | None = None
+) -> Iterator[Tuple[str, pd.DataFrame]]:
+    """
+    Obtiene datos de taxis de un rango de fechas con una única query y los
+    devuelve por día a medida que llegan sus record batches.
+
+    La query ordena por fecha, así que un día está completo en cuanto aparece
+    el siguiente: solo se retienen los batches del día en curso, no el tramo
+    entero. Cada DataFrame diario es equivalente al de fetch_taxi_data_for_date:
+    mismas columnas y dtypes (diccionarios construidos solo con el día), índice
+    desde 0 y su propio loaded_at. Los días sin viajes se devuelven como
+    DataFrame vacío con schema.
+
+    Args:
+        start_date: Fecha inicio (YYYY-MM-DD)
+        end_date: Fecha fin (YYYY-MM-DD)
+        stats: Dict opcional donde acumular métricas de BigQuery
+
+    Yields:
+        Tuplas (fecha, DataFrame) para todas las fechas del rango, en orden
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    label = f"{start_date}..{end_date}"
+    logger.info(f"Querying taxi data for range: {start_date} to {end_date}")
+    rows = start_extract_query(
+        extract_where_clause(start_date, end_date), stats, label, order_by="DATE(trip_start_timestamp)"
+    )
+
+    raw_schema = None
+
+    def day_frame(date: str, batches: List[pa.RecordBatch]) -> pd.DataFrame:
+        schema = raw_schema or pa.schema([f for f in taxi_arrow_schema() if f.name in TAXI_COLUMNS])
+        table = pa.Table.from_batches(batches, schema)
+        with stage_span("to_dataframe", date) as span:
+            df = conform_taxi_table(table).to_pandas(types_mapper=_taxi_pandas_type)
+            span["rows"] = len(df)
+            span["bytes_out"] = int(df.memory_usage().sum())
+        if EXTRACT_CACHE_DIR:
+            cache_extract_day(table, date)
+        # Añadir columna de auditoría
+        df['loaded_at'] = datetime.utcnow()
+        return df
+
+    pending = iter(get_date_range(start_date, end_date))
+    current = None
+    batches: List[pa.RecordBatch] = []
+    total = 0
+    for batch in rows.to_arrow_iterable():
+        if not batch.num_rows:
+            continue
+        raw_schema = raw_schema or batch.schema
+        # Filas ordenadas por día: cada día es un tramo contiguo del batch
+        counts = pc.value_counts(pc.strftime(batch.column("trip_start_timestamp"), format="%Y-%m-%d"))
+        offset = 0
+        for day, count in zip(counts.field("values").to_pylist(), counts.field("counts").to_pylist()):
+            if day != current:
+                if current is not None:
+                    if day < current:
+                        raise ValueError(f"Range extract {label} is not ordered by date")
+                    yield current, day_frame(current, batches)
+                # Días sin viajes antes de este
+                for date in pending:
+                    if date == day:
+                        break
+                    yield date, day_frame(date, [])
+                current, batches = day, []
+            batches.append(batch.slice(offset, count))
+            offset += count
+            total += count
+
+    if current is not None:
+        yield current, day_frame(current, batches)
+    for date in pending:
+        yield date, day_frame(date, [])
+
+    logger.info(f"Retrieved {total} taxi trips for {start_date} to {end_date}")
+
+
+def open_range_extract(start_date: str, end_date: str, stats: dict | None = None) -> dict:
+    """
+    Prepara la lectura por días de un tramo (EXTRACT_MODE=range) para
+    run_date_pipeline: la query se lanza con el primer fetch_range_day.
+
+    Args:
+        start_date: Fecha inicio (YYYY-MM-DD)
+        end_date: Fecha fin (YYYY-MM-DD)
+        stats: Dict opcional donde acumular métricas de BigQuery
+
+    Returns:
+        Estado del extract para fetch_range_day
+    """
+    return {
+        "days": iter_taxi_data_for_range(start_date, end_date, stats),
+        "ready": {},
+        "error": None,
+        "lock": threading.Lock(),
+    }
+
+
+def fetch_range_day(extract: dict, date: str) -> pd.DataFrame:
+    """
+    DataFrame de una fecha del tramo, leyendo el resultado de la query hasta
+    llegar a ella.
+
+    run_date_pipeline pide las fechas en orden y solo tras reservar su hueco
+    de INGEST_MAX_IN_FLIGHT, así que los días leídos por adelantado (de otro
+    thread del pool) son siempre fechas ya en vuelo: la memoria sigue acotada
+    por el semáforo del pipeline. Si la query falla, todas las fechas
+    pendientes del tramo fallan con el mismo error.
+
+    Args:
+        extract: Estado devuelto por open_range_extract
+        date: Fecha (YYYY-MM-DD)
+
+    Returns:
+        DataFrame del día
+    """
+    with extract["lock"]:
+        while date not in extract["ready"]:
+            if extract["error"] is not None:
+                raise extract["error"]
+            try:
+                day, df = next(extract["days"])
+            except StopIteration:
+                extract["error"] = ValueError(f"Range extract has no data for {date}")
+            except Exception as e:
+                extract["error"] = e
+            else:
+                extract["ready"][day] = df
+        return extract["ready"].pop(date)
+
+
+def fetch_source_fingerprints(start_date: str, end_date: str, stats: dict | None = None) -> dict:
+    """
+    Calcula la huella por día del dataset público con una única query agregada.
+
+    La huella de un día es (filas, máximo trip_end_timestamp, XOR de los 60
+    primeros bits del MD5 de cada unique_key): cambia si llegan filas tarde,
+    si se borran o si se corrige la hora de fin de algún viaje. La query solo
+    lee unique_key, trip_start_timestamp y trip_end_timestamp.
+
+    Args:
+        start_date: Fecha inicio (YYYY-MM-DD)
+        end_date: Fecha fin (YYYY-MM-DD)
+        stats: Dict opcional donde acumular bigquery_jobs y bytes_processed
+
+    Returns:
+        Dict {fecha: huella} con todas las fechas del rango (ver _fingerprint_metadata)
+    """
+    client = get_bigquery_client()
+
+    query = f"""
+        SELECT
+            CAST(DATE(trip_start_timestamp) AS STRING) AS date,
+            COUNT(*) AS row_count,
+            UNIX_MICROS(MAX(trip_end_timestamp)) AS max_trip_end_us,
+            BIT_XOR(CAST(CONCAT('0x', SUBSTR(TO_HEX(MD5(unique_key)), 1, 15)) AS INT64)) AS key_hash
+        FROM `{PUBLIC_TAXI_TABLE}`
+        WHERE DATE(trip_start_timestamp) BETWEEN '{start_date}' AND '{end_date}'
+        GROUP BY 1
+    """
+
+    with stage_span("fingerprint_query", f"{start_date}..{end_date}") as span:
+        job = client.query(query)
+        rows = job.result()
+        span["rows"] = rows.total_rows
+        span["bytes_in"] = job.total_bytes_processed or 0
+
+    if stats is not None:
+        with _stats_lock:
+            stats["bigquery_jobs"] = stats.get("bigquery_jobs", 0) + 1
+            stats["bytes_processed"] = stats.get("bytes_processed", 0) + (job.total_bytes_processed or 0)
+
+    # Los días sin viajes no aparecen en el GROUP BY: huella de una partición vacía
+    fingerprints = {date: _fingerprint_metadata(0, None, 0) for date in get_date_range(start_date, end_date)}
+    for row in rows:
+        fingerprints[row["date"]] = _fingerprint_metadata(row["row_count"], row["max_trip_end_us"], row["key_hash"])
+    return fingerprints
+
+
+def _fingerprint_metadata(rows: int, max_trip_end_us: int | None, key_hash: int | None) -> dict:
+    """Huella normalizada como metadata de objeto GCS (todos los valores string)."""
+    return {
+        "source_rows": str(int(rows)),
+        "source_max_trip_end_us": "" if max_trip_end_us is None else str(int(max_trip_end_us)),
+        "source_key_hash": f"{int(key_hash or 0):015x}",
+    }
+
+
+def table_fingerprint(tables: Iterable[pa.Table]) -> Tuple[Iterable[pa.Table], dict]:
+    """
+    Calcula la huella de una partición a medida que se consumen sus tablas,
+    con la misma fórmula que fetch_source_fingerprints.
+
+    Solo se calcula con SOURCE_FINGERPRINT o dentro de mode=refresh: el MD5 de
+    cada unique_key no tiene kernel en pyarrow.compute y es la parte cara. Los
+    digests se calculan con hashlib y el XOR se reduce con numpy por tabla.
+
+    Args:
+        tables: Tablas Arrow de la partición
+
+    Returns:
+        Tupla (tablas, huella): las tablas se devuelven tal cual y la huella
+        (dict de metadata) queda completa cuando se han consumido todas; vacía
+        si no se guarda huella
+    """
+    if not (SOURCE_FINGERPRINT or _refresh_writes.get()):
+        return tables, {}
+
+    import hashlib
+
+    import numpy as np
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    state = {"rows": 0, "max_trip_end_us": None, "key_hash": 0}
+    fingerprint: dict = {}
+    md5 = hashlib.md5
+
+    def consume():
+        for table in tables:
+            state["rows"] += table.num_rows
+            keys = pc.cast(table.column("unique_key").drop_null(), pa.binary()).to_pylist()
+            if keys:
+                # 60 primeros bits de cada MD5 (los 15 primeros dígitos hex de la query)
+                heads = np.frombuffer(b"".join([md5(key).digest() for key in keys]), dtype=">u8")[::2]
+                state["key_hash"] ^= int(np.bitwise_xor.reduce(heads >> np.uint64(4)))
+            ends = table.column("trip_end_timestamp")
+            ends = pc.cast(ends, pa.timestamp("us", tz=ends.type.tz), safe=False).cast(pa.int64())
+            table_max = pc.max(ends).as_py()
+            if table_max is not None and (state["max_trip_end_us"] is None or table_max > state["max_trip_end_us"]):
+                state["max_trip_end_us"] = table_max
+            yield table
+        fingerprint.update(_fingerprint_metadata(**state))
+
+    return consume(), fingerprint
+
+
+def read_partition_fingerprints(bucket_name: str, start_date: str, end_date: str) -> dict:
+    """
+    Lee las huellas guardadas como metadata de cada partición del rango.
+
+    La huella vive en el propio data.parquet o, en particiones multi-fichero,
+    en su marcador (que manda si aún convive con un data.parquet a medio
+    reemplazar); se obtiene del listado por mes sin descargar nada.
+
+    Args:
+        bucket_name: Nombre del bucket GCS
+        start_date: Fecha inicio (YYYY-MM-DD)
+        end_date: Fecha fin (YYYY-MM-DD)
+
+    Returns:
+        Dict {fecha: huella o None si la partición no tiene} con las fechas
+        que tienen partición completa
+    """
+    client = get_storage_client()
+    bucket = client.bucket(bucket_name)
+    fingerprints = {}
+
+    for month in _months_in_range(start_date, end_date):
+        multipart = set()
+        for blob in bucket.list_blobs(prefix=f"{PARQUET_BASE_PATH}/date={month}"):
+            (date,) = _dates_from_blobs([blob])
+            if blob.name.endswith("/data.parquet"):
+                fingerprints[date] = _stored_fingerprint(blob.metadata)
+            else:
+                multipart.add(date)
+        if multipart:
+            for blob in bucket.list_blobs(prefix=f"{COMPLETE_PREFIX}/date={month}"):
+                (date,) = _dates_from_blobs([blob])
+                fingerprints[date] = _stored_fingerprint(blob.metadata)
+
+    return {d: fp for d, fp in fingerprints.items() if start_date <= d <= end_date}
+
+
+def _stored_fingerprint(metadata: dict | None) -> dict | None:
+    if not metadata or "source_key_hash" not in metadata:
+        return None
+    return {key: metadata.get(key, "") for key in ("source_rows", "source_max_trip_end_us", "source_key_hash")}
+
+
+def write_daily_parquet(df: pd.DataFrame, bucket_name: str, date: str, stats: dict | None = None) -> str:
     """
     Escribe DataFrame como Parquet a GCS usando particionamiento Hive.
 
+    La tabla se convierte al schema fijo del landing (conform_taxi_table), sin
+    índice ni metadata de pandas, sea cual sea el dtype de cada columna del df.
+
+    Con PARTITION_TARGET_ROWS o PARTITION_TARGET_MB la partición se reparte en
+    varios ficheros (ver _write_partition_parts). La huella de origen del día
+    (table_fingerprint, con SOURCE_FINGERPRINT) se guarda como metadata del
+    objeto para mode=refresh.
+    Con DAILY_AGG se escribe además el cubo diario (ver aggregate_daily_cube).
+    Con DQ_PROFILE / DQ_THRESHOLDS el día se perfila antes de subirlo (ver
+    profile_taxi_table) y un día rechazado lanza ValueError sin escribirse.
+
     Args:
         df: DataFrame a escribir
         bucket_name: Nombre del bucket GCS
         date: Fecha de la partición (YYYY-MM-DD)
+        stats: Dict opcional donde acumular bytes_written
 
     Returns:
-        URI completa del archivo en GCS
+        URI completa del archivo en GCS (del prefijo de la partición si es multi-fichero)
     """
-    # Path con particionamiento Hive: taxis/date=YYYY-MM-DD/data.parquet
-    blob_path = f"{PARQUET_BASE_PATH}/date={date}/data.parquet"
+    import pyarrow as pa
 
     # Si el DataFrame está vacío, crear archivo vacío con schema
     if df.empty:
         logger.warning(f"No taxi data for {date} - writing empty parquet with schema")
     
     # Convertir DataFrame a tabla PyArrow
-    table = pa.Table.from_pandas(df)
+    profile = get_parquet_profile()
+    with stage_span("from_pandas", date, rows=len(df)) as span:
+        table = conform_taxi_table(pa.Table.from_pandas(df, preserve_index=False))
+        if DERIVE_SILVER_COLUMNS:
+            table = derive_silver_columns(table)
+        table = _sort_for_profile(table, profile)
+        span["bytes_out"] = table.nbytes
+
+    return _write_daily_table(table, bucket_name, date, profile, stats)
+
+
+def write_daily_table(table: pa.Table, bucket_name: str, date: str, stats: dict | None = None) -> str:
+    """
+    Escribe una tabla Arrow de un día (TAXI_COLUMNS + loaded_at, p. ej. un
+    extract de la caché) como Parquet a GCS, igual que write_daily_parquet
+    pero sin pasar por pandas.
+
+    Args:
+        table: Tabla del día con loaded_at
+        bucket_name: Nombre del bucket GCS
+        date: Fecha de la partición (YYYY-MM-DD)
+        stats: Dict opcional donde acumular bytes_written
 
-    # Crear cliente de storage
-    client = storage.Client(project=PROJECT_ID)
+    Returns:
+        URI completa del archivo en GCS (del prefijo de la partición si es multi-fichero)
+    """
+    profile = get_parquet_profile()
+    with stage_span("conform", date, rows=table.num_rows, bytes_in=table.nbytes) as span:
+        table = conform_taxi_table(table)
+        if DERIVE_SILVER_COLUMNS:
+            table = derive_silver_columns(table)
+        table = _sort_for_profile(table, profile)
+        span["bytes_out"] = table.nbytes
+
+    return _write_daily_table(table, bucket_name, date, profile, stats)
+
+
+def _write_daily_table(table: pa.Table, bucket_name: str, date: str, profile: dict, stats: dict | None) -> str:
+    """Huella, encoding y subida de una tabla ya convertida y ordenada (ver write_daily_parquet)."""
+    if dq_enabled():
+        # Antes de subir nada: un día rechazado conserva la partición anterior
+        with stage_span("dq_profile", date, rows=table.num_rows, bytes_in=table.nbytes):
+            quality = profile_taxi_table(table, date)
+        check_profile(quality, bucket_name, date)
+    gcs_uri = _write_partition_table(table, bucket_name, date, profile, stats)
+    if DAILY_AGG:
+        with stage_span("daily_agg", date, rows=table.num_rows, bytes_in=table.nbytes) as span:
+            cube = aggregate_daily_cube(table)
+            span["bytes_out"] = cube.nbytes
+        write_daily_cube(cube, bucket_name, date, stats)
+    return gcs_uri
+
+
+def _write_partition_table(table: pa.Table, bucket_name: str, date: str, profile: dict, stats: dict | None) -> str:
+    import pyarrow.parquet as pq
+
+    # Path con particionamiento Hive: taxis/date=YYYY-MM-DD/data.parquet
+    blob_path = partition_blob_path(date)
+
+    # Huella de origen guardada como metadata del objeto (ver detect_source_changes)
+    with stage_span("fingerprint", date, rows=table.num_rows):
+        tables, fingerprint = table_fingerprint([table])
+        tables = list(tables)
+
+    if _multipart_enabled():
+        # La tabla ya viene ordenada entera: cada parte es un tramo contiguo
+        with stage_span("parts_write", date, rows=table.num_rows, bytes_in=table.nbytes) as span:
+            parts, nrows, span["bytes_out"] = _write_partition_parts(
+                tables, bucket_name, date, profile,
+                profile["row_group_size"] or ARROW_ROW_GROUP_ROWS, sort_groups=False,
+            )
+            span["parts"] = len(parts)
+        _commit_partition_parts(bucket_name, date, parts, nrows, span["bytes_out"], fingerprint)
+        return _finish_multipart_write(bucket_name, date, parts, span["bytes_out"], stats)
+
+    # Cliente de storage compartido
+    client = get_storage_client()
     bucket = client.bucket(bucket_name)
     blob = bucket.blob(blob_path)
+    blob.metadata = fingerprint
 
     # Escribir Parquet a memoria y subir
     buffer = io.BytesIO()
-    pq.write_table(table, buffer)
+    with stage_span("parquet_encode", date, rows=table.num_rows, bytes_in=table.nbytes) as span:
+        pq.write_table(
+            table,
+            buffer,
+            row_group_size=profile["row_group_size"],
+            **_parquet_writer_options(table.schema, profile),
+        )
+        span["bytes_out"] = buffer.tell()
     buffer.seek(0)
 
-    blob.upload_from_file(buffer, content_type="application/octet-stream")
+    with stage_span("upload", date, bytes_in=buffer.getbuffer().nbytes):
+        blob.upload_from_file(buffer, content_type="application/octet-stream")
+
+    if stats is not None:
+        _add_bytes_written(stats, buffer.getbuffer().nbytes)
+
+    _remove_stale_parts(bucket_name, date)
+    register_partition(bucket_name, date)
 
     gcs_uri = f"gs://{bucket_name}/{blob_path}"
     logger.info(f"Written parquet to {gcs_uri}")
     return gcs_uri
 
 
-def process_single_date(target_date: str, force: bool = False) -> dict:
+def write_daily_parquet_stream(
+    rows: bigquery.table.RowIterator, bucket_name: str, date: str, stats: dict | None = None
+) -> str:
+    """
+    Escribe el resultado de una query como Parquet a GCS sin pasar por pandas.
+
+    Lee record batches de BigQuery, añade loaded_at como array Arrow, los
+    convierte al schema fijo (conform_taxi_table) y vuelca
+    row groups con ParquetWriter sobre una subida resumable a GCS. La memoria
+    pico queda acotada a ~un row group. El tamaño de row group es el del perfil
+    Parquet o, si no lo fija, ARROW_ROW_GROUP_ROWS; con sort_by cada row group
+    se ordena por separado (el fichero completo no se puede ordenar en streaming).
+    Con PARTITION_TARGET_ROWS o PARTITION_TARGET_MB las partes rotan igual que
+    en write_daily_parquet. Con EXTRACT_CACHE_DIR los batches crudos se guardan
+    además en la caché de extracts según se descargan. Con DAILY_AGG el cubo
+    diario se agrega por batch y se combina al final. El perfil de calidad
+    también se calcula por batch y se comprueba antes de publicar la escritura
+    (cerrar la subida o subir el marcador): un día rechazado por
+    DQ_THRESHOLDS lanza ValueError y conserva la partición anterior.
+
+    Args:
+        rows: RowIterator devuelto por start_taxi_query_for_date
+        bucket_name: Nombre del bucket GCS
+        date: Fecha de la partición (YYYY-MM-DD)
+        stats: Dict opcional donde acumular bytes_written
+
+    Returns:
+        URI completa del archivo en GCS (del prefijo de la partición si es multi-fichero)
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    # Path con particionamiento Hive: taxis/date=YYYY-MM-DD/data.parquet
+    blob_path = partition_blob_path(date)
+
+    # Un resultado vacío no garantiza ningún batch: pedir la tabla vacía con schema
+    if rows.total_rows == 0:
+        logger.warning(f"No taxi data for {date} - writing empty parquet with schema")
+        tables = [rows.to_arrow()]
+    else:
+        tables = (pa.Table.from_batches([batch]) for batch in rows.to_arrow_iterable())
+    # Extract crudo a la caché según se descarga (sin EXTRACT_CACHE_DIR no hace nada)
+    tables = cache_extract_tables(tables, date)
+
+    loaded_at = pa.scalar(datetime.utcnow(), type=pa.timestamp("us"))
+    # Añadir columna de auditoría (y las derivadas detrás, como en la ruta pandas)
+    tables = (
+        conform_taxi_table(table.append_column("loaded_at", pa.repeat(loaded_at, table.num_rows)))
+        for table in tables
+    )
+    if DERIVE_SILVER_COLUMNS:
+        tables = (derive_silver_columns(table) for table in tables)
+    # La huella (y los cubos parciales) se completan al consumir la última tabla
+    tables, fingerprint = table_fingerprint(tables)
+    if DAILY_AGG:
+        tables, cube_partials = daily_cube_tables(tables)
+    if dq_enabled():
+        tables, dq_partials = dq_profile_tables(tables)
+
+    # Cliente de storage compartido
+    client = get_storage_client()
+    bucket = client.bucket(bucket_name)
+    blob = bucket.blob(blob_path)
+
+    profile = get_parquet_profile()
+    row_group_rows = profile["row_group_size"] or ARROW_ROW_GROUP_ROWS
+
+    if _multipart_enabled():
+        with stage_span("stream_write", date, rows=rows.total_rows) as span:
+            parts, nrows, span["bytes_out"] = _write_partition_parts(
+                tables, bucket_name, date, profile, row_group_rows,
+            )
+            span["parts"] = len(parts)
+        if dq_enabled():
+            # Antes del marcador: un día rechazado conserva la partición anterior
+            _check_streamed_profile(dq_partials, bucket_name, date, parts)
+        # La huella se completa al consumir la última tabla: el marcador va después
+        _commit_partition_parts(bucket_name, date, parts, nrows, span["bytes_out"], fingerprint)
+        gcs_uri = _finish_multipart_write(bucket_name, date, parts, span["bytes_out"], stats)
+        if DAILY_AGG:
+            write_daily_cube(combine_daily_cube(cube_partials), bucket_name, date, stats)
+        return gcs_uri
+
+    writer = None
+    pending: List[pa.RecordBatch] = []
+    pending_rows = 0
+
+    # Descarga, encoding y subida van entrelazados: se miden como una sola etapa
+    with stage_span("stream_write", date, rows=rows.total_rows) as span:
+        with blob.open("wb", content_type="application/octet-stream", ignore_flush=True) as sink:
+            for table in tables:
+                if writer is None:
+                    writer = pq.ParquetWriter(sink, table.schema, **_parquet_writer_options(table.schema, profile))
+
+                pending.append(table)
+                pending_rows += table.num_rows
+                while pending_rows >= row_group_rows:
+                    # Volcar exactamente un row group y dejar el resto pendiente
+                    combined = pa.concat_tables(pending)
+                    group = _sort_for_profile(combined.slice(0, row_group_rows), profile)
+                    writer.write_table(group, row_group_size=row_group_rows)
+                    rest = combined.slice(row_group_rows)
+                    pending, pending_rows = [rest], rest.num_rows
+
+            if pending_rows:
+                writer.write_table(_sort_for_profile(pa.concat_tables(pending), profile), row_group_size=row_group_rows)
+            if dq_enabled():
+                # Con la subida aún abierta: si el día se rechaza, la excepción
+                # cancela la subida resumable (BlobWriter.terminate) y el
+                # data.parquet anterior no se reemplaza
+                _check_streamed_profile(dq_partials, bucket_name, date)
+            writer.close()
+            span["bytes_out"] = sink.tell()
+
+    # La subida resumable fija la metadata al empezar: la huella se añade después
+    if fingerprint:
+        blob.metadata = fingerprint
+        blob.patch()
+
+    if stats is not None:
+        _add_bytes_written(stats, span["bytes_out"])
+
+    _remove_stale_parts(bucket_name, date)
+    register_partition(bucket_name, date)
+    if DAILY_AGG:
+        write_daily_cube(combine_daily_cube(cube_partials), bucket_name, date, stats)
+
+    gcs_uri = f"gs://{bucket_name}/{blob_path}"
+    logger.info(f"Written parquet to {gcs_uri}")
+    return gcs_uri
+
+
+def run_date_pipeline(
+    dates: List[str],
+    fetch_fn: Callable[[str], Any],
+    write_fn: Callable[[Any, str], str],
+    max_workers: int | None = None,
+    max_in_flight: int | None = None,
+) -> Tuple[List[dict], List[dict]]:
+    """
+    Ejecuta fetch + write para cada fecha con concurrencia acotada.
+
+    Las etapas corren en dos pools de threads: fetch (query + to_dataframe) y
+    write (Parquet + upload), de modo que la query de un día se solapa con la
+    subida de otro. Un semáforo limita los DataFrames en vuelo (desde que empieza
+    su fetch hasta que termina su write), lo que acota la memoria usada.
+
+    Args:
+        dates: Fechas a procesar (YYYY-MM-DD)
+        fetch_fn: Función que recibe una fecha y devuelve su DataFrame
+            (RowIterator en la ruta Arrow, tabla Arrow en mode=rewrite)
+        write_fn: Función que recibe (datos, fecha) y devuelve la URI escrita
+        max_workers: Threads por etapa (default: INGEST_MAX_WORKERS)
+        max_in_flight: Máximo de fechas en vuelo (default: INGEST_MAX_IN_FLIGHT)
+
+    Returns:
+        Tupla (processed, errors) ordenadas por fecha:
+        - processed: [{"date", "rows", "gcs_uri"}]
+        - errors: [{"date", "error"}]
+    """
+    import pandas as pd
+    import pyarrow as pa
+
+    workers = max(1, max_workers or INGEST_MAX_WORKERS)
+    in_flight = max(1, max_in_flight or INGEST_MAX_IN_FLIGHT)
+
+    slots = threading.BoundedSemaphore(in_flight)
+    lock = threading.Lock()
+    processed: List[dict] = []
+    errors: List[dict] = []
+
+    def _record_error(date: str, e: Exception) -> None:
+        logger.error(f"Error processing date {date}: {str(e)}")
+        with lock:
+            errors.append({"date": date, "error": str(e)})
+
+    def _write(date: str, data: Any) -> None:
+        try:
+            gcs_uri = write_fn(data, date)
+            # DataFrame o tabla Arrow (len) o RowIterator de la ruta Arrow (total_rows)
+            rows = len(data) if isinstance(data, (pd.DataFrame, pa.Table)) else data.total_rows
+            with lock:
+                processed.append({"date": date, "rows": rows, "gcs_uri": gcs_uri})
+                done = len(processed)
+            if done % 10 == 0:
+                logger.info(f"Processed {done}/{len(dates)} dates")
+        except Exception as e:
+            _record_error(date, e)
+        finally:
+            slots.release()
+
+    def _fetch(date: str) -> None:
+        try:
+            data = fetch_fn(date)
+        except Exception as e:
+            _record_error(date, e)
+            slots.release()
+            return
+        write_pool.submit(contextvars.copy_context().run, _write, date, data)
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="write") as write_pool:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fetch") as fetch_pool:
+            for date in dates:
+                # Backpressure: bloquea hasta que haya hueco para otro DataFrame
+                slots.acquire()
+                # Cada tarea con su copia del contexto: comparte las métricas de la invocación
+                fetch_pool.submit(contextvars.copy_context().run, _fetch, date)
+
+    processed.sort(key=lambda r: r["date"])
+    errors.sort(key=lambda e: e["date"])
+    return processed, errors
+
+
+@instrumented(FUNCTION_NAME)
+def process_single_date(target_date: str, force: bool = False, write_path: str | None = None) -> dict:
     """
     Procesa una única fecha (usado por modo daily_offset).
 
     Args:
         target_date: Fecha a procesar (YYYY-MM-DD)
         force: Si es True, reprocesa aunque exista
+        write_path: "pandas" o "arrow" (default: WRITE_PATH)
 
     Returns:
         Dict con resultado de la operacion
@@ -239,37 +1195,73 @@ def process_single_date(target_date: str, force: bool = False) -> dict:
     try:
         # Verificar si ya existe
         if not force:
-            existing_dates = get_existing_dates(GCS_BUCKET)
-            if target_date in existing_dates:
+            with stage_span("existing_dates", target_date):
+                exists = partition_exists(GCS_BUCKET, target_date)
+            if exists:
                 return {
                     "status": "success",
                     "message": f"Date {target_date} already exists - skipping",
                     "target_date": target_date,
                     "processed": False,
-                    "trips_count": 0
+                    "trips_count": 0,
+                    "dates_written": []
                 }
 
+        admitted, budget = plan_extract_budget([[target_date]])
+        if not admitted:
+            return {
+                "status": "success",
+                "message": f"Date {target_date} deferred - query exceeds the byte budget",
+                "target_date": target_date,
+                "processed": False,
+                "deferred": True,
+                "trips_count": 0,
+                "dates_written": [],
+                "byte_budget": settle_extract_budget(budget, 0),
+            }
+
         # Fetch y escribir
         logger.info(f"Processing single date: {target_date}")
-        df = fetch_taxi_data_for_date(target_date)
-        trips_count = len(df)
-        gcs_uri = write_daily_parquet(df, GCS_BUCKET, target_date)
+        stats = {"bigquery_jobs": 0, "bytes_processed": 0}
+        try:
+            if (write_path or WRITE_PATH) == "arrow":
+                rows = start_taxi_query_for_date(target_date, stats)
+                trips_count = rows.total_rows
+                gcs_uri = write_daily_parquet_stream(rows, GCS_BUCKET, target_date)
+            else:
+                df = fetch_taxi_data_for_date(target_date, stats)
+                trips_count = len(df)
+                gcs_uri = write_daily_parquet(df, GCS_BUCKET, target_date)
+        finally:
+            settle_extract_budget(budget, stats["bytes_processed"])
 
-        return {
+        result = {
             "status": "success",
             "message": f"Processed {trips_count} taxi trips for {target_date}",
             "target_date": target_date,
             "gcs_uri": gcs_uri,
             "processed": True,
-            "trips_count": trips_count
+            "trips_count": trips_count,
+            "dates_written": [target_date]
         }
+        if budget is not None:
+            result["byte_budget"] = budget
+        return result
 
     except Exception as e:
         logger.error(f"Error processing date {target_date}: {str(e)}")
         raise
 
 
-def process_taxi_ingestion(start_date: str, end_date: str, force: bool = False) -> dict:
+@instrumented(FUNCTION_NAME)
+def process_taxi_ingestion(
+    start_date: str,
+    end_date: str,
+    force: bool = False,
+    max_workers: int | None = None,
+    extract_mode: str | None = None,
+    write_path: str | None = None,
+) -> dict:
     """
     Proceso principal de ingestion de datos de taxis con sharding diario.
     Solo procesa fechas que no existen en GCS (incremental).
@@ -278,13 +1270,17 @@ def process_taxi_ingestion(start_date: str, end_date: str, force: bool = False)
         start_date: Fecha inicio (YYYY-MM-DD)
         end_date: Fecha fin (YYYY-MM-DD)
         force: Si es True, reprocesa todas las fechas aunque existan
+        max_workers: Threads por etapa (default: INGEST_MAX_WORKERS)
+        extract_mode: "per_date" o "range" (default: EXTRACT_MODE)
+        write_path: "pandas" o "arrow" (default: WRITE_PATH); arrow solo aplica a per_date
 
     Returns:
         Dict con resultado de la operacion
     """
     try:
         # Obtener fechas existentes en GCS
-        existing_dates = set() if force else get_existing_dates(GCS_BUCKET)
+        with stage_span("existing_dates"):
+            existing_dates = set() if force else get_existing_dates(GCS_BUCKET, start_date, end_date)
 
         # Obtener rango de fechas a procesar
         all_dates = get_date_range(start_date, end_date)
@@ -292,38 +1288,59 @@ def process_taxi_ingestion(start_date: str, end_date: str, force: bool = False)
         # Filtrar solo fechas que no existen
         missing_dates = [d for d in all_dates if d not in existing_dates]
 
-        if not missing_dates:
-            return {
-                "status": "success",
-                "message": "No new dates to process - all data already exists",
-                "date_range": {"start": start_date, "end": end_date},
-                "existing_records": len(existing_dates),
-                "new_records": 0
-            }
-
-        logger.info(f"Processing {len(missing_dates)} missing dates out of {len(all_dates)} total")
-
-        # Procesar cada fecha faltante
-        processed_count = 0
-        total_trips = 0
-        errors = []
-
-        for date in missing_dates:
-            try:
-                # Fetch data for this date
-                df = fetch_taxi_data_for_date(date)
-                total_trips += len(df)
-
-                # Write to GCS
-                gcs_uri = write_daily_parquet(df, GCS_BUCKET, date)
-                processed_count += 1
-
-                if processed_count % 10 == 0:
-                    logger.info(f"Processed {processed_count}/{len(missing_dates)} dates")
-
-            except Exception as e:
-                logger.error(f"Error processing date {date}: {str(e)}")
-                errors.append({"date": date, "error": str(e)})
+        if missing_dates:
+            logger.info(f"Processing {len(missing_dates)} missing dates out of {len(all_dates)} total")
+
+        mode = extract_mode or EXTRACT_MODE
+        if mode not in ("per_date", "range"):
+            raise ValueError(f"Invalid extract_mode: {mode}")
+
+        # Una unidad de presupuesto por query: un día en per_date, un tramo en range
+        units = [[d] for d in missing_dates] if mode == "per_date" else group_contiguous_dates(
+            missing_dates, EXTRACT_MAX_DAYS
+        )
+        units, budget = plan_extract_budget(units)
+        deferred_dates = budget["deferred_dates"] if budget else []
+        missing_dates = [d for unit in units for d in unit]
+
+        stats = {"bigquery_jobs": 0, "bytes_processed": 0}
+
+        def write(df, date):
+            return write_daily_parquet(df, GCS_BUCKET, date)
+
+        if not units:
+            processed, errors = [], []
+        elif mode == "per_date" and (write_path or WRITE_PATH) == "arrow":
+            # Query en la etapa fetch; descarga, encoding y subida en streaming en la etapa write
+            processed, errors = run_date_pipeline(
+                missing_dates,
+                lambda date: start_taxi_query_for_date(date, stats),
+                lambda rows, date: write_daily_parquet_stream(rows, GCS_BUCKET, date),
+                max_workers=max_workers,
+            )
+        elif mode == "per_date":
+            # Procesar fechas faltantes en paralelo (fetch y write solapados)
+            processed, errors = run_date_pipeline(
+                missing_dates,
+                lambda date: fetch_taxi_data_for_date(date, stats),
+                write,
+                max_workers=max_workers,
+            )
+        else:
+            # Una query por tramo de fechas consecutivas; escritura por día en paralelo
+            processed, errors = [], []
+            for run in units:
+                # Los días se leen del resultado según entran en el pipeline
+                # (backpressure de INGEST_MAX_IN_FLIGHT), no el tramo entero
+                extract = open_range_extract(run[0], run[-1], stats)
+                run_processed, run_errors = run_date_pipeline(
+                    run, functools.partial(fetch_range_day, extract), write, max_workers=max_workers
+                )
+                processed.extend(run_processed)
+                errors.extend(run_errors)
+
+        processed_count = len(processed)
+        total_trips = sum(p["rows"] for p in processed)
 
         result = {
             "status": "success",
@@ -332,9 +1349,21 @@ def process_taxi_ingestion(start_date: str, end_date: str, force: bool = False)
             "total_dates_in_range": len(all_dates),
             "existing_dates": len(existing_dates),
             "new_dates_processed": processed_count,
+            "dates_written": [p["date"] for p in processed],
             "total_trips": total_trips,
+            "max_workers": max_workers or INGEST_MAX_WORKERS,
+            "extract_mode": mode,
+            "bigquery_jobs": stats["bigquery_jobs"],
+            "bytes_processed": stats["bytes_processed"],
             "gcs_path": f"gs://{GCS_BUCKET}/{PARQUET_BASE_PATH}/date=*/"
         }
+        if len(existing_dates) == len(all_dates):
+            # Misma forma de resultado que una ejecución con fechas nuevas
+            result["message"] = "No new dates to process - all data already exists"
+        if budget is not None:
+            result["byte_budget"] = settle_extract_budget(budget, stats["bytes_processed"])
+        if deferred_dates:
+            result["message"] += f"; {len(deferred_dates)} dates deferred by the byte budget"
 
         if errors:
             result["errors"] = errors
@@ -347,6 +1376,504 @@ def process_taxi_ingestion(start_date: str, end_date: str, force: bool = False)
         raise
 
 
+@instrumented(FUNCTION_NAME)
+def detect_source_changes(
+    start_date: str,
+    end_date: str,
+    dry_run: bool = False,
+    refresh_unknown: bool = False,
+    max_workers: int | None = None,
+    write_path: str | None = None,
+) -> dict:
+    """
+    Re-ingesta solo los días cuyo origen cambió desde que se escribieron.
+
+    Compara la huella de cada día en el dataset público (una query agregada
+    para todo el rango, ver fetch_source_fingerprints) con la guardada en la
+    metadata de su partición, y reprocesa los días distintos y los que aún no
+    tienen partición. Las particiones escritas antes de guardar huellas se
+    reportan como unfingerprinted y solo se reprocesan con refresh_unknown.
+
+    Args:
+        start_date: Fecha inicio (YYYY-MM-DD)
+        end_date: Fecha fin (YYYY-MM-DD)
+        dry_run: Si es True, solo reporta los días cambiados sin reprocesarlos
+        refresh_unknown: Si es True, reprocesa también las particiones sin huella
+        max_workers: Threads por etapa (default: INGEST_MAX_WORKERS)
+        write_path: "pandas" o "arrow" (default: WRITE_PATH)
+
+    Returns:
+        Dict con los días changed, missing y unfingerprinted y el resultado del reproceso
+    """
+    stats = {"bigquery_jobs": 0, "bytes_processed": 0}
+    source = fetch_source_fingerprints(start_date, end_date, stats)
+    with stage_span("existing_dates"):
+        stored = read_partition_fingerprints(GCS_BUCKET, start_date, end_date)
+
+    changed, missing, unknown = [], [], []
+    for date in get_date_range(start_date, end_date):
+        if date not in stored:
+            missing.append(date)
+        elif stored[date] is None:
+            unknown.append(date)
+        elif stored[date] != source[date]:
+            changed.append(date)
+
+    to_process = sorted(changed + missing + (unknown if refresh_unknown else []))
+    logger.info(
+        f"Source changes {start_date} to {end_date}: {len(changed)} changed, "
+        f"{len(missing)} missing, {len(unknown)} without fingerprint"
+    )
+
+    result = {
+        "status": "success",
+        "date_range": {"start": start_date, "end": end_date},
+        "dates_checked": len(source),
+        "unchanged": len(source) - len(changed) - len(missing) - len(unknown),
+        "changed": changed,
+        "missing": missing,
+        "unfingerprinted": unknown,
+        "dry_run": dry_run,
+        "new_dates_processed": 0,
+        "dates_written": [],
+        "total_trips": 0,
+    }
+
+    if to_process and not dry_run:
+        # La query de huellas ya cuenta para el presupuesto de la invocación
+        fingerprint_bytes = stats["bytes_processed"]
+        units, budget = plan_extract_budget([[d] for d in to_process], spent=fingerprint_bytes)
+        to_process = [unit[0] for unit in units]
+        # Los días re-ingestados guardan su huella aunque SOURCE_FINGERPRINT esté apagado
+        token = _refresh_writes.set(True)
+        try:
+            if (write_path or WRITE_PATH) == "arrow":
+                processed, errors = run_date_pipeline(
+                    to_process,
+                    lambda date: start_taxi_query_for_date(date, stats),
+                    lambda rows, date: write_daily_parquet_stream(rows, GCS_BUCKET, date),
+                    max_workers=max_workers,
+                )
+            else:
+                processed, errors = run_date_pipeline(
+                    to_process,
+                    lambda date: fetch_taxi_data_for_date(date, stats),
+                    lambda df, date: write_daily_parquet(df, GCS_BUCKET, date),
+                    max_workers=max_workers,
+                )
+        finally:
+            _refresh_writes.reset(token)
+        result["new_dates_processed"] = len(processed)
+        result["dates_written"] = [p["date"] for p in processed]
+        result["total_trips"] = sum(p["rows"] for p in processed)
+        result["message"] = f"Re-ingested {len(processed)} of {len(to_process)} changed or missing dates"
+        if budget is not None:
+            result["byte_budget"] = settle_extract_budget(budget, stats["bytes_processed"] - fingerprint_bytes)
+            if budget["deferred_dates"]:
+                result["message"] += f"; {len(budget['deferred_dates'])} dates deferred by the byte budget"
+        if errors:
+            result["errors"] = errors
+            result["status"] = "partial_success" if processed else "error"
+    else:
+        result["message"] = f"{len(to_process)} dates to re-ingest" + (" (dry run)" if dry_run else "")
+
+    result["bigquery_jobs"] = stats["bigquery_jobs"]
+    result["bytes_processed"] = stats["bytes_processed"]
+    return result
+
+
+def load_cached_extract(date: str) -> pa.Table:
+    """
+    Extract cacheado de un día con loaded_at, listo para write_daily_table.
+
+    Args:
+        date: Fecha (YYYY-MM-DD)
+
+    Returns:
+        Tabla del día (columnas mapeadas desde el fichero, sin copia)
+    """
+    import pyarrow as pa
+
+    with stage_span("extract_cache_read", date) as span:
+        table = read_extract_cache(date)
+        if table is None:
+            raise ValueError(f"No cached extract for {date}")
+        span["rows"] = table.num_rows
+        span["bytes_in"] = table.nbytes
+
+    loaded_at = pa.scalar(datetime.utcnow(), type=pa.timestamp("us"))
+    return table.append_column("loaded_at", pa.repeat(loaded_at, table.num_rows))
+
+
+@instrumented(FUNCTION_NAME)
+def rewrite_from_cache(start_date: str, end_date: str, max_workers: int | None = None) -> dict:
+    """
+    Reescribe las particiones del rango desde la caché de extracts, sin
+    queries a BigQuery: aplica el formato actual del landing (perfil Parquet,
+    TAXI_MONEY_TYPE, DERIVE_SILVER_COLUMNS, partes) a los días ya extraídos.
+
+    Lectura (memory mapping) y escritura corren en run_date_pipeline con
+    REWRITE_MAX_WORKERS threads por etapa: conversión, encoding Parquet y
+    compresión son kernels de Arrow que liberan el GIL, así que usan todos
+    los núcleos. Las fechas sin extract en la caché no se tocan y se
+    devuelven en missing_from_cache.
+
+    Args:
+        start_date: Fecha inicio (YYYY-MM-DD)
+        end_date: Fecha fin (YYYY-MM-DD)
+        max_workers: Threads por etapa (default: REWRITE_MAX_WORKERS)
+
+    Returns:
+        Dict con resultado de la operacion
+    """
+    if not EXTRACT_CACHE_DIR:
+        raise ValueError("EXTRACT_CACHE_DIR is not set - there is no extract cache to rewrite from")
+
+    all_dates = get_date_range(start_date, end_date)
+    cached = cached_extract_dates(start_date, end_date)
+    dates = [d for d in all_dates if d in cached]
+    missing = [d for d in all_dates if d not in cached]
+    workers = max_workers or REWRITE_MAX_WORKERS
+
+    logger.info(f"Rewriting {len(dates)} dates from the extract cache ({len(missing)} not cached)")
+    processed, errors = run_date_pipeline(
+        dates,
+        load_cached_extract,
+        lambda table, date: write_daily_table(table, GCS_BUCKET, date),
+        max_workers=workers,
+        max_in_flight=2 * workers,
+    )
+
+    total_trips = sum(p["rows"] for p in processed)
+    result = {
+        "status": "success",
+        "message": f"Rewrote {len(processed)} partitions from the extract cache ({total_trips} trips total)",
+        "date_range": {"start": start_date, "end": end_date},
+        "total_dates_in_range": len(all_dates),
+        "new_dates_processed": len(processed),
+        "dates_written": [p["date"] for p in processed],
+        "missing_from_cache": missing,
+        "total_trips": total_trips,
+        "max_workers": workers,
+        "bigquery_jobs": 0,
+        "gcs_path": f"gs://{GCS_BUCKET}/{PARQUET_BASE_PATH}/date=*/"
+    }
+
+    if errors:
+        result["errors"] = errors
+        result["status"] = "partial_success" if processed else "error"
+
+    return result
+
+
+def backfill_checkpoint_path(job_id: str) -> str:
+    """Ruta del checkpoint de un job de backfill dentro del bucket."""
+    return f"{BACKFILL_PREFIX}/{job_id}.json"
+
+
+def load_backfill_checkpoint(bucket_name: str, job_id: str) -> Tuple[dict | None, int]:
+    """
+    Lee el checkpoint de un job de backfill.
+
+    Returns:
+        Tupla (checkpoint, generation); (None, 0) si el job no existe
+    """
+    from google.api_core import exceptions as gcs_exceptions
+
+    client = get_storage_client()
+    blob = client.bucket(bucket_name).blob(backfill_checkpoint_path(job_id))
+    try:
+        checkpoint = json.loads(blob.download_as_bytes())
+    except gcs_exceptions.NotFound:
+        return None, 0
+    return checkpoint, blob.generation
+
+
+def save_backfill_checkpoint(bucket_name: str, checkpoint: dict, generation: int) -> int:
+    """
+    Guarda el checkpoint condicionado a la generación leída, de modo que dos
+    invocaciones que reanudan el mismo job a la vez no se pisen el progreso.
+
+    Args:
+        bucket_name: Nombre del bucket GCS
+        checkpoint: Estado del job
+        generation: Generación leída (0 si el job es nuevo)
+
+    Returns:
+        Nueva generación del checkpoint
+    """
+    from google.api_core import exceptions as gcs_exceptions
+
+    checkpoint["updated_at"] = datetime.utcnow().isoformat()
+
+    client = get_storage_client()
+    blob = client.bucket(bucket_name).blob(backfill_checkpoint_path(checkpoint["job_id"]))
+    try:
+        blob.upload_from_string(
+            json.dumps(checkpoint, sort_keys=True),
+            content_type="application/json",
+            if_generation_match=generation,
+        )
+    except gcs_exceptions.PreconditionFailed:
+        raise RuntimeError(
+            f"Backfill job {checkpoint['job_id']} was updated by another invocation"
+        )
+    return blob.generation
+
+
+@instrumented(FUNCTION_NAME)
+def start_backfill(
+    start_date: str,
+    end_date: str,
+    job_id: str | None = None,
+    force: bool = False,
+    max_workers: int | None = None,
+    write_path: str | None = None,
+    time_budget: float | None = None,
+    clock: Callable[[], float] | None = None,
+) -> dict:
+    """
+    Crea un job de backfill y procesa fechas hasta agotar el presupuesto de tiempo.
+
+    Si ya existe un job con ese job_id, lo reanuda (la llamada es idempotente).
+
+    Args:
+        start_date: Fecha inicio (YYYY-MM-DD)
+        end_date: Fecha fin (YYYY-MM-DD)
+        job_id: Identificador del job (default: generado a partir del rango)
+        force: Si es True, reprocesa también las fechas que ya existen en GCS
+        max_workers: Threads por etapa (default: INGEST_MAX_WORKERS)
+        write_path: "pandas" o "arrow" (default: WRITE_PATH)
+        time_budget: Segundos de trabajo de esta invocación (default: BACKFILL_TIME_BUDGET)
+        clock: Reloj monotónico en segundos (default: time.monotonic)
+
+    Returns:
+        Dict con el progreso del job (ver run_backfill)
+    """
+    job_id = job_id or f"{start_date}_{end_date}_{uuid.uuid4().hex[:8]}"
+
+    checkpoint, generation = load_backfill_checkpoint(GCS_BUCKET, job_id)
+    if checkpoint is None:
+        get_date_range(start_date, end_date)  # valida el rango antes de crear el job
+        checkpoint = {
+            "job_id": job_id,
+            "start_date": start_date,
+            "end_date": end_date,
+            "force": force,
+            "max_workers": max_workers,
+            "write_path": write_path,
+            "status": "running",
+            "created_at": datetime.utcnow().isoformat(),
+            "invocations": 0,
+            "completed": {},
+            "skipped": [],
+            "errors": {},
+        }
+        generation = save_backfill_checkpoint(GCS_BUCKET, checkpoint, 0)
+        logger.info(f"Created backfill job {job_id} for {start_date} to {end_date}")
+    elif (checkpoint["start_date"], checkpoint["end_date"]) != (start_date, end_date):
+        raise ValueError(
+            f"Backfill job {job_id} covers {checkpoint['start_date']} to {checkpoint['end_date']}"
+        )
+
+    return run_backfill(checkpoint, generation, time_budget, clock)
+
+
+@instrumented(FUNCTION_NAME)
+def resume_backfill(
+    job_id: str,
+    time_budget: float | None = None,
+    clock: Callable[[], float] | None = None,
+) -> dict:
+    """
+    Reanuda un job de backfill desde su último checkpoint.
+
+    Args:
+        job_id: Identificador del job
+        time_budget: Segundos de trabajo de esta invocación (default: BACKFILL_TIME_BUDGET)
+        clock: Reloj monotónico en segundos (default: time.monotonic)
+
+    Returns:
+        Dict con el progreso del job (ver run_backfill)
+    """
+    checkpoint, generation = load_backfill_checkpoint(GCS_BUCKET, job_id)
+    if checkpoint is None:
+        raise ValueError(f"Backfill job {job_id} not found")
+    return run_backfill(checkpoint, generation, time_budget, clock)
+
+
+def run_backfill(
+    checkpoint: dict,
+    generation: int,
+    time_budget: float | None = None,
+    clock: Callable[[], float] | None = None,
+) -> dict:
+    """
+    Procesa las fechas pendientes de un job en lotes de BACKFILL_BATCH_DAYS,
+    guardando el checkpoint tras cada lote.
+
+    Antes de empezar un lote comprueba que el tiempo transcurrido más la
+    duración del lote más lento hasta ahora cabe en el presupuesto; si no,
+    para y deja el job en estado "running" para que otra invocación lo reanude.
+    El presupuesto nunca supera FUNCTION_TIMEOUT_SECONDS - BACKFILL_SAFETY_MARGIN.
+
+    Las fechas con error se reintentan en la siguiente invocación. Con
+    presupuesto de bytes (ver plan_extract_budget) cada lote se planifica con
+    dry run; si alguna fecha no cabe, se procesan las admitidas y el job para
+    en estado "running" hasta la siguiente invocación. Las fechas cuya query no
+    cabe ni con el presupuesto entero se registran como error.
+
+    Args:
+        checkpoint: Estado del job (de load_backfill_checkpoint)
+        generation: Generación del checkpoint leído
+        time_budget: Segundos de trabajo de esta invocación (default: BACKFILL_TIME_BUDGET)
+        clock: Reloj monotónico en segundos (default: time.monotonic)
+
+    Returns:
+        Dict con el progreso del job y el trabajo de esta invocación
+    """
+    clock = clock or time.monotonic
+    started = clock()
+    budget = min(
+        time_budget if time_budget is not None else BACKFILL_TIME_BUDGET,
+        FUNCTION_TIMEOUT_SECONDS - BACKFILL_SAFETY_MARGIN,
+    )
+
+    job_id = checkpoint["job_id"]
+    all_dates = get_date_range(checkpoint["start_date"], checkpoint["end_date"])
+    completed = checkpoint["completed"]
+
+    # Solo la primera invocación consulta GCS; después manda el checkpoint
+    if checkpoint["invocations"] == 0 and not checkpoint["force"]:
+        with stage_span("existing_dates"):
+            existing = get_existing_dates(GCS_BUCKET, checkpoint["start_date"], checkpoint["end_date"])
+        checkpoint["skipped"] = sorted(existing - set(completed))
+    checkpoint["invocations"] += 1
+
+    done = set(completed) | set(checkpoint["skipped"])
+    pending = [d for d in all_dates if d not in done]
+    logger.info(f"Backfill job {job_id}: {len(pending)} pending dates, budget {budget:.0f}s")
+
+    use_arrow = (checkpoint["write_path"] or WRITE_PATH) == "arrow"
+    batch_estimate = 0.0
+    written_now: List[str] = []
+    stopped_early = False
+    stats = {"bigquery_jobs": 0, "bytes_processed": 0}
+    budget_reports: List[dict | None] = []
+
+    for i in range(0, len(pending), BACKFILL_BATCH_DAYS):
+        batch = pending[i:i + BACKFILL_BATCH_DAYS]
+        if clock() - started + batch_estimate > budget:
+            stopped_early = True
+            logger.info(f"Backfill job {job_id}: time budget reached, stopping before {batch[0]}")
+            break
+
+        units, byte_budget = plan_extract_budget([[d] for d in batch], spent=stats["bytes_processed"])
+        budget_reports.append(byte_budget)
+        bytes_exhausted = False
+        if byte_budget is not None:
+            for unit in byte_budget["units"]:
+                if unit.get("exceeds_budget"):
+                    checkpoint["errors"][unit["start"]] = "Query exceeds the byte budget"
+                elif not unit["admitted"]:
+                    bytes_exhausted = True
+        batch = [unit[0] for unit in units]
+        if not batch:
+            settle_extract_budget(byte_budget, 0)
+            if bytes_exhausted:
+                stopped_early = True
+                logger.info(f"Backfill job {job_id}: byte budget reached, stopping before {pending[i]}")
+                break
+            continue
+
+        batch_started = clock()
+        bytes_before = stats["bytes_processed"]
+        metrics = {date: {"duration_seconds": 0.0} for date in batch}
+
+        def fetch(date):
+            t0 = clock()
+            try:
+                if use_arrow:
+                    return start_taxi_query_for_date(date, stats)
+                return fetch_taxi_data_for_date(date, stats)
+            finally:
+                metrics[date]["duration_seconds"] += clock() - t0
+
+        def write(data, date):
+            t0 = clock()
+            try:
+                if use_arrow:
+                    return write_daily_parquet_stream(data, GCS_BUCKET, date, metrics[date])
+                return write_daily_parquet(data, GCS_BUCKET, date, metrics[date])
+            finally:
+                metrics[date]["duration_seconds"] += clock() - t0
+
+        processed, errors = run_date_pipeline(batch, fetch, write, max_workers=checkpoint["max_workers"])
+
+        for p in processed:
+            completed[p["date"]] = {
+                "rows": p["rows"],
+                "bytes": metrics[p["date"]].get("bytes_written", 0),
+                "duration_seconds": round(metrics[p["date"]]["duration_seconds"], 3),
+                "gcs_uri": p["gcs_uri"],
+            }
+            checkpoint["errors"].pop(p["date"], None)
+        for e in errors:
+            checkpoint["errors"][e["date"]] = e["error"]
+        written_now.extend(p["date"] for p in processed)
+
+        settle_extract_budget(byte_budget, stats["bytes_processed"] - bytes_before)
+
+        generation = save_backfill_checkpoint(GCS_BUCKET, checkpoint, generation)
+        batch_estimate = max(batch_estimate, clock() - batch_started)
+        if bytes_exhausted:
+            stopped_early = True
+            logger.info(f"Backfill job {job_id}: byte budget reached, deferring the rest of the job")
+            break
+
+    remaining = [d for d in all_dates if d not in completed and d not in checkpoint["skipped"]]
+    if not remaining:
+        checkpoint["status"] = "completed"
+    elif stopped_early:
+        checkpoint["status"] = "running"
+    else:
+        checkpoint["status"] = "failed"
+    generation = save_backfill_checkpoint(GCS_BUCKET, checkpoint, generation)
+
+    elapsed = clock() - started
+    logger.info(
+        f"Backfill job {job_id}: {checkpoint['status']}, {len(written_now)} dates this invocation, "
+        f"{len(remaining)} remaining, {elapsed:.1f}s"
+    )
+
+    result = {
+        "status": "success" if not checkpoint["errors"] else "partial_success",
+        "job_id": job_id,
+        "job_status": checkpoint["status"],
+        "date_range": {"start": checkpoint["start_date"], "end": checkpoint["end_date"]},
+        "total_dates_in_range": len(all_dates),
+        "processed_this_invocation": len(written_now),
+        "dates_written": sorted(written_now),
+        "completed_dates": len(completed),
+        "skipped_dates": len(checkpoint["skipped"]),
+        "remaining_dates": len(remaining),
+        "total_trips": sum(c["rows"] for c in completed.values()),
+        "bytes_written": sum(c["bytes"] for c in completed.values()),
+        "invocations": checkpoint["invocations"],
+        "elapsed_seconds": round(elapsed, 3),
+        "time_budget_seconds": budget,
+        "bigquery_jobs": stats["bigquery_jobs"],
+        "bytes_processed": stats["bytes_processed"],
+        "checkpoint_uri": f"gs://{GCS_BUCKET}/{backfill_checkpoint_path(job_id)}",
+    }
+    byte_budget = merge_budget_reports(budget_reports)
+    if byte_budget is not None:
+        result["byte_budget"] = byte_budget
+    if checkpoint["errors"]:
+        result["errors"] = [{"date": d, "error": err} for d, err in sorted(checkpoint["errors"].items())]
+    return result
+
+
 @functions_framework.http
 def ingest_taxis(request):
     """
@@ -358,11 +1885,29 @@ def ingest_taxis(request):
     - end_date: Fecha fin (YYYY-MM-DD) - solo para mode=range
     - offset_days: Días de offset para mode=daily_offset (default: 364)
     - force: Si es "true", reprocesa aunque exista
+    - debug_profile: Si es "true", añade top-N de cProfile y tracemalloc al resultado
+    - max_workers: Threads por etapa para mode=range (default: INGEST_MAX_WORKERS)
+    - extract_mode: "per_date" o "range" para mode=range (default: EXTRACT_MODE)
+    - write_path: "pandas" o "arrow" (default: WRITE_PATH)
+    - job_id: Identificador del job para mode=backfill (opcional) y mode=resume (obligatorio)
+    - time_budget: Segundos de trabajo para mode=backfill/resume (default: BACKFILL_TIME_BUDGET)
+    - chunk_days: Fechas por chunk para mode=fanout (default: FANOUT_CHUNK_DAYS)
+    - job_id: También identifica el job en mode=fanout (opcional) y mode=fanout_status (obligatorio)
+    - retry: Si es "false", mode=fanout_status no republica los chunks fallidos
+    - dry_run: Si es "true", mode=refresh solo reporta los días cambiados
+    - refresh_unknown: Si es "true", mode=refresh reprocesa también las particiones sin huella
+    - max_workers: También fija los threads por etapa de mode=rewrite (default: REWRITE_MAX_WORKERS)
 
     Ejemplos:
     - /ingest?mode=daily_offset  → Procesa fecha de hace 364 días
     - /ingest?mode=daily_offset&offset_days=365  → Procesa fecha de hace 365 días
     - /ingest?mode=range&start_date=2024-01-01&end_date=2024-01-31  → Procesa rango
+    - /ingest?mode=backfill&start_date=2023-06-01&end_date=2023-12-31  → Crea job de backfill
+    - /ingest?mode=resume&job_id=...  → Continúa el job desde su checkpoint
+    - /ingest?mode=fanout&start_date=2023-01-01&end_date=2023-12-31  → Reparte el rango entre workers
+    - /ingest?mode=fanout_status&job_id=...  → Resumen del job y reintento de chunks fallidos
+    - /ingest?mode=refresh&start_date=2023-01-01&end_date=2023-12-31  → Re-ingesta días cambiados
+    - /ingest?mode=rewrite&start_date=2023-01-01&end_date=2023-12-31  → Reescribe desde la caché de extracts
 
     Returns:
         JSON response con resultado
@@ -371,6 +1916,7 @@ def ingest_taxis(request):
         # Obtener parametros del request
         mode = request.args.get("mode", "daily_offset")
         force = request.args.get("force", "").lower() == "true"
+        debug_profile = request.args.get("debug_profile", "").lower() == "true"
 
         # Si es POST, intentar leer del body
         body = {}
@@ -379,9 +1925,12 @@ def ingest_taxis(request):
                 body = request.get_json(silent=True) or {}
                 mode = body.get("mode", mode)
                 force = force or body.get("force", False)
+                debug_profile = debug_profile or body.get("debug_profile", False)
             except Exception:
                 pass
 
+        write_path = request.args.get("write_path") or body.get("write_path")
+
         # Modo daily_offset: calcula fecha basada en offset
         if mode == "daily_offset":
             offset_days_param = request.args.get("offset_days") or body.get("offset_days")
@@ -389,11 +1938,110 @@ def ingest_taxis(request):
             target_date = calculate_offset_date(offset_days)
 
             logger.info(f"Mode: daily_offset, offset_days: {offset_days or OFFSET_DAYS}, target_date: {target_date}")
-            result = process_single_date(target_date, force)
+            result = process_single_date(target_date, force, write_path, debug_profile=debug_profile)
             result["mode"] = "daily_offset"
             result["offset_days"] = offset_days or OFFSET_DAYS
             result["execution_date"] = datetime.now().strftime("%Y-%m-%d")
 
+        # Modos backfill/resume: job reanudable con checkpoint en GCS
+        elif mode in ("backfill", "resume"):
+            job_id = request.args.get("job_id") or body.get("job_id")
+            time_budget_param = request.args.get("time_budget") or body.get("time_budget")
+            time_budget = float(time_budget_param) if time_budget_param else None
+
+            if mode == "resume":
+                if not job_id:
+                    return json.dumps({
+                        "status": "error",
+                        "message": "job_id is required for resume mode"
+                    }), 400, {"Content-Type": "application/json"}
+                result = resume_backfill(job_id, time_budget, debug_profile=debug_profile)
+            else:
+                start_date = request.args.get("start_date") or body.get("start_date")
+                end_date = request.args.get("end_date") or body.get("end_date")
+                if not start_date or not end_date:
+                    return json.dumps({
+                        "status": "error",
+                        "message": "start_date and end_date are required for backfill mode"
+                    }), 400, {"Content-Type": "application/json"}
+
+                max_workers = parse_max_workers(request.args.get("max_workers") or body.get("max_workers"))
+
+                result = start_backfill(
+                    start_date, end_date, job_id, force, max_workers, write_path, time_budget,
+                    debug_profile=debug_profile,
+                )
+            result["mode"] = mode
+
+        # Modos fanout/fanout_status: chunks publicados en Pub/Sub y agregados desde GCS
+        elif mode in ("fanout", "fanout_status"):
+            job_id = request.args.get("job_id") or body.get("job_id")
+
+            if mode == "fanout_status":
+                if not job_id:
+                    return json.dumps({
+                        "status": "error",
+                        "message": "job_id is required for fanout_status mode"
+                    }), 400, {"Content-Type": "application/json"}
+                retry = str(request.args.get("retry") or body.get("retry", "true")).lower() != "false"
+                result = fanout_status(job_id, retry)
+            else:
+                start_date = request.args.get("start_date") or body.get("start_date")
+                end_date = request.args.get("end_date") or body.get("end_date")
+                if not start_date or not end_date:
+                    return json.dumps({
+                        "status": "error",
+                        "message": "start_date and end_date are required for fanout mode"
+                    }), 400, {"Content-Type": "application/json"}
+
+                chunk_days_param = request.args.get("chunk_days") or body.get("chunk_days")
+                chunk_days = int(chunk_days_param) if chunk_days_param else None
+                max_workers = parse_max_workers(request.args.get("max_workers") or body.get("max_workers"))
+                extract_mode = request.args.get("extract_mode") or body.get("extract_mode")
+
+                result = start_fanout(
+                    start_date, end_date, job_id, force, chunk_days, max_workers, extract_mode, write_path,
+                    debug_profile=debug_profile,
+                )
+            result["mode"] = mode
+
+        # Modo refresh: re-ingesta los días cuya huella de origen cambió
+        elif mode == "refresh":
+            start_date = request.args.get("start_date") or body.get("start_date")
+            end_date = request.args.get("end_date") or body.get("end_date")
+            if not start_date or not end_date:
+                return json.dumps({
+                    "status": "error",
+                    "message": "start_date and end_date are required for refresh mode"
+                }), 400, {"Content-Type": "application/json"}
+
+            dry_run = str(request.args.get("dry_run") or body.get("dry_run", "false")).lower() == "true"
+            refresh_unknown = str(
+                request.args.get("refresh_unknown") or body.get("refresh_unknown", "false")
+            ).lower() == "true"
+            max_workers = parse_max_workers(request.args.get("max_workers") or body.get("max_workers"))
+
+            result = detect_source_changes(
+                start_date, end_date, dry_run, refresh_unknown, max_workers, write_path,
+                debug_profile=debug_profile,
+            )
+            result["mode"] = "refresh"
+
+        # Modo rewrite: reescribe particiones desde la caché local de extracts
+        elif mode == "rewrite":
+            start_date = request.args.get("start_date") or body.get("start_date")
+            end_date = request.args.get("end_date") or body.get("end_date")
+            if not start_date or not end_date:
+                return json.dumps({
+                    "status": "error",
+                    "message": "start_date and end_date are required for rewrite mode"
+                }), 400, {"Content-Type": "application/json"}
+
+            max_workers = parse_max_workers(request.args.get("max_workers") or body.get("max_workers"))
+
+            result = rewrite_from_cache(start_date, end_date, max_workers, debug_profile=debug_profile)
+            result["mode"] = "rewrite"
+
         # Modo range: procesa rango de fechas
         else:
             start_date = request.args.get("start_date") or body.get("start_date")
@@ -404,8 +2052,15 @@ def ingest_taxis(request):
                     "status": "error",
                     "message": "start_date and end_date are required for range mode"
                 }), 400, {"Content-Type": "application/json"}
-            
-            result = process_taxi_ingestion(start_date, end_date, force)
+
+            max_workers = parse_max_workers(request.args.get("max_workers") or body.get("max_workers"))
+
+            extract_mode = request.args.get("extract_mode") or body.get("extract_mode")
+
+            result = process_taxi_ingestion(
+                start_date, end_date, force, max_workers, extract_mode, write_path,
+                debug_profile=debug_profile,
+            )
             result["mode"] = "range"
 
         return json.dumps(result), 200, {"Content-Type": "application/json"}
@@ -423,11 +2078,22 @@ def ingest_taxis_pubsub(cloud_event):
     Usado por Cloud Scheduler.
 
     El mensaje puede contener:
-    - mode: "daily_offset" (default) o "range"
+    - mode: "daily_offset" (default) o cualquier otro modo del trigger HTTP
+      (range, backfill, resume, fanout, fanout_status, refresh, rewrite); un
+      modo desconocido se rechaza con error
     - start_date: Fecha inicio (YYYY-MM-DD) - solo para mode=range
     - end_date: Fecha fin (YYYY-MM-DD) - solo para mode=range
     - offset_days: Días de offset para mode=daily_offset
     - force: Si es true, reprocesa aunque exista
+    - debug_profile: Si es true, añade top-N de cProfile y tracemalloc al resultado
+    - max_workers: Threads por etapa para mode=range
+    - extract_mode: "per_date" o "range" para mode=range
+    - write_path: "pandas" o "arrow"
+    - job_id, time_budget: para mode=backfill/resume
+    - dry_run, refresh_unknown: para mode=refresh
+    - job_id, chunk_days, retry: para mode=fanout/fanout_status
+    - fanout_job_id, chunk_id, attempt: chunk de un job de fan-out (mode=range); el
+      resultado, o el error, se guarda en GCS para que fanout_status lo agregue
     """
     import base64
 
@@ -442,21 +2108,102 @@ def ingest_taxis_pubsub(cloud_event):
 
         mode = data.get("mode", "daily_offset")  # Default a daily_offset para scheduler
         force = data.get("force", False)
+        debug_profile = data.get("debug_profile", False)
 
         if mode == "daily_offset":
             offset_days = data.get("offset_days")
             target_date = calculate_offset_date(offset_days)
             logger.info(f"Pub/Sub trigger - Mode: daily_offset, target_date: {target_date}")
-            result = process_single_date(target_date, force)
-        else:
+            result = process_single_date(target_date, force, data.get("write_path"), debug_profile=debug_profile)
+        elif mode == "resume":
+            if not data.get("job_id"):
+                raise ValueError("job_id required for resume mode")
+            result = resume_backfill(data["job_id"], data.get("time_budget"), debug_profile=debug_profile)
+        elif mode == "backfill":
+            start_date = data.get("start_date")
+            end_date = data.get("end_date")
+            if not start_date or not end_date:
+                raise ValueError("start_date and end_date required for backfill mode")
+            result = start_backfill(
+                start_date,
+                end_date,
+                data.get("job_id"),
+                force,
+                parse_max_workers(data.get("max_workers")),
+                data.get("write_path"),
+                data.get("time_budget"),
+                debug_profile=debug_profile,
+            )
+        elif mode == "refresh":
+            start_date = data.get("start_date")
+            end_date = data.get("end_date")
+            if not start_date or not end_date:
+                raise ValueError("start_date and end_date required for refresh mode")
+            result = detect_source_changes(
+                start_date,
+                end_date,
+                str(data.get("dry_run", "false")).lower() == "true",
+                str(data.get("refresh_unknown", "false")).lower() == "true",
+                parse_max_workers(data.get("max_workers")),
+                data.get("write_path"),
+                debug_profile=debug_profile,
+            )
+        elif mode == "fanout":
+            start_date = data.get("start_date")
+            end_date = data.get("end_date")
+            if not start_date or not end_date:
+                raise ValueError("start_date and end_date required for fanout mode")
+            chunk_days = data.get("chunk_days")
+            result = start_fanout(
+                start_date,
+                end_date,
+                data.get("job_id"),
+                force,
+                int(chunk_days) if chunk_days else None,
+                parse_max_workers(data.get("max_workers")),
+                data.get("extract_mode"),
+                data.get("write_path"),
+                debug_profile=debug_profile,
+            )
+        elif mode == "fanout_status":
+            if not data.get("job_id"):
+                raise ValueError("job_id required for fanout_status mode")
+            result = fanout_status(data["job_id"], str(data.get("retry", "true")).lower() != "false")
+        elif mode == "rewrite":
+            start_date = data.get("start_date")
+            end_date = data.get("end_date")
+            if not start_date or not end_date:
+                raise ValueError("start_date and end_date required for rewrite mode")
+            result = rewrite_from_cache(
+                start_date,
+                end_date,
+                parse_max_workers(data.get("max_workers")),
+                debug_profile=debug_profile,
+            )
+        elif mode == "range":
             start_date = data.get("start_date")
             end_date = data.get("end_date")
             if not start_date or not end_date:
                 raise ValueError("start_date and end_date required for range mode")
-            result = process_taxi_ingestion(start_date, end_date, force)
+            result = process_taxi_ingestion(
+                start_date,
+                end_date,
+                force,
+                parse_max_workers(data.get("max_workers")),
+                data.get("extract_mode"),
+                data.get("write_path"),
+                debug_profile=debug_profile,
+            )
+            if data.get("fanout_job_id"):
+                record_fanout_chunk(GCS_BUCKET, data, result)
+        else:
+            # Antes caía en range y procesaba el rango con un modo que el mensaje no pedía
+            raise ValueError(f"Unknown mode for Pub/Sub trigger: {mode}")
 
         logger.info(f"Pub/Sub trigger completed: {result}")
 
     except Exception as e:
         logger.exception(f"Error in Pub/Sub trigger: {str(e)}")
+        if data.get("fanout_job_id"):
+            record_fanout_chunk(GCS_BUCKET, data, {"status": "error", "message": str(e)})
         raise
\ No newline at end of file
@@ -0,0 +1,251 @@
+"""
+ingest_taxis: dry runs y presupuesto de bytes de las queries de extracción.
+
+Antes de lanzar las queries de un rango se estima con dry runs lo que escanea
+cada unidad (día o tramo) y se admiten solo las que caben en
+QUERY_BYTE_BUDGET_GB por invocación y en QUERY_DAILY_BYTE_BUDGET_GB por día de
+cuota. El consumo diario se lleva en un ledger en GCS compartido por todas las
+instancias (_budgets/taxis/), actualizado con escrituras condicionales.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, List, Tuple
+
+from ingest_shared.clients import get_bigquery_client, get_storage_client
+from ingest_shared.instrumentation import stage_span
+from ingest_shared.partitions import MANIFEST_MAX_RETRIES
+from taxis_common import GCS_BUCKET, INGEST_MAX_WORKERS
+from taxis_partitions import PARQUET_BASE_PATH
+from taxis_schema import _extract_query_sql, extract_where_clause
+
+logger = logging.getLogger(__name__)
+
+# Presupuesto de bytes procesados por las queries de extracción (0 = sin límite)
+QUERY_BYTE_BUDGET_GB = float(os.environ.get("QUERY_BYTE_BUDGET_GB", "0"))
+QUERY_DAILY_BYTE_BUDGET_GB = float(os.environ.get("QUERY_DAILY_BYTE_BUDGET_GB", "0"))
+EXTRACT_DRY_RUN = os.environ.get("EXTRACT_DRY_RUN", "false").lower() == "true"
+# La cuota diaria de BigQuery se reinicia a medianoche del Pacífico
+QUOTA_TIMEZONE = "America/Los_Angeles"
+
+# Bytes consumidos por día de cuota: _budgets/taxis/{YYYY-MM-DD}.json
+BUDGET_PREFIX = f"_budgets/{PARQUET_BASE_PATH}"
+
+
+def estimate_query_bytes(where_clause: str) -> int:
+    """
+    Bytes que procesaría la query de extracción según un dry run de BigQuery
+    (no consume cuota ni se factura).
+
+    Args:
+        where_clause: Condición WHERE (sin la palabra clave)
+
+    Returns:
+        total_bytes_processed estimado
+    """
+    from google.cloud import bigquery
+
+    client = get_bigquery_client()
+    job_config = bigquery.QueryJobConfig(dry_run=True, use_query_cache=False)
+    job = client.query(_extract_query_sql(where_clause), job_config=job_config)
+    return job.total_bytes_processed or 0
+
+
+def byte_budgets() -> Tuple[int, int]:
+    """Presupuestos (por invocación, diario) en bytes; 0 = sin límite."""
+    return int(QUERY_BYTE_BUDGET_GB * 1024**3), int(QUERY_DAILY_BYTE_BUDGET_GB * 1024**3)
+
+
+def quota_day() -> str:
+    """Día de cuota de BigQuery en curso (YYYY-MM-DD en la hora del Pacífico)."""
+    from zoneinfo import ZoneInfo
+
+    return datetime.now(ZoneInfo(QUOTA_TIMEZONE)).strftime("%Y-%m-%d")
+
+
+def budget_ledger_path(day: str) -> str:
+    """Ruta del contador de bytes de un día de cuota: _budgets/taxis/{día}.json"""
+    return f"{BUDGET_PREFIX}/{day}.json"
+
+
+def read_budget_ledger(bucket_name: str, day: str) -> Tuple[int, int]:
+    """
+    Lee los bytes ya consumidos en un día de cuota.
+
+    Args:
+        bucket_name: Nombre del bucket GCS
+        day: Día de cuota (YYYY-MM-DD)
+
+    Returns:
+        Tupla (bytes, generación); (0, 0) si aún no hay contador
+    """
+    from google.api_core import exceptions as gcs_exceptions
+
+    blob = get_storage_client().bucket(bucket_name).blob(budget_ledger_path(day))
+    try:
+        ledger = json.loads(blob.download_as_bytes())
+    except gcs_exceptions.NotFound:
+        return 0, 0
+    return ledger["bytes"], blob.generation
+
+
+def _update_budget_ledger(bucket_name: str, day: str, update: Callable[[int], int]) -> int | None:
+    """
+    Aplica update(bytes consumidos) -> bytes nuevos al contador del día con
+    escritura condicional a la generación leída, reintentando si otra
+    invocación lo modificó entre medias.
+
+    Returns:
+        Bytes consumidos antes de la actualización, o None si no se pudo escribir
+    """
+    from google.api_core import exceptions as gcs_exceptions
+
+    bucket = get_storage_client().bucket(bucket_name)
+    for _ in range(MANIFEST_MAX_RETRIES):
+        used, generation = read_budget_ledger(bucket_name, day)
+        new_used = update(used)
+        if new_used == used:
+            return used
+        payload = {"bytes": max(0, new_used), "updated_at": datetime.utcnow().isoformat()}
+        try:
+            bucket.blob(budget_ledger_path(day)).upload_from_string(
+                json.dumps(payload),
+                content_type="application/json",
+                if_generation_match=generation,
+            )
+            return used
+        except gcs_exceptions.PreconditionFailed:
+            continue
+
+    logger.warning(f"Could not update byte budget ledger for {day} after {MANIFEST_MAX_RETRIES} attempts")
+    return None
+
+
+def plan_extract_budget(units: List[List[str]], spent: int = 0) -> Tuple[List[List[str]], dict | None]:
+    """
+    Estima con dry run los bytes de cada query de extracción planificada y
+    admite las que caben en el presupuesto de la invocación y del día.
+
+    Las unidades (un día en per_date, un tramo en range) se admiten en orden
+    cronológico mientras quepan; las que no caben se aplazan y las siguientes
+    más pequeñas aún pueden entrar. Los bytes admitidos se reservan en el
+    contador del día antes de lanzar las queries, así que invocaciones
+    concurrentes no pueden pasarse entre todas del presupuesto diario.
+
+    Args:
+        units: Fechas de cada query, en orden cronológico
+        spent: Bytes ya procesados por esta invocación (lotes anteriores de un backfill)
+
+    Returns:
+        Tupla (unidades admitidas, informe); el informe es None si no hay
+        presupuesto ni EXTRACT_DRY_RUN (todas se admiten sin dry run)
+    """
+    invocation_budget, daily_budget = byte_budgets()
+    if not (invocation_budget or daily_budget or EXTRACT_DRY_RUN):
+        return units, None
+
+    estimates: List[int] = []
+    if units:
+        with stage_span("dry_run", rows=len(units)) as span:
+            with ThreadPoolExecutor(max_workers=max(1, INGEST_MAX_WORKERS), thread_name_prefix="dry_run") as pool:
+                estimates = list(
+                    pool.map(lambda unit: estimate_query_bytes(extract_where_clause(unit[0], unit[-1])), units)
+                )
+            span["bytes_in"] = sum(estimates)
+
+    day = quota_day()
+    decisions: List[bool] = []
+
+    def admit(daily_used: int) -> int:
+        decisions.clear()
+        remaining = [
+            invocation_budget - spent if invocation_budget else None,
+            daily_budget - daily_used if daily_budget else None,
+        ]
+        remaining = min((r for r in remaining if r is not None), default=None)
+        reserved = 0
+        for estimate in estimates:
+            fits = remaining is None or reserved + estimate <= remaining
+            decisions.append(fits)
+            reserved += estimate if fits else 0
+        return daily_used + reserved
+
+    if not units:
+        # Nada que lanzar: el informe solo refleja lo ya consumido en el día
+        daily_used = read_budget_ledger(GCS_BUCKET, day)[0] if daily_budget else None
+    else:
+        daily_used = _update_budget_ledger(GCS_BUCKET, day, admit) if daily_budget else None
+    if daily_budget and daily_used is None:
+        # Sin poder reservar no hay garantía de no pasarse de la cuota: se aplaza todo
+        decisions = [False] * len(units)
+    elif not daily_budget:
+        admit(0)
+
+    admitted = [unit for unit, fits in zip(units, decisions) if fits]
+    deferred = [date for unit, fits in zip(units, decisions) if not fits for date in unit]
+    report = {
+        "invocation_budget_bytes": invocation_budget,
+        "daily_budget_bytes": daily_budget,
+        "quota_day": day,
+        "daily_used_bytes": daily_used,
+        "dry_runs": len(units),
+        "estimated_bytes": sum(e for e, fits in zip(estimates, decisions) if fits),
+        "deferred_estimated_bytes": sum(e for e, fits in zip(estimates, decisions) if not fits),
+        "deferred_dates": deferred,
+        "units": [
+            {"start": unit[0], "end": unit[-1], "estimated_bytes": estimate, "admitted": fits}
+            for unit, estimate, fits in zip(units, estimates, decisions)
+        ],
+    }
+    smallest_budget = min(b for b in (invocation_budget, daily_budget, float("inf")) if b)
+    for unit, estimate in zip(report["units"], estimates):
+        if estimate > smallest_budget:
+            # No cabe ni con el presupuesto entero: se aplazará siempre
+            unit["exceeds_budget"] = True
+            logger.warning(f"Query for {unit['start']}..{unit['end']} ({estimate} bytes) exceeds the byte budget")
+    if deferred:
+        logger.info(
+            f"Byte budget: admitted {len(admitted)} of {len(units)} queries "
+            f"({report['estimated_bytes']} bytes), deferred {len(deferred)} dates"
+        )
+    return admitted, report
+
+
+def settle_extract_budget(report: dict | None, actual_bytes: int) -> dict | None:
+    """
+    Cierra el informe de plan_extract_budget con los bytes reales y corrige la
+    reserva del contador diario con la diferencia (las queries fallidas no
+    consumen cuota).
+
+    Args:
+        report: Informe de plan_extract_budget (None si no hubo presupuesto)
+        actual_bytes: Bytes procesados por las queries admitidas
+
+    Returns:
+        El mismo informe con actual_bytes
+    """
+    if report is None:
+        return None
+    report["actual_bytes"] = actual_bytes
+    delta = actual_bytes - report["estimated_bytes"]
+    if report["daily_budget_bytes"] and delta:
+        _update_budget_ledger(GCS_BUCKET, report["quota_day"], lambda used: used + delta)
+    return report
+
+
+def merge_budget_reports(reports: List[dict | None]) -> dict | None:
+    """Suma los informes de varios planes de una invocación (lotes de un backfill)."""
+    reports = [r for r in reports if r is not None]
+    if not reports:
+        return None
+    merged = dict(reports[0])
+    for key in ("dry_runs", "estimated_bytes", "deferred_estimated_bytes", "actual_bytes"):
+        merged[key] = sum(r.get(key, 0) for r in reports)
+    merged["deferred_dates"] = [d for r in reports for d in r["deferred_dates"]]
+    merged["units"] = [u for r in reports for u in r["units"]]
+    return merged
@@ -0,0 +1,28 @@
+"""
+ingest_taxis: configuración y estado compartidos por main.py y los módulos taxis_*.
+
+Las variables de entorno de la función están documentadas en main.py.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+
+# Nombre de la función en los logs por etapa (STAGE_LOGS, INGEST_DEBUG_PROFILE y
+# DEBUG_PROFILE_TOP_N los lee ingest_shared.instrumentation)
+FUNCTION_NAME = "ingest_taxis"
+
+# Configuracion desde variables de entorno (GCP_PROJECT la lee ingest_shared.clients)
+GCS_BUCKET = os.environ.get("GCS_BUCKET", "orbidi-challenge-data-landing")
+
+# Workers concurrentes por etapa (fetch / write en modo range, dry runs del presupuesto de bytes)
+INGEST_MAX_WORKERS = int(os.environ.get("INGEST_MAX_WORKERS", "4"))
+
+# Protege los contadores de métricas compartidos entre threads
+_stats_lock = threading.Lock()
+
+
+def _add_bytes_written(stats: dict, nbytes: int) -> None:
+    with _stats_lock:
+        stats["bytes_written"] = stats.get("bytes_written", 0) + nbytes
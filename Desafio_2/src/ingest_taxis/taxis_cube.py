@@ -0,0 +1,188 @@
+"""
+ingest_taxis: cubo diario pre-agregado (taxis_agg/).
+
+Con DAILY_AGG (main.py), cada escritura de una partición deja junto a ella un
+cubo por dimensiones de vw_trips_weather_summary con count, sum y sumsq por
+medida. trips_weather_summary_agg combina los cubos en lugar de releer los
+viajes; los parciales por lote (_partial_daily_cube) permiten construirlo en
+la ruta streaming sin tener el día entero en memoria.
+"""
+
+from __future__ import annotations
+
+import io
+from typing import TYPE_CHECKING, Iterable, List, Tuple
+
+from ingest_shared.clients import get_storage_client
+from ingest_shared.instrumentation import stage_span
+from taxis_common import _add_bytes_written
+from taxis_partitions import PARQUET_BASE_PATH
+from taxis_silver import _sql_round2, derive_silver_columns
+
+# Solo para anotaciones: como en main.py, se importan dentro de las funciones
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+# Cubos diarios: taxis_agg/date=YYYY-MM-DD/data.parquet (external table taxi_daily_agg_ext)
+AGG_BASE_PATH = f"{PARQUET_BASE_PATH}_agg"
+
+# Dimensiones y medidas del cubo diario (viajes válidos de silver_taxis). Por
+# medida: count (no nulos), sum y sumsq, suficientes para media, suma y
+# desviación típica de cualquier agregado superior; DAILY_AGG_SUMS solo llevan
+# count y sum (las medias de vw_trips_weather_summary)
+DAILY_AGG_KEYS = ["start_hour", "pickup_community_area", "payment_type", "company"]
+DAILY_AGG_MEASURES = ["trip_minutes", "trip_miles", "fare", "tips"]
+DAILY_AGG_SUMS = ["trip_total", "avg_speed_mph", "tip_percentage"]
+
+
+def _partial_daily_cube(table: pa.Table) -> pa.Table:
+    """Cubo de una tabla del día (o de un tramo de ella) sin renombrar ni ordenar."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    if "is_valid_trip" not in table.column_names:
+        table = derive_silver_columns(table)
+    # stg_taxis descarta los viajes sin hora de inicio; la vista solo usa los válidos
+    table = table.filter(pc.and_(pc.is_valid(table.column("trip_start_timestamp")), table.column("is_valid_trip")))
+
+    def f64(name: str) -> pa.ChunkedArray:
+        return pc.cast(table.column(name), pa.float64())
+
+    # Mismos valores que silver_taxis: importes y millas redondeados a 2 decimales
+    values = {
+        "trip_minutes": table.column("trip_minutes"),
+        "trip_miles": _sql_round2(f64("trip_miles")),
+        "fare": _sql_round2(f64("fare")),
+        "tips": _sql_round2(f64("tips")),
+        "trip_total": _sql_round2(f64("trip_total")),
+        "avg_speed_mph": table.column("avg_speed_mph"),
+        "tip_percentage": table.column("tip_percentage"),
+    }
+    columns = {
+        "start_hour": pc.cast(table.column("start_hour"), pa.int64()),
+        "pickup_community_area": pc.cast(table.column("pickup_community_area"), pa.int64()),
+        "payment_type": pc.fill_null(pc.cast(table.column("payment_type"), pa.string()), "Unknown"),
+        "company": pc.fill_null(pc.cast(table.column("company"), pa.string()), "Unknown"),
+    }
+    aggregations = [([], "count_all")]
+    for name in DAILY_AGG_MEASURES + DAILY_AGG_SUMS:
+        columns[name] = values[name]
+        aggregations += [(name, "count"), (name, "sum")]
+    for name in DAILY_AGG_MEASURES:
+        columns[f"{name}__sq"] = pc.multiply(values[name], values[name])
+        aggregations.append((f"{name}__sq", "sum"))
+    aggregations += [("trip_minutes", "min"), ("trip_minutes", "max")]
+
+    return pa.table(columns).group_by(DAILY_AGG_KEYS, use_threads=False).aggregate(aggregations)
+
+
+def combine_daily_cube(partials: List[pa.Table]) -> pa.Table:
+    """
+    Combina los cubos parciales de un día (uno por tabla o record batch) en el
+    cubo final: counts y sums se suman, min y max se combinan.
+
+    Args:
+        partials: Salidas de _partial_daily_cube
+
+    Returns:
+        Tabla con DAILY_AGG_KEYS, trips, count_/sum_/sumsq_ de DAILY_AGG_MEASURES,
+        count_/sum_ de DAILY_AGG_SUMS y min_/max_trip_minutes, ordenada por las claves
+    """
+    import pyarrow as pa
+
+    table = pa.concat_tables(partials)
+    measures = [name for name in table.column_names if name not in DAILY_AGG_KEYS]
+    how = {"trip_minutes_min": "min", "trip_minutes_max": "max"}
+    # Las columnas de group_by son {columna}_{función}: se vuelven a sumar con el mismo nombre
+    combined = table.group_by(DAILY_AGG_KEYS, use_threads=False).aggregate(
+        [(name, how.get(name, "sum")) for name in measures]
+    )
+    combined = combined.rename_columns(
+        [name.rsplit("_", 1)[0] if name not in DAILY_AGG_KEYS else name for name in combined.column_names]
+    )
+
+    renamed = {"count_all": "trips", "trip_minutes_min": "min_trip_minutes", "trip_minutes_max": "max_trip_minutes"}
+    order = ["trips"]
+    for name in DAILY_AGG_MEASURES + DAILY_AGG_SUMS:
+        renamed[f"{name}_count"] = f"count_{name}"
+        renamed[f"{name}_sum"] = f"sum_{name}"
+        renamed[f"{name}__sq_sum"] = f"sumsq_{name}"
+        order += [f"count_{name}", f"sum_{name}"] + ([f"sumsq_{name}"] if name in DAILY_AGG_MEASURES else [])
+    order += ["min_trip_minutes", "max_trip_minutes"]
+
+    combined = combined.rename_columns([renamed.get(name, name) for name in combined.column_names])
+    return combined.select(DAILY_AGG_KEYS + order).sort_by([(key, "ascending") for key in DAILY_AGG_KEYS])
+
+
+def aggregate_daily_cube(table: pa.Table) -> pa.Table:
+    """
+    Cubo diario de un día de taxis: viajes válidos agrupados por DAILY_AGG_KEYS
+    con count, sum y suma de cuadrados de DAILY_AGG_MEASURES (y count y sum de
+    DAILY_AGG_SUMS), con los mismos valores (redondeos, 'Unknown', is_valid_trip) que
+    silver_taxis. Todo el trabajo ocurre en kernels de Arrow (group_by).
+
+    Args:
+        table: Tabla del día con TAXI_COLUMNS (y las derivadas si ya las tiene)
+
+    Returns:
+        Cubo del día (ver combine_daily_cube)
+    """
+    return combine_daily_cube([_partial_daily_cube(table)])
+
+
+def daily_cube_tables(tables: Iterable[pa.Table]) -> Tuple[Iterable[pa.Table], List[pa.Table]]:
+    """
+    Calcula los cubos parciales de una partición a medida que se consumen sus
+    tablas (ruta Arrow en streaming), como table_fingerprint.
+
+    Args:
+        tables: Tablas Arrow de la partición
+
+    Returns:
+        Tupla (tablas, parciales): las tablas se devuelven tal cual y la lista
+        de parciales queda completa cuando se han consumido todas
+    """
+    partials: List[pa.Table] = []
+
+    def consume():
+        for table in tables:
+            partials.append(_partial_daily_cube(table))
+            yield table
+
+    return consume(), partials
+
+
+def agg_blob_path(date: str) -> str:
+    """Path del cubo diario de una fecha: taxis_agg/date=YYYY-MM-DD/data.parquet"""
+    return f"{AGG_BASE_PATH}/date={date}/data.parquet"
+
+
+def write_daily_cube(cube: pa.Table, bucket_name: str, date: str, stats: dict | None = None) -> str:
+    """
+    Sube el cubo diario de una fecha como Parquet (una fila por celda, no por viaje).
+
+    Se escribe después de la partición de datos: un cubo nunca existe sin sus
+    viajes, y reescribir la partición (force, refresh, rewrite) lo reemplaza.
+
+    Args:
+        cube: Salida de aggregate_daily_cube / combine_daily_cube
+        bucket_name: Nombre del bucket GCS
+        date: Fecha de la partición (YYYY-MM-DD)
+        stats: Dict opcional donde acumular bytes_written
+
+    Returns:
+        URI del cubo en GCS
+    """
+    import pyarrow.parquet as pq
+
+    buffer = io.BytesIO()
+    with stage_span("daily_agg_write", date, rows=cube.num_rows, bytes_in=cube.nbytes) as span:
+        pq.write_table(cube, buffer, compression="zstd")
+        span["bytes_out"] = buffer.tell()
+        buffer.seek(0)
+        blob = get_storage_client().bucket(bucket_name).blob(agg_blob_path(date))
+        blob.upload_from_file(buffer, content_type="application/octet-stream")
+
+    if stats is not None:
+        _add_bytes_written(stats, span["bytes_out"])
+    return f"gs://{bucket_name}/{agg_blob_path(date)}"
@@ -0,0 +1,353 @@
+"""
+ingest_taxis: fan-out de rangos grandes entre instancias (mode=fanout).
+
+start_fanout reparte las fechas pendientes en chunks de FANOUT_CHUNK_DAYS y
+publica uno por mensaje en TAXIS_WORK_TOPIC; cada instancia del worker Pub/Sub
+(ingest_taxis_pubsub) ingesta su chunk y deja su estado en
+_fanout/taxis/{job_id}/. fanout_status agrega ese estado y republica los
+chunks fallidos hasta FANOUT_MAX_ATTEMPTS.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import uuid
+from datetime import datetime
+from typing import TYPE_CHECKING, List, Set, Tuple
+
+from ingest_shared.clients import PROJECT_ID, _get_client, get_storage_client
+from ingest_shared.dates import get_date_range, group_contiguous_dates
+from ingest_shared.instrumentation import instrumented, stage_span
+from taxis_common import FUNCTION_NAME, GCS_BUCKET
+from taxis_partitions import PARQUET_BASE_PATH, get_existing_dates
+
+# Solo para anotaciones: como en main.py, se importan dentro de las funciones
+if TYPE_CHECKING:
+    from google.cloud import pubsub_v1
+
+logger = logging.getLogger(__name__)
+
+# Fan-out: rangos grandes repartidos en chunks entre instancias del worker Pub/Sub
+TAXIS_WORK_TOPIC = os.environ.get("TAXIS_WORK_TOPIC", "ingest-taxis-work")
+FANOUT_CHUNK_DAYS = int(os.environ.get("FANOUT_CHUNK_DAYS", "14"))
+FANOUT_MAX_ATTEMPTS = int(os.environ.get("FANOUT_MAX_ATTEMPTS", "3"))
+
+# Jobs de fan-out junto a las particiones de PARQUET_BASE_PATH:
+# _fanout/taxis/{job_id}/job.json y chunks/{chunk_id}.json
+FANOUT_PREFIX = f"_fanout/{PARQUET_BASE_PATH}"
+
+
+def get_publisher() -> pubsub_v1.PublisherClient:
+    """Cliente de Pub/Sub compartido del proceso (solo lo usa el modo fanout)."""
+
+    def factory() -> pubsub_v1.PublisherClient:
+        from google.cloud import pubsub_v1
+
+        return pubsub_v1.PublisherClient()
+
+    return _get_client("publisher", factory)
+
+
+def work_topic_path() -> str:
+    """Ruta completa del topic de trabajo (TAXIS_WORK_TOPIC admite nombre corto o ruta)."""
+    if TAXIS_WORK_TOPIC.startswith("projects/"):
+        return TAXIS_WORK_TOPIC
+    return f"projects/{PROJECT_ID}/topics/{TAXIS_WORK_TOPIC}"
+
+
+def fanout_job_path(job_id: str) -> str:
+    """Ruta del estado de un job de fan-out dentro del bucket."""
+    return f"{FANOUT_PREFIX}/{job_id}/job.json"
+
+
+def fanout_chunk_path(job_id: str, chunk_id: str, attempt: int) -> str:
+    """Ruta del resultado de un intento de un chunk de un job de fan-out."""
+    return f"{FANOUT_PREFIX}/{job_id}/chunks/{chunk_id}/attempt-{attempt}.json"
+
+
+def load_fanout_job(bucket_name: str, job_id: str) -> Tuple[dict | None, int]:
+    """
+    Lee el estado de un job de fan-out.
+
+    Returns:
+        Tupla (job, generation); (None, 0) si el job no existe
+    """
+    from google.api_core import exceptions as gcs_exceptions
+
+    client = get_storage_client()
+    blob = client.bucket(bucket_name).blob(fanout_job_path(job_id))
+    try:
+        job = json.loads(blob.download_as_bytes())
+    except gcs_exceptions.NotFound:
+        return None, 0
+    return job, blob.generation
+
+
+def save_fanout_job(bucket_name: str, job: dict, generation: int) -> int:
+    """
+    Guarda el estado del job condicionado a la generación leída, de modo que
+    dos consultas de estado simultáneas no republiquen el mismo chunk dos veces.
+
+    Args:
+        bucket_name: Nombre del bucket GCS
+        job: Estado del job
+        generation: Generación leída (0 si el job es nuevo)
+
+    Returns:
+        Nueva generación del estado
+    """
+    from google.api_core import exceptions as gcs_exceptions
+
+    job["updated_at"] = datetime.utcnow().isoformat()
+
+    client = get_storage_client()
+    blob = client.bucket(bucket_name).blob(fanout_job_path(job["job_id"]))
+    try:
+        blob.upload_from_string(
+            json.dumps(job, sort_keys=True),
+            content_type="application/json",
+            if_generation_match=generation,
+        )
+    except gcs_exceptions.PreconditionFailed:
+        raise RuntimeError(f"Fan-out job {job['job_id']} was updated by another invocation")
+    return blob.generation
+
+
+def record_fanout_chunk(bucket_name: str, message: dict, result: dict) -> None:
+    """
+    Guarda el resultado de un intento de un chunk procesado por un worker.
+    Cada intento tiene su propio objeto, así que los workers no compiten por el
+    estado del job; el coordinador los agrega en fanout_status. Un chunk con
+    fechas aplazadas por el presupuesto de bytes queda como "deferred" y
+    fanout_status lo reintenta como uno fallido.
+
+    Args:
+        bucket_name: Nombre del bucket GCS
+        message: Mensaje de trabajo recibido (fanout_job_id, chunk_id, attempt)
+        result: Resultado de process_taxi_ingestion, o {"status": "error", "message": ...}
+    """
+    deferred_dates = (result.get("byte_budget") or {}).get("deferred_dates", [])
+    status = result.get("status", "error")
+    record = {
+        "chunk_id": message["chunk_id"],
+        "attempt": message.get("attempt", 1),
+        "status": "deferred" if status == "success" and deferred_dates else status,
+        "message": result.get("message"),
+        "new_dates_processed": result.get("new_dates_processed", 0),
+        "dates_written": result.get("dates_written", []),
+        "total_trips": result.get("total_trips", 0),
+        "bigquery_jobs": result.get("bigquery_jobs", 0),
+        "bytes_processed": result.get("bytes_processed", 0),
+        "errors": result.get("errors", []),
+        "deferred_dates": deferred_dates,
+        "finished_at": datetime.utcnow().isoformat(),
+    }
+    client = get_storage_client()
+    blob = client.bucket(bucket_name).blob(
+        fanout_chunk_path(message["fanout_job_id"], record["chunk_id"], record["attempt"])
+    )
+    blob.upload_from_string(json.dumps(record, sort_keys=True), content_type="application/json")
+
+
+def _publish_chunks(job: dict, chunks: List[dict]) -> None:
+    """Publica un mensaje mode=range por chunk y espera la confirmación de todos."""
+    publisher = get_publisher()
+    topic = work_topic_path()
+    futures = []
+    for chunk in chunks:
+        message = {
+            "mode": "range",
+            "start_date": chunk["start_date"],
+            "end_date": chunk["end_date"],
+            "force": job["force"],
+            "max_workers": job["max_workers"],
+            "extract_mode": job["extract_mode"],
+            "write_path": job["write_path"],
+            "fanout_job_id": job["job_id"],
+            "chunk_id": chunk["chunk_id"],
+            "attempt": chunk["attempts"],
+        }
+        futures.append(publisher.publish(topic, json.dumps(message).encode("utf-8")))
+    for future in futures:
+        future.result(timeout=60)
+
+
+@instrumented(FUNCTION_NAME)
+def start_fanout(
+    start_date: str,
+    end_date: str,
+    job_id: str | None = None,
+    force: bool = False,
+    chunk_days: int | None = None,
+    max_workers: int | None = None,
+    extract_mode: str | None = None,
+    write_path: str | None = None,
+) -> dict:
+    """
+    Reparte las fechas pendientes de un rango en chunks y publica un mensaje
+    de trabajo por chunk en TAXIS_WORK_TOPIC, de modo que cada chunk lo procese
+    una instancia distinta de ingest_taxis_pubsub.
+
+    Args:
+        start_date: Fecha inicio (YYYY-MM-DD)
+        end_date: Fecha fin (YYYY-MM-DD)
+        job_id: Identificador del job (default: generado a partir del rango)
+        force: Si es True, reprocesa también las fechas que ya existen en GCS
+        chunk_days: Máximo de fechas consecutivas por chunk (default: FANOUT_CHUNK_DAYS)
+        max_workers: Threads por etapa en cada worker (default: INGEST_MAX_WORKERS)
+        extract_mode: "per_date" o "range" en cada worker (default: EXTRACT_MODE)
+        write_path: "pandas" o "arrow" en cada worker (default: WRITE_PATH)
+
+    Returns:
+        Dict con el job creado y los chunks publicados
+    """
+    with stage_span("existing_dates"):
+        existing_dates = set() if force else get_existing_dates(GCS_BUCKET, start_date, end_date)
+    all_dates = get_date_range(start_date, end_date)
+    missing_dates = [d for d in all_dates if d not in existing_dates]
+
+    if not missing_dates:
+        return {
+            "status": "success",
+            "message": "No new dates to process - all data already exists",
+            "date_range": {"start": start_date, "end": end_date},
+            "existing_dates": len(existing_dates),
+            "chunks_published": 0,
+        }
+
+    job_id = job_id or f"{start_date}_{end_date}_{uuid.uuid4().hex[:8]}"
+    chunks = [
+        {"chunk_id": f"{i:04d}", "start_date": run[0], "end_date": run[-1], "dates": len(run), "attempts": 1}
+        for i, run in enumerate(group_contiguous_dates(missing_dates, chunk_days or FANOUT_CHUNK_DAYS))
+    ]
+    job = {
+        "job_id": job_id,
+        "start_date": start_date,
+        "end_date": end_date,
+        "force": force,
+        "max_workers": max_workers,
+        "extract_mode": extract_mode,
+        "write_path": write_path,
+        "status": "running",
+        "created_at": datetime.utcnow().isoformat(),
+        "chunks": chunks,
+    }
+    # Si el job_id ya existe la precondición falla: no se publica dos veces
+    save_fanout_job(GCS_BUCKET, job, 0)
+
+    with stage_span("publish", rows=len(chunks)):
+        _publish_chunks(job, chunks)
+    logger.info(f"Fan-out job {job_id}: published {len(chunks)} chunks for {len(missing_dates)} dates")
+
+    return {
+        "status": "success",
+        "message": f"Published {len(chunks)} chunks for {len(missing_dates)} missing dates",
+        "job_id": job_id,
+        "job_status": "running",
+        "date_range": {"start": start_date, "end": end_date},
+        "existing_dates": len(existing_dates),
+        "missing_dates": len(missing_dates),
+        "chunks_published": len(chunks),
+        "topic": work_topic_path(),
+    }
+
+
+def fanout_status(job_id: str, retry_failed: bool = True) -> dict:
+    """
+    Agrega los resultados de los chunks de un job de fan-out y, si retry_failed,
+    vuelve a publicar los chunks fallidos que no han agotado FANOUT_MAX_ATTEMPTS.
+
+    Un chunk sin resultado de su último intento cuenta como pendiente. Los
+    reintentos solo reprocesan las fechas que faltan, ya que el worker omite las
+    particiones existentes; los totales suman todos los intentos.
+
+    Args:
+        job_id: Identificador del job
+        retry_failed: Si es True, republica los chunks fallidos
+
+    Returns:
+        Dict con job_status ("running", "completed" o "failed") y el resumen agregado
+    """
+    job, generation = load_fanout_job(GCS_BUCKET, job_id)
+    if job is None:
+        raise ValueError(f"Fan-out job {job_id} not found")
+
+    counts = {"completed": 0, "pending": 0, "failed": 0, "retried": 0}
+    totals = {"new_dates_processed": 0, "total_trips": 0, "bigquery_jobs": 0, "bytes_processed": 0}
+    errors = []
+    to_retry = []
+    dates_written: Set[str] = set()
+
+    # Un listado por job en lugar de una lectura por chunk e intento
+    client = get_storage_client()
+    records = {}
+    for blob in client.bucket(GCS_BUCKET).list_blobs(prefix=f"{FANOUT_PREFIX}/{job_id}/chunks/"):
+        record = json.loads(blob.download_as_bytes())
+        records[(record["chunk_id"], record["attempt"])] = record
+        for key in totals:
+            totals[key] += record.get(key, 0)
+        dates_written.update(record.get("dates_written", []))
+
+    for chunk in job["chunks"]:
+        record = records.get((chunk["chunk_id"], chunk["attempts"]))
+        if record is None:
+            counts["pending"] += 1
+            continue
+
+        if record["status"] == "success":
+            counts["completed"] += 1
+        elif retry_failed and chunk["attempts"] < FANOUT_MAX_ATTEMPTS:
+            to_retry.append(chunk)
+        else:
+            counts["failed"] += 1
+            errors.append({
+                "chunk_id": chunk["chunk_id"],
+                "start_date": chunk["start_date"],
+                "end_date": chunk["end_date"],
+                "attempts": chunk["attempts"],
+                "message": record.get("message"),
+                "errors": record.get("errors", []),
+            })
+
+    if to_retry:
+        for chunk in to_retry:
+            chunk["attempts"] += 1
+        try:
+            # Guardar antes de publicar: si otra consulta ya los reintentó, no se duplican
+            save_fanout_job(GCS_BUCKET, job, generation)
+            _publish_chunks(job, to_retry)
+            counts["retried"] = len(to_retry)
+            logger.info(f"Fan-out job {job_id}: retried {len(to_retry)} failed chunks")
+        except RuntimeError as e:
+            logger.warning(str(e))
+        counts["pending"] += len(to_retry)
+
+    if counts["completed"] == len(job["chunks"]):
+        job_status = "completed"
+    elif counts["pending"]:
+        job_status = "running"
+    else:
+        job_status = "failed"
+
+    if job_status != job["status"] and not to_retry:
+        job["status"] = job_status
+        try:
+            save_fanout_job(GCS_BUCKET, job, generation)
+        except RuntimeError as e:
+            logger.warning(str(e))
+
+    result = {
+        "status": "error" if job_status == "failed" else "success",
+        "job_id": job_id,
+        "job_status": job_status,
+        "date_range": {"start": job["start_date"], "end": job["end_date"]},
+        "chunks": {"total": len(job["chunks"]), **counts},
+        "dates": sum(chunk["dates"] for chunk in job["chunks"]),
+        **totals,
+        "dates_written": sorted(dates_written),
+    }
+    if errors:
+        result["errors"] = errors
+    return result
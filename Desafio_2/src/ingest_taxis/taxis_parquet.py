@@ -0,0 +1,105 @@
+"""
+ingest_taxis: perfiles de escritura Parquet.
+
+Los ficheros del landing se leen desde las external tables de stg_taxis, así
+que su layout (codec, row groups, diccionario, orden) determina los bytes que
+escanea BigQuery. Todas las rutas de escritura de main.py resuelven aquí su
+perfil (get_parquet_profile) y los kwargs del writer (_parquet_writer_options).
+"""
+
+from __future__ import annotations
+
+import os
+from typing import TYPE_CHECKING
+
+# Solo para anotaciones: como en main.py, se importan dentro de las funciones
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+# Perfil activo (PARQUET_PROFILE) y overrides PARQUET_* por variable de entorno (ver main.py)
+PARQUET_PROFILE = os.environ.get("PARQUET_PROFILE", "default")
+PARQUET_PROFILES = {
+    # Defaults de pyarrow: snappy, diccionario en todas las columnas, un row group por día
+    "default": {},
+    "zstd": {"compression": "zstd", "compression_level": 3},
+    # Diccionario solo en columnas de baja cardinalidad y orden por hora de inicio
+    # para que las estadísticas min/max de cada row group permitan podar
+    "compact": {
+        "compression": "zstd",
+        "compression_level": 3,
+        "row_group_size": 8192,
+        "use_dictionary": ["taxi_id", "payment_type", "company"],
+        "sort_by": "trip_start_timestamp",
+    },
+}
+
+
+def get_parquet_profile(name: str | None = None) -> dict:
+    """
+    Resuelve un perfil de escritura Parquet aplicando los overrides de entorno.
+
+    Args:
+        name: Nombre del perfil en PARQUET_PROFILES (default: PARQUET_PROFILE)
+
+    Returns:
+        Dict con compression, compression_level, row_group_size,
+        use_dictionary (True o lista de columnas) y sort_by (columna o None)
+    """
+    name = name or PARQUET_PROFILE
+    if name not in PARQUET_PROFILES:
+        raise ValueError(f"Invalid parquet profile: {name}")
+
+    profile = {
+        "compression": "snappy",
+        "compression_level": None,
+        "row_group_size": None,
+        "use_dictionary": True,
+        "sort_by": None,
+        **PARQUET_PROFILES[name],
+    }
+
+    if os.environ.get("PARQUET_COMPRESSION"):
+        profile["compression"] = os.environ["PARQUET_COMPRESSION"]
+    if os.environ.get("PARQUET_COMPRESSION_LEVEL"):
+        profile["compression_level"] = int(os.environ["PARQUET_COMPRESSION_LEVEL"])
+    if os.environ.get("PARQUET_ROW_GROUP_ROWS"):
+        profile["row_group_size"] = int(os.environ["PARQUET_ROW_GROUP_ROWS"])
+    if os.environ.get("PARQUET_DICTIONARY_COLUMNS"):
+        profile["use_dictionary"] = os.environ["PARQUET_DICTIONARY_COLUMNS"].split(",")
+    if os.environ.get("PARQUET_SORT_BY"):
+        profile["sort_by"] = os.environ["PARQUET_SORT_BY"]
+
+    return profile
+
+
+def _sort_for_profile(table: pa.Table, profile: dict) -> pa.Table:
+    """Ordena la tabla por la columna sort_by del perfil, si la tiene."""
+    if profile["sort_by"] and profile["sort_by"] in table.column_names:
+        return table.sort_by(profile["sort_by"])
+    return table
+
+
+def _parquet_writer_options(schema: pa.Schema, profile: dict) -> dict:
+    """
+    Traduce un perfil a kwargs de pq.write_table / pq.ParquetWriter.
+
+    Las columnas de diccionario y de orden que no estén en el schema se ignoran.
+    """
+    import pyarrow.parquet as pq
+
+    options = {"compression": profile["compression"]}
+    if profile["compression_level"] is not None:
+        options["compression_level"] = profile["compression_level"]
+
+    use_dictionary = profile["use_dictionary"]
+    if isinstance(use_dictionary, list):
+        use_dictionary = [c for c in use_dictionary if c in schema.names]
+    options["use_dictionary"] = use_dictionary
+
+    # sorting_columns es metadata por row group: vale también para la ruta streaming
+    if profile["sort_by"] and profile["sort_by"] in schema.names:
+        options["sorting_columns"] = pq.SortingColumn.from_ordering(
+            schema, [(profile["sort_by"], "ascending")]
+        )
+
+    return options
@@ -0,0 +1,295 @@
+"""
+ingest_taxis: layout de las particiones diarias en GCS.
+
+Una partición es taxis/date=YYYY-MM-DD/data.parquet o, con
+PARTITION_TARGET_ROWS / PARTITION_TARGET_MB, varios ficheros
+part-<escritura>-NNNNN.parquet cuyo marcador _complete/taxis/date=.../parts.json
+decide cuáles son los vigentes. Aquí están los paths, el índice de fechas
+completas (ingest_shared.partitions con los marcadores) y la escritura y
+publicación de las partes.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import uuid
+from datetime import datetime
+from typing import TYPE_CHECKING, Iterable, List, Set, Tuple
+
+from ingest_shared.clients import get_storage_client
+from ingest_shared.partitions import PartitionIndex, _dates_from_blobs
+from taxis_common import _add_bytes_written
+from taxis_parquet import _parquet_writer_options, _sort_for_profile
+
+# Solo para anotaciones: como en main.py, se importan dentro de las funciones
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+logger = logging.getLogger(__name__)
+
+# Particiones multi-fichero: rotación por filas o por tamaño (0 = un único data.parquet)
+PARTITION_TARGET_ROWS = int(os.environ.get("PARTITION_TARGET_ROWS", "0"))
+PARTITION_TARGET_MB = int(os.environ.get("PARTITION_TARGET_MB", "0"))
+
+# Ruta base para Parquet en GCS (Hive-style partitioning)
+PARQUET_BASE_PATH = "taxis"
+# Marcadores de particiones multi-fichero completas: _complete/taxis/date=YYYY-MM-DD/parts.json.
+# Si existe, la partición son exactamente sus parts (external table taxi_partition_markers_ext)
+COMPLETE_PREFIX = f"_complete/{PARQUET_BASE_PATH}"
+
+
+def partition_blob_path(date: str) -> str:
+    """Path del Parquet de una partición diaria: {base}/date=YYYY-MM-DD/data.parquet"""
+    return f"{PARQUET_BASE_PATH}/date={date}/data.parquet"
+
+
+def partition_part_path(date: str, write_id: str, index: int) -> str:
+    """
+    Path de un fichero de una partición multi-fichero:
+    {base}/date=YYYY-MM-DD/part-{write_id}-00000.parquet
+
+    Cada escritura usa su propio write_id, así que sus partes nunca pisan las
+    que lista el marcador vigente.
+    """
+    return f"{PARQUET_BASE_PATH}/date={date}/part-{write_id}-{index:05d}.parquet"
+
+
+def partition_marker_path(date: str) -> str:
+    """Path del marcador de una partición multi-fichero completa (fuera del prefijo de datos)."""
+    return f"{COMPLETE_PREFIX}/date={date}/parts.json"
+
+
+def _multipart_enabled() -> bool:
+    return PARTITION_TARGET_ROWS > 0 or PARTITION_TARGET_MB > 0
+
+
+def _complete_dates(bucket, suffix: str) -> Set[str]:
+    """
+    Fechas con partición completa bajo {base}/date={suffix}.
+
+    Una partición con data.parquet está completa (se sube en una sola
+    operación). Una partición con part-*.parquet solo lo está si tiene su
+    marcador en COMPLETE_PREFIX, que se escribe después de la última parte
+    (ver _commit_partition_parts); el listado de marcadores solo se hace si
+    aparece alguna parte.
+
+    Args:
+        bucket: Bucket GCS
+        suffix: Prefijo de fecha a listar ("" para todo, "YYYY-MM" para un mes)
+
+    Returns:
+        Set de fechas en formato YYYY-MM-DD
+    """
+    single, multipart = set(), set()
+    for blob in bucket.list_blobs(prefix=f"{PARQUET_BASE_PATH}/date={suffix}"):
+        dates = _dates_from_blobs([blob])
+        if blob.name.endswith("/data.parquet"):
+            single |= dates
+        else:
+            multipart |= dates
+
+    pending = multipart - single
+    if pending:
+        pending &= _dates_from_blobs(bucket.list_blobs(prefix=f"{COMPLETE_PREFIX}/date={suffix}"))
+    return single | pending
+
+
+def _partition_exists_paths(date: str) -> List[str]:
+    """Blobs que marcan una partición: data.parquet y el marcador multi-fichero, primero el del modo activo."""
+    paths = [partition_blob_path(date), partition_marker_path(date)]
+    if _multipart_enabled():
+        paths.reverse()
+    return paths
+
+
+# Índice de particiones (PARTITION_CACHE_TTL y PARTITION_MANIFEST los lee ingest_shared.partitions).
+# Las particiones multi-fichero solo cuentan si tienen marcador (ver _complete_dates)
+partition_index = PartitionIndex(
+    PARQUET_BASE_PATH,
+    list_dates=_complete_dates,
+    exists_paths=_partition_exists_paths,
+    label="taxi",
+)
+get_existing_dates = partition_index.get_existing_dates
+partition_exists = partition_index.partition_exists
+register_partition = partition_index.register_partition
+
+
+def _write_partition_parts(
+    tables: Iterable[pa.Table],
+    bucket_name: str,
+    date: str,
+    profile: dict,
+    row_group_rows: int,
+    sort_groups: bool = True,
+) -> Tuple[List[str], int, int]:
+    """
+    Escribe una partición como varios ficheros part-{write_id}-NNNNN.parquet,
+    rotando de fichero al alcanzar PARTITION_TARGET_ROWS filas o PARTITION_TARGET_MB.
+
+    Cada parte se sube en streaming (memoria acotada a ~un row group) y el
+    tamaño se comprueba tras cada row group, así que esa es la granularidad de
+    PARTITION_TARGET_MB. Las partes llevan un write_id nuevo y no tocan la
+    partición anterior: los lectores siguen viendo la versión que lista el
+    marcador (o el data.parquet) hasta _commit_partition_parts.
+
+    Args:
+        tables: Tablas Arrow de la partición (con loaded_at), en orden
+        bucket_name: Nombre del bucket GCS
+        date: Fecha de la partición (YYYY-MM-DD)
+        profile: Perfil Parquet (ver get_parquet_profile)
+        row_group_rows: Filas por row group
+        sort_groups: Si es True, ordena cada row group por sort_by del perfil
+
+    Returns:
+        Tupla (paths de las partes, filas, bytes escritos)
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    client = get_storage_client()
+    bucket = client.bucket(bucket_name)
+
+    target_rows = PARTITION_TARGET_ROWS or None
+    target_bytes = PARTITION_TARGET_MB * 1024 * 1024 or None
+    write_id = uuid.uuid4().hex[:12]
+
+    parts: List[str] = []
+    total_rows = total_bytes = 0
+    schema = None
+    pending: List[pa.Table] = []
+    pending_rows = 0
+    sink = writer = None
+    file_rows = 0
+
+    def close_part() -> None:
+        nonlocal sink, writer, total_bytes
+        writer.close()
+        total_bytes += sink.tell()
+        sink.close()
+        sink = writer = None
+
+    def group_rows() -> int:
+        # El último row group de una parte se recorta para cerrar justo en target_rows
+        if target_rows and writer is not None:
+            return min(row_group_rows, target_rows - file_rows)
+        return min(row_group_rows, target_rows or row_group_rows)
+
+    def write_group(group: pa.Table) -> None:
+        nonlocal sink, writer, file_rows, total_rows
+        if writer is None:
+            path = partition_part_path(date, write_id, len(parts))
+            sink = bucket.blob(path).open("wb", content_type="application/octet-stream", ignore_flush=True)
+            writer = pq.ParquetWriter(sink, schema, **_parquet_writer_options(schema, profile))
+            parts.append(path)
+            file_rows = 0
+        if sort_groups:
+            group = _sort_for_profile(group, profile)
+        writer.write_table(group, row_group_size=group.num_rows or 1)
+        file_rows += group.num_rows
+        total_rows += group.num_rows
+        if (target_rows and file_rows >= target_rows) or (target_bytes and sink.tell() >= target_bytes):
+            close_part()
+
+    for table in tables:
+        schema = schema or table.schema
+        pending.append(table)
+        pending_rows += table.num_rows
+        while pending_rows >= group_rows():
+            # Volcar exactamente un row group y dejar el resto pendiente
+            size = group_rows()
+            combined = pa.concat_tables(pending)
+            write_group(combined.slice(0, size))
+            rest = combined.slice(size)
+            pending, pending_rows = [rest], rest.num_rows
+
+    # Resto del último row group; un día sin viajes deja una parte vacía con schema
+    if pending_rows or not parts:
+        write_group(pa.concat_tables(pending))
+    if writer is not None:
+        close_part()
+
+    return parts, total_rows, total_bytes
+
+
+def _commit_partition_parts(
+    bucket_name: str, date: str, parts: List[str], rows: int, nbytes: int, metadata: dict | None = None
+) -> None:
+    """
+    Publica las partes de una escritura multi-fichero y borra la versión anterior.
+
+    El marcador se sobrescribe en una sola operación con la nueva lista de
+    partes: es el cambio atómico de versión para los lectores que resuelven la
+    partición por el marcador (get_existing_dates, stg_taxis, el motor local).
+    Después se borran los ficheros que no pertenecen a esta escritura (partes
+    anteriores, de escrituras a medias o un data.parquet anterior).
+
+    Args:
+        bucket_name: Nombre del bucket GCS
+        date: Fecha de la partición (YYYY-MM-DD)
+        parts: Paths de las partes escritas por _write_partition_parts
+        rows: Filas de la partición
+        nbytes: Bytes escritos
+        metadata: Metadata del marcador (huella de origen)
+    """
+    bucket = get_storage_client().bucket(bucket_name)
+
+    marker = bucket.blob(partition_marker_path(date))
+    marker.metadata = metadata or None
+    marker.upload_from_string(
+        json.dumps({
+            "parts": parts,
+            "rows": rows,
+            "bytes": nbytes,
+            "written_at": datetime.utcnow().isoformat(),
+        }),
+        content_type="application/json",
+    )
+
+    keep = set(parts)
+    for blob in bucket.list_blobs(prefix=f"{PARQUET_BASE_PATH}/date={date}/"):
+        if blob.name not in keep:
+            blob.delete()
+
+
+def _remove_stale_parts(bucket_name: str, date: str) -> None:
+    """
+    Borra las partes y el marcador de una escritura multi-fichero anterior de
+    la fecha, para que no convivan con el data.parquet recién subido (p.ej. al
+    volver a PARTITION_TARGET_ROWS=0 o tras una escritura multi-fichero a medias).
+
+    Mientras exista el marcador los lectores siguen con sus partes, así que se
+    borra primero (pasan al data.parquet en un solo paso) y las partes después.
+    """
+    client = get_storage_client()
+    bucket = client.bucket(bucket_name)
+    stale = [
+        blob for blob in bucket.list_blobs(prefix=f"{PARQUET_BASE_PATH}/date={date}/")
+        if not blob.name.endswith("/data.parquet")
+    ]
+    if not stale:
+        return
+    from google.api_core import exceptions as gcs_exceptions
+
+    try:
+        bucket.blob(partition_marker_path(date)).delete()
+    except gcs_exceptions.NotFound:
+        pass
+    for blob in stale:
+        blob.delete()
+
+
+def _finish_multipart_write(
+    bucket_name: str, date: str, parts: List[str], nbytes: int, stats: dict | None
+) -> str:
+    """Registra una partición multi-fichero ya marcada como completa y devuelve su URI."""
+    if stats is not None:
+        _add_bytes_written(stats, nbytes)
+
+    register_partition(bucket_name, date)
+
+    gcs_uri = f"gs://{bucket_name}/{PARQUET_BASE_PATH}/date={date}/"
+    logger.info(f"Written {len(parts)} parquet parts to {gcs_uri}")
+    return gcs_uri
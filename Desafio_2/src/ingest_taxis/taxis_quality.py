@@ -0,0 +1,270 @@
+"""
+ingest_taxis: perfil de calidad por día (DQ_PROFILE / DQ_THRESHOLDS).
+
+Cada día se perfila de forma vectorizada antes de publicarse (nulos, min/max y
+checks de filas sospechosas); el perfil se sube como sidecar JSON a
+_profiles/taxis/ y un día que supera algún umbral se rechaza con ValueError,
+conservando la partición anterior. En la ruta streaming se combinan los
+perfiles parciales de cada lote (combine_taxi_profile).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Iterable, List, Tuple
+
+from ingest_shared.clients import get_storage_client
+from taxis_partitions import PARQUET_BASE_PATH
+
+# Solo para anotaciones: como en main.py, se importan dentro de las funciones
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+# Perfil de calidad por día y umbrales que lo rechazan (ver profile_taxi_table)
+DQ_PROFILE = os.environ.get("DQ_PROFILE", "false").lower() == "true"
+DQ_THRESHOLDS = os.environ.get("DQ_THRESHOLDS", "")
+
+# Perfiles de calidad: _profiles/taxis/date=YYYY-MM-DD/profile.json (una línea JSON)
+PROFILE_PREFIX = f"_profiles/{PARQUET_BASE_PATH}"
+
+# Caja de coordenadas de Chicago (ciudad y O'Hare) para el check out_of_chicago
+CHICAGO_BOUNDS = {"latitude": (41.6, 42.1), "longitude": (-88.0, -87.5)}
+
+
+def dq_enabled() -> bool:
+    """True si hay que perfilar cada día (DQ_PROFILE o umbrales configurados)."""
+    return DQ_PROFILE or bool(DQ_THRESHOLDS.strip())
+
+
+def dq_thresholds() -> dict:
+    """
+    Umbrales de DQ_THRESHOLDS como {check: fracción máxima de filas}.
+
+    Returns:
+        Dict vacío si no hay umbrales
+    """
+    thresholds = {}
+    for item in DQ_THRESHOLDS.split(","):
+        if item.strip():
+            name, _, value = item.partition("=")
+            thresholds[name.strip()] = float(value)
+    return thresholds
+
+
+def _json_value(value: Any) -> Any:
+    """Escalar de Arrow (.as_py()) serializable en JSON: fechas ISO, decimales a float."""
+    import decimal
+
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    return value
+
+
+def _count_true(mask: pa.ChunkedArray) -> int:
+    import pyarrow.compute as pc
+
+    return pc.sum(mask).as_py() or 0
+
+
+def _outside_chicago(table: pa.Table, prefix: str) -> pa.ChunkedArray:
+    """Máscara de puntos (pickup / dropoff) con coordenadas fuera de CHICAGO_BOUNDS; NULL cuenta como dentro."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    outside = None
+    for axis, (low, high) in CHICAGO_BOUNDS.items():
+        values = pc.cast(table.column(f"{prefix}_{axis}"), pa.float64())
+        mask = pc.or_(pc.less(values, low), pc.greater(values, high))
+        # Kleene: una coordenada fuera basta aunque la otra sea NULL (como en SQL)
+        outside = mask if outside is None else pc.or_kleene(outside, mask)
+    return pc.fill_null(outside, False)
+
+
+def _partial_taxi_profile(table: pa.Table) -> dict:
+    """Perfil de una tabla del día (o de un tramo de ella) con las claves únicas para combinar."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    profile = {
+        "rows": table.num_rows,
+        "nulls": {name: table.column(name).null_count for name in table.column_names},
+        "min": {},
+        "max": {},
+    }
+    for field in table.schema:
+        if pa.types.is_integer(field.type) or pa.types.is_floating(field.type) or \
+                pa.types.is_decimal(field.type) or pa.types.is_timestamp(field.type):
+            bounds = pc.min_max(table.column(field.name))
+            profile["min"][field.name] = bounds["min"].as_py()
+            profile["max"][field.name] = bounds["max"].as_py()
+
+    fare = pc.cast(table.column("fare"), pa.float64())
+    profile["checks"] = {
+        "negative_fare": _count_true(pc.less(fare, 0)),
+        "zero_second_trips": _count_true(pc.equal(table.column("trip_seconds"), 0)),
+        "out_of_chicago": _count_true(pc.or_(_outside_chicago(table, "pickup"), _outside_chicago(table, "dropoff"))),
+    }
+    keys = table.column("unique_key")
+    profile["keys"] = len(keys) - keys.null_count
+    profile["unique_keys"] = pc.unique(keys.drop_null())
+    return profile
+
+
+def combine_taxi_profile(partials: List[dict], date: str) -> dict:
+    """
+    Combina los perfiles parciales de un día y evalúa los umbrales de DQ_THRESHOLDS.
+
+    Las claves únicas de cada parcial se unen para contar los unique_key
+    duplicados del día completo, también entre record batches distintos.
+
+    Args:
+        partials: Salidas de _partial_taxi_profile
+        date: Fecha de la partición (YYYY-MM-DD)
+
+    Returns:
+        Dict con date, rows, nulls, min y max por columna, checks (filas que
+        fallan cada uno), failed_checks y rejected
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    rows = sum(p["rows"] for p in partials)
+    nulls: dict = {}
+    lows: dict = {}
+    highs: dict = {}
+    checks: dict = {}
+    for partial in partials:
+        for name, count in partial["nulls"].items():
+            nulls[name] = nulls.get(name, 0) + count
+        for name, value in partial["min"].items():
+            if lows.get(name) is None or (value is not None and value < lows[name]):
+                lows[name] = value
+        for name, value in partial["max"].items():
+            if highs.get(name) is None or (value is not None and value > highs[name]):
+                highs[name] = value
+        for name, count in partial["checks"].items():
+            checks[name] = checks.get(name, 0) + count
+
+    if len(partials) == 1:
+        distinct = len(partials[0]["unique_keys"])
+    else:
+        distinct = pc.count_distinct(pa.chunked_array([p["unique_keys"] for p in partials], type=pa.string())).as_py()
+    checks["duplicate_unique_keys"] = sum(p["keys"] for p in partials) - distinct
+
+    profile = {
+        "date": date,
+        "rows": rows,
+        "nulls": nulls,
+        "min": {name: _json_value(value) for name, value in lows.items()},
+        "max": {name: _json_value(value) for name, value in highs.items()},
+        "checks": checks,
+    }
+    return evaluate_profile(profile)
+
+
+def evaluate_profile(profile: dict) -> dict:
+    """
+    Añade failed_checks y rejected a un perfil según DQ_THRESHOLDS. Cada umbral
+    es la fracción máxima de filas que puede fallar un check (o ser NULL en
+    una columna, con nulls.<columna>).
+
+    Args:
+        profile: Perfil con rows, nulls y checks
+
+    Returns:
+        El mismo perfil
+    """
+    failed = []
+    rows = profile["rows"]
+    for name, limit in dq_thresholds().items():
+        counts = profile["nulls"] if name.startswith("nulls.") else profile["checks"]
+        key = name.removeprefix("nulls.")
+        if key not in counts:
+            raise ValueError(f"Unknown data quality check: {name}")
+        fraction = counts[key] / rows if rows else 0.0
+        if fraction > limit:
+            failed.append(f"{name}={counts[key]} ({fraction:.2%} > {limit:.2%})")
+    profile["failed_checks"] = failed
+    profile["rejected"] = bool(failed)
+    return profile
+
+
+def profile_taxi_table(table: pa.Table, date: str) -> dict:
+    """
+    Perfil de calidad de un día de taxis calculado con kernels de Arrow: NULLs
+    por columna, min y max de las numéricas y timestamps, y filas con tarifa
+    negativa, trip_seconds = 0, coordenadas fuera de Chicago (CHICAGO_BOUNDS)
+    y unique_key duplicado. Son los checks que hoy repiten los tests de dbt
+    sobre tablas completas, reducidos a unos cientos de bytes por día.
+
+    Args:
+        table: Tabla del día ya convertida al schema del landing
+        date: Fecha de la partición (YYYY-MM-DD)
+
+    Returns:
+        Perfil (ver combine_taxi_profile)
+    """
+    return combine_taxi_profile([_partial_taxi_profile(table)], date)
+
+
+def dq_profile_tables(tables: Iterable[pa.Table]) -> Tuple[Iterable[pa.Table], List[dict]]:
+    """
+    Calcula los perfiles parciales de una partición a medida que se consumen
+    sus tablas (ruta Arrow en streaming), como daily_cube_tables.
+
+    Returns:
+        Tupla (tablas, parciales): la lista queda completa cuando se han
+        consumido todas las tablas
+    """
+    partials: List[dict] = []
+
+    def consume():
+        for table in tables:
+            partials.append(_partial_taxi_profile(table))
+            yield table
+
+    return consume(), partials
+
+
+def profile_blob_path(date: str) -> str:
+    """Path del perfil de calidad de una fecha: _profiles/taxis/date=YYYY-MM-DD/profile.json"""
+    return f"{PROFILE_PREFIX}/date={date}/profile.json"
+
+
+def check_profile(profile: dict, bucket_name: str, date: str) -> None:
+    """
+    Sube el perfil (con DQ_PROFILE, también el de un día rechazado) y lanza
+    ValueError si el día supera algún umbral de DQ_THRESHOLDS.
+
+    Args:
+        profile: Perfil del día
+        bucket_name: Nombre del bucket GCS
+        date: Fecha de la partición (YYYY-MM-DD)
+    """
+    if DQ_PROFILE:
+        profile["profiled_at"] = datetime.utcnow().isoformat()
+        # Una línea JSON sin date (es la clave Hive de la ruta): la external table
+        # lo lee como NEWLINE_DELIMITED_JSON
+        sidecar = {name: value for name, value in profile.items() if name != "date"}
+        blob = get_storage_client().bucket(bucket_name).blob(profile_blob_path(date))
+        blob.upload_from_string(json.dumps(sidecar, separators=(",", ":")) + "\n", content_type="application/json")
+    if profile["rejected"]:
+        raise ValueError(f"Data quality check failed for {date}: {', '.join(profile['failed_checks'])}")
+
+
+def _check_streamed_profile(partials: List[dict], bucket_name: str, date: str, parts: List[str] = ()) -> None:
+    """
+    check_profile para la ruta streaming, antes de publicar la escritura: si el
+    día se rechaza se borran sus partes aún sin marcador y la partición
+    anterior queda intacta (sin tocar el manifest ni la caché de partition_index).
+    """
+    quality = combine_taxi_profile(partials, date)
+    if quality["rejected"] and parts:
+        bucket = get_storage_client().bucket(bucket_name)
+        for name in parts:
+            bucket.blob(name).delete()
+    check_profile(quality, bucket_name, date)
@@ -0,0 +1,166 @@
+"""
+ingest_taxis: tabla de origen y schema fijo del landing.
+
+Columnas que se extraen del dataset público de taxis de Chicago, SQL de las
+queries de extracción y conversión de cada tabla Arrow al schema del landing
+(taxi_arrow_schema / conform_taxi_table), sea cual sea la ruta de escritura.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import TYPE_CHECKING, Any
+
+# Solo para anotaciones: como en main.py, se importan dentro de las funciones
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+# Dataset público de taxis de Chicago
+PUBLIC_TAXI_TABLE = "bigquery-public-data.chicago_taxi_trips.taxi_trips"
+
+# Tipo de los importes en el schema fijo del landing (ver taxi_arrow_schema)
+TAXI_MONEY_TYPE = os.environ.get("TAXI_MONEY_TYPE", "float64")
+
+# Columnas a extraer del dataset público
+TAXI_COLUMNS = [
+    "unique_key",
+    "taxi_id", 
+    "trip_start_timestamp",
+    "trip_end_timestamp",
+    "trip_seconds",
+    "trip_miles",
+    "pickup_community_area",
+    "dropoff_community_area",
+    "fare",
+    "tips",
+    "tolls",
+    "extras",
+    "trip_total",
+    "payment_type",
+    "company",
+    "pickup_latitude",
+    "pickup_longitude",
+    "dropoff_latitude",
+    "dropoff_longitude"
+]
+
+# Importes (tipo según TAXI_MONEY_TYPE) y categóricas de baja cardinalidad por día
+TAXI_MONEY_COLUMNS = ["fare", "tips", "tolls", "extras", "trip_total"]
+TAXI_DICTIONARY_COLUMNS = ["taxi_id", "payment_type", "company"]
+
+
+def taxi_arrow_schema(money_type: str | None = None) -> pa.Schema:
+    """
+    Schema fijo del landing de taxis: TAXI_COLUMNS más loaded_at.
+
+    Categóricas como diccionario, enteros compactos para community areas y
+    trip_seconds, timestamps en microsegundos UTC (la precisión de BigQuery)
+    e importes según TAXI_MONEY_TYPE.
+
+    Args:
+        money_type: float64, float32 o decimal (default: TAXI_MONEY_TYPE)
+
+    Returns:
+        pa.Schema sin metadata de pandas
+    """
+    import pyarrow as pa
+
+    money_type = money_type or TAXI_MONEY_TYPE
+    money_types = {"float64": pa.float64(), "float32": pa.float32(), "decimal": pa.decimal128(12, 2)}
+    if money_type not in money_types:
+        raise ValueError(f"Invalid money type: {money_type}")
+
+    category = pa.dictionary(pa.int32(), pa.string())
+    timestamp = pa.timestamp("us", tz="UTC")
+    types = {
+        "unique_key": pa.string(),
+        "trip_start_timestamp": timestamp,
+        "trip_end_timestamp": timestamp,
+        "trip_seconds": pa.int32(),
+        "trip_miles": pa.float64(),
+        # Community areas de Chicago: 1-77
+        "pickup_community_area": pa.int16(),
+        "dropoff_community_area": pa.int16(),
+        "pickup_latitude": pa.float64(),
+        "pickup_longitude": pa.float64(),
+        "dropoff_latitude": pa.float64(),
+        "dropoff_longitude": pa.float64(),
+        **{name: category for name in TAXI_DICTIONARY_COLUMNS},
+        **{name: money_types[money_type] for name in TAXI_MONEY_COLUMNS},
+    }
+    return pa.schema(
+        [pa.field(name, types[name]) for name in TAXI_COLUMNS] + [pa.field("loaded_at", pa.timestamp("us"))]
+    )
+
+
+def conform_taxi_table(table: pa.Table) -> pa.Table:
+    """
+    Convierte una tabla de taxis a los tipos de taxi_arrow_schema.
+
+    Las columnas se mantienen en su orden; las que no están en el schema
+    (p. ej. las de derive_silver_columns) conservan su tipo. Se descarta la
+    metadata de pandas, así que el schema es idéntico para todos los días,
+    incluidos los vacíos o con columnas enteras a NULL.
+
+    Args:
+        table: Tabla Arrow de la query (o de pa.Table.from_pandas)
+
+    Returns:
+        Tabla con el schema fijo
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    schema = taxi_arrow_schema()
+    target = pa.schema([
+        schema.field(name) if name in schema.names else table.schema.field(name)
+        for name in table.column_names
+    ])
+
+    for name in TAXI_MONEY_COLUMNS:
+        field = target.field(name) if name in target.names else None
+        if field is not None and pa.types.is_decimal(field.type) and not pa.types.is_decimal(table.schema.field(name).type):
+            # El cast float -> decimal no redondea: céntimos con el mismo
+            # half-away-from-zero que ROUND de BigQuery
+            column = pc.cast(table.column(name), pa.float64())
+            cents = pc.round(pc.multiply(column, 100.0), round_mode="half_towards_infinity")
+            table = table.set_column(table.column_names.index(name), name, pc.divide(cents, 100.0))
+
+    return table.cast(target)
+
+
+def _taxi_pandas_type(arrow_type: pa.DataType) -> Any:
+    """types_mapper de to_pandas: enteros nullable y decimales sin pasar por object."""
+    import pandas as pd
+    import pyarrow as pa
+
+    if pa.types.is_decimal(arrow_type):
+        return pd.ArrowDtype(arrow_type)
+    return {pa.int16(): pd.Int16Dtype(), pa.int32(): pd.Int32Dtype()}.get(arrow_type)
+
+
+def extract_where_clause(start_date: str, end_date: str) -> str:
+    """
+    Condición WHERE de la query de extracción de un día o de un tramo.
+
+    Args:
+        start_date: Fecha inicio (YYYY-MM-DD)
+        end_date: Fecha fin (YYYY-MM-DD)
+
+    Returns:
+        Condición sobre DATE(trip_start_timestamp), sin la palabra clave WHERE
+    """
+    if start_date == end_date:
+        return f"DATE(trip_start_timestamp) = '{start_date}'"
+    return f"DATE(trip_start_timestamp) BETWEEN '{start_date}' AND '{end_date}'"
+
+
+def _extract_query_sql(where_clause: str, order_by: str | None = None) -> str:
+    columns_str = ", ".join(TAXI_COLUMNS)
+    order_clause = f"ORDER BY {order_by}" if order_by else ""
+    return f"""
+        SELECT {columns_str}
+        FROM `{PUBLIC_TAXI_TABLE}`
+        WHERE {where_clause}
+        {order_clause}
+    """
@@ -0,0 +1,113 @@
+"""
+ingest_taxis: columnas derivadas de silver_taxis calculadas en la ingesta.
+
+Con DERIVE_SILVER_COLUMNS (main.py), derive_silver_columns añade a cada
+partición las columnas de silver_taxis.sql calculadas con pyarrow.compute, con
+la misma semántica que el SQL (ver su docstring), para que dbt solo tenga que
+leerlas.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+# Solo para anotaciones: como en main.py, se importan dentro de las funciones
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+# Columnas que añade derive_silver_columns, en el orden de silver_taxis.sql
+SILVER_DERIVED_COLUMNS = [
+    "trip_minutes",
+    "trip_km",
+    "avg_speed_mph",
+    "tip_percentage",
+    "cost_per_mile",
+    "start_hour",
+    "day_of_week",
+    "day_type",
+    "time_of_day",
+    "is_valid_trip",
+]
+
+
+def _sql_round2(values):
+    """
+    round(x, 2) de SQL: escalar, redondear y dividir. pc.round(x, 2) puede
+    dejar el double vecino (24.599999999999998 en vez de 24.6).
+    """
+    import pyarrow.compute as pc
+
+    scaled = pc.round(pc.multiply(values, 100.0), round_mode="half_towards_infinity")
+    return pc.divide(scaled, 100.0)
+
+
+def derive_silver_columns(table: pa.Table) -> pa.Table:
+    """
+    Añade a un día de taxis las columnas derivadas de silver_taxis.sql,
+    calculadas de forma vectorizada con pyarrow.compute.
+
+    Reproduce la semántica del SQL: ROUND de BigQuery (mitades lejos de cero),
+    EXTRACT(DAYOFWEEK) con domingo = 1, y un CASE cuya condición es NULL cae en
+    su rama ELSE (p.ej. tip_percentage = 0 si fare es NULL). La paridad con el
+    SQL se comprueba en benchmarks/check_silver_parity.py y los casos límite
+    con valores fijos en tests/test_silver_columns.py.
+
+    Args:
+        table: Tabla Arrow con las columnas de TAXI_COLUMNS
+
+    Returns:
+        Tabla con SILVER_DERIVED_COLUMNS añadidas al final
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    def f64(name: str) -> pa.ChunkedArray:
+        return pc.cast(table.column(name), pa.float64())
+
+    round2 = _sql_round2
+
+    def when(condition):
+        # CASE WHEN: una condición NULL no entra en la rama THEN
+        return pc.fill_null(condition, False)
+
+    seconds, miles = f64("trip_seconds"), f64("trip_miles")
+    fare, tips, total = f64("fare"), f64("tips"), f64("trip_total")
+    # cast(trip_seconds as int64) > 0: el cast redondea alejándose de cero
+    has_seconds = when(pc.greater(pc.round(seconds, round_mode="half_towards_infinity"), 0))
+    start = table.column("trip_start_timestamp")
+
+    null_float = pa.scalar(None, pa.float64())
+    hour = pc.cast(pc.hour(start), pa.int64())
+    day_of_week = pc.cast(pc.day_of_week(start, count_from_zero=False, week_start=7), pa.int64())
+
+    derived = {
+        "trip_minutes": round2(pc.divide(seconds, 60.0)),
+        "trip_km": round2(pc.multiply(miles, 1.60934)),
+        "avg_speed_mph": pc.if_else(
+            has_seconds, round2(pc.divide(miles, pc.divide(seconds, 3600.0))), null_float
+        ),
+        "tip_percentage": pc.if_else(
+            when(pc.greater(fare, 0)), round2(pc.multiply(pc.divide(tips, fare), 100.0)), 0.0
+        ),
+        "cost_per_mile": pc.if_else(when(pc.greater(miles, 0)), round2(pc.divide(total, miles)), null_float),
+        "start_hour": hour,
+        "day_of_week": day_of_week,
+        "day_type": pc.if_else(when(pc.is_in(day_of_week, pa.array([1, 7]))), "weekend", "weekday"),
+        # case_when trata las condiciones NULL como falsas, igual que CASE
+        "time_of_day": pc.case_when(
+            pc.make_struct(
+                pc.and_(pc.greater_equal(hour, 6), pc.less_equal(hour, 9)),
+                pc.and_(pc.greater_equal(hour, 10), pc.less_equal(hour, 15)),
+                pc.and_(pc.greater_equal(hour, 16), pc.less_equal(hour, 19)),
+                pc.and_(pc.greater_equal(hour, 20), pc.less_equal(hour, 23)),
+            ),
+            "morning_rush", "midday", "evening_rush", "night", "late_night",
+        ),
+        "is_valid_trip": when(
+            pc.and_kleene(pc.and_kleene(has_seconds, pc.greater(miles, 0)), pc.greater_equal(fare, 0))
+        ),
+    }
+
+    for name in SILVER_DERIVED_COLUMNS:
+        table = table.append_column(name, derived[name])
+    return table
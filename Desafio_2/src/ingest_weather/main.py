@@ -13,33 +13,76 @@ Variables de entorno:
 - WEATHER_START_DATE: Fecha inicio (default: 2023-06-01)
 - WEATHER_END_DATE: Fecha fin (default: 2023-12-31)
 - OFFSET_DAYS: Días de offset para modo daily_offset (default: 364)
+- WEATHER_MAX_SPAN_DAYS: Máximo de días por request a Open-Meteo en modo range (default: 92)
+- WEATHER_MAX_RETRIES: Reintentos por request ante 429/5xx (default: 5)
+- WEATHER_BACKOFF_FACTOR: Factor de backoff exponencial entre reintentos en segundos (default: 0.5)
+- WEATHER_RATE_LIMIT_PER_SEC: Requests por segundo a Open-Meteo (default: 5)
+- WEATHER_RATE_LIMIT_BURST: Ráfaga máxima del token bucket (default: 10)
+- WEATHER_CACHE_URI: Tier persistente de la caché de Open-Meteo, directorio local o gs://bucket/prefix
+  (default: vacío, solo caché en proceso)
+- WEATHER_CACHE_MEMORY_ENTRIES: Días en la LRU en proceso de la caché de Open-Meteo (default: 4096, 0 la desactiva)
+- WEATHER_CACHE_MAX_MB: Tamaño máximo del tier persistente; se borran primero las entradas más antiguas (default: 64)
+- WEATHER_CACHE_MIN_AGE_DAYS: Solo se cachean días con al menos esta antigüedad, los recientes aún
+  pueden revisarse en el archivo de Open-Meteo (default: 90)
+- DQ_PROFILE: Si es "true", escribe el perfil de calidad de cada día (nulos, min/max y
+  checks) en _profiles/weather/date=YYYY-MM-DD/profile.json (default: false)
+- DQ_THRESHOLDS: Fracción máxima de filas por check que admite un día, p. ej.
+  "nulls.temperature_mean=0,negative_precipitation=0"; un día que la supera no se
+  escribe y queda en errors (default: vacío, no rechaza ninguno)
+- PARTITION_CACHE_TTL: Segundos de vida de la caché de particiones en instancias warm (default: 300)
+- PARTITION_MANIFEST: Si es "true", mantiene _manifests/weather.json con las fechas escritas (default: false)
+- STAGE_LOGS: Si es "true", emite un log JSON por etapa y fecha (default: true)
+- INGEST_DEBUG_PROFILE: Si es "true", añade top-N de cProfile y tracemalloc al resultado (default: false)
+- DEBUG_PROFILE_TOP_N: Entradas del top-N de INGEST_DEBUG_PROFILE (default: 20)
 
 Modos de operación:
 - range: Procesa un rango de fechas (default)
 - daily_offset: Calcula la fecha a procesar basándose en la fecha actual menos OFFSET_DAYS
   Ejemplo: Si hoy es 2025-12-30 y OFFSET_DAYS=364, procesa 2024-01-01
+
+Los días del archivo de Open-Meteo no cambian una vez consolidados: las respuestas
+se cachean por (lat, lon, fecha, variables, timezone) y el resultado incluye los
+contadores de la caché en weather_cache.
+
+El resultado incluye dates_written, las fechas escritas por la invocación:
+run_dbt_pipeline.sh --weather-result las pasa a dbt (var weather_dates) para
+reconstruir solo esas particiones de taxis_weather_enriched.
 """
 
+from __future__ import annotations
+
 import os
 import json
 import logging
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import List, Set
+from typing import TYPE_CHECKING, Any, List
 
 import functions_framework
-from google.cloud import storage
-import requests
-import pandas as pd
-import pyarrow as pa
-import pyarrow.parquet as pq
 import io
 
+from ingest_shared.clients import _get_client, get_storage_client
+# Los tests y benchmarks registran fakes con set_client sobre el módulo de la función
+from ingest_shared.clients import reset_clients, set_client  # noqa: F401
+from ingest_shared.dates import get_date_range, group_contiguous_dates
+from ingest_shared.instrumentation import instrumented, stage_span
+from ingest_shared.partitions import PartitionIndex
+
+# Dependencias pesadas (pandas, pyarrow, requests, google-cloud-*) se importan
+# dentro de las funciones que las usan: una invocación que solo comprueba que la
+# fecha ya existe no paga su coste de import en el cold start.
+if TYPE_CHECKING:
+    import pandas as pd
+    import requests
+
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Configuracion desde variables de entorno
-PROJECT_ID = os.environ.get("GCP_PROJECT", "orbidi-challenge")
+
+# Configuracion desde variables de entorno (GCP_PROJECT la lee ingest_shared.clients)
 GCS_BUCKET = os.environ.get("GCS_BUCKET", "orbidi-challenge-data-landing")
 DEFAULT_START_DATE = os.environ.get("WEATHER_START_DATE", "2023-06-01")
 DEFAULT_END_DATE = os.environ.get("WEATHER_END_DATE", "2023-12-31")
@@ -47,15 +90,56 @@ DEFAULT_END_DATE = os.environ.get("WEATHER_END_DATE", "2023-12-31")
 # Offset para modo daily_offset (2025-12-29 - 730 = 2023-12-29)
 OFFSET_DAYS = int(os.environ.get("OFFSET_DAYS", "730"))
 
+# Nombre de la función en los logs por etapa (STAGE_LOGS, INGEST_DEBUG_PROFILE y
+# DEBUG_PROFILE_TOP_N los lee ingest_shared.instrumentation)
+FUNCTION_NAME = "ingest_weather"
+
 # Coordenadas de Chicago
 CHICAGO_LAT = 41.8781
 CHICAGO_LON = -87.6298
 
 # Open-Meteo API
 OPEN_METEO_URL = "https://archive-api.open-meteo.com/v1/archive"
+WEATHER_TIMEZONE = "America/Chicago"
+
+# Variables diarias pedidas a Open-Meteo
+WEATHER_DAILY_VARIABLES = [
+    "temperature_2m_max",
+    "temperature_2m_min",
+    "temperature_2m_mean",
+    "precipitation_sum",
+    "rain_sum",
+    "snowfall_sum",
+    "wind_speed_10m_max",
+    "wind_gusts_10m_max",
+    "weather_code"
+]
+
+# Máximo de días por request en modo range (la API devuelve rangos completos)
+WEATHER_MAX_SPAN_DAYS = int(os.environ.get("WEATHER_MAX_SPAN_DAYS", "92"))
+
+# Cliente HTTP: reintentos con backoff exponencial + jitter y rate limit compartido
+WEATHER_MAX_RETRIES = int(os.environ.get("WEATHER_MAX_RETRIES", "5"))
+WEATHER_BACKOFF_FACTOR = float(os.environ.get("WEATHER_BACKOFF_FACTOR", "0.5"))
+WEATHER_RATE_LIMIT_PER_SEC = float(os.environ.get("WEATHER_RATE_LIMIT_PER_SEC", "5"))
+WEATHER_RATE_LIMIT_BURST = int(os.environ.get("WEATHER_RATE_LIMIT_BURST", "10"))
+
+# Caché de respuestas: LRU en proceso + tier persistente (directorio local o gs://)
+WEATHER_CACHE_URI = os.environ.get("WEATHER_CACHE_URI", "")
+WEATHER_CACHE_MEMORY_ENTRIES = int(os.environ.get("WEATHER_CACHE_MEMORY_ENTRIES", "4096"))
+WEATHER_CACHE_MAX_MB = float(os.environ.get("WEATHER_CACHE_MAX_MB", "64"))
+WEATHER_CACHE_MIN_AGE_DAYS = int(os.environ.get("WEATHER_CACHE_MIN_AGE_DAYS", "90"))
+
+# Perfil de calidad por día y umbrales que lo rechazan (ver profile_weather_table)
+DQ_PROFILE = os.environ.get("DQ_PROFILE", "false").lower() == "true"
+DQ_THRESHOLDS = os.environ.get("DQ_THRESHOLDS", "")
+# Rango físicamente plausible de temperaturas en Chicago (°C) para temperature_out_of_range
+WEATHER_TEMPERATURE_BOUNDS = (-50.0, 50.0)
 
 # Ruta base para Parquet en GCS (Hive-style partitioning)
 PARQUET_BASE_PATH = "weather"
+# Perfiles de calidad: _profiles/weather/date=YYYY-MM-DD/profile.json (una línea JSON)
+PROFILE_PREFIX = f"_profiles/{PARQUET_BASE_PATH}"
 
 
 def calculate_offset_date(offset_days: int = None) -> str:
@@ -77,118 +161,673 @@ def calculate_offset_date(offset_days: int = None) -> str:
     return target_date.strftime("%Y-%m-%d")
 
 
-def get_existing_dates(bucket_name: str) -> Set[str]:
+def partition_blob_path(date: str) -> str:
+    """Path del Parquet de una partición diaria: {base}/date=YYYY-MM-DD/data.parquet"""
+    return f"{PARQUET_BASE_PATH}/date={date}/data.parquet"
+
+
+# Índice de particiones (PARTITION_CACHE_TTL y PARTITION_MANIFEST los lee ingest_shared.partitions)
+partition_index = PartitionIndex(PARQUET_BASE_PATH)
+get_existing_dates = partition_index.get_existing_dates
+partition_exists = partition_index.partition_exists
+register_partition = partition_index.register_partition
+
+
+class TokenBucket:
     """
-    Obtiene las fechas que ya existen en GCS (particiones existentes).
+    Rate limiter token bucket thread-safe.
+
+    Se reponen `rate` tokens por segundo hasta `capacity`; acquire() bloquea
+    hasta que haya un token disponible.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Consume un token. Devuelve los segundos esperados."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+
+# Contadores HTTP acumulados por instancia; el resultado reporta la diferencia por invocación
+_http_stats = {"requests": 0, "retries": 0, "throttled": 0, "rate_limit_wait_seconds": 0.0}
+_http_stats_lock = threading.Lock()
+_rate_limiter = TokenBucket(WEATHER_RATE_LIMIT_PER_SEC, WEATHER_RATE_LIMIT_BURST)
+
+
+def _record_http_stat(name: str, value: float = 1) -> None:
+    with _http_stats_lock:
+        _http_stats[name] += value
+
+
+def http_stats_snapshot() -> dict:
+    """Copia de los contadores HTTP acumulados."""
+    with _http_stats_lock:
+        return dict(_http_stats)
+
+
+def http_stats_since(snapshot: dict) -> dict:
+    """Contadores HTTP desde un snapshot (para el dict de resultado)."""
+    current = http_stats_snapshot()
+    stats = {name: current[name] - snapshot[name] for name in current}
+    stats["rate_limit_wait_seconds"] = round(stats["rate_limit_wait_seconds"], 3)
+    return stats
+
+
+def _build_http_session() -> requests.Session:
+    """
+    Crea la sesión HTTP para Open-Meteo.
+
+    La sesión mantiene un pool de conexiones keep-alive entre requests (y entre
+    invocaciones en instancias warm) y reintenta 429/5xx con backoff exponencial
+    con jitter, respetando el header Retry-After.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    class _CountingRetry(Retry):
+        """Retry de urllib3 que contabiliza reintentos y respuestas 429 en _http_stats."""
+
+        def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+            _record_http_stat("retries")
+            if response is not None and response.status == 429:
+                _record_http_stat("throttled")
+            return super().increment(method, url, response, error, _pool, _stacktrace)
+
+    retry = _CountingRetry(
+        total=WEATHER_MAX_RETRIES,
+        backoff_factor=WEATHER_BACKOFF_FACTOR,
+        backoff_jitter=WEATHER_BACKOFF_FACTOR,
+        backoff_max=60,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["GET"],
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_http_session() -> requests.Session:
+    """Sesión HTTP compartida del proceso (ver _build_http_session)."""
+    return _get_client("http", _build_http_session)
+
+
+def http_get(url: str, params: dict, timeout: int = 60) -> requests.Response:
+    """
+    GET a través de la sesión compartida, pasando antes por el rate limiter.
 
     Args:
-        bucket_name: Nombre del bucket GCS
+        url: URL a consultar
+        params: Query params
+        timeout: Timeout en segundos por intento
 
     Returns:
-        Set de fechas en formato YYYY-MM-DD
+        Response (ya validada con raise_for_status)
     """
-    client = storage.Client(project=PROJECT_ID)
-    bucket = client.bucket(bucket_name)
+    waited = _rate_limiter.acquire()
+    _record_http_stat("rate_limit_wait_seconds", waited)
+    _record_http_stat("requests")
+
+    response = get_http_session().get(url, params=params, timeout=timeout)
+    response.raise_for_status()
+    return response
+
+
+# Contadores de la caché de Open-Meteo acumulados por instancia (como _http_stats)
+_weather_cache_stats = {
+    "memory_hits": 0,
+    "persistent_hits": 0,
+    "misses": 0,
+    "not_cacheable": 0,
+    "writes": 0,
+    "evictions": 0,
+    "errors": 0,
+}
+_weather_cache_stats_lock = threading.Lock()
+
+# LRU en proceso {weather_cache_key(fecha): valores del día}, compartida entre invocaciones
+_weather_cache: OrderedDict = OrderedDict()
+_weather_cache_lock = threading.Lock()
+
+
+def _record_cache_stat(name: str, value: int = 1) -> None:
+    with _weather_cache_stats_lock:
+        _weather_cache_stats[name] += value
+
+
+def weather_cache_stats_snapshot() -> dict:
+    """Copia de los contadores de la caché de Open-Meteo."""
+    with _weather_cache_stats_lock:
+        return dict(_weather_cache_stats)
+
+
+def weather_cache_stats_since(snapshot: dict) -> dict:
+    """Contadores de la caché desde un snapshot (para el dict de resultado)."""
+    current = weather_cache_stats_snapshot()
+    return {name: current[name] - snapshot[name] for name in current}
+
 
-    existing_dates = set()
-    prefix = f"{PARQUET_BASE_PATH}/date="
+def weather_cache_key(date: str) -> tuple:
+    """Clave de caché de un día: (lat, lon, fecha, variables, timezone)."""
+    return (CHICAGO_LAT, CHICAGO_LON, date, tuple(WEATHER_DAILY_VARIABLES), WEATHER_TIMEZONE)
 
-    blobs = bucket.list_blobs(prefix=prefix)
-    for blob in blobs:
-        # Extraer fecha del path: weather/date=2023-06-01/data.parquet
+
+def is_cacheable_date(date: str) -> bool:
+    """
+    True si el día queda fuera de la ventana de frescura: Open-Meteo aún puede
+    revisar los días recientes, que se piden siempre a la API.
+    """
+    cutoff = datetime.now() - timedelta(days=WEATHER_CACHE_MIN_AGE_DAYS)
+    return date <= cutoff.strftime("%Y-%m-%d")
+
+
+def _memory_cache_get(key: tuple) -> dict | None:
+    with _weather_cache_lock:
+        record = _weather_cache.get(key)
+        if record is not None:
+            _weather_cache.move_to_end(key)
+        return record
+
+
+def _memory_cache_put(key: tuple, record: dict) -> None:
+    if WEATHER_CACHE_MEMORY_ENTRIES <= 0:
+        return
+    with _weather_cache_lock:
+        _weather_cache[key] = record
+        _weather_cache.move_to_end(key)
+        while len(_weather_cache) > WEATHER_CACHE_MEMORY_ENTRIES:
+            _weather_cache.popitem(last=False)
+
+
+def persistent_cache_path(date: str) -> str:
+    """
+    Path relativo (bajo WEATHER_CACHE_URI) de la entrada persistente de un día.
+
+    Una entrada agrupa los días de un mes para una misma combinación de
+    (lat, lon, variables, timezone): reprocesar un año lee 12 objetos.
+    """
+    import hashlib
+
+    lat, lon, _, variables, timezone = weather_cache_key(date)
+    request = json.dumps([lat, lon, list(variables), timezone])
+    return f"{hashlib.sha1(request.encode('utf-8')).hexdigest()[:16]}/{date[:7]}.json"
+
+
+def _cache_gcs_location() -> tuple[str, str]:
+    """(bucket, prefix) de un WEATHER_CACHE_URI gs://bucket/prefix."""
+    bucket, _, prefix = WEATHER_CACHE_URI[len("gs://"):].partition("/")
+    prefix = prefix.strip("/")
+    return bucket, f"{prefix}/" if prefix else ""
+
+
+def _persistent_read(path: str) -> dict | None:
+    """Días de una entrada persistente, o None si no existe."""
+    if WEATHER_CACHE_URI.startswith("gs://"):
+        from google.api_core import exceptions as gcs_exceptions
+
+        bucket, prefix = _cache_gcs_location()
         try:
-            parts = blob.name.split("/")
-            for part in parts:
-                if part.startswith("date="):
-                    date_str = part.replace("date=", "")
-                    existing_dates.add(date_str)
-                    break
-        except Exception:
-            continue
+            data = get_storage_client().bucket(bucket).blob(prefix + path).download_as_bytes()
+        except gcs_exceptions.NotFound:
+            return None
+    else:
+        full_path = os.path.join(WEATHER_CACHE_URI, path)
+        try:
+            with open(full_path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        # El mtime marca el último uso: la poda por tamaño borra antes lo menos usado
+        os.utime(full_path)
+    return json.loads(data)["days"]
+
+
+def _persistent_write(path: str, days: dict) -> None:
+    data = json.dumps({"days": days, "updated_at": datetime.utcnow().isoformat()}).encode("utf-8")
+    if WEATHER_CACHE_URI.startswith("gs://"):
+        bucket, prefix = _cache_gcs_location()
+        blob = get_storage_client().bucket(bucket).blob(prefix + path)
+        blob.upload_from_string(data, content_type="application/json")
+    else:
+        full_path = os.path.join(WEATHER_CACHE_URI, path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        # Escritura atómica: un lector concurrente nunca ve un JSON a medias
+        tmp_path = f"{full_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, full_path)
+
+
+def _persistent_entries() -> List[tuple]:
+    """(nombre, bytes, último uso en epoch) de cada entrada persistente."""
+    if WEATHER_CACHE_URI.startswith("gs://"):
+        bucket, prefix = _cache_gcs_location()
+        return [
+            (blob.name, blob.size or 0, blob.updated.timestamp() if blob.updated else 0.0)
+            for blob in get_storage_client().bucket(bucket).list_blobs(prefix=prefix)
+            if blob.name.endswith(".json")
+        ]
+
+    entries = []
+    for root, _, files in os.walk(WEATHER_CACHE_URI):
+        for name in files:
+            if name.endswith(".json"):
+                try:
+                    stat = os.stat(os.path.join(root, name))
+                except FileNotFoundError:
+                    # Podada por otra instancia entre el listado y el stat
+                    continue
+                entries.append((os.path.join(root, name), stat.st_size, stat.st_mtime))
+    return entries
+
+
+def _persistent_delete(name: str) -> bool:
+    """Borra una entrada persistente; False si ya no existía (la podó otra instancia)."""
+    if WEATHER_CACHE_URI.startswith("gs://"):
+        from google.api_core import exceptions as gcs_exceptions
+
+        bucket, _ = _cache_gcs_location()
+        try:
+            get_storage_client().bucket(bucket).blob(name).delete()
+        except gcs_exceptions.NotFound:
+            return False
+    else:
+        try:
+            os.remove(name)
+        except FileNotFoundError:
+            return False
+    return True
 
-    logger.info(f"Found {len(existing_dates)} existing dates in GCS")
-    return existing_dates
 
+def prune_weather_cache() -> int:
+    """
+    Borra las entradas persistentes más antiguas hasta que el tier ocupe como
+    mucho WEATHER_CACHE_MAX_MB. En disco la antigüedad es la del último uso
+    (las lecturas actualizan el mtime); en GCS, la de la última escritura. A
+    igual antigüedad (resolución del mtime) se borra antes el mes anterior.
+
+    Una entrada que ya no existe (la podó otra instancia a la vez) deja de
+    ocupar sitio pero no cuenta como eviction de esta poda.
 
-def get_date_range(start_date: str, end_date: str) -> List[str]:
+    Returns:
+        Número de entradas borradas
     """
-    Genera lista de fechas entre start y end.
+    if not WEATHER_CACHE_URI:
+        return 0
+
+    entries = sorted(_persistent_entries(), key=lambda entry: (entry[2], entry[0]))
+    total = sum(size for _, size, _ in entries)
+    limit = WEATHER_CACHE_MAX_MB * 1024**2
+    evicted = 0
+    for name, size, _ in entries:
+        if total <= limit:
+            break
+        if _persistent_delete(name):
+            evicted += 1
+        total -= size
+
+    if evicted:
+        _record_cache_stat("evictions", evicted)
+        logger.info(f"Evicted {evicted} weather cache entries ({total / 1024**2:.1f} MB left)")
+    return evicted
+
+
+def weather_cache_get_many(dates: List[str]) -> dict:
+    """
+    Busca días en la caché: primero en la LRU en proceso y después en el tier
+    persistente, con una lectura por entrada (mes) que puebla además la LRU.
+    Los días dentro de la ventana de frescura no se buscan.
+
+    Un fallo del tier persistente no interrumpe la ingesta: esos días cuentan
+    como miss y se piden a la API.
 
     Args:
-        start_date: Fecha inicio (YYYY-MM-DD)
-        end_date: Fecha fin (YYYY-MM-DD)
+        dates: Fechas (YYYY-MM-DD)
 
     Returns:
-        Lista de fechas en formato YYYY-MM-DD
+        Dict {fecha: valores del día} con los días encontrados
     """
-    start = datetime.strptime(start_date, "%Y-%m-%d")
-    end = datetime.strptime(end_date, "%Y-%m-%d")
+    found = {}
+    entries: dict = {}
+    for date in dates:
+        if not is_cacheable_date(date):
+            _record_cache_stat("not_cacheable")
+            continue
 
-    dates = []
-    current = start
-    while current <= end:
-        dates.append(current.strftime("%Y-%m-%d"))
-        current += timedelta(days=1)
+        record = _memory_cache_get(weather_cache_key(date))
+        if record is not None:
+            found[date] = record
+            _record_cache_stat("memory_hits")
+            continue
 
-    return dates
+        if WEATHER_CACHE_URI:
+            path = persistent_cache_path(date)
+            if path not in entries:
+                try:
+                    entries[path] = _persistent_read(path) or {}
+                except Exception as e:
+                    logger.warning(f"Weather cache read failed for {path}: {str(e)}")
+                    _record_cache_stat("errors")
+                    entries[path] = {}
+                for day, values in entries[path].items():
+                    _memory_cache_put(weather_cache_key(day), values)
+
+            record = entries[path].get(date)
+            if record is not None:
+                found[date] = record
+                _record_cache_stat("persistent_hits")
+                continue
+
+        _record_cache_stat("misses")
+    return found
+
+
+def weather_cache_put_many(records: dict) -> None:
+    """
+    Guarda en ambos tiers los días fuera de la ventana de frescura y poda el
+    tier persistente si supera WEATHER_CACHE_MAX_MB.
 
+    Args:
+        records: Dict {fecha: valores del día} tal como los devuelve la API
+    """
+    cacheable = {date: record for date, record in records.items() if is_cacheable_date(date)}
+    for date, record in cacheable.items():
+        _memory_cache_put(weather_cache_key(date), record)
+    if not WEATHER_CACHE_URI or not cacheable:
+        return
 
-def fetch_weather_for_date(date: str) -> pd.DataFrame:
+    by_path: dict = {}
+    for date, record in cacheable.items():
+        by_path.setdefault(persistent_cache_path(date), {})[date] = record
+
+    try:
+        for path, days in by_path.items():
+            merged = {**(_persistent_read(path) or {}), **days}
+            _persistent_write(path, dict(sorted(merged.items())))
+            _record_cache_stat("writes", len(days))
+        prune_weather_cache()
+    except Exception as e:
+        logger.warning(f"Weather cache write failed: {str(e)}")
+        _record_cache_stat("errors")
+
+
+def request_weather_days(start_date: str, end_date: str) -> dict:
     """
-    Obtiene datos climaticos de Open-Meteo API para una fecha específica.
+    Pide un rango de fechas a Open-Meteo con una única request.
 
     Args:
-        date: Fecha (YYYY-MM-DD)
+        start_date: Fecha inicio (YYYY-MM-DD)
+        end_date: Fecha fin (YYYY-MM-DD)
 
     Returns:
-        DataFrame con datos climaticos de ese día
+        Dict {fecha: {variable: valor}} con los días devueltos por la API,
+        en el orden de columnas de la respuesta
     """
     params = {
         "latitude": CHICAGO_LAT,
         "longitude": CHICAGO_LON,
-        "start_date": date,
-        "end_date": date,
-        "daily": [
-            "temperature_2m_max",
-            "temperature_2m_min",
-            "temperature_2m_mean",
-            "precipitation_sum",
-            "rain_sum",
-            "snowfall_sum",
-            "wind_speed_10m_max",
-            "wind_gusts_10m_max",
-            "weather_code"
-        ],
-        "timezone": "America/Chicago"
+        "start_date": start_date,
+        "end_date": end_date,
+        "daily": WEATHER_DAILY_VARIABLES,
+        "timezone": WEATHER_TIMEZONE
     }
 
-    response = requests.get(OPEN_METEO_URL, params=params, timeout=60)
-    response.raise_for_status()
+    with stage_span("http_fetch", f"{start_date}..{end_date}") as span:
+        response = http_get(OPEN_METEO_URL, params=params, timeout=60)
+        data = response.json()["daily"]
+        span["bytes_in"] = len(response.content)
+        span["rows"] = len(data.get("time", []))
+
+    return {
+        day: {name: values[i] for name, values in data.items()}
+        for i, day in enumerate(data.get("time", []))
+    }
+
+
+def fetch_weather_for_range(start_date: str, end_date: str) -> dict:
+    """
+    Obtiene datos climaticos de un rango de fechas y los divide en un
+    DataFrame por día. Los días cacheados no se piden a la API; el resto se
+    pide con una request por tramo consecutivo y se guarda en la caché.
+
+    Cada DataFrame diario es equivalente al de una request de un solo día:
+    mismas columnas y tipos, índice desde 0 y su propio loaded_at (ver
+    weather_day_frame).
+
+    Args:
+        start_date: Fecha inicio (YYYY-MM-DD)
+        end_date: Fecha fin (YYYY-MM-DD)
+
+    Returns:
+        Dict {fecha: DataFrame} con las fechas devueltas por la API o la caché
+    """
+    dates = get_date_range(start_date, end_date)
+    records = weather_cache_get_many(dates)
+
+    missing = [date for date in dates if date not in records]
+    for run in group_contiguous_dates(missing, len(dates)):
+        fetched = request_weather_days(run[0], run[-1])
+        weather_cache_put_many(fetched)
+        records.update(fetched)
 
-    data = response.json()["daily"]
-    df = pd.DataFrame(data)
+    return {date: weather_day_frame(records[date]) for date in dates if date in records}
 
-    # Renombrar columnas para coincidir con schema de BigQuery
-    df = df.rename(columns={
+
+def weather_day_frame(record: dict) -> pd.DataFrame:
+    """
+    Construye el DataFrame de un día a partir de su registro de la API.
+
+    Cada día se construye por separado para que sus tipos dependan solo de
+    sus valores: con un DataFrame del rango troceado por filas, un día con
+    nulos heredaba el float64 de sus vecinos y uno pedido solo no.
+
+    Args:
+        record: Dict {variable: valor} de un día, como lo devuelve la API
+
+    Returns:
+        DataFrame de una fila con columnas renombradas y su propio loaded_at
+    """
+    import pandas as pd
+
+    # Renombrar columnas para coincidir con schema de BigQuery (sobre el dict:
+    # rename y to_datetime de pandas cuestan más que la fila entera)
+    renames = {
         "time": "date",
         "temperature_2m_max": "temperature_max",
         "temperature_2m_min": "temperature_min",
         "temperature_2m_mean": "temperature_mean",
         "wind_speed_10m_max": "wind_speed_max",
         "wind_gusts_10m_max": "wind_gusts_max"
-    })
+    }
+    row = {renames.get(name, name): value for name, value in record.items()}
 
     # Convertir tipos
-    df['date'] = pd.to_datetime(df['date']).dt.date
+    row['date'] = datetime.fromisoformat(row['date']).date()
+    df = pd.DataFrame([row])
     df['loaded_at'] = datetime.utcnow()
-
     return df
 
 
+def fetch_weather_for_date(date: str) -> pd.DataFrame:
+    """
+    Obtiene datos climaticos de Open-Meteo API para una fecha específica.
+
+    Args:
+        date: Fecha (YYYY-MM-DD)
+
+    Returns:
+        DataFrame con datos climaticos de ese día
+    """
+    return fetch_weather_for_range(date, date)[date]
+
+
+def dq_enabled() -> bool:
+    """True si hay que perfilar cada día (DQ_PROFILE o umbrales configurados)."""
+    return DQ_PROFILE or bool(DQ_THRESHOLDS.strip())
+
+
+def dq_thresholds() -> dict:
+    """
+    Umbrales de DQ_THRESHOLDS como {check: fracción máxima de filas}.
+
+    Returns:
+        Dict vacío si no hay umbrales
+    """
+    thresholds = {}
+    for item in DQ_THRESHOLDS.split(","):
+        if item.strip():
+            name, _, value = item.partition("=")
+            thresholds[name.strip()] = float(value)
+    return thresholds
+
+
+def _json_value(value: Any) -> Any:
+    """Escalar de Arrow (.as_py()) serializable en JSON: fechas ISO, decimales a float."""
+    import decimal
+
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    return value
+
+
+def _any_true(masks: list) -> Any:
+    """OR de varias máscaras booleanas; NULL cuenta como False."""
+    import pyarrow.compute as pc
+
+    combined = masks[0]
+    for mask in masks[1:]:
+        combined = pc.or_kleene(combined, mask)
+    return pc.fill_null(combined, False)
+
+
+def profile_weather_table(table: Any, date: str) -> dict:
+    """
+    Perfil de calidad de un día de clima calculado con kernels de Arrow: NULLs
+    por columna, min y max de las numéricas y fechas, y filas con
+    precipitación negativa o temperaturas fuera de WEATHER_TEMPERATURE_BOUNDS.
+
+    Args:
+        table: Tabla Arrow del día
+        date: Fecha de la partición (YYYY-MM-DD)
+
+    Returns:
+        Dict con date, rows, nulls, min, max, checks, failed_checks y rejected
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    profile = {
+        "date": date,
+        "rows": table.num_rows,
+        "nulls": {name: table.column(name).null_count for name in table.column_names},
+        "min": {},
+        "max": {},
+    }
+    for field in table.schema:
+        if pa.types.is_integer(field.type) or pa.types.is_floating(field.type) or \
+                pa.types.is_temporal(field.type):
+            bounds = pc.min_max(table.column(field.name))
+            profile["min"][field.name] = _json_value(bounds["min"].as_py())
+            profile["max"][field.name] = _json_value(bounds["max"].as_py())
+
+    def values(name: str) -> Any:
+        return pc.cast(table.column(name), pa.float64())
+
+    low, high = WEATHER_TEMPERATURE_BOUNDS
+    precipitation = [pc.less(values(name), 0) for name in ("precipitation_sum", "rain_sum", "snowfall_sum")]
+    temperatures = [
+        pc.or_(pc.less(values(name), low), pc.greater(values(name), high))
+        for name in ("temperature_min", "temperature_max", "temperature_mean")
+    ]
+    profile["checks"] = {
+        "negative_precipitation": pc.sum(_any_true(precipitation)).as_py() or 0,
+        "temperature_out_of_range": pc.sum(_any_true(temperatures)).as_py() or 0,
+    }
+    return evaluate_profile(profile)
+
+
+def evaluate_profile(profile: dict) -> dict:
+    """
+    Añade failed_checks y rejected a un perfil según DQ_THRESHOLDS. Cada umbral
+    es la fracción máxima de filas que puede fallar un check (o ser NULL en
+    una columna, con nulls.<columna>).
+
+    Args:
+        profile: Perfil con rows, nulls y checks
+
+    Returns:
+        El mismo perfil
+    """
+    failed = []
+    rows = profile["rows"]
+    for name, limit in dq_thresholds().items():
+        counts = profile["nulls"] if name.startswith("nulls.") else profile["checks"]
+        key = name.removeprefix("nulls.")
+        if key not in counts:
+            raise ValueError(f"Unknown data quality check: {name}")
+        fraction = counts[key] / rows if rows else 0.0
+        if fraction > limit:
+            failed.append(f"{name}={counts[key]} ({fraction:.2%} > {limit:.2%})")
+    profile["failed_checks"] = failed
+    profile["rejected"] = bool(failed)
+    return profile
+
+
+def profile_blob_path(date: str) -> str:
+    """Path del perfil de calidad de una fecha: _profiles/weather/date=YYYY-MM-DD/profile.json"""
+    return f"{PROFILE_PREFIX}/date={date}/profile.json"
+
+
+def check_profile(profile: dict, bucket_name: str, date: str) -> None:
+    """
+    Sube el perfil (con DQ_PROFILE, también el de un día rechazado) y lanza
+    ValueError si el día supera algún umbral de DQ_THRESHOLDS.
+
+    Args:
+        profile: Perfil del día
+        bucket_name: Nombre del bucket GCS
+        date: Fecha de la partición (YYYY-MM-DD)
+    """
+    if DQ_PROFILE:
+        profile["profiled_at"] = datetime.utcnow().isoformat()
+        # Una línea JSON sin date (es la clave Hive de la ruta): la external table
+        # lo lee como NEWLINE_DELIMITED_JSON
+        sidecar = {name: value for name, value in profile.items() if name != "date"}
+        blob = get_storage_client().bucket(bucket_name).blob(profile_blob_path(date))
+        blob.upload_from_string(json.dumps(sidecar, separators=(",", ":")) + "\n", content_type="application/json")
+    if profile["rejected"]:
+        raise ValueError(f"Data quality check failed for {date}: {', '.join(profile['failed_checks'])}")
+
+
 def write_daily_parquet(df: pd.DataFrame, bucket_name: str, date: str) -> str:
     """
     Escribe DataFrame como Parquet a GCS usando particionamiento Hive.
 
+    Con DQ_PROFILE / DQ_THRESHOLDS el día se perfila antes de subirlo (ver
+    profile_weather_table) y un día rechazado lanza ValueError sin escribirse.
+
     Args:
         df: DataFrame a escribir
         bucket_name: Nombre del bucket GCS
@@ -197,28 +836,45 @@ def write_daily_parquet(df: pd.DataFrame, bucket_name: str, date: str) -> str:
     Returns:
         URI completa del archivo en GCS
     """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
     # Path con particionamiento Hive: weather/date=YYYY-MM-DD/data.parquet
-    blob_path = f"{PARQUET_BASE_PATH}/date={date}/data.parquet"
+    blob_path = partition_blob_path(date)
 
     # Convertir DataFrame a tabla PyArrow
-    table = pa.Table.from_pandas(df)
+    with stage_span("from_pandas", date, rows=len(df)) as span:
+        table = pa.Table.from_pandas(df)
+        span["bytes_out"] = table.nbytes
 
-    # Crear cliente de storage
-    client = storage.Client(project=PROJECT_ID)
+    if dq_enabled():
+        with stage_span("dq_profile", date, rows=table.num_rows, bytes_in=table.nbytes):
+            quality = profile_weather_table(table, date)
+        check_profile(quality, bucket_name, date)
+
+    # Cliente de storage compartido
+    client = get_storage_client()
     bucket = client.bucket(bucket_name)
     blob = bucket.blob(blob_path)
 
     # Escribir Parquet a memoria y subir
     buffer = io.BytesIO()
-    pq.write_table(table, buffer)
+    with stage_span("parquet_encode", date, rows=table.num_rows, bytes_in=table.nbytes) as span:
+        pq.write_table(table, buffer)
+        span["bytes_out"] = buffer.tell()
     buffer.seek(0)
 
-    blob.upload_from_file(buffer, content_type="application/octet-stream")
+    with stage_span("upload", date, bytes_in=buffer.getbuffer().nbytes):
+        blob.upload_from_file(buffer, content_type="application/octet-stream")
+
+    register_partition(bucket_name, date)
 
     gcs_uri = f"gs://{bucket_name}/{blob_path}"
+    logger.info(f"Written parquet to {gcs_uri}")
     return gcs_uri
 
 
+@instrumented(FUNCTION_NAME)
 def process_single_date(target_date: str, force: bool = False) -> dict:
     """
     Procesa una única fecha (usado por modo daily_offset).
@@ -233,17 +889,21 @@ def process_single_date(target_date: str, force: bool = False) -> dict:
     try:
         # Verificar si ya existe
         if not force:
-            existing_dates = get_existing_dates(GCS_BUCKET)
-            if target_date in existing_dates:
+            with stage_span("existing_dates", target_date):
+                exists = partition_exists(GCS_BUCKET, target_date)
+            if exists:
                 return {
                     "status": "success",
                     "message": f"Date {target_date} already exists - skipping",
                     "target_date": target_date,
-                    "processed": False
+                    "processed": False,
+                    "dates_written": []
                 }
 
         # Fetch y escribir
         logger.info(f"Processing single date: {target_date}")
+        http_before = http_stats_snapshot()
+        cache_before = weather_cache_stats_snapshot()
         df = fetch_weather_for_date(target_date)
         gcs_uri = write_daily_parquet(df, GCS_BUCKET, target_date)
 
@@ -252,7 +912,10 @@ def process_single_date(target_date: str, force: bool = False) -> dict:
             "message": f"Processed weather data for {target_date}",
             "target_date": target_date,
             "gcs_uri": gcs_uri,
-            "processed": True
+            "processed": True,
+            "dates_written": [target_date],
+            "http": http_stats_since(http_before),
+            "weather_cache": weather_cache_stats_since(cache_before)
         }
 
     except Exception as e:
@@ -260,6 +923,7 @@ def process_single_date(target_date: str, force: bool = False) -> dict:
         raise
 
 
+@instrumented(FUNCTION_NAME)
 def process_weather_ingestion(start_date: str = None, end_date: str = None, force: bool = False) -> dict:
     """
     Proceso principal de ingestion de datos climaticos con sharding diario.
@@ -278,7 +942,8 @@ def process_weather_ingestion(start_date: str = None, end_date: str = None, forc
 
     try:
         # Obtener fechas existentes en GCS
-        existing_dates = set() if force else get_existing_dates(GCS_BUCKET)
+        with stage_span("existing_dates"):
+            existing_dates = set() if force else get_existing_dates(GCS_BUCKET, start, end)
 
         # Obtener rango de fechas a procesar
         all_dates = get_date_range(start, end)
@@ -292,44 +957,60 @@ def process_weather_ingestion(start_date: str = None, end_date: str = None, forc
                 "message": "No new dates to process - all data already exists",
                 "date_range": {"start": start, "end": end},
                 "existing_records": len(existing_dates),
-                "new_records": 0
+                "new_records": 0,
+                "dates_written": []
             }
 
         logger.info(f"Processing {len(missing_dates)} missing dates out of {len(all_dates)} total")
 
-        # Procesar cada fecha faltante
-        processed_count = 0
+        # Una request por tramo de fechas consecutivas (sin los días cacheados), escritura por día
+        written: List[str] = []
         errors = []
+        http_before = http_stats_snapshot()
+        cache_before = weather_cache_stats_snapshot()
 
-        for date in missing_dates:
+        for run in group_contiguous_dates(missing_dates, WEATHER_MAX_SPAN_DAYS):
             try:
-                # Fetch data for this date
-                df = fetch_weather_for_date(date)
+                frames = fetch_weather_for_range(run[0], run[-1])
+            except Exception as e:
+                logger.error(f"Error fetching range {run[0]} to {run[-1]}: {str(e)}")
+                errors.extend({"date": date, "error": str(e)} for date in run)
+                continue
 
-                # Write to GCS
-                gcs_uri = write_daily_parquet(df, GCS_BUCKET, date)
-                processed_count += 1
+            for date in run:
+                try:
+                    if date not in frames:
+                        raise ValueError(f"No weather data returned for {date}")
 
-                if processed_count % 10 == 0:
-                    logger.info(f"Processed {processed_count}/{len(missing_dates)} dates")
+                    # Write to GCS
+                    write_daily_parquet(frames.pop(date), GCS_BUCKET, date)
+                    written.append(date)
 
-            except Exception as e:
-                logger.error(f"Error processing date {date}: {str(e)}")
-                errors.append({"date": date, "error": str(e)})
+                    if len(written) % 10 == 0:
+                        logger.info(f"Processed {len(written)}/{len(missing_dates)} dates")
+
+                except Exception as e:
+                    logger.error(f"Error processing date {date}: {str(e)}")
+                    errors.append({"date": date, "error": str(e)})
 
+        http = http_stats_since(http_before)
         result = {
             "status": "success",
-            "message": f"Processed {processed_count} new daily weather records",
+            "message": f"Processed {len(written)} new daily weather records",
             "date_range": {"start": start, "end": end},
             "total_dates_in_range": len(all_dates),
             "existing_dates": len(existing_dates),
-            "new_dates_processed": processed_count,
+            "new_dates_processed": len(written),
+            "dates_written": written,
+            "api_requests": http["requests"],
+            "http": http,
+            "weather_cache": weather_cache_stats_since(cache_before),
             "gcs_path": f"gs://{GCS_BUCKET}/{PARQUET_BASE_PATH}/date=*/"
         }
 
         if errors:
             result["errors"] = errors
-            result["status"] = "partial_success" if processed_count > 0 else "error"
+            result["status"] = "partial_success" if written else "error"
 
         return result
 
@@ -349,6 +1030,7 @@ def ingest_weather(request):
     - end_date: Fecha fin (YYYY-MM-DD) - solo para mode=range
     - offset_days: Días de offset para mode=daily_offset (default: 364)
     - force: Si es "true", reprocesa aunque exista
+    - debug_profile: Si es "true", añade top-N de cProfile y tracemalloc al resultado
 
     Ejemplos:
     - /ingest?mode=daily_offset  → Procesa fecha de hace 364 días
@@ -362,6 +1044,7 @@ def ingest_weather(request):
         # Obtener parametros del request
         mode = request.args.get("mode", "range")
         force = request.args.get("force", "").lower() == "true"
+        debug_profile = request.args.get("debug_profile", "").lower() == "true"
 
         # Si es POST, intentar leer del body
         body = {}
@@ -370,6 +1053,7 @@ def ingest_weather(request):
                 body = request.get_json(silent=True) or {}
                 mode = body.get("mode", mode)
                 force = force or body.get("force", False)
+                debug_profile = debug_profile or body.get("debug_profile", False)
             except Exception:
                 pass
 
@@ -380,7 +1064,7 @@ def ingest_weather(request):
             target_date = calculate_offset_date(offset_days)
 
             logger.info(f"Mode: daily_offset, offset_days: {offset_days or OFFSET_DAYS}, target_date: {target_date}")
-            result = process_single_date(target_date, force)
+            result = process_single_date(target_date, force, debug_profile=debug_profile)
             result["mode"] = "daily_offset"
             result["offset_days"] = offset_days or OFFSET_DAYS
             result["execution_date"] = datetime.now().strftime("%Y-%m-%d")
@@ -389,7 +1073,7 @@ def ingest_weather(request):
         else:
             start_date = request.args.get("start_date") or body.get("start_date")
             end_date = request.args.get("end_date") or body.get("end_date")
-            result = process_weather_ingestion(start_date, end_date, force)
+            result = process_weather_ingestion(start_date, end_date, force, debug_profile=debug_profile)
             result["mode"] = "range"
 
         return json.dumps(result), 200, {"Content-Type": "application/json"}
@@ -412,6 +1096,7 @@ def ingest_weather_pubsub(cloud_event):
     - end_date: Fecha fin (YYYY-MM-DD) - solo para mode=range
     - offset_days: Días de offset para mode=daily_offset
     - force: Si es true, reprocesa aunque exista
+    - debug_profile: Si es true, añade top-N de cProfile y tracemalloc al resultado
     """
     import base64
 
@@ -426,16 +1111,17 @@ def ingest_weather_pubsub(cloud_event):
 
         mode = data.get("mode", "daily_offset")  # Default a daily_offset para scheduler
         force = data.get("force", False)
+        debug_profile = data.get("debug_profile", False)
 
         if mode == "daily_offset":
             offset_days = data.get("offset_days")
             target_date = calculate_offset_date(offset_days)
             logger.info(f"Pub/Sub trigger - Mode: daily_offset, target_date: {target_date}")
-            result = process_single_date(target_date, force)
+            result = process_single_date(target_date, force, debug_profile=debug_profile)
         else:
             start_date = data.get("start_date")
             end_date = data.get("end_date")
-            result = process_weather_ingestion(start_date, end_date, force)
+            result = process_weather_ingestion(start_date, end_date, force, debug_profile=debug_profile)
 
         logger.info(f"Pub/Sub trigger completed: {result}")
 
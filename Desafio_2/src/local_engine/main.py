@@ -0,0 +1,593 @@
+"""
+Motor local: transformaciones silver/analytics con DuckDB sobre el landing en Parquet.
+
+Reproduce la lógica de los modelos dbt silver_taxis, silver_weather y
+taxis_weather_enriched directamente sobre el layout Hive que escriben las
+Cloud Functions (taxis/date=YYYY-MM-DD/data.parquet, o las part-*.parquet que lista
+el marcador _complete/taxis/date=.../parts.json en particiones multi-fichero, y
+weather/date=.../data.parquet), sin pasar por BigQuery. Sirve para reprocesar en local y para checks de
+paridad en CI.
+
+Salida (mismo layout Hive, un fichero por partición):
+- silver_weather/data.parquet
+- silver_taxis/date=YYYY-MM-DD/data.parquet
+- taxis_weather_enriched/date=YYYY-MM-DD/data.parquet
+
+Los resúmenes vw_trips_weather_summary y trips_weather_summary_agg (desde el
+cubo diario taxis_agg/ del landing) se consultan con trips_weather_summary.
+
+Paralelismo: cada fecha es una tarea independiente en un pool de threads
+(un cursor DuckDB por tarea) y DuckDB reparte cada query entre sus threads.
+
+Variables de entorno:
+- LOCAL_ENGINE_MAX_WORKERS: Particiones procesadas a la vez (default: 4)
+- LOCAL_ENGINE_THREADS: Threads de DuckDB, 0 = todos los cores (default: 0)
+
+Uso:
+    uv run python src/local_engine/main.py --landing ./landing --output ./local_out \\
+        --start-date 2023-06-01 --end-date 2023-06-30
+
+Para trabajar sobre el bucket, sincronizar antes el landing:
+    gsutil -m rsync -r gs://orbidi-challenge-data-landing ./landing
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import TYPE_CHECKING, List
+
+import duckdb
+
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Configuracion desde variables de entorno
+LOCAL_ENGINE_MAX_WORKERS = int(os.environ.get("LOCAL_ENGINE_MAX_WORKERS", "4"))
+LOCAL_ENGINE_THREADS = int(os.environ.get("LOCAL_ENGINE_THREADS", "0"))
+
+# Prefijos del landing (los mismos PARQUET_BASE_PATH de las funciones de ingesta)
+TAXIS_BASE_PATH = "taxis"
+TAXIS_AGG_BASE_PATH = "taxis_agg"
+WEATHER_BASE_PATH = "weather"
+# Marcadores de particiones multi-fichero (COMPLETE_PREFIX de ingest_taxis)
+COMPLETE_BASE_PATH = "_complete"
+
+# Prefijos de salida: nombre del modelo dbt equivalente
+SILVER_TAXIS_PATH = "silver_taxis"
+SILVER_WEATHER_PATH = "silver_weather"
+ENRICHED_PATH = "taxis_weather_enriched"
+
+# dbt/models/silver/silver_taxis.sql en dialecto DuckDB. Diferencias con BigQuery:
+# - dayofweek de DuckDB va de 0 (domingo) a 6; BigQuery de 1 a 7 → +1
+# - CAST(double AS BIGINT) redondea a par en DuckDB; BigQuery redondea alejándose
+#   de cero → cast(round(x) as bigint)
+# - La sesión usa TimeZone=UTC para que hour/date coincidan con BigQuery
+SILVER_TAXIS_SQL = """
+    select
+        -- Primary key and partition
+        unique_key,
+        cast(trip_start_timestamp as date) as date,
+
+        -- Timestamps
+        trip_start_timestamp as trip_start_ts,
+        trip_end_timestamp as trip_end_ts,
+
+        -- Time extractions
+        extract(hour from trip_start_timestamp) as start_hour,
+        dayofweek(trip_start_timestamp) + 1 as day_of_week,
+        case
+            when dayofweek(trip_start_timestamp) + 1 in (1, 7) then 'weekend'
+            else 'weekday'
+        end as day_type,
+        case
+            when extract(hour from trip_start_timestamp) between 6 and 9 then 'morning_rush'
+            when extract(hour from trip_start_timestamp) between 10 and 15 then 'midday'
+            when extract(hour from trip_start_timestamp) between 16 and 19 then 'evening_rush'
+            when extract(hour from trip_start_timestamp) between 20 and 23 then 'night'
+            else 'late_night'
+        end as time_of_day,
+
+        -- Trip duration
+        cast(round(trip_seconds) as bigint) as trip_seconds,
+        round(cast(trip_seconds as double) / 60, 2) as trip_minutes,
+
+        -- Distance
+        round(cast(trip_miles as double), 2) as trip_miles,
+        round(cast(trip_miles as double) * 1.60934, 2) as trip_km,
+
+        -- Average speed (only if trip_seconds > 0)
+        case
+            when cast(round(trip_seconds) as bigint) > 0
+            then round((cast(trip_miles as double) / (cast(trip_seconds as double) / 3600)), 2)
+            else null
+        end as avg_speed_mph,
+
+        -- Financial metrics
+        round(cast(fare as double), 2) as fare,
+        round(cast(tips as double), 2) as tips,
+        round(cast(tolls as double), 2) as tolls,
+        round(cast(extras as double), 2) as extras,
+        round(cast(trip_total as double), 2) as trip_total,
+
+        -- Tip percentage
+        case
+            when cast(fare as double) > 0
+            then round((cast(tips as double) / cast(fare as double)) * 100, 2)
+            else 0
+        end as tip_percentage,
+
+        -- Cost per mile
+        case
+            when cast(trip_miles as double) > 0
+            then round(cast(trip_total as double) / cast(trip_miles as double), 2)
+            else null
+        end as cost_per_mile,
+
+        -- Categories
+        coalesce(cast(payment_type as varchar), 'Unknown') as payment_type,
+        coalesce(cast(company as varchar), 'Unknown') as company,
+        cast(taxi_id as varchar) as taxi_id,
+
+        -- Location
+        cast(round(pickup_community_area) as bigint) as pickup_community_area,
+        cast(round(dropoff_community_area) as bigint) as dropoff_community_area,
+        cast(pickup_latitude as double) as pickup_lat,
+        cast(pickup_longitude as double) as pickup_lon,
+        cast(dropoff_latitude as double) as dropoff_lat,
+        cast(dropoff_longitude as double) as dropoff_lon,
+
+        -- Valid trip flag
+        case
+            when cast(round(trip_seconds) as bigint) > 0
+                 and cast(trip_miles as double) > 0
+                 and cast(fare as double) >= 0
+            then true
+            else false
+        end as is_valid_trip,
+
+        -- Metadata
+        current_timestamp as processed_at
+
+    -- La fecha sale de trip_start_timestamp, no de la ruta Hive
+    from read_parquet({source}, hive_partitioning = false)
+    -- stg_taxis
+    where trip_start_timestamp is not null
+"""
+
+# dbt/models/silver/silver_weather.sql en dialecto DuckDB
+SILVER_WEATHER_SQL = """
+    select
+        -- Primary key
+        date,
+
+        -- Temperatures (Celsius) with 2 decimal precision
+        round(cast(temperature_mean as double), 2) as temperature_mean_c,
+        round(cast(temperature_max as double), 2) as temperature_max_c,
+        round(cast(temperature_min as double), 2) as temperature_min_c,
+
+        -- Temperature range
+        round(cast(temperature_max as double) - cast(temperature_min as double), 2) as temperature_range_c,
+
+        -- Precipitation (mm)
+        round(cast(precipitation_sum as double), 2) as precipitation_mm,
+        round(cast(rain_sum as double), 2) as rain_mm,
+        round(cast(snowfall_sum as double), 2) as snowfall_cm,
+
+        -- Wind (km/h)
+        round(cast(wind_speed_max as double), 2) as wind_speed_max_kmh,
+
+        -- Derived categories
+        case
+            when cast(temperature_mean as double) < 0 then 'freezing'
+            when cast(temperature_mean as double) < 10 then 'cold'
+            when cast(temperature_mean as double) < 20 then 'mild'
+            when cast(temperature_mean as double) < 30 then 'warm'
+            else 'hot'
+        end as temperature_category,
+
+        case
+            when cast(precipitation_sum as double) = 0 then 'dry'
+            when cast(precipitation_sum as double) < 5 then 'light_rain'
+            when cast(precipitation_sum as double) < 20 then 'moderate_rain'
+            else 'heavy_rain'
+        end as precipitation_category,
+
+        -- Adverse conditions flag
+        case
+            when cast(snowfall_sum as double) > 0
+                 or cast(precipitation_sum as double) > 10
+                 or cast(wind_speed_max as double) > 50
+            then true
+            else false
+        end as adverse_conditions,
+
+        -- Metadata
+        current_timestamp as processed_at
+
+    -- El fichero ya trae la columna date: se ignora la de la ruta Hive
+    from read_parquet('{source}', hive_partitioning = false)
+    order by date
+"""
+
+# dbt/models/analytics/taxis_weather_enriched.sql en dialecto DuckDB
+ENRICHED_SQL = """
+    select
+        -- All taxi fields
+        t.* exclude (processed_at),
+
+        -- Weather fields
+        w.temperature_mean_c,
+        w.temperature_category,
+        w.precipitation_mm,
+        w.precipitation_category,
+        w.wind_speed_max_kmh,
+        w.adverse_conditions,
+
+        -- Metadata
+        current_timestamp as processed_at
+
+    from read_parquet('{silver_taxis}', hive_partitioning = false) t
+    left join read_parquet('{silver_weather}', hive_partitioning = false) w on t.date = w.date
+"""
+
+# Columnas agrupadas por las dos vistas de resumen
+SUMMARY_GROUP_BY = """
+        date, day_of_week, day_type, time_of_day,
+        temperature_category, precipitation_category, adverse_conditions
+"""
+
+# dbt/models/analytics/vw_trips_weather_summary.sql en dialecto DuckDB
+# (median exacta en lugar de approx_quantiles)
+SUMMARY_SQL = """
+    select
+        {group_by},
+        count(*) as total_trips,
+        avg(trip_minutes) as avg_duration_min,
+        min(trip_minutes) as min_duration_min,
+        max(trip_minutes) as max_duration_min,
+        median(trip_minutes) as median_duration_min,
+        stddev_samp(trip_minutes) as stddev_duration_min,
+        avg(trip_miles) as avg_distance_miles,
+        sum(trip_miles) as total_distance_miles,
+        avg(avg_speed_mph) as avg_speed_mph,
+        avg(trip_total) as avg_fare,
+        sum(trip_total) as total_revenue,
+        avg(tip_percentage) as avg_tip_pct,
+        avg(temperature_mean_c) as avg_temperature_c,
+        avg(precipitation_mm) as avg_precipitation_mm,
+        avg(wind_speed_max_kmh) as avg_wind_speed_kmh
+    from read_parquet('{enriched}', hive_partitioning = false)
+    where is_valid_trip = true
+    group by all
+    order by all
+"""
+
+# dbt/models/analytics/trips_weather_summary_agg.sql en dialecto DuckDB
+CUBE_SUMMARY_SQL = """
+    with cube as (
+        select
+            *,
+            dayofweek(date) + 1 as day_of_week,
+            case when dayofweek(date) in (0, 6) then 'weekend' else 'weekday' end as day_type,
+            case
+                when start_hour between 6 and 9 then 'morning_rush'
+                when start_hour between 10 and 15 then 'midday'
+                when start_hour between 16 and 19 then 'evening_rush'
+                when start_hour between 20 and 23 then 'night'
+                else 'late_night'
+            end as time_of_day
+        from read_parquet('{cube}', hive_partitioning = true, hive_types = {{'date': date}})
+    )
+    select
+        {group_by},
+        sum(trips) as total_trips,
+        sum(sum_trip_minutes) / nullif(sum(count_trip_minutes), 0) as avg_duration_min,
+        min(min_trip_minutes) as min_duration_min,
+        max(max_trip_minutes) as max_duration_min,
+        sqrt(greatest(
+            sum(sumsq_trip_minutes) - pow(sum(sum_trip_minutes), 2) / nullif(sum(count_trip_minutes), 0),
+            0
+        ) / nullif(sum(count_trip_minutes) - 1, 0)) as stddev_duration_min,
+        sum(sum_trip_miles) / nullif(sum(count_trip_miles), 0) as avg_distance_miles,
+        sum(sum_trip_miles) as total_distance_miles,
+        sum(sum_avg_speed_mph) / nullif(sum(count_avg_speed_mph), 0) as avg_speed_mph,
+        sum(sum_trip_total) / nullif(sum(count_trip_total), 0) as avg_fare,
+        sum(sum_trip_total) as total_revenue,
+        sum(sum_tip_percentage) / nullif(sum(count_tip_percentage), 0) as avg_tip_pct,
+        any_value(temperature_mean_c) as avg_temperature_c,
+        any_value(precipitation_mm) as avg_precipitation_mm,
+        any_value(wind_speed_max_kmh) as avg_wind_speed_kmh
+    from cube c
+    left join read_parquet('{silver_weather}', hive_partitioning = false) w using (date)
+    group by all
+    order by all
+"""
+
+
+def connect(threads: int | None = None) -> duckdb.DuckDBPyConnection:
+    """
+    Abre una conexión DuckDB en memoria configurada como BigQuery (UTC).
+
+    Args:
+        threads: Threads de DuckDB; 0 o None = todos los cores (default: LOCAL_ENGINE_THREADS)
+
+    Returns:
+        Conexión DuckDB
+    """
+    con = duckdb.connect()
+    con.execute("SET TimeZone = 'UTC'")
+    threads = threads if threads is not None else LOCAL_ENGINE_THREADS
+    if threads:
+        con.execute(f"SET threads = {int(threads)}")
+    return con
+
+
+def partition_path(root: Path, base: str, date: str) -> Path:
+    """Path de una partición diaria: {root}/{base}/date=YYYY-MM-DD/data.parquet"""
+    return Path(root) / base / f"date={date}" / "data.parquet"
+
+
+def partition_files(landing_dir: Path, base: str, date: str) -> List[Path]:
+    """
+    Ficheros vigentes de una partición del landing.
+
+    Si la partición tiene marcador (_complete/{base}/date=YYYY-MM-DD/parts.json)
+    son exactamente las partes que lista, aunque queden ficheros de otra
+    escritura en el directorio; si no, su data.parquet.
+
+    Args:
+        landing_dir: Directorio raíz del landing
+        base: Prefijo del dataset (taxis / weather)
+        date: Fecha de la partición (YYYY-MM-DD)
+
+    Returns:
+        Paths de los ficheros (vacío si la partición no está completa)
+    """
+    marker = Path(landing_dir) / COMPLETE_BASE_PATH / base / f"date={date}" / "parts.json"
+    if marker.exists():
+        return [Path(landing_dir) / part for part in json.loads(marker.read_text())["parts"]]
+    single = partition_path(landing_dir, base, date)
+    return [single] if single.exists() else []
+
+
+def discover_dates(landing_dir: Path, base: str, start_date: str | None = None, end_date: str | None = None) -> List[str]:
+    """
+    Lista las fechas con partición en el landing local.
+
+    Args:
+        landing_dir: Directorio raíz del landing
+        base: Prefijo del dataset (taxis / weather)
+        start_date: Fecha inicio opcional (YYYY-MM-DD)
+        end_date: Fecha fin opcional (YYYY-MM-DD)
+
+    Returns:
+        Fechas ordenadas (YYYY-MM-DD)
+    """
+    dates = []
+    for path in (Path(landing_dir) / base).glob("date=*"):
+        date = path.name.split("=", 1)[1]
+        if not partition_files(landing_dir, base, date):
+            continue
+        if (start_date is None or date >= start_date) and (end_date is None or date <= end_date):
+            dates.append(date)
+    return sorted(dates)
+
+
+def _copy_to_parquet(con: duckdb.DuckDBPyConnection, sql: str, target: Path) -> int:
+    """Escribe el resultado de sql en target (Parquet zstd) y devuelve las filas escritas."""
+    target.parent.mkdir(parents=True, exist_ok=True)
+    return con.execute(
+        f"COPY ({sql}) TO '{target}' (FORMAT parquet, COMPRESSION zstd)"
+    ).fetchone()[0]
+
+
+def build_silver_weather(con: duckdb.DuckDBPyConnection, landing_dir: Path, output_dir: Path) -> int:
+    """
+    Construye silver_weather (tabla completa, como en dbt) desde weather/date=*/.
+
+    Returns:
+        Filas escritas
+    """
+    source = Path(landing_dir) / WEATHER_BASE_PATH / "date=*" / "data.parquet"
+    target = Path(output_dir) / SILVER_WEATHER_PATH / "data.parquet"
+    rows = _copy_to_parquet(con, SILVER_WEATHER_SQL.format(source=source), target)
+    logger.info(f"Written {rows} rows to {target}")
+    return rows
+
+
+def transform_taxi_partition(
+    con: duckdb.DuckDBPyConnection, landing_dir: Path, output_dir: Path, date: str
+) -> dict:
+    """
+    Transforma una partición de taxis a silver_taxis y taxis_weather_enriched.
+
+    Equivale al insert_overwrite de esa fecha en los modelos incrementales:
+    reescribe solo los ficheros de la partición.
+
+    Args:
+        con: Cursor DuckDB (uno por thread)
+        landing_dir: Directorio raíz del landing
+        output_dir: Directorio raíz de salida (debe contener silver_weather)
+        date: Fecha de la partición (YYYY-MM-DD)
+
+    Returns:
+        Dict con date, rows, silver_path y enriched_path
+    """
+    silver_target = partition_path(output_dir, SILVER_TAXIS_PATH, date)
+    enriched_target = partition_path(output_dir, ENRICHED_PATH, date)
+
+    rows = _copy_to_parquet(
+        con,
+        # data.parquet o las partes del marcador si la partición es multi-fichero (PARTITION_TARGET_*)
+        SILVER_TAXIS_SQL.format(
+            source=[str(path) for path in partition_files(landing_dir, TAXIS_BASE_PATH, date)]
+        ),
+        silver_target,
+    )
+    _copy_to_parquet(
+        con,
+        ENRICHED_SQL.format(
+            silver_taxis=silver_target,
+            silver_weather=Path(output_dir) / SILVER_WEATHER_PATH / "data.parquet",
+        ),
+        enriched_target,
+    )
+    return {
+        "date": date,
+        "rows": rows,
+        "silver_path": str(silver_target),
+        "enriched_path": str(enriched_target),
+    }
+
+
+def trips_weather_summary(
+    con: duckdb.DuckDBPyConnection, output_dir: Path, landing_dir: Path | None = None
+) -> pa.Table:
+    """
+    Consulta vw_trips_weather_summary sobre la salida del motor local o, con
+    landing_dir, trips_weather_summary_agg sobre el cubo diario taxis_agg/.
+
+    Args:
+        con: Conexión DuckDB
+        output_dir: Directorio raíz de salida (taxis_weather_enriched, silver_weather)
+        landing_dir: Directorio raíz del landing con taxis_agg/ (DAILY_AGG)
+
+    Returns:
+        Tabla Arrow ordenada por las columnas de agrupación
+    """
+    if landing_dir is None:
+        sql = SUMMARY_SQL.format(
+            group_by=SUMMARY_GROUP_BY.strip(),
+            enriched=Path(output_dir) / ENRICHED_PATH / "date=*" / "data.parquet",
+        )
+    else:
+        sql = CUBE_SUMMARY_SQL.format(
+            group_by=SUMMARY_GROUP_BY.strip(),
+            cube=Path(landing_dir) / TAXIS_AGG_BASE_PATH / "date=*" / "data.parquet",
+            silver_weather=Path(output_dir) / SILVER_WEATHER_PATH / "data.parquet",
+        )
+    result = con.execute(sql).arrow()
+    return result.read_all() if hasattr(result, "read_all") else result
+
+
+def run_local_pipeline(
+    landing_dir: str,
+    output_dir: str,
+    start_date: str | None = None,
+    end_date: str | None = None,
+    max_workers: int | None = None,
+    threads: int | None = None,
+) -> dict:
+    """
+    Ejecuta silver_weather, silver_taxis y taxis_weather_enriched en local.
+
+    silver_weather se reconstruye entero (es pequeño y el join lo necesita);
+    las particiones de taxis se procesan en paralelo.
+
+    Args:
+        landing_dir: Directorio raíz del landing (taxis/, weather/)
+        output_dir: Directorio raíz de salida
+        start_date: Fecha inicio opcional (YYYY-MM-DD)
+        end_date: Fecha fin opcional (YYYY-MM-DD)
+        max_workers: Particiones a la vez (default: LOCAL_ENGINE_MAX_WORKERS)
+        threads: Threads de DuckDB (default: LOCAL_ENGINE_THREADS)
+
+    Returns:
+        Dict con resultado de la operacion
+    """
+    started = time.perf_counter()
+    landing = Path(landing_dir)
+    output = Path(output_dir)
+    workers = max(1, max_workers or LOCAL_ENGINE_MAX_WORKERS)
+
+    con = connect(threads)
+    weather_rows = build_silver_weather(con, landing, output)
+
+    dates = discover_dates(landing, TAXIS_BASE_PATH, start_date, end_date)
+    logger.info(f"Transforming {len(dates)} taxi partitions with {workers} workers")
+
+    local = threading.local()
+    cursors = []
+    cursors_lock = threading.Lock()
+
+    def _cursor() -> duckdb.DuckDBPyConnection:
+        # Un cursor por thread: comparte base de datos y pool de threads de DuckDB
+        if not hasattr(local, "con"):
+            local.con = con.cursor()
+            with cursors_lock:
+                cursors.append(local.con)
+        return local.con
+
+    processed, errors = [], []
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="partition") as pool:
+        futures = {
+            pool.submit(lambda d: transform_taxi_partition(_cursor(), landing, output, d), date): date
+            for date in dates
+        }
+        for future in as_completed(futures):
+            date = futures[future]
+            try:
+                processed.append(future.result())
+            except Exception as e:
+                logger.error(f"Error transforming date {date}: {str(e)}")
+                errors.append({"date": date, "error": str(e)})
+
+    for cursor in cursors:
+        cursor.close()
+    con.close()
+
+    processed.sort(key=lambda r: r["date"])
+    errors.sort(key=lambda e: e["date"])
+
+    elapsed = time.perf_counter() - started
+    total_rows = sum(p["rows"] for p in processed)
+
+    result = {
+        "status": "success",
+        "message": f"Transformed {len(processed)} taxi partitions ({total_rows} trips total)",
+        "date_range": {"start": start_date, "end": end_date},
+        "partitions_processed": len(processed),
+        "total_trips": total_rows,
+        "weather_rows": weather_rows,
+        "max_workers": workers,
+        "elapsed_seconds": round(elapsed, 3),
+        "rows_per_second": round(total_rows / elapsed) if elapsed > 0 else 0,
+        "output_path": str(output),
+    }
+
+    if errors:
+        result["errors"] = errors
+        result["status"] = "partial_success" if processed else "error"
+
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--landing", required=True, help="Directorio raíz del landing (taxis/, weather/)")
+    parser.add_argument("--output", required=True, help="Directorio raíz de salida")
+    parser.add_argument("--start-date", default=None)
+    parser.add_argument("--end-date", default=None)
+    parser.add_argument("--max-workers", type=int, default=None)
+    parser.add_argument("--threads", type=int, default=None)
+    args = parser.parse_args()
+
+    result = run_local_pipeline(
+        args.landing, args.output, args.start_date, args.end_date, args.max_workers, args.threads
+    )
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -46,6 +46,9 @@ locals {
     project     = "orbidi-challenge"
     managed_by  = "terraform"
   }
+
+  # Tipo BigQuery de los importes del landing según TAXI_MONEY_TYPE (float32 se lee como FLOAT)
+  taxis_money_bq_type = var.taxis_money_type == "decimal" ? "NUMERIC" : "FLOAT"
 }
 
 # ------------------------------------------------------------------------------
@@ -64,6 +67,9 @@ resource "google_project_service" "apis" {
     "artifactregistry.googleapis.com",
     # Cloud Scheduler
     "cloudscheduler.googleapis.com",
+    # Pub/Sub + Eventarc (fan-out de ingest-taxis)
+    "pubsub.googleapis.com",
+    "eventarc.googleapis.com",
     # Data Catalog (Column-Level Security)
     "datacatalog.googleapis.com",
     "bigquerydatapolicy.googleapis.com",
@@ -101,6 +107,7 @@ module "cloud_functions" {
   region              = var.region
   labels              = local.labels
   function_source_dir = "${path.module}/../../../src/ingest_weather"
+  shared_source_dir   = "${path.module}/../../../src/ingest_shared"
 
   # Weather function configuration
   weather_function_name    = "ingest-weather"
@@ -119,6 +126,21 @@ module "cloud_functions" {
   taxis_function_timeout    = 540
   taxis_offset_days         = "738"  # 2025-12-31 - 738 = 2023-12-24
 
+  taxis_derive_silver_columns = var.taxis_silver_columns_at_ingest
+  taxis_money_type            = var.taxis_money_type
+
+  taxis_query_byte_budget_gb       = var.taxis_query_byte_budget_gb
+  taxis_query_daily_byte_budget_gb = var.taxis_query_daily_byte_budget_gb
+
+  taxis_daily_agg = var.taxis_daily_agg
+
+  taxis_partition_target_rows = var.taxis_partition_target_rows
+  taxis_source_fingerprint    = var.taxis_source_fingerprint
+
+  dq_profile            = var.dq_profile
+  taxis_dq_thresholds   = var.taxis_dq_thresholds
+  weather_dq_thresholds = var.weather_dq_thresholds
+
   depends_on = [
     google_project_service.apis,
     module.bigquery
@@ -163,7 +185,7 @@ resource "google_bigquery_table" "taxis_external" {
   description         = "External table reading taxi trips data from Parquet with Hive-style daily partitioning"
 
   # Schema explícito para evitar errores de autodetect con tipos STRING/INT
-  schema = jsonencode([
+  schema = jsonencode(concat([
     { name = "unique_key", type = "STRING", mode = "NULLABLE" },
     { name = "taxi_id", type = "STRING", mode = "NULLABLE" },
     { name = "trip_start_timestamp", type = "TIMESTAMP", mode = "NULLABLE" },
@@ -172,11 +194,11 @@ resource "google_bigquery_table" "taxis_external" {
     { name = "trip_miles", type = "FLOAT", mode = "NULLABLE" },
     { name = "pickup_community_area", type = "INTEGER", mode = "NULLABLE" },
     { name = "dropoff_community_area", type = "INTEGER", mode = "NULLABLE" },
-    { name = "fare", type = "FLOAT", mode = "NULLABLE" },
-    { name = "tips", type = "FLOAT", mode = "NULLABLE" },
-    { name = "tolls", type = "FLOAT", mode = "NULLABLE" },
-    { name = "extras", type = "FLOAT", mode = "NULLABLE" },
-    { name = "trip_total", type = "FLOAT", mode = "NULLABLE" },
+    { name = "fare", type = local.taxis_money_bq_type, mode = "NULLABLE" },
+    { name = "tips", type = local.taxis_money_bq_type, mode = "NULLABLE" },
+    { name = "tolls", type = local.taxis_money_bq_type, mode = "NULLABLE" },
+    { name = "extras", type = local.taxis_money_bq_type, mode = "NULLABLE" },
+    { name = "trip_total", type = local.taxis_money_bq_type, mode = "NULLABLE" },
     { name = "payment_type", type = "STRING", mode = "NULLABLE" },
     { name = "company", type = "STRING", mode = "NULLABLE" },
     { name = "pickup_latitude", type = "FLOAT", mode = "NULLABLE" },
@@ -184,16 +206,156 @@ resource "google_bigquery_table" "taxis_external" {
     { name = "dropoff_latitude", type = "FLOAT", mode = "NULLABLE" },
     { name = "dropoff_longitude", type = "FLOAT", mode = "NULLABLE" },
     { name = "loaded_at", type = "TIMESTAMP", mode = "NULLABLE" }
-  ])
+  ], var.taxis_silver_columns_at_ingest ? [
+    # Columnas de silver derivadas en la ingesta (DERIVE_SILVER_COLUMNS)
+    { name = "trip_minutes", type = "FLOAT", mode = "NULLABLE" },
+    { name = "trip_km", type = "FLOAT", mode = "NULLABLE" },
+    { name = "avg_speed_mph", type = "FLOAT", mode = "NULLABLE" },
+    { name = "tip_percentage", type = "FLOAT", mode = "NULLABLE" },
+    { name = "cost_per_mile", type = "FLOAT", mode = "NULLABLE" },
+    { name = "start_hour", type = "INTEGER", mode = "NULLABLE" },
+    { name = "day_of_week", type = "INTEGER", mode = "NULLABLE" },
+    { name = "day_type", type = "STRING", mode = "NULLABLE" },
+    { name = "time_of_day", type = "STRING", mode = "NULLABLE" },
+    { name = "is_valid_trip", type = "BOOLEAN", mode = "NULLABLE" }
+  ] : []))
 
   external_data_configuration {
     autodetect    = false
     source_format = "PARQUET"
     source_uris   = ["gs://${module.cloud_functions.data_landing_bucket}/taxis/*"]
 
+    # Clave de partición date (DATE) desde taxis/date=YYYY-MM-DD/: un filtro
+    # sobre date solo lee los ficheros de esas particiones
     hive_partitioning_options {
-      mode                     = "AUTO"
-      source_uri_prefix        = "gs://${module.cloud_functions.data_landing_bucket}/taxis/"
+      mode                     = "CUSTOM"
+      source_uri_prefix        = "gs://${module.cloud_functions.data_landing_bucket}/taxis/{date:DATE}"
+      require_partition_filter = var.taxis_require_partition_filter
+    }
+  }
+
+  labels = local.labels
+
+  depends_on = [module.cloud_functions]
+}
+
+# ------------------------------------------------------------------------------
+# BigQuery External Table: taxi_partition_markers (ficheros vigentes de cada
+# partición multi-fichero, PARTITION_TARGET_ROWS): stg_taxis solo lee de
+# taxi_trips_ext los ficheros que lista el marcador de su fecha
+# ------------------------------------------------------------------------------
+resource "google_bigquery_table" "taxis_partition_markers_external" {
+  count = var.taxis_partition_target_rows > 0 ? 1 : 0
+
+  dataset_id          = module.bigquery.raw_data_dataset_id
+  table_id            = "taxi_partition_markers_ext"
+  project             = var.project_id
+  deletion_protection = false
+  description         = "External table reading the markers of the multi-file taxis partitions (_complete/taxis/date=YYYY-MM-DD/parts.json)"
+
+  schema = jsonencode([
+    { name = "parts", type = "STRING", mode = "REPEATED" },
+    { name = "rows", type = "INTEGER", mode = "NULLABLE" },
+    { name = "bytes", type = "INTEGER", mode = "NULLABLE" },
+    { name = "written_at", type = "STRING", mode = "NULLABLE" }
+  ])
+
+  external_data_configuration {
+    autodetect    = false
+    source_format = "NEWLINE_DELIMITED_JSON"
+    source_uris   = ["gs://${module.cloud_functions.data_landing_bucket}/_complete/taxis/*"]
+
+    hive_partitioning_options {
+      mode                     = "CUSTOM"
+      source_uri_prefix        = "gs://${module.cloud_functions.data_landing_bucket}/_complete/taxis/{date:DATE}"
+      require_partition_filter = false
+    }
+  }
+
+  labels = local.labels
+
+  depends_on = [module.cloud_functions]
+}
+
+# ------------------------------------------------------------------------------
+# BigQuery External Table: taxi_daily_agg (cubo diario de la ingesta, DAILY_AGG)
+# ------------------------------------------------------------------------------
+resource "google_bigquery_table" "taxis_daily_agg_external" {
+  count = var.taxis_daily_agg ? 1 : 0
+
+  dataset_id          = module.bigquery.raw_data_dataset_id
+  table_id            = "taxi_daily_agg_ext"
+  project             = var.project_id
+  deletion_protection = false
+  description         = "External table reading the per-day taxi aggregate cube written at ingest (taxis_agg/date=YYYY-MM-DD/)"
+
+  schema = jsonencode([
+    { name = "start_hour", type = "INTEGER", mode = "NULLABLE" },
+    { name = "pickup_community_area", type = "INTEGER", mode = "NULLABLE" },
+    { name = "payment_type", type = "STRING", mode = "NULLABLE" },
+    { name = "company", type = "STRING", mode = "NULLABLE" },
+    { name = "trips", type = "INTEGER", mode = "NULLABLE" },
+    { name = "count_trip_minutes", type = "INTEGER", mode = "NULLABLE" },
+    { name = "sum_trip_minutes", type = "FLOAT", mode = "NULLABLE" },
+    { name = "sumsq_trip_minutes", type = "FLOAT", mode = "NULLABLE" },
+    { name = "count_trip_miles", type = "INTEGER", mode = "NULLABLE" },
+    { name = "sum_trip_miles", type = "FLOAT", mode = "NULLABLE" },
+    { name = "sumsq_trip_miles", type = "FLOAT", mode = "NULLABLE" },
+    { name = "count_fare", type = "INTEGER", mode = "NULLABLE" },
+    { name = "sum_fare", type = "FLOAT", mode = "NULLABLE" },
+    { name = "sumsq_fare", type = "FLOAT", mode = "NULLABLE" },
+    { name = "count_tips", type = "INTEGER", mode = "NULLABLE" },
+    { name = "sum_tips", type = "FLOAT", mode = "NULLABLE" },
+    { name = "sumsq_tips", type = "FLOAT", mode = "NULLABLE" },
+    { name = "count_trip_total", type = "INTEGER", mode = "NULLABLE" },
+    { name = "sum_trip_total", type = "FLOAT", mode = "NULLABLE" },
+    { name = "count_avg_speed_mph", type = "INTEGER", mode = "NULLABLE" },
+    { name = "sum_avg_speed_mph", type = "FLOAT", mode = "NULLABLE" },
+    { name = "count_tip_percentage", type = "INTEGER", mode = "NULLABLE" },
+    { name = "sum_tip_percentage", type = "FLOAT", mode = "NULLABLE" },
+    { name = "min_trip_minutes", type = "FLOAT", mode = "NULLABLE" },
+    { name = "max_trip_minutes", type = "FLOAT", mode = "NULLABLE" }
+  ])
+
+  external_data_configuration {
+    autodetect    = false
+    source_format = "PARQUET"
+    source_uris   = ["gs://${module.cloud_functions.data_landing_bucket}/taxis_agg/*"]
+
+    hive_partitioning_options {
+      mode                     = "CUSTOM"
+      source_uri_prefix        = "gs://${module.cloud_functions.data_landing_bucket}/taxis_agg/{date:DATE}"
+      require_partition_filter = false
+    }
+  }
+
+  labels = local.labels
+
+  depends_on = [module.cloud_functions]
+}
+
+# ------------------------------------------------------------------------------
+# BigQuery External Tables: perfiles de calidad por partición (DQ_PROFILE)
+# ------------------------------------------------------------------------------
+resource "google_bigquery_table" "dq_profiles_external" {
+  # table_id => prefijo de los perfiles en el bucket
+  for_each = var.dq_profile ? { taxi_dq_profiles_ext = "taxis", weather_dq_profiles_ext = "weather" } : {}
+
+  dataset_id          = module.bigquery.raw_data_dataset_id
+  table_id            = each.key
+  project             = var.project_id
+  deletion_protection = false
+  description         = "External table reading the per-partition data-quality profiles written at ingest (_profiles/${each.value}/date=YYYY-MM-DD/)"
+
+  external_data_configuration {
+    autodetect    = true
+    source_format = "NEWLINE_DELIMITED_JSON"
+    source_uris   = ["gs://${module.cloud_functions.data_landing_bucket}/_profiles/${each.value}/*"]
+
+    # La fecha solo va en la ruta: el JSON no lleva columna date
+    hive_partitioning_options {
+      mode                     = "CUSTOM"
+      source_uri_prefix        = "gs://${module.cloud_functions.data_landing_bucket}/_profiles/${each.value}/{date:DATE}"
       require_partition_filter = false
     }
   }
@@ -25,6 +25,72 @@ variable "weather_schedule" {
   default     = "0 2 * * *"
 }
 
+variable "taxis_require_partition_filter" {
+  description = "Reject queries on raw_data.taxi_trips_ext that do not filter on the date partition column (dbt models always do)"
+  type        = bool
+  default     = false
+}
+
+variable "taxis_money_type" {
+  description = "Type of the taxi money columns in the landing Parquet (TAXI_MONEY_TYPE): float64, float32 or decimal (read as NUMERIC); changing it requires rewriting existing partitions"
+  type        = string
+  default     = "float64"
+}
+
+variable "taxis_silver_columns_at_ingest" {
+  description = "Derive the silver taxi columns at ingest time; must match the dbt var taxis_silver_columns_at_ingest and requires rewriting existing partitions"
+  type        = bool
+  default     = false
+}
+
+variable "taxis_query_byte_budget_gb" {
+  description = "GB the taxis extraction queries may process per invocation (QUERY_BYTE_BUDGET_GB); dates over budget are deferred to the next run. 0 disables it"
+  type        = number
+  default     = 0
+}
+
+variable "taxis_query_daily_byte_budget_gb" {
+  description = "GB the taxis extraction queries may process per quota day across invocations (QUERY_DAILY_BYTE_BUDGET_GB); keep it below the per-user quota of scripts/set_bigquery_quotas.sh. 0 disables it"
+  type        = number
+  default     = 0
+}
+
+variable "taxis_daily_agg" {
+  description = "Write the per-day aggregate cube at ingest (DAILY_AGG) and create raw_data.taxi_daily_agg_ext; must match the dbt var taxis_daily_agg"
+  type        = bool
+  default     = false
+}
+
+variable "taxis_source_fingerprint" {
+  description = "Store the source fingerprint of each taxis partition (SOURCE_FINGERPRINT) so mode=refresh can detect late or corrected rows; refresh re-ingests always store it"
+  type        = bool
+  default     = false
+}
+
+variable "taxis_partition_target_rows" {
+  description = "Rows per file of the taxis partitions (PARTITION_TARGET_ROWS); > 0 writes multi-file partitions resolved through their _complete/ marker and creates raw_data.taxi_partition_markers_ext; must match the dbt var taxis_partition_markers"
+  type        = number
+  default     = 0
+}
+
+variable "dq_profile" {
+  description = "Write a data-quality profile per ingested partition (DQ_PROFILE) and create the raw_data profile external tables; must match the dbt var dq_profiles"
+  type        = bool
+  default     = false
+}
+
+variable "taxis_dq_thresholds" {
+  description = "DQ_THRESHOLDS of the taxis functions: maximum fraction of rows per check before a day is rejected (e.g. duplicate_unique_keys=0,negative_fare=0.01)"
+  type        = string
+  default     = ""
+}
+
+variable "weather_dq_thresholds" {
+  description = "DQ_THRESHOLDS of the weather function (e.g. nulls.temperature_mean=0,negative_precipitation=0)"
+  type        = string
+  default     = ""
+}
+
 # ==============================================================================
 # Data Security Variables
 # ==============================================================================
@@ -5,6 +5,19 @@
 locals {
   service_account_email = var.service_account_email != "" ? var.service_account_email : google_service_account.function_sa[0].email
   gcp_project           = var.gcp_project_env != "" ? var.gcp_project_env : var.project_id
+
+  # Cada zip lleva el directorio de la función y el paquete común ingest_shared/
+  shared_source_files = {
+    for f in fileset(var.shared_source_dir, "*.py") : "ingest_shared/${f}" => "${var.shared_source_dir}/${f}"
+  }
+  weather_source_files = merge(
+    { for f in fileset(var.function_source_dir, "*.{py,txt}") : f => "${var.function_source_dir}/${f}" },
+    local.shared_source_files,
+  )
+  taxis_source_files = merge(
+    { for f in fileset(var.taxis_function_source_dir, "*.{py,txt}") : f => "${var.taxis_function_source_dir}/${f}" },
+    local.shared_source_files,
+  )
 }
 
 # ------------------------------------------------------------------------------
@@ -94,8 +107,15 @@ resource "google_storage_bucket" "function_source" {
 # ------------------------------------------------------------------------------
 data "archive_file" "weather_function_source" {
   type        = "zip"
-  source_dir  = var.function_source_dir
   output_path = "${path.module}/tmp/ingest_weather.zip"
+
+  dynamic "source" {
+    for_each = local.weather_source_files
+    content {
+      content  = file(source.value)
+      filename = source.key
+    }
+  }
 }
 
 resource "google_storage_bucket_object" "weather_function_zip" {
@@ -138,6 +158,12 @@ resource "google_cloudfunctions2_function" "ingest_weather" {
       WEATHER_START_DATE   = var.weather_start_date
       WEATHER_END_DATE     = var.weather_end_date
       OFFSET_DAYS          = var.weather_offset_days
+      # Fuera de weather/ para que la external table no lo lea
+      WEATHER_CACHE_URI    = var.weather_cache_enabled ? "gs://${google_storage_bucket.data_landing.name}/_cache/open-meteo" : ""
+      WEATHER_CACHE_MAX_MB = tostring(var.weather_cache_max_mb)
+
+      DQ_PROFILE    = tostring(var.dq_profile)
+      DQ_THRESHOLDS = var.weather_dq_thresholds
     }
   }
 
@@ -171,8 +197,15 @@ resource "google_cloud_run_service_iam_member" "invoker" {
 # ------------------------------------------------------------------------------
 data "archive_file" "taxis_function_source" {
   type        = "zip"
-  source_dir  = var.taxis_function_source_dir
   output_path = "${path.module}/tmp/ingest_taxis.zip"
+
+  dynamic "source" {
+    for_each = local.taxis_source_files
+    content {
+      content  = file(source.value)
+      filename = source.key
+    }
+  }
 }
 
 resource "google_storage_bucket_object" "taxis_function_zip" {
@@ -210,9 +243,25 @@ resource "google_cloudfunctions2_function" "ingest_taxis" {
     service_account_email = local.service_account_email
 
     environment_variables = {
-      GCP_PROJECT = local.gcp_project
-      GCS_BUCKET  = google_storage_bucket.data_landing.name
-      OFFSET_DAYS = var.taxis_offset_days
+      GCP_PROJECT              = local.gcp_project
+      GCS_BUCKET               = google_storage_bucket.data_landing.name
+      OFFSET_DAYS              = var.taxis_offset_days
+      FUNCTION_TIMEOUT_SECONDS = var.taxis_function_timeout
+      TAXIS_WORK_TOPIC         = google_pubsub_topic.taxis_work.id
+      FANOUT_CHUNK_DAYS        = var.taxis_fanout_chunk_days
+      DERIVE_SILVER_COLUMNS    = tostring(var.taxis_derive_silver_columns)
+      TAXI_MONEY_TYPE          = var.taxis_money_type
+
+      QUERY_BYTE_BUDGET_GB       = tostring(var.taxis_query_byte_budget_gb)
+      QUERY_DAILY_BYTE_BUDGET_GB = tostring(var.taxis_query_daily_byte_budget_gb)
+
+      DAILY_AGG = tostring(var.taxis_daily_agg)
+
+      PARTITION_TARGET_ROWS = tostring(var.taxis_partition_target_rows)
+      SOURCE_FINGERPRINT    = tostring(var.taxis_source_fingerprint)
+
+      DQ_PROFILE    = tostring(var.dq_profile)
+      DQ_THRESHOLDS = var.taxis_dq_thresholds
     }
   }
 
@@ -236,3 +285,106 @@ resource "google_cloud_run_service_iam_member" "taxis_invoker" {
   role     = "roles/run.invoker"
   member   = "allUsers"
 }
+
+# ==============================================================================
+# Fan-out: topic de trabajo y worker ingest_taxis_pubsub
+# ==============================================================================
+
+# ------------------------------------------------------------------------------
+# Pub/Sub topic donde mode=fanout publica un mensaje por chunk de fechas
+# ------------------------------------------------------------------------------
+resource "google_pubsub_topic" "taxis_work" {
+  name    = var.taxis_work_topic_name
+  project = var.project_id
+
+  message_retention_duration = "86400s"
+
+  labels = var.labels
+}
+
+# IAM: el coordinador (ingest-taxis) publica en el topic
+resource "google_pubsub_topic_iam_member" "taxis_work_publisher" {
+  project = var.project_id
+  topic   = google_pubsub_topic.taxis_work.name
+  role    = "roles/pubsub.publisher"
+  member  = "serviceAccount:${local.service_account_email}"
+}
+
+# ------------------------------------------------------------------------------
+# Cloud Function Gen2: ingest_taxis_worker (mismo código, entry point Pub/Sub)
+# ------------------------------------------------------------------------------
+resource "google_cloudfunctions2_function" "ingest_taxis_worker" {
+  name        = var.taxis_worker_function_name
+  project     = var.project_id
+  location    = var.region
+  description = "Processes taxi ingestion chunks published by ingest-taxis in fanout mode"
+
+  build_config {
+    runtime     = "python311"
+    entry_point = "ingest_taxis_pubsub"
+
+    source {
+      storage_source {
+        bucket = google_storage_bucket.function_source.name
+        object = google_storage_bucket_object.taxis_function_zip.name
+      }
+    }
+  }
+
+  service_config {
+    max_instance_count    = var.taxis_worker_max_instances
+    min_instance_count    = 0
+    available_memory      = var.taxis_function_memory
+    timeout_seconds       = var.taxis_function_timeout
+    service_account_email = local.service_account_email
+
+    environment_variables = {
+      GCP_PROJECT              = local.gcp_project
+      GCS_BUCKET               = google_storage_bucket.data_landing.name
+      OFFSET_DAYS              = var.taxis_offset_days
+      FUNCTION_TIMEOUT_SECONDS = var.taxis_function_timeout
+      TAXIS_WORK_TOPIC         = google_pubsub_topic.taxis_work.id
+      DERIVE_SILVER_COLUMNS    = tostring(var.taxis_derive_silver_columns)
+      TAXI_MONEY_TYPE          = var.taxis_money_type
+
+      QUERY_BYTE_BUDGET_GB       = tostring(var.taxis_query_byte_budget_gb)
+      QUERY_DAILY_BYTE_BUDGET_GB = tostring(var.taxis_query_daily_byte_budget_gb)
+
+      DAILY_AGG = tostring(var.taxis_daily_agg)
+
+      PARTITION_TARGET_ROWS = tostring(var.taxis_partition_target_rows)
+      SOURCE_FINGERPRINT    = tostring(var.taxis_source_fingerprint)
+
+      DQ_PROFILE    = tostring(var.dq_profile)
+      DQ_THRESHOLDS = var.taxis_dq_thresholds
+    }
+  }
+
+  # Sin reintentos de Pub/Sub: el coordinador (mode=fanout_status) reintenta
+  # los chunks fallidos con un límite de intentos
+  event_trigger {
+    trigger_region        = var.region
+    event_type            = "google.cloud.pubsub.topic.v1.messagePublished"
+    pubsub_topic          = google_pubsub_topic.taxis_work.id
+    retry_policy          = "RETRY_POLICY_DO_NOT_RETRY"
+    service_account_email = local.service_account_email
+  }
+
+  labels = var.labels
+
+  depends_on = [
+    google_project_iam_member.function_bq_editor,
+    google_project_iam_member.function_bq_job_user,
+    google_project_iam_member.function_storage_admin,
+    google_storage_bucket.data_landing,
+  ]
+}
+
+# IAM: el trigger de Eventarc invoca al worker con la service account de las funciones
+resource "google_cloud_run_service_iam_member" "taxis_worker_invoker" {
+  project  = var.project_id
+  location = var.region
+  service  = google_cloudfunctions2_function.ingest_taxis_worker.name
+  role     = "roles/run.invoker"
+  member   = "serviceAccount:${local.service_account_email}"
+}
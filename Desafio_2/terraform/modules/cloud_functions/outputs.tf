@@ -33,6 +33,16 @@ output "taxis_function_uri" {
   value       = google_cloudfunctions2_function.ingest_taxis.service_config[0].uri
 }
 
+output "taxis_worker_function_name" {
+  description = "Name of the Pub/Sub worker that processes fanout chunks"
+  value       = google_cloudfunctions2_function.ingest_taxis_worker.name
+}
+
+output "taxis_work_topic" {
+  description = "Pub/Sub topic for taxis fanout chunks"
+  value       = google_pubsub_topic.taxis_work.id
+}
+
 # ------------------------------------------------------------------------------
 # Storage Outputs
 # ------------------------------------------------------------------------------
@@ -32,6 +32,11 @@ variable "taxis_function_source_dir" {
   type        = string
 }
 
+variable "shared_source_dir" {
+  description = "Local directory of the ingest_shared package bundled with both functions"
+  type        = string
+}
+
 # ------------------------------------------------------------------------------
 # Weather Function Configuration
 # ------------------------------------------------------------------------------
@@ -104,6 +109,75 @@ variable "taxis_offset_days" {
   default     = "738"
 }
 
+# ------------------------------------------------------------------------------
+# Taxis Fan-out Configuration
+# ------------------------------------------------------------------------------
+variable "taxis_work_topic_name" {
+  description = "Pub/Sub topic where ingest-taxis publishes fanout chunks"
+  type        = string
+  default     = "ingest-taxis-work"
+}
+
+variable "taxis_worker_function_name" {
+  description = "Name of the Pub/Sub worker that processes fanout chunks"
+  type        = string
+  default     = "ingest-taxis-worker"
+}
+
+variable "taxis_worker_max_instances" {
+  description = "Maximum number of worker instances processing fanout chunks in parallel"
+  type        = number
+  default     = 10
+}
+
+variable "taxis_fanout_chunk_days" {
+  description = "Maximum consecutive dates per fanout chunk"
+  type        = number
+  default     = 14
+}
+
+variable "taxis_money_type" {
+  description = "Type of fare, tips, tolls, extras and trip_total in the landing Parquet: float64, float32 or decimal"
+  type        = string
+  default     = "float64"
+}
+
+variable "taxis_derive_silver_columns" {
+  description = "Write the silver derived columns (trip_km, avg_speed_mph, time_of_day, ...) into the landing Parquet"
+  type        = bool
+  default     = false
+}
+
+variable "taxis_query_byte_budget_gb" {
+  description = "Maximum GB processed by the extraction queries of one taxis invocation (dry run estimate); dates over budget are deferred. 0 disables it"
+  type        = number
+  default     = 0
+}
+
+variable "taxis_query_daily_byte_budget_gb" {
+  description = "Maximum GB processed by taxis extraction queries per BigQuery quota day, shared by all invocations. 0 disables it"
+  type        = number
+  default     = 0
+}
+
+variable "taxis_daily_agg" {
+  description = "Write the per-day aggregate cube (taxis_agg/date=YYYY-MM-DD/) next to each taxis partition"
+  type        = bool
+  default     = false
+}
+
+variable "taxis_source_fingerprint" {
+  description = "Store the source fingerprint used by mode=refresh as metadata of each taxis partition"
+  type        = bool
+  default     = false
+}
+
+variable "taxis_partition_target_rows" {
+  description = "Rows per file of the taxis partitions (PARTITION_TARGET_ROWS). 0 writes a single data.parquet per day"
+  type        = number
+  default     = 0
+}
+
 variable "weather_offset_days" {
   description = "Offset days for weather daily ingestion (e.g., 738 means process date from ~2 years ago for 2023 data)"
   type        = string
@@ -131,6 +205,18 @@ variable "weather_end_date" {
   default     = "2023-12-31"
 }
 
+variable "weather_cache_enabled" {
+  description = "Persist Open-Meteo archive responses under _cache/open-meteo in the landing bucket"
+  type        = bool
+  default     = true
+}
+
+variable "weather_cache_max_mb" {
+  description = "Size limit of the persistent Open-Meteo cache; oldest entries are evicted first"
+  type        = number
+  default     = 64
+}
+
 # ------------------------------------------------------------------------------
 # Service Account
 # ------------------------------------------------------------------------------
@@ -139,3 +225,21 @@ variable "service_account_email" {
   type        = string
   default     = ""
 }
+
+variable "dq_profile" {
+  description = "Write a data-quality profile per partition (_profiles/{taxis,weather}/date=YYYY-MM-DD/profile.json)"
+  type        = bool
+  default     = false
+}
+
+variable "taxis_dq_thresholds" {
+  description = "Maximum fraction of rows per check before a taxis day is rejected, e.g. duplicate_unique_keys=0,negative_fare=0.01. Empty rejects nothing"
+  type        = string
+  default     = ""
+}
+
+variable "weather_dq_thresholds" {
+  description = "Maximum fraction of rows per check before a weather day is rejected, e.g. nulls.temperature_mean=0. Empty rejects nothing"
+  type        = string
+  default     = ""
+}
@@ -0,0 +1,37 @@
+"""
+Fixtures de los tests de las Cloud Functions de ingesta.
+
+Reutilizan los fakes de benchmarks/fakes.py: cada test carga una copia nueva
+de src/<function>/main.py (load_function), con los clientes de GCS y
+BigQuery sustituidos por los fakes en memoria.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "benchmarks"))
+
+from fakes import FakeStorageClient, load_function  # noqa: E402
+
+
+@pytest.fixture
+def gcs() -> FakeStorageClient:
+    return FakeStorageClient()
+
+
+@pytest.fixture
+def taxis(gcs):
+    """ingest_taxis con un bucket GCS en memoria."""
+    module = load_function("ingest_taxis")
+    module.set_client("storage", gcs)
+    return module
+
+
+@pytest.fixture
+def weather(gcs):
+    """ingest_weather con un bucket GCS en memoria."""
+    module = load_function("ingest_weather")
+    module.set_client("storage", gcs)
+    return module
@@ -0,0 +1,40 @@
+"""Presupuesto de bytes de BigQuery (QUERY_BYTE_BUDGET_GB / QUERY_DAILY_BYTE_BUDGET_GB)."""
+
+import pytest
+
+from fakes import FakeBigQueryClient
+
+GIB = 1024**3
+START, END = "2024-01-01", "2024-01-03"
+
+
+@pytest.fixture
+def bq(taxis):
+    client = FakeBigQueryClient(rows_per_day=50, query_latency=0, download_latency=0, bytes_per_scan=GIB)
+    taxis.set_client("bigquery", client)
+    taxis.taxis_budget.quota_day = lambda: "2025-01-01"
+    return client
+
+
+def test_run_with_nothing_to_process_has_the_same_result_keys(taxis, bq):
+    taxis.taxis_budget.QUERY_DAILY_BYTE_BUDGET_GB = 10
+    first = taxis.process_taxi_ingestion(START, END)
+    second = taxis.process_taxi_ingestion(START, END)
+
+    assert first["new_dates_processed"] == 3
+    assert set(second) == set(first)
+    assert second["message"] == "No new dates to process - all data already exists"
+    assert second["new_dates_processed"] == second["bigquery_jobs"] == second["bytes_processed"] == 0
+    assert second["dates_written"] == [] and "errors" not in second
+    # Sin dry runs, pero con lo ya consumido en el día de cuota
+    budget = second["byte_budget"]
+    assert budget["dry_runs"] == 0 and budget["units"] == [] and budget["deferred_dates"] == []
+    assert budget["daily_used_bytes"] == first["bytes_processed"] == 3 * GIB
+    assert len(bq.dry_runs) == 3
+
+
+def test_run_with_nothing_to_process_without_budget(taxis, bq):
+    taxis.process_taxi_ingestion(START, END)
+    second = taxis.process_taxi_ingestion(START, END)
+    assert second["new_dates_processed"] == second["bigquery_jobs"] == 0
+    assert "byte_budget" not in second
@@ -0,0 +1,38 @@
+"""Registro de clientes del proceso (ingest_shared.clients), el mismo en las dos funciones."""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from google.cloud import storage
+
+
+@pytest.fixture(params=["taxis", "weather"])
+def module(request, monkeypatch):
+    """Función cargada con un storage.Client real sustituido por uno que cuenta construcciones."""
+    function = request.getfixturevalue(request.param)
+    function.built = []
+
+    def client(**kwargs):
+        time.sleep(0.01)  # ventana para que los workers coincidan en el primer uso
+        function.built.append(kwargs)
+        return object()
+
+    monkeypatch.setattr(storage, "Client", client)
+    function.set_client("storage", None)
+    return function
+
+
+def test_concurrent_workers_build_a_single_client(module):
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        clients = set(pool.map(lambda _: id(module.get_storage_client()), range(16)))
+    assert len(clients) == 1
+    assert module.built == [{"project": module.clients.PROJECT_ID}]
+
+
+def test_warm_invocations_reuse_the_client_until_reset(module):
+    first = module.get_storage_client()
+    assert module.get_storage_client() is first
+    module.reset_clients()
+    assert module.get_storage_client() is not first
+    assert len(module.built) == 2
@@ -0,0 +1,22 @@
+"""Rangos de fechas de ingest_shared.dates, los mismos en las dos funciones."""
+
+import pytest
+
+
+@pytest.fixture(params=["taxis", "weather"])
+def module(request):
+    return request.getfixturevalue(request.param)
+
+
+def test_date_range_crosses_month_and_leap_day(module):
+    assert module.get_date_range("2024-02-28", "2024-03-01") == ["2024-02-28", "2024-02-29", "2024-03-01"]
+    assert module.get_date_range("2024-03-02", "2024-03-01") == []
+    assert module.dates._months_in_range("2023-12-31", "2024-02-01") == ["2023-12", "2024-01", "2024-02"]
+
+
+def test_contiguous_runs_split_on_gaps_and_max_days(module):
+    dates = ["2024-01-30", "2024-01-31", "2024-02-01", "2024-02-02", "2024-02-04"]
+    assert module.group_contiguous_dates(dates, 3) == [
+        ["2024-01-30", "2024-01-31", "2024-02-01"], ["2024-02-02"], ["2024-02-04"],
+    ]
+    assert module.group_contiguous_dates([], 3) == []
@@ -0,0 +1,55 @@
+"""Umbrales de calidad (DQ_THRESHOLDS) al reescribir un día que ya estaba en el landing."""
+
+import pyarrow as pa
+import pytest
+
+from fakes import synthetic_taxi_day
+
+DAY = "2024-01-01"
+
+
+class TableRows:
+    """RowIterator mínimo sobre una tabla Arrow para write_daily_parquet_stream."""
+
+    def __init__(self, table: pa.Table, batch_rows: int):
+        self._table = table
+        self._batch_rows = batch_rows
+        self.total_rows = table.num_rows
+
+    def to_arrow(self, *args, **kwargs) -> pa.Table:
+        return self._table
+
+    def to_arrow_iterable(self, *args, **kwargs):
+        return iter(self._table.to_batches(max_chunksize=self._batch_rows))
+
+
+def dirty_rows() -> TableRows:
+    df = synthetic_taxi_day(DAY, 600, seed=2)
+    df.loc[::50, "fare"] = -5.0
+    return TableRows(pa.Table.from_pandas(df, preserve_index=False), 100)
+
+
+def partition_objects(taxis, bucket) -> dict:
+    return {
+        name: data for name, data in bucket.objects.items()
+        if name.startswith(f"{taxis.PARQUET_BASE_PATH}/") or name == taxis.taxis_partitions.partition_marker_path(DAY)
+    }
+
+
+@pytest.mark.parametrize("before", ["single", "multipart"])
+@pytest.mark.parametrize("after", ["single", "multipart"])
+def test_rejected_stream_keeps_the_previous_partition(taxis, gcs, before, after):
+    bucket = gcs.bucket(taxis.GCS_BUCKET)
+    taxis.taxis_quality.DQ_THRESHOLDS = "negative_fare=0"
+    taxis.taxis_partitions.PARTITION_TARGET_ROWS = 400 if before == "multipart" else 0
+    taxis.write_daily_parquet(synthetic_taxi_day(DAY, 1000, seed=1), taxis.GCS_BUCKET, DAY)
+    previous = partition_objects(taxis, bucket)
+
+    taxis.taxis_partitions.PARTITION_TARGET_ROWS = 250 if after == "multipart" else 0
+    with pytest.raises(ValueError, match="negative_fare"):
+        taxis.write_daily_parquet_stream(dirty_rows(), taxis.GCS_BUCKET, DAY)
+
+    assert partition_objects(taxis, bucket) == previous
+    assert taxis.get_existing_dates(taxis.GCS_BUCKET, DAY, DAY) == {DAY}
+    taxis.taxis_partitions.partition_index._cache.clear()
+    assert taxis.get_existing_dates(taxis.GCS_BUCKET, DAY, DAY) == {DAY}
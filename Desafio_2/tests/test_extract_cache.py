@@ -0,0 +1,65 @@
+"""Caché local de extracts (EXTRACT_CACHE_DIR): poda LRU por EXTRACT_CACHE_MAX_MB."""
+
+import os
+
+import pyarrow as pa
+import pytest
+
+from fakes import load_function, synthetic_taxi_day
+
+DATES = ["2024-01-01", "2024-01-02", "2024-01-03", "2024-01-04"]
+
+
+@pytest.fixture
+def cache(taxis, tmp_path):
+    taxis.EXTRACT_CACHE_DIR = str(tmp_path)
+    for date in DATES:
+        taxis.cache_extract_day(pa.Table.from_pandas(synthetic_taxi_day(date, 200)), date)
+    return taxis
+
+
+def size_of(taxis, dates) -> float:
+    return sum(os.path.getsize(taxis.extract_cache_path(date)) for date in dates) / 1024**2
+
+
+def test_prune_keeps_the_most_recently_used_days(cache):
+    taxis = cache
+    for date in ("2024-01-04", "2024-01-02"):
+        assert taxis.read_extract_cache(date) is not None
+    # El mtime no cuenta: al revés que el orden de uso
+    for used, date in enumerate(reversed(DATES), start=1):
+        os.utime(taxis.extract_cache_path(date), (used, used))
+
+    taxis.EXTRACT_CACHE_MAX_MB = size_of(taxis, ["2024-01-04", "2024-01-02"])
+    assert taxis.prune_extract_cache() == 2
+    assert taxis.cached_extract_dates(DATES[0], DATES[-1]) == {"2024-01-02", "2024-01-04"}
+
+    # Un solo día de presupuesto: el último leído
+    taxis.EXTRACT_CACHE_MAX_MB = size_of(taxis, ["2024-01-02"])
+    assert taxis.prune_extract_cache() == 1
+    assert taxis.cached_extract_dates(DATES[0], DATES[-1]) == {"2024-01-02"}
+
+
+def test_access_order_survives_a_new_instance(cache):
+    cache.read_extract_cache("2024-01-01")
+    taxis = load_function("ingest_taxis")
+    taxis.EXTRACT_CACHE_DIR = cache.EXTRACT_CACHE_DIR
+    taxis.EXTRACT_CACHE_MAX_MB = size_of(taxis, ["2024-01-04", "2024-01-01"])
+    assert taxis.prune_extract_cache() == 2
+    assert taxis.cached_extract_dates(DATES[0], DATES[-1]) == {"2024-01-01", "2024-01-04"}
+
+
+def test_days_missing_from_the_index_are_evicted_first_by_date(cache):
+    taxis = cache
+    os.remove(taxis._extract_access_path())
+    taxis.read_extract_cache("2024-01-01")
+    taxis.EXTRACT_CACHE_MAX_MB = size_of(taxis, ["2024-01-01", "2024-01-04"])
+    assert taxis.prune_extract_cache() == 2
+    assert taxis.cached_extract_dates(DATES[0], DATES[-1]) == {"2024-01-01", "2024-01-04"}
+    assert set(taxis._read_extract_access()["used"]) == {"date=2024-01-01.arrow"}
+
+
+def test_prune_under_budget_is_a_no_op(cache):
+    cache.EXTRACT_CACHE_MAX_MB = size_of(cache, DATES)
+    assert cache.prune_extract_cache() == 0
+    assert cache.cached_extract_dates(DATES[0], DATES[-1]) == set(DATES)
@@ -0,0 +1,141 @@
+"""
+Escrituras condicionales a la generación (if_generation_match) en GCS:
+manifest de particiones, checkpoints de backfill y fan-out y contador de bytes.
+"""
+
+import json
+import logging
+
+import pytest
+
+from fakes import FakeBlob
+
+DAY = "2025-01-01"
+
+
+def interleave(monkeypatch, name: str, writes: list) -> None:
+    """Otra instancia escribe writes.pop(0) en `name` justo antes de cada upload condicional."""
+    upload = FakeBlob.upload_from_string
+
+    def racing(blob, data, *args, **kwargs):
+        if blob.name == name and writes and kwargs.get("if_generation_match") is not None:
+            upload(blob.bucket.blob(name), writes.pop(0))
+        upload(blob, data, *args, **kwargs)
+
+    monkeypatch.setattr(FakeBlob, "upload_from_string", racing)
+
+
+def stored(taxis, gcs, name: str) -> dict:
+    return json.loads(gcs.bucket(taxis.GCS_BUCKET).objects[name])
+
+
+# Manifest de particiones
+
+def test_manifest_seed_is_used_only_when_it_does_not_exist(taxis):
+    partitions = taxis.taxis_partitions.partition_index
+    partitions._write_manifest(taxis.GCS_BUCKET, {"2024-01-02"}, seed={"2024-01-01"})
+    partitions._write_manifest(taxis.GCS_BUCKET, {"2024-01-03"}, seed={"2023-12-31"})
+    assert partitions.read_manifest(taxis.GCS_BUCKET) == {"2024-01-01", "2024-01-02", "2024-01-03"}
+
+
+def test_manifest_skips_the_write_when_the_dates_are_already_there(taxis, gcs):
+    partitions = taxis.taxis_partitions.partition_index
+    partitions._write_manifest(taxis.GCS_BUCKET, {"2024-01-01", "2024-01-02"})
+    partitions._write_manifest(taxis.GCS_BUCKET, {"2024-01-02"})
+    assert gcs.bucket(taxis.GCS_BUCKET).generations[partitions.manifest_path] == 1
+
+
+def test_manifest_retries_over_a_concurrent_update(taxis, gcs, monkeypatch):
+    partitions = taxis.taxis_partitions.partition_index
+    partitions._write_manifest(taxis.GCS_BUCKET, {"2024-01-01"})
+    other = json.dumps({"dates": ["2024-01-01", "2024-01-05"]})
+    interleave(monkeypatch, partitions.manifest_path, [other, other])
+
+    partitions._write_manifest(taxis.GCS_BUCKET, {"2024-01-02"})
+    # Ninguna de las dos escrituras pierde fechas
+    assert partitions.read_manifest(taxis.GCS_BUCKET) == {"2024-01-01", "2024-01-02", "2024-01-05"}
+    assert gcs.bucket(taxis.GCS_BUCKET).generations[partitions.manifest_path] == 4
+
+
+def test_manifest_gives_up_after_max_retries(taxis, monkeypatch, caplog):
+    partitions = taxis.taxis_partitions.partition_index
+    other = json.dumps({"dates": ["2024-01-05"]})
+    interleave(monkeypatch, partitions.manifest_path, [other] * taxis.partitions.MANIFEST_MAX_RETRIES)
+
+    with caplog.at_level(logging.WARNING):
+        partitions._write_manifest(taxis.GCS_BUCKET, {"2024-01-02"})
+    assert partitions.read_manifest(taxis.GCS_BUCKET) == {"2024-01-05"}
+    assert "Could not update partition manifest" in caplog.text
+
+
+# Checkpoints de backfill y fan-out
+
+@pytest.fixture(params=["backfill", "fanout"])
+def checkpoint(request, taxis):
+    """(load, save, path) del checkpoint de cada tipo de job."""
+    if request.param == "backfill":
+        return taxis.load_backfill_checkpoint, taxis.save_backfill_checkpoint, taxis.backfill_checkpoint_path
+    fanout = taxis.taxis_fanout
+    return fanout.load_fanout_job, fanout.save_fanout_job, fanout.fanout_job_path
+
+
+def test_checkpoint_generation_round_trip(taxis, checkpoint):
+    load, save, _ = checkpoint
+    assert load(taxis.GCS_BUCKET, "job") == (None, 0)
+    generation = save(taxis.GCS_BUCKET, {"job_id": "job", "completed": {}}, 0)
+    job, loaded = load(taxis.GCS_BUCKET, "job")
+    assert loaded == generation == 1 and job["completed"] == {}
+
+    job["completed"] = {"2024-01-01": 10}
+    assert save(taxis.GCS_BUCKET, job, loaded) == 2
+    assert load(taxis.GCS_BUCKET, "job") == (job, 2)
+
+
+def test_checkpoint_create_fails_if_the_job_already_exists(taxis, checkpoint):
+    _, save, _ = checkpoint
+    save(taxis.GCS_BUCKET, {"job_id": "job"}, 0)
+    with pytest.raises(RuntimeError, match="was updated by another invocation"):
+        save(taxis.GCS_BUCKET, {"job_id": "job"}, 0)
+
+
+def test_stale_checkpoint_does_not_overwrite_a_concurrent_save(taxis, gcs, checkpoint):
+    load, save, path = checkpoint
+    save(taxis.GCS_BUCKET, {"job_id": "job", "completed": {}}, 0)
+    first, generation = load(taxis.GCS_BUCKET, "job")
+    second, _ = load(taxis.GCS_BUCKET, "job")
+
+    first["completed"] = {"2024-01-01": 10}
+    save(taxis.GCS_BUCKET, first, generation)
+    second["completed"] = {"2024-01-02": 10}
+    with pytest.raises(RuntimeError, match="was updated by another invocation"):
+        save(taxis.GCS_BUCKET, second, generation)
+    assert stored(taxis, gcs, path("job"))["completed"] == {"2024-01-01": 10}
+
+
+# Contador de bytes del día de cuota
+
+def test_ledger_skips_the_write_when_nothing_changes(taxis, gcs):
+    budget = taxis.taxis_budget
+    assert budget._update_budget_ledger(taxis.GCS_BUCKET, DAY, lambda used: used) == 0
+    assert budget.budget_ledger_path(DAY) not in gcs.bucket(taxis.GCS_BUCKET).objects
+
+
+def test_ledger_retries_over_a_concurrent_reservation(taxis, gcs, monkeypatch):
+    budget = taxis.taxis_budget
+    budget._update_budget_ledger(taxis.GCS_BUCKET, DAY, lambda used: used + 100)
+    interleave(monkeypatch, budget.budget_ledger_path(DAY), [json.dumps({"bytes": 150})])
+
+    # Devuelve lo consumido al leer en el intento que sí escribe
+    assert budget._update_budget_ledger(taxis.GCS_BUCKET, DAY, lambda used: used + 30) == 150
+    assert budget.read_budget_ledger(taxis.GCS_BUCKET, DAY) == (180, 3)
+
+
+def test_ledger_returns_none_after_max_retries(taxis, monkeypatch, caplog):
+    budget = taxis.taxis_budget
+    others = [json.dumps({"bytes": 100 * attempt}) for attempt in range(1, taxis.partitions.MANIFEST_MAX_RETRIES + 1)]
+    interleave(monkeypatch, budget.budget_ledger_path(DAY), others)
+
+    with caplog.at_level(logging.WARNING):
+        assert budget._update_budget_ledger(taxis.GCS_BUCKET, DAY, lambda used: used + 30) is None
+    assert budget.read_budget_ledger(taxis.GCS_BUCKET, DAY)[0] == 100 * taxis.partitions.MANIFEST_MAX_RETRIES
+    assert f"Could not update byte budget ledger for {DAY}" in caplog.text
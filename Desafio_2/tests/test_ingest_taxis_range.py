@@ -0,0 +1,90 @@
+"""Extracción por tramos (EXTRACT_MODE=range) leída por días."""
+
+import threading
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from fakes import FakeBigQueryClient
+
+
+@pytest.fixture
+def bq(taxis):
+    client = FakeBigQueryClient(rows_per_day=300, page_size=100)
+    client.pages_read = 0
+    day_pages = client.day_pages
+
+    def counted_pages(date):
+        for page in day_pages(date):
+            client.pages_read += 1
+            yield page
+
+    client.day_pages = counted_pages
+    taxis.set_client("bigquery", client)
+    return client
+
+
+def test_range_days_are_read_as_they_arrive(taxis, bq):
+    extract = taxis.open_range_extract("2024-01-01", "2024-01-10")
+    first = taxis.fetch_range_day(extract, "2024-01-01")
+    assert len(first) == 300
+    # Solo el primer día y la primera página del siguiente, no el tramo entero
+    assert bq.pages_read <= 4
+    assert "ORDER BY DATE(trip_start_timestamp)" in bq.queries[0]
+
+
+def test_range_days_match_per_date_extract(taxis, bq):
+    extract = taxis.open_range_extract("2024-01-01", "2024-01-03")
+    # Pedidas fuera de orden: el día anterior queda guardado hasta que se pide
+    third = taxis.fetch_range_day(extract, "2024-01-03")
+    first = taxis.fetch_range_day(extract, "2024-01-01")
+    assert extract["ready"].keys() == {"2024-01-02"}
+    for date, df in (("2024-01-01", first), ("2024-01-03", third)):
+        alone = taxis.fetch_taxi_data_for_date(date)
+        pd.testing.assert_frame_equal(df.drop(columns="loaded_at"), alone.drop(columns="loaded_at"))
+
+
+def test_range_empty_days_keep_the_schema(taxis, bq):
+    bq.revisions = {"2024-01-02": -300}
+    extract = taxis.open_range_extract("2024-01-01", "2024-01-03")
+    days = {d: taxis.fetch_range_day(extract, d) for d in ("2024-01-01", "2024-01-02", "2024-01-03")}
+    assert [len(df) for df in days.values()] == [300, 0, 300]
+    schemas = {d: taxis.conform_taxi_table(pa.Table.from_pandas(df, preserve_index=False)).schema
+               for d, df in days.items()}
+    assert schemas["2024-01-02"].equals(schemas["2024-01-01"])
+
+
+def test_range_query_failure_fails_every_date(taxis, bq):
+    bq.fail_once = {"2024-01-01"}
+    extract = taxis.open_range_extract("2024-01-01", "2024-01-02")
+    for date in ("2024-01-01", "2024-01-02"):
+        with pytest.raises(Exception, match="simulated failure"):
+            taxis.fetch_range_day(extract, date)
+
+
+def test_range_mode_respects_max_in_flight(taxis, bq, monkeypatch):
+    taxis.INGEST_MAX_IN_FLIGHT = 2
+    lock = threading.Lock()
+    alive = {"now": 0, "max": 0}
+    fetch_range_day = taxis.fetch_range_day
+
+    def fetch(extract, date):
+        df = fetch_range_day(extract, date)
+        with lock:
+            alive["now"] += 1
+            alive["max"] = max(alive["max"], alive["now"] + len(extract["ready"]))
+        return df
+
+    def write(df, bucket_name, date, stats=None):
+        time.sleep(0.01)
+        with lock:
+            alive["now"] -= 1
+        return f"gs://{bucket_name}/{date}"
+
+    monkeypatch.setattr(taxis, "fetch_range_day", fetch)
+    monkeypatch.setattr(taxis, "write_daily_parquet", write)
+    result = taxis.process_taxi_ingestion("2024-01-01", "2024-01-20", extract_mode="range", max_workers=4)
+    assert result["new_dates_processed"] == 20 and result["bigquery_jobs"] == 1
+    assert alive["max"] <= 2
@@ -0,0 +1,79 @@
+"""Parámetros de los triggers HTTP y Pub/Sub de ingest_taxis."""
+
+import base64
+import json
+from types import SimpleNamespace
+
+import pytest
+
+
+def pubsub_event(data: dict) -> SimpleNamespace:
+    encoded = base64.b64encode(json.dumps(data).encode()).decode()
+    return SimpleNamespace(data={"message": {"data": encoded}})
+
+
+@pytest.mark.parametrize("value, expected", [(None, None), ("", None), ("8", 8), (8, 8), (4.0, 4)])
+def test_parse_max_workers(taxis, value, expected):
+    assert taxis.parse_max_workers(value) == expected
+
+
+@pytest.mark.parametrize("value", ["0", -2, "eight", 2.5, [4]])
+def test_parse_max_workers_rejects_invalid(taxis, value):
+    with pytest.raises(ValueError, match="max_workers"):
+        taxis.parse_max_workers(value)
+
+
+def test_pubsub_range_parses_string_max_workers(taxis, monkeypatch):
+    calls = []
+    monkeypatch.setattr(taxis, "process_taxi_ingestion", lambda *args, **kwargs: calls.append(args) or {})
+    taxis.ingest_taxis_pubsub(pubsub_event(
+        {"mode": "range", "start_date": "2023-01-01", "end_date": "2023-01-02", "max_workers": "8"}
+    ))
+    assert calls and calls[0][3] == 8
+
+
+def test_pubsub_backfill_and_refresh_parse_max_workers(taxis, monkeypatch):
+    calls = {}
+    monkeypatch.setattr(taxis, "start_backfill", lambda *args, **kwargs: calls.setdefault("backfill", args) and {})
+    monkeypatch.setattr(taxis, "detect_source_changes",
+                        lambda *args, **kwargs: calls.setdefault("refresh", args) and {})
+    dates = {"start_date": "2023-01-01", "end_date": "2023-01-02", "max_workers": "3"}
+    taxis.ingest_taxis_pubsub(pubsub_event({"mode": "backfill", **dates}))
+    taxis.ingest_taxis_pubsub(pubsub_event({"mode": "refresh", **dates}))
+    assert calls["backfill"][4] == 3 and calls["refresh"][4] == 3
+
+
+@pytest.mark.parametrize("mode, handler", [
+    ("fanout", "start_fanout"),
+    ("fanout_status", "fanout_status"),
+    ("rewrite", "rewrite_from_cache"),
+])
+def test_pubsub_dispatches_every_http_mode(taxis, monkeypatch, mode, handler):
+    calls = {}
+    for name in ("process_taxi_ingestion", handler):
+        monkeypatch.setattr(taxis, name, lambda *args, name=name, **kwargs: calls.setdefault(name, args) and {})
+    taxis.ingest_taxis_pubsub(pubsub_event(
+        {"mode": mode, "start_date": "2023-01-01", "end_date": "2023-01-02", "job_id": "job-1", "retry": "false"}
+    ))
+    assert list(calls) == [handler]
+    if mode == "fanout_status":
+        assert calls[handler] == ("job-1", False)
+
+
+def test_pubsub_rejects_unknown_mode(taxis, monkeypatch):
+    calls = []
+    monkeypatch.setattr(taxis, "process_taxi_ingestion", lambda *args, **kwargs: calls.append(args) or {})
+    with pytest.raises(ValueError, match="Unknown mode"):
+        taxis.ingest_taxis_pubsub(pubsub_event({"mode": "ranges", "start_date": "2023-01-01", "end_date": "2023-01-02"}))
+    assert calls == []
+
+
+@pytest.mark.parametrize("value, expected", [("false", False), ("False", False), ("true", True), (True, True), (None, False)])
+def test_pubsub_refresh_parses_boolean_flags(taxis, monkeypatch, value, expected):
+    calls = []
+    monkeypatch.setattr(taxis, "detect_source_changes", lambda *args, **kwargs: calls.append(args) or {})
+    message = {"mode": "refresh", "start_date": "2023-01-01", "end_date": "2023-01-02"}
+    if value is not None:
+        message.update(dry_run=value, refresh_unknown=value)
+    taxis.ingest_taxis_pubsub(pubsub_event(message))
+    assert calls[0][2:4] == (expected, expected)
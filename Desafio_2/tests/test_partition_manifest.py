@@ -0,0 +1,47 @@
+"""Manifest de particiones (PARTITION_MANIFEST) activado sobre un bucket que ya tiene particiones."""
+
+import json
+
+import pytest
+
+EXISTING = ["2024-01-01", "2024-01-02", "2024-01-03", "2024-01-04", "2024-01-05"]
+
+
+@pytest.fixture(params=["taxis", "weather"])
+def module(request, gcs):
+    """Función con particiones escritas antes de activar el manifest."""
+    function = request.getfixturevalue(request.param)
+    bucket = gcs.bucket(function.GCS_BUCKET)
+    for date in EXISTING:
+        bucket.blob(function.partition_blob_path(date)).upload_from_string(b"")
+    function.partitions.PARTITION_MANIFEST = True
+    return function
+
+
+def manifest_dates(module, gcs) -> list:
+    return json.loads(gcs.bucket(module.GCS_BUCKET).objects[f"_manifests/{module.PARQUET_BASE_PATH}.json"])["dates"]
+
+
+def test_bounded_lookup_seeds_the_manifest_with_every_partition(module, gcs):
+    assert module.get_existing_dates(module.GCS_BUCKET, "2024-01-04", "2024-01-10") == {"2024-01-04", "2024-01-05"}
+    assert manifest_dates(module, gcs) == EXISTING
+
+
+def test_first_registered_partition_keeps_the_existing_ones(module, gcs):
+    module.register_partition(module.GCS_BUCKET, "2024-01-06")
+
+    assert manifest_dates(module, gcs) == EXISTING + ["2024-01-06"]
+    # El manifest ya es la fuente: un rango sobre fechas previas no se vuelve a ingestar
+    assert module.get_existing_dates(module.GCS_BUCKET, "2024-01-01", "2024-01-06") == set(EXISTING) | {"2024-01-06"}
+
+
+def test_unfinished_multipart_partition_is_not_seeded(taxis, gcs):
+    bucket = gcs.bucket(taxis.GCS_BUCKET)
+    bucket.blob(taxis.partition_blob_path(EXISTING[0])).upload_from_string(b"")
+    # Partes de una escritura sin marcador: la partición no está completa
+    bucket.blob(f"{taxis.PARQUET_BASE_PATH}/date={EXISTING[1]}/part-00000.parquet").upload_from_string(b"")
+    taxis.partitions.PARTITION_MANIFEST = True
+
+    taxis.register_partition(taxis.GCS_BUCKET, EXISTING[2])
+
+    assert manifest_dates(taxis, gcs) == [EXISTING[0], EXISTING[2]]
@@ -0,0 +1,104 @@
+"""Reemplazo de particiones: los lectores resuelven por el marcador y nunca ven una mezcla."""
+
+import io
+import json
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from fakes import FakeBlob, load_function, synthetic_taxi_day
+
+DAY = "2024-01-01"
+
+
+def visible_rows(taxis, bucket) -> int | None:
+    """Filas de la partición como la lee stg_taxis: las partes del marcador o el data.parquet."""
+    marker = bucket.objects.get(taxis.taxis_partitions.partition_marker_path(DAY))
+    files = json.loads(marker)["parts"] if marker is not None else [taxis.partition_blob_path(DAY)]
+    if not all(name in bucket.objects for name in files):
+        return None
+    return sum(pq.read_metadata(io.BytesIO(bucket.objects[name])).num_rows for name in files)
+
+
+@pytest.fixture
+def snapshots(taxis, gcs, monkeypatch):
+    """Filas visibles tras cada subida o borrado de un objeto del bucket."""
+    bucket = gcs.bucket(taxis.GCS_BUCKET)
+    seen = []
+    upload, delete = FakeBlob.upload_from_string, FakeBlob.delete
+
+    def recording_upload(self, *args, **kwargs):
+        upload(self, *args, **kwargs)
+        seen.append(visible_rows(taxis, bucket))
+
+    def recording_delete(self, *args, **kwargs):
+        delete(self, *args, **kwargs)
+        seen.append(visible_rows(taxis, bucket))
+
+    monkeypatch.setattr(FakeBlob, "upload_from_string", recording_upload)
+    monkeypatch.setattr(FakeBlob, "delete", recording_delete)
+    return seen
+
+
+@pytest.mark.parametrize("before, after", [
+    ("single", "multipart"),
+    ("multipart", "multipart"),
+    ("multipart", "single"),
+])
+def test_readers_never_see_a_mixed_partition(taxis, gcs, snapshots, before, after):
+    bucket = gcs.bucket(taxis.GCS_BUCKET)
+    taxis.taxis_partitions.PARTITION_TARGET_ROWS = 400 if before == "multipart" else 0
+    taxis.write_daily_parquet(synthetic_taxi_day(DAY, 1000, seed=1), taxis.GCS_BUCKET, DAY)
+    snapshots.clear()
+
+    taxis.taxis_partitions.PARTITION_TARGET_ROWS = 300 if after == "multipart" else 0
+    taxis.write_daily_parquet(synthetic_taxi_day(DAY, 700, seed=2), taxis.GCS_BUCKET, DAY)
+
+    # La versión anterior hasta el cambio de marcador (o de data.parquet) y la nueva después
+    assert snapshots[0] == 1000 and snapshots[-1] == 700
+    assert set(snapshots) == {1000, 700}
+    assert snapshots == sorted(snapshots, reverse=True)
+    # Al terminar no queda nada de la versión anterior
+    names = [name for name in bucket.objects if name.startswith(f"{taxis.PARQUET_BASE_PATH}/")]
+    if after == "multipart":
+        marker = bucket.objects[taxis.taxis_partitions.partition_marker_path(DAY)]
+        assert sorted(names) == sorted(json.loads(marker)["parts"])
+    else:
+        assert names == [taxis.partition_blob_path(DAY)]
+        assert taxis.taxis_partitions.partition_marker_path(DAY) not in bucket.objects
+
+
+def test_interrupted_multipart_write_keeps_the_previous_version(taxis, gcs):
+    bucket = gcs.bucket(taxis.GCS_BUCKET)
+    taxis.taxis_partitions.PARTITION_TARGET_ROWS = 400
+    taxis.write_daily_parquet(synthetic_taxi_day(DAY, 1000, seed=1), taxis.GCS_BUCKET, DAY)
+    previous = json.loads(bucket.objects[taxis.taxis_partitions.partition_marker_path(DAY)])["parts"]
+
+    # Partes de una escritura que muere antes de publicar su marcador
+    table = taxis.conform_taxi_table(pa.Table.from_pandas(synthetic_taxi_day(DAY, 500, seed=2)))
+    taxis._write_partition_parts([table], taxis.GCS_BUCKET, DAY, taxis.get_parquet_profile(), 250)
+
+    assert json.loads(bucket.objects[taxis.taxis_partitions.partition_marker_path(DAY)])["parts"] == previous
+    assert visible_rows(taxis, bucket) == 1000
+    taxis.taxis_partitions.partition_index._cache.clear()
+    assert taxis.get_existing_dates(taxis.GCS_BUCKET, DAY, DAY) == {DAY}
+
+
+def test_local_engine_reads_only_the_marker_parts(taxis, gcs, tmp_path):
+    engine = load_function("local_engine")
+    bucket = gcs.bucket(taxis.GCS_BUCKET)
+    taxis.taxis_partitions.PARTITION_TARGET_ROWS = 400
+    taxis.write_daily_parquet(synthetic_taxi_day(DAY, 1000, seed=1), taxis.GCS_BUCKET, DAY)
+    # Un data.parquet que aún no se ha borrado tras el cambio a multi-fichero
+    bucket.objects[taxis.partition_blob_path(DAY)] = bucket.objects[
+        json.loads(bucket.objects[taxis.taxis_partitions.partition_marker_path(DAY)])["parts"][0]
+    ]
+    for name, data in bucket.objects.items():
+        (tmp_path / name).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / name).write_bytes(data)
+
+    files = engine.partition_files(tmp_path, engine.TAXIS_BASE_PATH, DAY)
+    assert len(files) == 3 and all(path.name.startswith("part-") for path in files)
+    assert sum(pq.read_metadata(path).num_rows for path in files) == 1000
+    assert engine.discover_dates(tmp_path, engine.TAXIS_BASE_PATH) == [DAY]
@@ -0,0 +1,124 @@
+"""
+Columnas de silver_taxis y cubo diario calculados en la ingesta: valores fijos
+con la semántica de BigQuery (ROUND, CASE con NULL, EXTRACT(DAYOFWEEK)).
+"""
+
+from datetime import datetime, timezone
+
+import pyarrow as pa
+import pytest
+
+
+def utc(*args) -> datetime:
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+def trips(**columns) -> pa.Table:
+    types = {
+        "trip_seconds": pa.int64(), "trip_miles": pa.float64(), "fare": pa.float64(), "tips": pa.float64(),
+        "trip_total": pa.float64(), "trip_start_timestamp": pa.timestamp("us", tz="UTC"),
+        "pickup_community_area": pa.int64(), "payment_type": pa.string(), "company": pa.string(),
+    }
+    return pa.table({name: pa.array(values, types[name]) for name, values in columns.items()})
+
+
+def test_round2_ties_go_away_from_zero(taxis):
+    values = pa.array([0.125, -0.125, 0.375, -0.375, 2.5, 24.599999999999998, None])
+    assert taxis.taxis_silver._sql_round2(values).to_pylist() == [0.13, -0.13, 0.38, -0.38, 2.5, 24.6, None]
+
+
+def test_derived_columns(taxis):
+    table = trips(
+        trip_seconds=[1230, 0, None, 60, 45],
+        trip_miles=[2.5, 0.0, None, 1.0, 2.0],
+        fare=[10.0, 0.0, None, -5.0, 3.0],
+        tips=[2.5, 0.0, 1.0, 0.0, 0.0],
+        trip_total=[14.0, 3.25, None, -5.0, 0.25],
+        trip_start_timestamp=[
+            utc(2024, 3, 3, 7, 15),  # domingo
+            utc(2024, 3, 9, 23, 59),  # sábado
+            utc(2024, 3, 6, 3, 0),  # miércoles
+            utc(2024, 3, 4, 16, 0),  # lunes
+            utc(2024, 3, 5, 12, 0),  # martes
+        ],
+    )
+    derived = taxis.derive_silver_columns(table).select(taxis.taxis_silver.SILVER_DERIVED_COLUMNS).to_pydict()
+
+    assert derived == {
+        "trip_minutes": [20.5, 0.0, None, 1.0, 0.75],
+        "trip_km": [4.02, 0.0, None, 1.61, 3.22],
+        # trip_seconds = 0 o NULL: NULL
+        "avg_speed_mph": [7.32, None, None, 60.0, 160.0],
+        # fare = 0, NULL o negativo: rama ELSE (0)
+        "tip_percentage": [25.0, 0.0, 0.0, 0.0, 0.0],
+        # trip_miles = 0 o NULL: NULL; 0.25 / 2 = 0.125 redondea a 0.13
+        "cost_per_mile": [5.6, None, None, -5.0, 0.13],
+        "start_hour": [7, 23, 3, 16, 12],
+        # DAYOFWEEK de BigQuery: domingo = 1 ... sábado = 7
+        "day_of_week": [1, 7, 4, 2, 3],
+        "day_type": ["weekend", "weekend", "weekday", "weekday", "weekday"],
+        "time_of_day": ["morning_rush", "night", "late_night", "evening_rush", "midday"],
+        # Una condición NULL hace falso el CASE
+        "is_valid_trip": [True, False, False, False, True],
+    }
+
+
+def test_daily_cube(taxis):
+    table = trips(
+        trip_seconds=[1230, 600, 45, 0, 300],
+        trip_miles=[2.5, 1.004, 2.0, 1.0, 1.0],
+        fare=[10.0, 7.25, 3.0, 5.0, 5.0],
+        tips=[2.5, None, 0.0, 0.0, 0.0],
+        trip_total=[14.0, 7.25, 0.25, 5.0, 5.0],
+        trip_start_timestamp=[utc(2024, 3, 3, 7, 15), utc(2024, 3, 3, 7, 45), utc(2024, 3, 3, 12, 0),
+                              utc(2024, 3, 3, 7, 0), None],
+        pickup_community_area=[8, 8, None, 8, 8],
+        payment_type=[None, None, "Cash", None, None],
+        company=["Flash Cab", "Flash Cab", None, "Flash Cab", "Flash Cab"],
+    )
+    # El cuarto viaje no es válido (trip_seconds = 0) y el quinto no tiene hora de inicio
+    cube = taxis.aggregate_daily_cube(table).to_pylist()
+
+    assert len(cube) == 2
+    assert cube[0] == pytest.approx({
+        "start_hour": 7, "pickup_community_area": 8, "payment_type": "Unknown", "company": "Flash Cab",
+        "trips": 2,
+        "count_trip_minutes": 2, "sum_trip_minutes": 30.5, "sumsq_trip_minutes": 520.25,
+        # trip_miles redondeado como en silver_taxis: 1.004 -> 1.0
+        "count_trip_miles": 2, "sum_trip_miles": 3.5, "sumsq_trip_miles": 7.25,
+        "count_fare": 2, "sum_fare": 17.25, "sumsq_fare": 152.5625,
+        # Las propinas NULL no cuentan, y su tip_percentage también es NULL
+        "count_tips": 1, "sum_tips": 2.5, "sumsq_tips": 6.25,
+        "count_trip_total": 2, "sum_trip_total": 21.25,
+        "count_avg_speed_mph": 2, "sum_avg_speed_mph": 7.32 + 6.02,
+        "count_tip_percentage": 1, "sum_tip_percentage": 25.0,
+        "min_trip_minutes": 10.0, "max_trip_minutes": 20.5,
+    })
+    assert cube[1] == pytest.approx({
+        "start_hour": 12, "pickup_community_area": None, "payment_type": "Cash", "company": "Unknown",
+        "trips": 1,
+        "count_trip_minutes": 1, "sum_trip_minutes": 0.75, "sumsq_trip_minutes": 0.5625,
+        "count_trip_miles": 1, "sum_trip_miles": 2.0, "sumsq_trip_miles": 4.0,
+        "count_fare": 1, "sum_fare": 3.0, "sumsq_fare": 9.0,
+        "count_tips": 1, "sum_tips": 0.0, "sumsq_tips": 0.0,
+        "count_trip_total": 1, "sum_trip_total": 0.25,
+        "count_avg_speed_mph": 1, "sum_avg_speed_mph": 160.0,
+        "count_tip_percentage": 1, "sum_tip_percentage": 0.0,
+        "min_trip_minutes": 0.75, "max_trip_minutes": 0.75,
+    })
+
+
+def test_daily_cube_combines_partials(taxis):
+    table = trips(
+        trip_seconds=[1230, 600, 45],
+        trip_miles=[2.5, 1.004, 2.0],
+        fare=[10.0, 7.25, 3.0],
+        tips=[2.5, None, 0.0],
+        trip_total=[14.0, 7.25, 0.25],
+        trip_start_timestamp=[utc(2024, 3, 3, 7, 15), utc(2024, 3, 3, 7, 45), utc(2024, 3, 3, 12, 0)],
+        pickup_community_area=[8, 8, None],
+        payment_type=[None, None, "Cash"],
+        company=["Flash Cab", "Flash Cab", None],
+    )
+    partials = [taxis.taxis_cube._partial_daily_cube(table.slice(i, 1)) for i in range(table.num_rows)]
+    assert taxis.combine_daily_cube(partials).equals(taxis.aggregate_daily_cube(table))
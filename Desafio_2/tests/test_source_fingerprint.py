@@ -0,0 +1,50 @@
+"""Huella de origen de cada partición (SOURCE_FINGERPRINT / mode=refresh)."""
+
+import pyarrow as pa
+import pytest
+
+from fakes import FakeBigQueryClient, synthetic_taxi_day
+
+DAY = "2024-01-01"
+
+
+@pytest.fixture
+def bq(taxis):
+    client = FakeBigQueryClient(rows_per_day=500)
+    taxis.set_client("bigquery", client)
+    return client
+
+
+def landed_table(taxis, df):
+    return taxis.conform_taxi_table(pa.Table.from_pandas(df, preserve_index=False))
+
+
+def test_fingerprint_matches_the_source_query(taxis, bq):
+    taxis.SOURCE_FINGERPRINT = True
+    df = taxis.fetch_taxi_data_for_date(DAY)
+    table = landed_table(taxis, df)
+    # Por trozos, como en la ruta streaming
+    tables, fingerprint = taxis.table_fingerprint([table.slice(0, 200), table.slice(200, 0), table.slice(200)])
+    list(tables)
+    assert fingerprint == taxis.fetch_source_fingerprints(DAY, DAY)[DAY]
+
+
+def test_fingerprint_is_skipped_unless_enabled(taxis):
+    table = landed_table(taxis, synthetic_taxi_day(DAY, 100))
+    tables, fingerprint = taxis.table_fingerprint([table])
+    assert list(tables) == [table] and fingerprint == {}
+
+    taxis.write_daily_parquet(synthetic_taxi_day(DAY, 100), taxis.GCS_BUCKET, DAY)
+    assert taxis.read_partition_fingerprints(taxis.GCS_BUCKET, DAY, DAY) == {DAY: None}
+
+
+@pytest.mark.parametrize("write_path", ["pandas", "arrow"])
+def test_refresh_stores_fingerprints_without_the_flag(taxis, bq, write_path):
+    taxis.process_taxi_ingestion(DAY, "2024-01-03")
+    first = taxis.detect_source_changes(DAY, "2024-01-03", dry_run=True)
+    assert first["unfingerprinted"] == [DAY, "2024-01-02", "2024-01-03"]
+
+    taxis.detect_source_changes(DAY, "2024-01-03", refresh_unknown=True, write_path=write_path)
+    second = taxis.detect_source_changes(DAY, "2024-01-03", dry_run=True)
+    assert second["unchanged"] == 3 and not second["unfingerprinted"]
+    assert not taxis._refresh_writes.get()
@@ -0,0 +1,72 @@
+"""Logs JSON por etapa (stage_span) de las funciones de ingesta."""
+
+import io
+import json
+import logging
+
+import pytest
+
+
+@pytest.fixture(params=["taxis", "weather"])
+def module(request):
+    return request.getfixturevalue(request.param)
+
+
+@pytest.fixture
+def stage_logger(module):
+    return module.instrumentation.get_stage_logger(module.FUNCTION_NAME)
+
+
+def test_stage_span_logs_one_json_line(module, stage_logger, capsys):
+    module.instrumentation.STAGE_LOGS = True
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(module.instrumentation.JsonLogFormatter())
+    stage_logger.addHandler(handler)
+
+    @module.instrumented(module.FUNCTION_NAME)
+    def run():
+        with module.stage_span("upload", "2024-01-01", rows=10) as span:
+            span["bytes_out"] = 1234
+        return {}
+
+    try:
+        run()
+    finally:
+        stage_logger.removeHandler(handler)
+
+    line, = stream.getvalue().splitlines()
+    record = json.loads(line)
+    assert record["severity"] == "INFO" and record["message"] == "stage upload 2024-01-01"
+    assert record["event"] == "stage" and record["function"] == module.FUNCTION_NAME
+    assert record["rows"] == 10 and record["bytes_out"] == 1234 and record["seconds"] >= 0
+    # Sin print: nada sale por stdout fuera de los handlers de logging
+    assert "stage upload" not in capsys.readouterr().out
+
+
+def test_stage_logs_off_emit_nothing(module, stage_logger):
+    module.instrumentation.STAGE_LOGS = False
+    records = []
+    handler = logging.Handler()
+    handler.emit = records.append
+    stage_logger.addHandler(handler)
+    try:
+        module.instrumented(module.FUNCTION_NAME)(lambda: module.stage_span("upload").__enter__() and {})()
+    finally:
+        stage_logger.removeHandler(handler)
+    assert records == []
+
+
+def test_each_function_logs_under_its_own_name(taxis, weather):
+    taxis_logger = taxis.instrumentation.get_stage_logger(taxis.FUNCTION_NAME)
+    weather_logger = weather.instrumentation.get_stage_logger(weather.FUNCTION_NAME)
+    assert (taxis_logger.name, weather_logger.name) == ("ingest_taxis.stages", "ingest_weather.stages")
+
+
+def test_reloading_keeps_a_single_stage_handler(taxis):
+    from fakes import load_function
+
+    reloaded = load_function("ingest_taxis")
+    for module in (taxis, reloaded):
+        stage_logger = module.instrumentation.get_stage_logger(module.FUNCTION_NAME)
+    assert [h.get_name() for h in stage_logger.handlers].count("stage_json") == 1
@@ -0,0 +1,53 @@
+"""Rangos de Open-Meteo troceados por día: mismo DataFrame que una request de un solo día."""
+
+import pytest
+
+# Un día con nulos entre dos con valores: en un DataFrame del rango la columna es float64
+RECORDS = {
+    "2023-01-01": {"time": "2023-01-01", "temperature_2m_max": 1.5, "rain_sum": 0.2, "snowfall_sum": 3},
+    "2023-01-02": {"time": "2023-01-02", "temperature_2m_max": None, "rain_sum": None, "snowfall_sum": None},
+    "2023-01-03": {"time": "2023-01-03", "temperature_2m_max": 2.5, "rain_sum": 0.0, "snowfall_sum": 0},
+}
+
+
+@pytest.fixture
+def open_meteo(weather, monkeypatch):
+    """Función sin caché con la API sustituida por RECORDS."""
+    weather.WEATHER_CACHE_MEMORY_ENTRIES = 0
+
+    def request_weather_days(start_date, end_date):
+        return {date: dict(record) for date, record in RECORDS.items() if start_date <= date <= end_date}
+
+    monkeypatch.setattr(weather, "request_weather_days", request_weather_days)
+    return weather
+
+
+def test_batched_days_have_the_dtypes_of_single_day_requests(open_meteo):
+    batched = open_meteo.fetch_weather_for_range("2023-01-01", "2023-01-03")
+
+    assert list(batched) == list(RECORDS)
+    for date, frame in batched.items():
+        single = open_meteo.fetch_weather_for_date(date)
+        assert frame.dtypes.to_dict() == single.dtypes.to_dict(), date
+        assert frame.drop(columns="loaded_at").equals(single.drop(columns="loaded_at"))
+
+
+def test_day_with_nulls_does_not_inherit_its_neighbours_dtypes(open_meteo):
+    batched = open_meteo.fetch_weather_for_range("2023-01-01", "2023-01-03")
+
+    assert str(batched["2023-01-01"]["snowfall_sum"].dtype) == "int64"
+    assert batched["2023-01-02"]["rain_sum"].isna().all()
+    assert str(batched["2023-01-02"]["rain_sum"].dtype) == str(
+        open_meteo.fetch_weather_for_date("2023-01-02")["rain_sum"].dtype
+    )
+
+
+def test_range_ingestion_logs_every_written_partition(open_meteo, caplog):
+    with caplog.at_level("INFO", logger=open_meteo.logger.name):
+        result = open_meteo.process_weather_ingestion("2023-01-01", "2023-01-03")
+
+    assert result["status"] == "success"
+    written = [r.getMessage() for r in caplog.records if r.getMessage().startswith("Written parquet to ")]
+    assert written == [
+        f"Written parquet to gs://{open_meteo.GCS_BUCKET}/{open_meteo.partition_blob_path(date)}" for date in RECORDS
+    ]
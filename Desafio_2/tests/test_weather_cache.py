@@ -0,0 +1,105 @@
+"""Tier persistente de la caché de Open-Meteo: poda por WEATHER_CACHE_MAX_MB."""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from fakes import synthetic_weather_value
+
+MONTHS = ["2023-01", "2023-02", "2023-03"]
+
+
+def month_records(month: str) -> dict:
+    dates = [f"{month}-{day:02d}" for day in range(1, 29)]
+    return {date: {"time": date, "temperature_2m_max": synthetic_weather_value("temperature_2m_max", date)}
+            for date in dates}
+
+
+@pytest.fixture
+def disk_cache(weather, tmp_path):
+    weather.WEATHER_CACHE_URI = str(tmp_path / "open-meteo")
+    weather.WEATHER_CACHE_MEMORY_ENTRIES = 0
+    for month in MONTHS:
+        weather.weather_cache_put_many(month_records(month))
+    return weather
+
+
+def entry_paths(weather) -> dict:
+    return {Path(name).stem: name for name, _, _ in weather._persistent_entries()}
+
+
+def test_prune_evicts_least_recently_used_until_under_the_cap(disk_cache):
+    weather = disk_cache
+    paths = entry_paths(weather)
+    sizes = {name: size for name, size, _ in weather._persistent_entries()}
+    # Último uso explícito: marzo, enero, febrero (de más antiguo a más reciente)
+    for used, month in enumerate(["2023-03", "2023-01", "2023-02"], start=1):
+        os.utime(paths[month], (used, used))
+
+    weather.WEATHER_CACHE_MAX_MB = (sum(sizes.values()) - 1) / 1024**2
+    before = weather.weather_cache_stats_snapshot()
+    assert weather.prune_weather_cache() == 1
+    assert set(entry_paths(weather)) == {"2023-01", "2023-02"}
+    assert weather.weather_cache_stats_since(before)["evictions"] == 1
+
+    # Con presupuesto para una sola entrada queda la usada más recientemente
+    weather.WEATHER_CACHE_MAX_MB = sizes[paths["2023-02"]] / 1024**2
+    assert weather.prune_weather_cache() == 1
+    assert set(entry_paths(weather)) == {"2023-02"}
+
+
+def test_prune_breaks_mtime_ties_by_month(disk_cache):
+    weather = disk_cache
+    for name in entry_paths(weather).values():
+        os.utime(name, (100, 100))
+    total = sum(size for _, size, _ in weather._persistent_entries())
+    weather.WEATHER_CACHE_MAX_MB = (total - 1) / 1024**2
+    assert weather.prune_weather_cache() == 1
+    assert set(entry_paths(weather)) == {"2023-02", "2023-03"}
+
+
+def test_prune_counts_space_of_entries_removed_by_another_instance(disk_cache, monkeypatch):
+    weather = disk_cache
+    paths = entry_paths(weather)
+    for used, month in enumerate(MONTHS, start=1):
+        os.utime(paths[month], (used, used))
+    entries = weather._persistent_entries()
+    sizes = {name: size for name, size, _ in entries}
+    # Enero ya lo ha borrado otra instancia tras el listado
+    os.remove(paths["2023-01"])
+    monkeypatch.setattr(weather, "_persistent_entries", lambda: entries)
+
+    weather.WEATHER_CACHE_MAX_MB = (sum(sizes.values()) - sizes[paths["2023-01"]]) / 1024**2
+    before = weather.weather_cache_stats_snapshot()
+    assert weather.prune_weather_cache() == 0
+    assert weather.weather_cache_stats_since(before)["evictions"] == 0
+    assert all(os.path.exists(paths[month]) for month in ("2023-02", "2023-03"))
+
+
+def test_put_many_keeps_the_gcs_tier_under_the_cap(weather, gcs):
+    weather.WEATHER_CACHE_URI = "gs://weather-cache/open-meteo"
+    weather.WEATHER_CACHE_MAX_MB = 64
+    weather.weather_cache_put_many(month_records("2023-01"))
+    (entry,) = weather._persistent_entries()
+
+    weather.WEATHER_CACHE_MAX_MB = entry[1] * 2.5 / 1024**2
+    for month in MONTHS[1:]:
+        weather.weather_cache_put_many(month_records(month))
+    entries = weather._persistent_entries()
+    assert len(entries) == 2
+    assert sum(size for _, size, _ in entries) <= weather.WEATHER_CACHE_MAX_MB * 1024**2
+    assert not any(name.endswith("2023-01.json") for name, _, _ in entries)
+
+
+def test_synthetic_weather_value_is_stable_across_processes():
+    code = "from fakes import synthetic_weather_value as v; print(v('rain_sum', '2023-05-01'))"
+    benchmarks = str(Path(__file__).resolve().parent.parent / "benchmarks")
+    values = {
+        subprocess.run([sys.executable, "-c", code], cwd=benchmarks, capture_output=True, text=True, check=True,
+                       env={**os.environ, "PYTHONHASHSEED": seed}).stdout
+        for seed in ("1", "2")
+    }
+    assert values == {f"{synthetic_weather_value('rain_sum', '2023-05-01')}\n"}